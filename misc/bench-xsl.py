@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from __future__ import with_statement
+from __future__ import print_function
+from contextlib import closing
+import io
+import os.path
+import logging
+import sys
+import time
+
+
+logger = logging.getLogger('hwp5.xslbench')
+
+
+def make_synthetic_xhwp5(hwp5path, out_path, paragraphs):
+    ''' Repeat the body paragraphs of a hwp5 file into a large XHWP5. '''
+    from lxml import etree
+    from hwp5.xmlmodel import Hwp5File
+
+    with closing(Hwp5File(hwp5path)) as hwp5file:
+        f = io.BytesIO()
+        hwp5file.xmlevents(embedbin=False).dump(f)
+    f.seek(0)
+    doc = etree.parse(f)
+
+    columnset = doc.find('BodyText/SectionDef/ColumnSet')
+    originals = columnset.findall('Paragraph')
+    for i in range(paragraphs - len(originals)):
+        paragraph = etree.fromstring(etree.tostring(originals[i %
+                                                              len(originals)]))
+        columnset.append(paragraph)
+    for paragraph_id, paragraph in enumerate(doc.iter('Paragraph')):
+        paragraph.set('paragraph-id', str(paragraph_id))
+
+    with io.open(out_path, 'wb') as f:
+        doc.write(f, encoding='utf-8', xml_declaration=True)
+
+
+def main():
+    doc = ''' time the XSL transforms on a synthetic document
+
+    Usage:
+        bench-xsl [--paragraphs=<n>] [--work-dir=<dir>] [<hwp5file>]
+        bench-xsl --help
+
+    Options:
+        -h --help               Show this screen
+           --paragraphs=<n>     Number of paragraphs [default: 10000]
+           --work-dir=<dir>     Directory for the generated files
+    '''
+    from docopt import docopt
+    from hwp5.hwp5html import HTMLTransform
+    from hwp5.hwp5odt import ODTTransform
+
+    args = docopt(doc, version='0.0')
+
+    logging.getLogger().addHandler(logging.StreamHandler())
+    logging.getLogger('hwp5.xslbench').setLevel(logging.INFO)
+
+    hwp5path = args['<hwp5file>']
+    if hwp5path is None:
+        hwp5path = os.path.join(os.path.dirname(__file__), '..',
+                                'samples', 'sample-5017.hwp')
+    work_dir = args['--work-dir'] or '.'
+    if not os.path.exists(work_dir):
+        os.makedirs(work_dir)
+    paragraphs = int(args['--paragraphs'])
+
+    xhwp5path = os.path.join(work_dir, 'bench-%d.xml' % paragraphs)
+    logger.info('generating %s', xhwp5path)
+    make_synthetic_xhwp5(hwp5path, xhwp5path, paragraphs)
+
+    html = HTMLTransform()
+    odt = ODTTransform(relaxng_compile=False)
+    transforms = [
+        ('styles.css', html.transform_xhwp5_to_css),
+        ('index.xhtml', html.transform_xhwp5_to_xhtml),
+        ('styles.xml', odt.transform_xhwp5_to_styles),
+        ('content.xml', odt.transform_xhwp5_to_content),
+    ]
+    for name, transform in transforms:
+        out_path = os.path.join(work_dir, name)
+        started = time.time()
+        with io.open(out_path, 'wb') as f:
+            transform(xhwp5path, f)
+        print('%-12s %8.3fs' % (name, time.time() - started))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from binascii import a2b_hex
+from unittest import TestCase
+
+from hwp5.aes import AES128ECBDecryptor
+from hwp5.aes import aes128ecb_decrypt
+
+
+class TestAES128ECB(TestCase):
+
+    # FIPS-197, Appendix C.1
+    key = a2b_hex(b'000102030405060708090a0b0c0d0e0f')
+    plaintext = a2b_hex(b'00112233445566778899aabbccddeeff')
+    ciphertext = a2b_hex(b'69c4e0d86a7b0430d8cdb78070b4c55a')
+
+    def test_decrypt(self):
+        self.assertEquals(self.plaintext,
+                          aes128ecb_decrypt(self.key, self.ciphertext))
+
+    def test_decrypt_multiple_blocks(self):
+        ciphertext = self.ciphertext * 3
+        self.assertEquals(self.plaintext * 3,
+                          aes128ecb_decrypt(self.key, ciphertext))
+
+    def test_decryptor_incremental(self):
+        ciphertext = self.ciphertext * 3
+        decryptor = AES128ECBDecryptor(self.key)
+        decrypted = decryptor.update(ciphertext[:5])
+        self.assertEquals(b'', decrypted)
+        decrypted += decryptor.update(ciphertext[5:37])
+        self.assertEquals(self.plaintext * 2, decrypted)
+        decrypted += decryptor.update(ciphertext[37:])
+        decrypted += decryptor.finalize()
+        self.assertEquals(self.plaintext * 3, decrypted)
+
+    def test_decryptor_incomplete_block(self):
+        decryptor = AES128ECBDecryptor(self.key)
+        decryptor.update(self.ciphertext[:15])
+        self.assertRaises(ValueError, decryptor.finalize)
+
+    def test_invalid_key_size(self):
+        self.assertRaises(ValueError, AES128ECBDecryptor, self.key[:15])
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from contextlib import closing
+from io import BytesIO
+from multiprocessing.pool import ThreadPool
+from unittest import TestCase
+import hashlib
+import io
+import os
+import os.path
+import shutil
+import tempfile
+
+from hwp5 import bindatastore
+from hwp5.bindatastore import BinDataStore
+from hwp5.hwp5html import DirectoryTarget
+from hwp5.hwp5html import HTMLTransform
+from hwp5.storage import unpack
+from hwp5.xmlmodel import Hwp5File
+
+from .fixtures import get_fixture_path
+
+
+class TestBinDataStore(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir, True)
+        self.store = BinDataStore(os.path.join(self.tempdir, 'store'))
+
+    def read(self, path):
+        with io.open(path, 'rb') as f:
+            return f.read()
+
+    def test_add(self):
+        data = b'logo' * 1000
+        digest = self.store.add(BytesIO(data))
+        self.assertEquals(hashlib.sha1(data).hexdigest(), digest)
+        self.assertEquals(data, self.read(self.store.object_path(digest)))
+        self.assertEquals(digest, self.store.add(BytesIO(data)))
+        self.assertEquals(1, self.store.added)
+        self.assertEquals(1, self.store.reused)
+        tmp = os.path.join(self.store.path, bindatastore.TEMP_DIRNAME)
+        self.assertEquals([], os.listdir(tmp))
+
+    def test_add_large(self):
+        data = os.urandom(bindatastore.SPOOL_SIZE + 1000)
+        digest = self.store.add(BytesIO(data))
+        self.assertEquals(data, self.read(self.store.object_path(digest)))
+        self.assertEquals(digest, self.store.add(BytesIO(data)))
+        tmp = os.path.join(self.store.path, bindatastore.TEMP_DIRNAME)
+        self.assertEquals([], os.listdir(tmp))
+
+    def test_export(self):
+        data = b'background'
+        first = os.path.join(self.tempdir, 'first')
+        second = os.path.join(self.tempdir, 'second')
+        digest = self.store.export(BytesIO(data), first)
+        self.store.export(BytesIO(data), second)
+        self.assertEquals(data, self.read(first))
+        self.assertEquals(data, self.read(second))
+        if hasattr(os, 'link'):
+            self.assertTrue(os.path.samefile(first, second))
+            self.assertTrue(os.path.samefile(
+                first, self.store.object_path(digest)
+            ))
+
+        # exported again over an existing one
+        self.store.export(BytesIO(b'another'), first)
+        self.assertEquals(b'another', self.read(first))
+        self.assertEquals(data, self.read(second))
+
+    def test_concurrent(self):
+        data = b'shared' * 1000
+
+        def add(i):
+            return self.store.add(BytesIO(data))
+        pool = ThreadPool(4)
+        try:
+            digests = pool.map(add, range(16))
+        finally:
+            pool.terminate()
+            pool.join()
+        self.assertEquals(1, len(set(digests)))
+        self.assertEquals(data,
+                          self.read(self.store.object_path(digests[0])))
+
+    def test_unpack(self):
+        path = get_fixture_path('sample-5017.hwp')
+        with closing(Hwp5File(path)) as hwp5file:
+            unpack(hwp5file, self.make_outdir('first'),
+                   bindata_store=self.store)
+            added = self.store.added
+            unpack(hwp5file, self.make_outdir('second'),
+                   bindata_store=self.store)
+            expected = hwp5file['BinData']['BIN0002.jpg'].open().read()
+        first = os.path.join(self.tempdir, 'first', 'BinData', 'BIN0002.jpg')
+        second = os.path.join(self.tempdir, 'second', 'BinData',
+                              'BIN0002.jpg')
+        self.assertEquals(expected, self.read(first))
+        self.assertEquals(expected, self.read(second))
+        # nothing new in the second
+        self.assertEquals(added, self.store.added)
+        self.assertTrue(os.path.exists(os.path.join(self.tempdir, 'first',
+                                                    'DocInfo')))
+
+    def make_outdir(self, name):
+        path = os.path.join(self.tempdir, name)
+        os.mkdir(path)
+        return path
+
+    def test_html_transform(self):
+        transform = HTMLTransform(bindata_store=self.store)
+        path = get_fixture_path('sample-5017.hwp')
+        with closing(Hwp5File(path)) as hwp5file:
+            transform.transform_hwp5_to_dir(
+                hwp5file, os.path.join(self.tempdir, 'first')
+            )
+            added = self.store.added
+            transform.transform_hwp5_to_dir(
+                hwp5file, os.path.join(self.tempdir, 'second')
+            )
+            expected = hwp5file['BinData']['BIN0002.jpg'].open().read()
+        for name in ('first', 'second'):
+            bindata = os.path.join(self.tempdir, name, 'bindata',
+                                   'BIN0002.jpg')
+            self.assertEquals(expected, self.read(bindata))
+        self.assertEquals(added, self.store.added)
+
+    def test_html_transform_without_store(self):
+        path = get_fixture_path('sample-5017.hwp')
+        outdir = os.path.join(self.tempdir, 'out')
+        with closing(Hwp5File(path)) as hwp5file:
+            transform = HTMLTransform(bindata_store=self.store)
+            transform.transform_hwp5_to_dir(hwp5file, outdir)
+            expected = hwp5file['BinData']['BIN0002.jpg'].open().read()
+        digest = hashlib.sha1(expected).hexdigest()
+
+        # written anew, not through the link into the store
+        target = DirectoryTarget(outdir)
+        target.write_stream('bindata/BIN0002.jpg', BytesIO(b'other'))
+        bindata = os.path.join(outdir, 'bindata', 'BIN0002.jpg')
+        self.assertEquals(b'other', self.read(bindata))
+        self.assertEquals(expected,
+                          self.read(self.store.object_path(digest)))
+
+    def test_unpack_without_store(self):
+        path = get_fixture_path('sample-5017.hwp')
+        with closing(Hwp5File(path)) as hwp5file:
+            outdir = self.make_outdir('out')
+            unpack(hwp5file, outdir, bindata_store=self.store)
+            unpack(hwp5file, outdir)
+            expected = hwp5file['BinData']['BIN0002.jpg'].open().read()
+        digest = hashlib.sha1(expected).hexdigest()
+        bindata = os.path.join(outdir, 'BinData', 'BIN0002.jpg')
+        self.assertEquals(expected, self.read(bindata))
+        self.assertNotEquals(os.stat(self.store.object_path(digest)).st_ino,
+                             os.stat(bindata).st_ino)
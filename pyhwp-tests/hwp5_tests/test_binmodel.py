@@ -33,6 +33,8 @@ from hwp5.binmodel import TableControl
 from hwp5.binmodel import TextboxParagraphList
 from hwp5.binmodel import init_record_parsing_context
 from hwp5.binmodel import model_to_json
+from hwp5.binmodel import model_to_ndjson
+from hwp5.binmodel import paragraph_texts
 from hwp5.binmodel import parse_model
 from hwp5.binmodel import parse_models
 from hwp5.binmodel import parse_models_intern
@@ -919,6 +921,32 @@ class TestModelJson(TestBase):
         jsonobject = json.loads(json_string)
         self.assertEquals(['ff fe fd fc'], jsonobject['unparsed'])
 
+    def test_model_to_ndjson(self):
+        model = self.hwp5file.bodytext.section(0).model(1)
+        json_string = model_to_ndjson(model)
+        self.assertFalse('\n' in json_string)
+
+        jsonobject = json.loads(json_string)
+        self.assertEquals('ParaText', jsonobject['type'])
+        self.assertEquals('0200646365730000', jsonobject['payload'][:16])
+        self.assertFalse(isinstance(model['type'], basestring))
+
+        model = dict(type=RecordModel, content=[], payload=b'\x00\x01',
+                     unparsed=b'\xff\xfe')
+        jsonobject = json.loads(model_to_ndjson(model))
+        self.assertEquals('0001', jsonobject['payload'])
+        self.assertEquals('fffe', jsonobject['unparsed'])
+
+    def test_paragraph_texts(self):
+        models = self.hwp5file.bodytext.section(0).models()
+        texts = list(paragraph_texts(models))
+        self.assertEquals(Paragraph, texts[0][0]['type'])
+        self.assertEquals('\ud55c\uae00 2005 \uc608\uc81c '
+                          '\ud30c\uc77c\uc785\ub2c8\ub2e4.', texts[0][1])
+        # empty paragraphs and paragraphs in the table cells
+        self.assertEquals('', texts[1][1])
+        self.assertEquals((2, 'A0'), (texts[6][0]['level'], texts[6][1]))
+
     def test_generate_models_json_array(self):
         models_json = self.hwp5file.bodytext.section(0).models_json()
         gen = models_json.generate()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from contextlib import closing
+from io import BytesIO
+from multiprocessing.pool import ThreadPool
+from unittest import TestCase
+import io
+import os
+import os.path
+import shutil
+import tempfile
+import time
+
+from hwp5.cache import ConversionCache
+from hwp5.cache import parse_size
+from hwp5.cache import storage_digest
+from hwp5.hwp5html import HTMLTransform
+from hwp5.xmlmodel import Hwp5File
+from hwp5.xmlmodel import Selection
+
+from .fixtures import get_fixture_path
+
+
+class TestCacheBase(TestCase):
+
+    def make_tempdir(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, True)
+        return path
+
+    def open_hwp5file(self, path):
+        hwp5file = Hwp5File(path)
+        self.addCleanup(hwp5file.close)
+        return hwp5file
+
+
+class TestDigest(TestCacheBase):
+
+    def test_parse_size(self):
+        self.assertEquals(1000, parse_size('1000'))
+        self.assertEquals(512 * 1024, parse_size('512k'))
+        self.assertEquals(100 * 1024 * 1024, parse_size('100M'))
+        self.assertEquals(2 * 1024 ** 3, parse_size('2G'))
+        self.assertRaises(ValueError, parse_size, 'big')
+
+    def test_storage_digest(self):
+        path = get_fixture_path('sample-5017.hwp')
+        copied = os.path.join(self.make_tempdir(), 'attachment.hwp')
+        shutil.copyfile(path, copied)
+        digest = storage_digest(self.open_hwp5file(path))
+        self.assertEquals(digest, storage_digest(self.open_hwp5file(copied)))
+
+        other = self.open_hwp5file(get_fixture_path('table.hwp'))
+        self.assertNotEquals(digest, storage_digest(other))
+
+    def test_key(self):
+        cache = ConversionCache(self.make_tempdir())
+        hwp5file = self.open_hwp5file(get_fixture_path('table.hwp'))
+        key = cache.key(hwp5file, 'text', embedbin=False)
+        self.assertEquals(key, cache.key(hwp5file, 'text', embedbin=False))
+        self.assertNotEquals(key, cache.key(hwp5file, 'xhwp5'))
+        self.assertNotEquals(key, cache.key(hwp5file, 'text', embedbin=True))
+        self.assertNotEquals(
+            cache.key(hwp5file, 'text', selection=Selection(pages=1)),
+            cache.key(hwp5file, 'text', selection=Selection(pages=2))
+        )
+
+
+class TestConversionCache(TestCacheBase):
+
+    def setUp(self):
+        self.cache = ConversionCache(self.make_tempdir())
+        self.transformed = []
+
+    def transform(self, hwp5file, f):
+        self.transformed.append(hwp5file)
+        hwp5file.xmlevents().dump(f)
+
+    def test_cached_file(self):
+        transform = self.cache.cached(self.transform, 'xhwp5')
+        path = get_fixture_path('table.hwp')
+        outputs = []
+        for i in range(3):
+            hwp5file = self.open_hwp5file(path)
+            output = BytesIO()
+            transform(hwp5file, output)
+            outputs.append(output.getvalue())
+        self.assertEquals(1, len(self.transformed))
+        self.assertEquals(1, self.cache.misses)
+        self.assertEquals(2, self.cache.hits)
+        self.assertEquals([outputs[0]] * 3, outputs)
+
+        expected = BytesIO()
+        self.transform(hwp5file, expected)
+        self.assertEquals(expected.getvalue(), outputs[0])
+
+    def test_cached_path(self):
+        html_transform = HTMLTransform()
+        transform = self.cache.cached(html_transform.transform_hwp5_to_dir,
+                                      'html/dir')
+        outdir = self.make_tempdir()
+        path = get_fixture_path('sample-5017.hwp')
+        with closing(Hwp5File(path)) as hwp5file:
+            transform(hwp5file, os.path.join(outdir, 'first'))
+            transform(hwp5file, os.path.join(outdir, 'second'))
+        self.assertEquals(1, self.cache.misses)
+        self.assertEquals(1, self.cache.hits)
+        for name in ['index.xhtml', 'styles.css', 'bindata/BIN0002.jpg']:
+            with io.open(os.path.join(outdir, 'first', name), 'rb') as f:
+                first = f.read()
+            with io.open(os.path.join(outdir, 'second', name), 'rb') as f:
+                second = f.read()
+            self.assertTrue(len(first) > 0)
+            self.assertEquals(first, second)
+
+    def test_failed_transform(self):
+        def transform(hwp5file, f):
+            f.write(b'partial')
+            raise ValueError()
+        transform = self.cache.cached(transform, 'failing')
+        hwp5file = self.open_hwp5file(get_fixture_path('table.hwp'))
+        self.assertRaises(ValueError, transform, hwp5file, BytesIO())
+        self.assertEquals([], list(self.cache.entries()))
+        self.assertEquals([], os.listdir(os.path.join(self.cache.path,
+                                                      'tmp')))
+
+    def test_evict(self):
+        self.cache.max_size = 250
+
+        def write(data):
+            def write(path):
+                with io.open(path, 'wb') as f:
+                    f.write(data)
+            return write
+        keys = ['%040x' % i for i in range(4)]
+        for i, key in enumerate(keys[:3]):
+            self.cache.store(key, write(b'x' * 100))
+            # entries are told apart by their mtimes
+            past = time.time() - 100 + i
+            os.utime(self.cache.entry_path(key), (past, past))
+        self.assertEquals(None, self.cache.lookup(keys[0]))
+        self.assertTrue(self.cache.lookup(keys[1]) is not None)
+
+        # the looked up one is used recently
+        self.cache.store(keys[3], write(b'x' * 100))
+        self.assertTrue(self.cache.lookup(keys[1]) is not None)
+        self.assertEquals(None, self.cache.lookup(keys[2]))
+        self.assertTrue(self.cache.lookup(keys[3]) is not None)
+
+        # an entry larger than the cache is kept until the next one
+        self.cache.store(keys[0], write(b'x' * 1000))
+        self.assertTrue(self.cache.lookup(keys[0]) is not None)
+        self.assertEquals(1, len(list(self.cache.entries())))
+
+    def test_evict_walks_only_over_max_size(self):
+        self.cache.max_size = 250
+        walks = []
+        entries = self.cache.entries
+
+        def walk():
+            walks.append(1)
+            return entries()
+        self.cache.entries = walk
+
+        def write(path):
+            with io.open(path, 'wb') as f:
+                f.write(b'x' * 100)
+        keys = ['%040x' % i for i in range(3)]
+        self.cache.store(keys[0], write)
+        self.assertEquals(1, len(walks))
+        self.cache.store(keys[1], write)
+        self.assertEquals(1, len(walks))
+        self.assertEquals(200, self.cache.size)
+        self.cache.store(keys[2], write)
+        self.assertEquals(2, len(walks))
+        self.assertEquals(200, self.cache.size)
+
+    def test_concurrent(self):
+        path = get_fixture_path('table.hwp')
+
+        def transform(i):
+            hwp5file = Hwp5File(path)
+            with closing(hwp5file):
+                cached = self.cache.cached(self.transform, 'xhwp5')
+                output = BytesIO()
+                cached(hwp5file, output)
+                return output.getvalue()
+        pool = ThreadPool(4)
+        try:
+            outputs = pool.map(transform, range(8))
+        finally:
+            pool.terminate()
+            pool.join()
+        self.assertEquals(1, len(set(outputs)))
+        self.assertEquals(1, len(list(self.cache.entries())))
+        self.assertEquals([], os.listdir(os.path.join(self.cache.path,
+                                                      'tmp')))
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from unittest import TestCase
+
+from hwp5.charsets import get_unichr_lang
+from hwp5.charsets import tokenize_unicode_by_lang
+
+
+class TestCharsets(TestCase):
+
+    def test_get_unichr_lang(self):
+        self.assertEquals(None, get_unichr_lang('\0'))
+        self.assertEquals(None, get_unichr_lang('1'))
+        self.assertEquals(None, get_unichr_lang('@'))
+        self.assertEquals('en', get_unichr_lang('A'))
+        self.assertEquals('en', get_unichr_lang('ɏ'))
+        self.assertEquals('other', get_unichr_lang('ɐ'))
+        self.assertEquals('ko', get_unichr_lang('가'))
+        self.assertEquals('ko', get_unichr_lang('ㄱ'))
+        self.assertEquals('cn', get_unichr_lang('漢'))
+        self.assertEquals('symbol', get_unichr_lang('　'))
+        self.assertEquals('jp', get_unichr_lang('か'))
+        self.assertEquals('other', get_unichr_lang('￿'))
+
+    def test_tokenize_unicode_by_lang(self):
+        def tokenize(text):
+            return list(tokenize_unicode_by_lang(text))
+        self.assertEquals([], tokenize(''))
+        self.assertEquals([('ko', '1 2')], tokenize('1 2'))
+        self.assertEquals([('en', 'abc')], tokenize('abc'))
+        self.assertEquals([('en', '1. Hello, '),
+                           ('ko', '세계! '),
+                           ('cn', '漢字 '),
+                           ('jp', 'かな'),
+                           ('other', 'ɐ '),
+                           ('en', 'x')],
+                          tokenize('1. Hello, 세계! 漢字 かなɐ x'))
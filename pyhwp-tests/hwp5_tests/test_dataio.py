@@ -23,6 +23,10 @@ from hwp5.dataio import ParseError
 from hwp5.dataio import Struct
 from hwp5.dataio import StructType
 from hwp5.dataio import decode_utf16le_with_hypua
+from hwp5.dataio import dumpbytes
+from hwp5.dataio import X_ARRAY
+from hwp5.dataio import ref_member
+from hwp5.dataio import typed_struct_attribute_items
 from hwp5.dataio import typed_struct_attributes
 from hwp5.dataio import _parse_flags_args
 
@@ -87,6 +91,48 @@ class TestTypedAttributes(TestCase):
                     dict(name='c', type=tuple, value=(2, 2))]
         self.assertEquals(expected, result)
 
+    def test_typed_struct_attribute_items(self):
+
+        def has_extra(context, values):
+            return values['n'] > 1
+
+        class Hello(Struct):
+            @staticmethod
+            def attributes():
+                yield UINT8, 'n'
+                yield X_ARRAY(INT32, ref_member('n')), 'a'
+                yield dict(type=BSTR, name='extra', condition=has_extra)
+                yield dict(type=INT32, name='new', version=(5, 0, 0, 0))
+
+        class Hoho(Hello):
+            @staticmethod
+            def attributes():
+                yield BSTR, 'b'
+
+        attributes = dict(n=2, a=(3, 4), b=u'abc', c=(2, 2))
+        context = dict(version=(5, 0, 0, 0))
+        result = typed_struct_attribute_items(Hoho, attributes, context)
+        self.assertEquals([('n', UINT8, 2),
+                           ('a', ARRAY(INT32, 2), (3, 4)),
+                           ('extra', BSTR, u''),
+                           ('new', INT32, 0),
+                           ('b', BSTR, u'abc'),
+                           ('c', tuple, (2, 2))], list(result))
+
+        attributes = dict(n=1, a=(3,), b=u'abc')
+        context = dict(version=(4, 0, 0, 0))
+        result = typed_struct_attribute_items(Hoho, attributes, context)
+        self.assertEquals([('n', UINT8, 1),
+                           ('a', ARRAY(INT32, 1), (3,)),
+                           ('b', BSTR, u'abc')], list(result))
+
+        expected = list((member['name'], member['type'], member['value'])
+                        for member in typed_struct_attributes(Hoho,
+                                                              attributes,
+                                                              context))
+        result = typed_struct_attribute_items(Hoho, attributes, context)
+        self.assertEquals(expected, list(result))
+
 
 class TestStructType(TestCase):
     def test_assign_enum_flags_name(self):
@@ -362,3 +408,24 @@ class TestDecodeUTF16LEPUA(TestCase):
         bytes = expected.encode('utf-16le')
         u = decode_utf16le_with_hypua(bytes)
         self.assertEquals(expected, u)
+
+
+class TestDumpBytes(TestCase):
+
+    def test_dumpbytes(self):
+        self.assertEquals([''], list(dumpbytes(b'')))
+        self.assertEquals(['00 01 02'], list(dumpbytes(b'\x00\x01\x02')))
+
+        data = b''.join(chr(i) for i in range(33))
+        lines = list(dumpbytes(data))
+        self.assertEquals(3, len(lines))
+        self.assertEquals(' '.join('%02x' % i for i in range(16)), lines[0])
+        self.assertEquals('20', lines[2])
+        self.assertEquals(2, len(list(dumpbytes(data[:32]))))
+
+    def test_dumpbytes_crust(self):
+        lines = list(dumpbytes(b'\xff' * 17, crust=True))
+        self.assertEquals('\t 0  1  2  3  4  5  6  7  8  9  A  B  C  D  E  F',
+                          lines[0])
+        self.assertEquals('000000: ' + ' '.join(['ff'] * 16), lines[1])
+        self.assertEquals('000010: ff', lines[2])
@@ -8,10 +8,14 @@ from io import BytesIO
 import zlib
 
 from hwp5.filestructure import Hwp5DistDoc
+from hwp5.distdoc import KeyCache
+from hwp5.distdoc import Random
 from hwp5.distdoc import decode_head_to_sha1
 from hwp5.distdoc import decode_head_to_key
 from hwp5.distdoc import decrypt_tail
+from hwp5.distdoc import decrypt_tail_gen
 from hwp5.recordstream import read_record
+from hwp5.recordstream import read_records
 from hwp5.tagids import HWPTAG_PARA_HEADER
 import hwp5.distdoc
 import hwp5.compressed
@@ -36,12 +40,74 @@ class TestHwp5DistDocFunctions(TestBase):
         expected = b2a_hex(self.password_sha1).upper().encode('utf-16le')
         self.assertEquals(expected, decode_head_to_sha1(self.section.head()))
 
+    def test_distdoc_decode_head_to_sha1_keystream(self):
+        payload = self.section.head()
+
+        # reference: xor byte by byte with the MSVC rand() keystream
+        data = list(ord(x) for x in payload)
+        seed = data[3] << 24 | data[2] << 16 | data[1] << 8 | data[0]
+        random = Random(seed)
+        n = 0
+        for i in range(256):
+            if n == 0:
+                key = random.rand() & 0xff
+                n = (random.rand() & 0xf) + 1
+            if i >= 4:
+                data[i] = data[i] ^ key
+            n -= 1
+        sha1offset = 4 + (seed & 0xf)
+        expected = b''.join(chr(x) for x in data)
+        expected = expected[sha1offset:sha1offset + 80]
+
+        self.assertEquals(expected, decode_head_to_sha1(payload))
+
     def test_distdoc_decode_head_to_key(self):
         section = self.section
         expected = b2a_hex(self.password_sha1).upper().encode('utf-16le')[:16]
         self.assertEquals(expected, decode_head_to_key(section.head()))
         self.assertEquals(expected, section.head_key())
 
+    def test_distdoc_keycache(self):
+        payload = self.section.head()
+        keycache = KeyCache()
+        sha1 = keycache.sha1(payload)
+        self.assertEquals(decode_head_to_sha1(payload), sha1)
+        self.assertTrue(sha1 is keycache.sha1(payload))
+        self.assertEquals(sha1[:16], keycache.key(payload))
+        self.assertEquals(1, len(keycache.sha1s))
+
+    def test_distdoc_keycache_shared_by_document(self):
+        hwp5distdoc = self.hwp5distdoc
+        section = hwp5distdoc['ViewText']['Section0']
+        script = hwp5distdoc['Scripts']['DefaultJScript']
+        self.assertTrue(section.keycache is hwp5distdoc.keycache)
+        self.assertTrue(script.keycache is hwp5distdoc.keycache)
+
+        section.head_key()
+        script.open().read()
+        self.assertEquals(1, len(hwp5distdoc.keycache.sha1s))
+
+    def test_distdoc_head_record_read_once(self):
+        section = self.section
+        opened = []
+        wrapped = section.wrapped
+
+        class CountingItem(object):
+            def open(self):
+                opened.append(1)
+                return wrapped.open()
+        section.wrapped = CountingItem()
+
+        record = section.head_record()
+        self.assertTrue(record is section.head_record())
+        section.head_key()
+        self.assertEquals(1, len(opened))
+
+        # past the head record, which is not read again
+        self.assertEquals(len(wrapped.open().read()) - 4 - 256,
+                          len(section.tail()))
+        self.assertTrue(record is section.head_record())
+
     def test_distdoc_decrypt_tail(self):
         section = self.section
 
@@ -56,6 +122,15 @@ class TestHwp5DistDocFunctions(TestBase):
 
         self.assertEquals(390, len(decompressed))
 
+    def test_distdoc_decrypt_tail_gen(self):
+        section = self.section
+
+        key = section.head_key()
+        tail = section.tail()
+        chunks = list(decrypt_tail_gen(key, BytesIO(tail), bufsize=40))
+        self.assertTrue(len(chunks) > 1)
+        self.assertEquals(decrypt_tail(key, tail), b''.join(chunks))
+
     def test_distdoc_decode(self):
         section = self.section
 
@@ -65,3 +140,35 @@ class TestHwp5DistDocFunctions(TestBase):
         self.assertEquals(0, record['level'])
         self.assertEquals(HWPTAG_PARA_HEADER, record['tagid'])
         self.assertEquals(22, record['size'])
+
+    def test_distdoc_decode_uncompressed(self):
+        section = self.section
+        key = section.head_key()
+        records = zlib.decompress(decrypt_tail(key, section.tail()), -15)
+
+        # an uncompressed distribution document: the records follow the
+        # HWPTAG_DISTRIBUTE_DOC_DATA record as they are, encrypted with a
+        # cipher which is left out here
+        class PlainDecryptor(object):
+            def update(self, data):
+                return data
+
+            def finalize(self):
+                return b''
+
+        get_decryptor = hwp5.distdoc.get_aes128ecb_decryptor
+
+        def restore():
+            hwp5.distdoc.get_aes128ecb_decryptor = get_decryptor
+        self.addCleanup(restore)
+        hwp5.distdoc.get_aes128ecb_decryptor = lambda: lambda key: \
+            PlainDecryptor()
+
+        head = section.wrapped.open().read(4 + 256)
+        stream = BytesIO(head + records)
+        decoded = list(read_records(hwp5.distdoc.decode(stream)))
+        expected = list(read_records(BytesIO(records)))
+        self.assertEquals(len(expected), len(decoded))
+        self.assertEquals(HWPTAG_PARA_HEADER, decoded[0]['tagid'])
+        self.assertEquals([r['payload'] for r in expected],
+                          [r['payload'] for r in decoded])
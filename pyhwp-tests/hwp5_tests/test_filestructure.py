@@ -19,6 +19,7 @@ from hwp5.filestructure import Hwp5FileBase
 from hwp5.filestructure import HwpFileHeader
 from hwp5.filestructure import PreviewText
 from hwp5.filestructure import Sections
+from hwp5.filestructure import StreamCache
 from hwp5.recordstream import read_record
 from hwp5.storage import ExtraItemStorage
 from hwp5.storage import is_storage
@@ -155,7 +156,9 @@ class TestHwp5DistDoc(TestBase):
 
     def test_conversion_for(self):
         conversion = self.hwp5distdoc.resolve_conversion_for('Scripts')
-        self.assertTrue(conversion is Hwp5DistDocStorage)
+        scripts = conversion(self.olestg['Scripts'])
+        self.assertTrue(isinstance(scripts, Hwp5DistDocStorage))
+        self.assertTrue(scripts.keycache is self.hwp5distdoc.keycache)
 
     def test_getitem(self):
         self.assertTrue(isinstance(self.hwp5distdoc['Scripts'],
@@ -304,6 +307,96 @@ class TestHwp5File(TestBase):
         self.assertTrue(isinstance(bodytext, FS.Sections))
         self.assertEquals(['Section0'], list(bodytext))
 
+    def test_stream_cache(self):
+        hwp5file = Hwp5File(self.olestg)
+        cache = hwp5file.stream_cache
+        datas = []
+        for i in range(3):
+            f = hwp5file.docinfo.open()
+            try:
+                datas.append(f.read())
+                f.seek(0)
+                self.assertEquals(datas[0], f.read())
+            finally:
+                f.close()
+            section = hwp5file.bodytext.section(0)
+            f = section.open()
+            try:
+                datas.append(f.read())
+            finally:
+                f.close()
+        self.assertEquals(2, cache.misses)
+        self.assertEquals(4, cache.hits)
+        self.assertEquals(datas[0:2] * 3, datas)
+        self.assertEquals(len(datas[0]) + len(datas[1]), cache.size)
+
+    def test_stream_cache_incremental(self):
+        hwp5file = Hwp5File(self.olestg)
+        cache = hwp5file.stream_cache
+        section = hwp5file.bodytext.section(0)
+        data = zlib.decompress(self.olestg['BodyText']['Section0'].open()
+                               .read(), -15)
+
+        # read only partly: neither decompressed as a whole nor kept
+        f = section.open()
+        try:
+            self.assertEquals(data[:4], f.read(4))
+            self.assertEquals(4, f.tell())
+        finally:
+            f.close()
+        self.assertEquals([], list(cache.buffers))
+
+        # read to the end: kept
+        f = section.open()
+        try:
+            self.assertEquals(data, f.read())
+        finally:
+            f.close()
+        self.assertEquals(['BodyText/Section0'], list(cache.buffers))
+        self.assertEquals(data, section.open().read())
+        self.assertEquals(1, cache.hits)
+
+    def test_stream_cache_disabled(self):
+        hwp5file = Hwp5File(self.olestg, stream_cache_size=0)
+        self.assertEquals(None, hwp5file.stream_cache)
+        f = hwp5file.docinfo.open()
+        try:
+            data = f.read()
+        finally:
+            f.close()
+        self.assertEquals(self.hwp5file.docinfo.open().read(), data)
+
+
+class TestStreamCache(TestCase):
+
+    def test_lru(self):
+        cache = StreamCache(max_size=10)
+        loaded = []
+
+        def load(data):
+            def load():
+                loaded.append(data)
+                return data
+            return load
+        self.assertEquals(b'aaaa', cache.get('a', load(b'aaaa')))
+        self.assertEquals(b'bbbb', cache.get('b', load(b'bbbb')))
+        self.assertEquals(b'aaaa', cache.get('a', load(b'aaaa')))
+        self.assertEquals([b'aaaa', b'bbbb'], loaded)
+        self.assertEquals(8, cache.size)
+
+        # b is the least recently used
+        self.assertEquals(b'cccc', cache.get('c', load(b'cccc')))
+        self.assertEquals(['a', 'c'], list(cache.buffers))
+        self.assertEquals(8, cache.size)
+
+        # too large to be kept
+        self.assertEquals(b'x' * 11, cache.get('x', load(b'x' * 11)))
+        self.assertEquals(['a', 'c'], list(cache.buffers))
+
+        cache.clear()
+        self.assertEquals(0, cache.size)
+        self.assertEquals([], list(cache.buffers))
+
 
 class TestSections(TestBase):
 
@@ -341,3 +434,19 @@ class TestGeneratorReader(TestCase):
         self.assertEquals('lo wor', f.read(6))
         self.assertEquals('ldmy ', f.read(5))
         self.assertEquals('name isgenreader', f.read(1000))
+
+    def test_generator_reader_bounded(self):
+        def data():
+            yield 'Hello'
+            yield 'world'
+
+        f = GeneratorReader(data())
+        self.assertEquals(0, f.tell())
+        self.assertEquals('Hel', f.read(3))
+        self.assertEquals(3, f.tell())
+        self.assertEquals('low', f.read(3))
+        self.assertEquals('orl', f.read(3))
+        self.assertEquals('d', f.read(3))
+        self.assertEquals(10, f.tell())
+        self.assertEquals('', f.read(3))
+        self.assertEquals(10, f.tell())
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from contextlib import closing
+from io import BytesIO
+from unittest import TestCase
+import re
+
+from hwp5 import plat
+from hwp5.hwp5html import HTMLTransform
+from hwp5.htmlwriter import write_css
+from hwp5.htmlwriter import write_xhtml
+from hwp5.xmlmodel import Hwp5File
+from hwp5.xmlmodel import Selection
+
+from .fixtures import get_fixture_path
+from .test_odtwriter import ErrorRecords
+
+
+def css_rules(css):
+    ''' Rules of a CSS, with the comments which precede them. '''
+    css = re.sub(r'/\* (Styles|Paragraph attributes|Text attributes) \*/\n',
+                 '', css)
+    return re.findall(r'(?s)(?:/\*[^\n]*\*/\n)*[^{}]*\{\n.*?\}\n', css)
+
+
+class TestHTMLWriter(TestCase):
+    ''' The native writer should write what the XSL transforms do. '''
+
+    examples = [
+        'linespacing.hwp',
+        'table.hwp',
+        'table-position.hwp',
+        'borderfill.hwp',
+        'lists-bullet.hwp',
+        'sample-5017.hwp',
+    ]
+
+    @property
+    def xsl_transform(self):
+        xslt = plat.get_xslt_compile()
+        assert xslt is not None, 'no XSLT implementation is available'
+        return HTMLTransform(xslt, native=False)
+
+    def transform_examples(self, transform, embedbin=False):
+        for filename in self.examples:
+            with closing(Hwp5File(get_fixture_path(filename))) as hwp5file:
+                native = BytesIO()
+                used = write_xhtml(hwp5file, native, embedbin=embedbin)
+                css = BytesIO()
+                write_css(hwp5file, css, used)
+                xsl = BytesIO()
+                transform.transform_hwp5_to_xhtml(hwp5file, xsl)
+                xsl_css = BytesIO()
+                transform.transform_hwp5_to_css(hwp5file, xsl_css)
+            yield filename, native, css, xsl, xsl_css
+
+    def test_write_without_errors(self):
+        for filename in self.examples:
+            with closing(Hwp5File(get_fixture_path(filename))) as hwp5file:
+                with ErrorRecords() as records:
+                    used = write_xhtml(hwp5file, BytesIO())
+                    write_css(hwp5file, BytesIO(), used)
+            self.assertEquals([], [r.getMessage() for r in records],
+                              filename)
+
+    def test_write_xhtml(self):
+        transform = self.xsl_transform
+        for filename, native, css, xsl, xsl_css in \
+                self.transform_examples(transform):
+            self.assertEquals(xsl.getvalue(), native.getvalue(), filename)
+
+    def test_write_xhtml_embedbin(self):
+        transform = self.xsl_transform
+        transform.embedbin = True
+        self.examples = ['sample-5017.hwp']
+        for filename, native, css, xsl, xsl_css in \
+                self.transform_examples(transform, embedbin=True):
+            self.assertTrue(b'data:;base64,' in native.getvalue())
+            self.assertEquals(xsl.getvalue(), native.getvalue(), filename)
+
+    def test_write_css_used_rules_only(self):
+        transform = self.xsl_transform
+        for filename, native, css, xsl, xsl_css in \
+                self.transform_examples(transform):
+            native_css = css.getvalue().decode('utf-8')
+            native_rules = css_rules(native_css)
+            xsl_rules = css_rules(xsl_css.getvalue().decode('utf-8'))
+            self.assertTrue(len(native_rules) < len(xsl_rules), filename)
+            for rule in native_rules:
+                self.assertTrue(rule in xsl_rules, rule)
+
+            native_xhtml = native.getvalue().decode('utf-8')
+            for class_name in set(re.findall('class="([^"]*)"',
+                                             native_xhtml)):
+                for name in class_name.split(' '):
+                    if name.startswith(('parashape-', 'charshape-',
+                                        'borderfill-', 'Bullet-')):
+                        self.assertTrue('.' + name in native_css, name)
+
+    def test_write_css_without_used(self):
+        with closing(Hwp5File(get_fixture_path('table.hwp'))) as hwp5file:
+            used = write_xhtml(hwp5file, BytesIO())
+            css = BytesIO()
+            write_css(hwp5file, css, used)
+            without_used = BytesIO()
+            write_css(hwp5file, without_used)
+        self.assertEquals(css.getvalue(), without_used.getvalue())
+
+    def test_write_xhtml_headerfooter(self):
+        path = get_fixture_path('headerfooter.hwp')
+        with closing(Hwp5File(path)) as hwp5file:
+            native = BytesIO()
+            used = write_xhtml(hwp5file, native)
+            css = BytesIO()
+            write_css(hwp5file, css, used)
+        xhtml = native.getvalue()
+        self.assertEquals(1, len(used.headers))
+        self.assertEquals(1, len(used.footers))
+        self.assertTrue(xhtml.index(b'<div class="Page">') <
+                        xhtml.index(b'<div class="HeaderArea">') <
+                        xhtml.index(b'<div class="FooterArea">'))
+        self.assertTrue(b'.HeaderArea {' in css.getvalue())
+        self.assertTrue(b'.FooterArea {' in css.getvalue())
+
+    def test_write_xhtml_head_first(self):
+        ''' The head is written once the section definitions are read,
+        before the body of any section is.
+        '''
+        path = get_fixture_path('sample-5017.hwp')
+        with closing(Hwp5File(path)) as hwp5file:
+            written = []
+
+            class Output(object):
+                def write(self, data):
+                    written.append(data)
+
+            bodytext = hwp5file.text
+            section = bodytext.section
+            read = []
+
+            def read_section(idx):
+                if idx in read:
+                    self.assertTrue(written[0].endswith(b'</head>'))
+                read.append(idx)
+                return section(idx)
+            bodytext.section = read_section
+            write_xhtml(hwp5file, Output())
+        self.assertEquals([0, 0], read)
+        self.assertTrue(len(written) > 1)
+
+    def test_write_xhtml_selection(self):
+        path = get_fixture_path('paragraph-split-page.hwp')
+        with closing(Hwp5File(path)) as hwp5file:
+            whole = BytesIO()
+            write_xhtml(hwp5file, whole)
+            first_page = BytesIO()
+            used = write_xhtml(hwp5file, first_page,
+                               selection=Selection(pages=1))
+            css = BytesIO()
+            write_css(hwp5file, css, used)
+        whole = whole.getvalue()
+        first_page = first_page.getvalue()
+        self.assertTrue(len(first_page) < len(whole))
+        self.assertTrue(first_page.endswith(b'</body></html>'))
+        self.assertEquals(2, first_page.count(b'<p '))
+        self.assertEquals(3, whole.count(b'<p '))
+        self.assertTrue(b'.Paper {' in css.getvalue())
+
+
+class TestHTMLTransformNative(TestCase):
+
+    def test_transform_hwp5_into(self):
+        transform = HTMLTransform()
+        path = get_fixture_path('sample-5017.hwp')
+        with closing(Hwp5File(path)) as hwp5file:
+            files = dict()
+            transform.transform_hwp5_into(hwp5file, files)
+            xhtml = BytesIO()
+            used = write_xhtml(hwp5file, xhtml)
+            css = BytesIO()
+            write_css(hwp5file, css, used)
+        self.assertEquals(xhtml.getvalue(), files['index.xhtml'])
+        self.assertEquals(css.getvalue(), files['styles.css'])
+        self.assertTrue('bindata/BIN0002.jpg' in files)
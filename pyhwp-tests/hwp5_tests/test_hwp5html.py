@@ -3,6 +3,10 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 from contextlib import closing
+from xml.etree import ElementTree as etree
+from zipfile import ZIP_DEFLATED
+from zipfile import ZIP_STORED
+from zipfile import ZipFile
 import io
 import os.path
 import shutil
@@ -60,6 +64,25 @@ class HtmlConvTest(TestBase):
             with io.open(html_path, 'wb+') as f:
                 self.transform.transform_hwp5_to_xhtml(hwp5file, f)
 
+    def test_generate_html_file_paragraph_styles(self):
+        self.hwp5file_name = 'facename2.hwp'
+        xhwp5_path = self.create_xhwp5()
+        html_path = self.id() + '.xhtml'
+        with io.open(html_path, 'wb') as f:
+            self.transform.transform_xhwp5_to_xhtml(xhwp5_path, f)
+
+        xhwp5 = etree.parse(xhwp5_path)
+        styles = xhwp5.findall('DocInfo/IdMappings/Style')
+        expected = list(styles[int(paragraph.get('style-id'))].get('name')
+                        .replace(' ', '-')
+                        for paragraph in xhwp5.iter('Paragraph'))
+
+        xhtml = etree.parse(html_path)
+        paragraphs = xhtml.iter('{http://www.w3.org/1999/xhtml}p')
+        classes = list(p.get('class').split(' ')[0] for p in paragraphs)
+        self.assertEquals(8, len(set(expected)))
+        self.assertEquals(expected, classes)
+
     def test_extract_bindata_dir(self):
         base_dir = self.make_base_dir()
         hwp5file = self.hwp5file
@@ -82,3 +105,68 @@ class HtmlConvTest(TestBase):
 
         self.transform.extract_bindata_dir(hwp5file, bindata_dir)
         self.assertFalse(os.path.exists(bindata_dir))
+
+
+class HtmlTargetTest(TestBase):
+
+    def expected_files(self):
+        base_dir = self.make_base_dir()
+        transform = HTMLTransform(native=False)
+        hwp5file = self.hwp5file
+        with transform.transformed_xhwp5_at_temp(hwp5file) as xhwp5path:
+            transform.transform_xhwp5_to_dir(xhwp5path, base_dir)
+        bindata_dir = os.path.join(base_dir, 'bindata')
+        transform.extract_bindata_dir(hwp5file, bindata_dir)
+
+        files = dict()
+        for name in os.listdir(base_dir):
+            path = os.path.join(base_dir, name)
+            if os.path.isdir(path):
+                for subname in os.listdir(path):
+                    with io.open(os.path.join(path, subname), 'rb') as f:
+                        files[name + '/' + subname] = f.read()
+            else:
+                with io.open(path, 'rb') as f:
+                    files[name] = f.read()
+        return files
+
+    def test_transform_hwp5_into_dict(self):
+        expected = self.expected_files()
+        self.assertTrue('bindata/BIN0002.jpg' in expected)
+
+        for workers in (1, 3):
+            files = dict()
+            transform = HTMLTransform(native=False,
+                                      bindata_workers=workers)
+            transform.transform_hwp5_into(self.hwp5file, files)
+            self.assertEquals(expected, files)
+
+    def test_transform_hwp5_into_zip(self):
+        expected = self.expected_files()
+
+        zip_path = self.id() + '.zip'
+        with closing(ZipFile(zip_path, 'w')) as zf:
+            transform = HTMLTransform(native=False, bindata_workers=3)
+            transform.transform_hwp5_into(self.hwp5file, zf)
+
+        with closing(ZipFile(zip_path)) as zf:
+            self.assertEquals(None, zf.testzip())
+            self.assertEquals(expected,
+                              dict((name, zf.read(name))
+                                   for name in zf.namelist()))
+            self.assertEquals(ZIP_STORED,
+                              zf.getinfo('bindata/BIN0002.jpg').compress_type)
+            self.assertEquals(ZIP_DEFLATED,
+                              zf.getinfo('index.xhtml').compress_type)
+
+    def test_transform_hwp5_to_dir(self):
+        expected = self.expected_files()
+        base_dir = self.id() + '.dir'
+        if os.path.exists(base_dir):
+            shutil.rmtree(base_dir)
+        os.mkdir(base_dir)
+        HTMLTransform().transform_hwp5_to_dir(self.hwp5file, base_dir)
+        self.assertEquals(set(expected), set(['index.xhtml', 'styles.css'] +
+                                             ['bindata/' + name for name in
+                                              os.listdir(os.path.join(
+                                                  base_dir, 'bindata'))]))
@@ -2,9 +2,17 @@
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
+from contextlib import contextmanager
+from io import BytesIO
 from unittest import TestCase
+from zipfile import ZIP_DEFLATED
+from zipfile import ZIP_STORED
+from zipfile import ZipFile
 import os.path
 
+from hwp5.errors import ValidationFailed
+from hwp5.hwp5odt import ODFValidate
+from hwp5.hwp5odt import ODTPackage
 from hwp5.importhelper import pkg_resources_filename_fallback
 from hwp5.utils import hwp5_resources_path
 
@@ -18,3 +26,174 @@ class ResourcesTest(TestCase):
     def test_hwp5_resources_filename(self):
         with hwp5_resources_path('xsl/odt/styles.xsl') as styles_xsl:
             self.assertTrue(os.path.exists(styles_xsl))
+
+
+class BytesItem(object):
+
+    def __init__(self, data):
+        self.data = data
+
+    def open(self):
+        return BytesIO(self.data)
+
+
+class ODTPackageTest(TestCase):
+
+    streams = [
+        (BytesItem(b'BM' + b'\x00' * 300000), 'bindata/BIN0001.bmp',
+         'application/octet-stream'),
+        (BytesItem(b'\xff\xd8' + b'\x01' * 1000), 'bindata/BIN0002.jpg',
+         'application/octet-stream'),
+        (BytesItem(b''), 'bindata/BIN0003.wmf', 'application/octet-stream'),
+        (BytesItem(b'\x89PNG' + b'\x02' * 1000), 'bindata/BIN0004',
+         'image/png'),
+    ]
+
+    @property
+    def odt_path(self):
+        return self.id() + '.odt'
+
+    def assertPackage(self):
+        zf = ZipFile(self.odt_path)
+        self.assertEquals(None, zf.testzip())
+        names = [zinfo.filename for zinfo in zf.infolist()]
+        self.assertEquals(['content.xml',
+                           'bindata/BIN0001.bmp',
+                           'bindata/BIN0002.jpg',
+                           'bindata/BIN0003.wmf',
+                           'bindata/BIN0004',
+                           'META-INF/manifest.xml',
+                           'mimetype'], names)
+        compress_types = [zinfo.compress_type for zinfo in zf.infolist()]
+        self.assertEquals([ZIP_DEFLATED,
+                           ZIP_DEFLATED,
+                           ZIP_STORED,
+                           ZIP_DEFLATED,
+                           ZIP_STORED,
+                           ZIP_DEFLATED,
+                           ZIP_STORED], compress_types)
+        self.assertEquals(b'<content/>' * 10000, zf.read('content.xml'))
+        for item, path, media_type in self.streams:
+            self.assertEquals(item.data, zf.read(path))
+
+    def write_package(self, workers):
+        odtpkg = ODTPackage(self.odt_path)
+        with odtpkg.open_stream('content.xml', 'text/xml') as f:
+            for i in range(10000):
+                f.write(b'<content/>')
+        odtpkg.insert_streams(self.streams, workers=workers)
+        odtpkg.close()
+
+    def test_insert_streams(self):
+        self.write_package(1)
+        self.assertPackage()
+
+    def test_insert_streams_in_parallel(self):
+        self.write_package(3)
+        self.assertPackage()
+
+    def test_insert_streams_in_parallel_bounded(self):
+        odtpkg = ODTPackage(ZipFile(BytesIO(), 'w'))
+        ahead = []
+
+        def streams():
+            for i in range(20):
+                # streams taken but not written yet
+                ahead.append(i - len(odtpkg.files))
+                yield (BytesItem(b'\x00' * 1000), 'bindata/BIN%04d' % i,
+                       'application/octet-stream')
+        odtpkg.insert_streams(streams(), workers=2)
+        self.assertEquals(20, len(odtpkg.files))
+        self.assertTrue(max(ahead) <= 4, ahead)
+
+
+class FakeValidator(object):
+
+    def __init__(self, valid=True):
+        self.valid = valid
+        self.validated = []
+
+    @contextmanager
+    def validating_output(self, output):
+        buf = BytesIO()
+        yield buf
+        self.validated.append(buf.getvalue())
+        if not self.valid:
+            raise ValidationFailed('RelaxNG')
+        output.write(buf.getvalue())
+
+
+class ODFValidateTest(TestCase):
+
+    def make_validate(self, validator, **kwargs):
+        def relaxng_compile(rng_path):
+            return validator
+        return ODFValidate(relaxng_compile, **kwargs)
+
+    def write_outputs(self, validate, n):
+        outputs = []
+        for i in range(n):
+            output = BytesIO()
+            with validate.validating_output(output) as f:
+                f.write(b'<document/>')
+            outputs.append(output.getvalue())
+        return outputs
+
+    def test_shared_validator(self):
+        compiled = []
+
+        def relaxng_compile(rng_path):
+            compiled.append(rng_path)
+            return FakeValidator()
+        first = ODFValidate(relaxng_compile)
+        second = ODFValidate(relaxng_compile)
+        self.assertTrue(first.odf_validator is second.odf_validator)
+        self.assertEquals(1, len(compiled))
+
+    def test_invalid_policy(self):
+        self.assertRaises(ValueError, ODFValidate, validation='sometimes')
+
+    def test_always(self):
+        validator = FakeValidator()
+        validate = self.make_validate(validator)
+        self.assertEquals([b'<document/>'] * 3,
+                          self.write_outputs(validate, 3))
+        self.assertEquals(3, len(validator.validated))
+
+        validate = self.make_validate(FakeValidator(valid=False))
+        self.assertRaises(ValidationFailed, self.write_outputs, validate, 1)
+
+    def test_never(self):
+        validator = FakeValidator(valid=False)
+        validate = self.make_validate(validator, validation='never')
+        self.assertEquals([b'<document/>'] * 3,
+                          self.write_outputs(validate, 3))
+        self.assertEquals(0, len(validator.validated))
+
+    def test_sampled(self):
+        validator = FakeValidator()
+        validate = self.make_validate(validator, validation='sampled',
+                                      validation_sample=4)
+        validate.validation_random.seed(0)
+        self.assertEquals([b'<document/>'] * 400,
+                          self.write_outputs(validate, 400))
+        self.assertTrue(50 < len(validator.validated) < 150)
+
+        validator = FakeValidator()
+        validate = self.make_validate(validator, validation='sampled',
+                                      validation_sample=1)
+        self.write_outputs(validate, 3)
+        self.assertEquals(3, len(validator.validated))
+
+    def test_async(self):
+        failures = []
+        validator = FakeValidator(valid=False)
+        validate = self.make_validate(validator, validation='async',
+                                      on_validation_failed=failures.append)
+        self.assertEquals([b'<document/>'] * 3,
+                          self.write_outputs(validate, 3))
+        validate.wait_validations()
+        self.assertEquals([b'<document/>'] * 3, validator.validated)
+        self.assertEquals(3, len(failures))
+        for e in failures:
+            self.assertTrue(isinstance(e, ValidationFailed))
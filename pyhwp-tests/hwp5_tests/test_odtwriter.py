@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from contextlib import closing
+from io import BytesIO
+from unittest import TestCase
+from zipfile import ZipFile
+import logging
+
+from hwp5 import plat
+from hwp5.hwp5odt import ODTTransform
+from hwp5.hwp5odt import open_odtpkg
+from hwp5.odtwriter import write_content
+from hwp5.odtwriter import write_single_document
+from hwp5.odtwriter import write_styles
+from hwp5.xmlmodel import Hwp5File
+
+from .fixtures import get_fixture_path
+
+
+class ErrorRecords(logging.Handler):
+    ''' Keep the error records logged under `hwp5`. '''
+
+    def __init__(self):
+        logging.Handler.__init__(self, logging.ERROR)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def __enter__(self):
+        logging.getLogger('hwp5').addHandler(self)
+        return self.records
+
+    def __exit__(self, *exc_info):
+        logging.getLogger('hwp5').removeHandler(self)
+
+
+class TestODTWriter(TestCase):
+    ''' The native writer should write what the XSL transforms do. '''
+
+    examples = [
+        'linespacing.hwp',
+        'table.hwp',
+        'footnote-endnote.hwp',
+        'shapecontainer-2.hwp',
+        'sample-5017.hwp',
+    ]
+
+    @property
+    def xsl_transform(self):
+        xslt = plat.get_xslt_compile()
+        assert xslt is not None, 'no XSLT implementation is available'
+        return ODTTransform(xslt, False, native=False)
+
+    def assertSameAsXSL(self, write, transform):
+        for filename in self.examples:
+            with closing(Hwp5File(get_fixture_path(filename))) as hwp5file:
+                native = BytesIO()
+                write(hwp5file, native)
+                xsl = BytesIO()
+                transform(hwp5file, xsl)
+            self.assertEquals(xsl.getvalue(), native.getvalue(), filename)
+
+    def test_write_without_errors(self):
+        for filename in self.examples:
+            with closing(Hwp5File(get_fixture_path(filename))) as hwp5file:
+                with ErrorRecords() as records:
+                    write_styles(hwp5file, BytesIO())
+                    write_content(hwp5file, BytesIO())
+            self.assertEquals([], [r.getMessage() for r in records],
+                              filename)
+
+    def test_write_styles(self):
+        transform = self.xsl_transform.transform_hwp5_to_styles
+        self.assertSameAsXSL(write_styles, transform)
+
+    def test_write_content(self):
+        transform = self.xsl_transform.transform_hwp5_to_content
+        self.assertSameAsXSL(write_content, transform)
+
+    def test_write_content_embedbin(self):
+        xsl_transform = self.xsl_transform
+        xsl_transform.embedbin = True
+        transform = xsl_transform.transform_hwp5_to_content
+
+        def write(hwp5file, f):
+            write_content(hwp5file, f, embedbin=True)
+        self.assertSameAsXSL(write, transform)
+
+    def test_write_single_document(self):
+        xsl_transform = self.xsl_transform
+        xsl_transform.embedbin = True
+        transform = xsl_transform.transform_hwp5_to_single_document
+
+        def write(hwp5file, f):
+            write_single_document(hwp5file, f, embedbin=True)
+        self.assertSameAsXSL(write, transform)
+
+
+class TestODTTransformNative(TestCase):
+
+    @property
+    def odt_path(self):
+        return self.id() + '.odt'
+
+    def test_transform_hwp5_to_package(self):
+        transform = ODTTransform(relaxng_compile=plat.get_relaxng_compile())
+        path = get_fixture_path('sample-5017.hwp')
+        with closing(Hwp5File(path)) as hwp5file:
+            with open_odtpkg(self.odt_path) as odtpkg:
+                transform.transform_hwp5_to_package(hwp5file, odtpkg)
+            styles = BytesIO()
+            write_styles(hwp5file, styles)
+            content = BytesIO()
+            write_content(hwp5file, content)
+
+        zf = ZipFile(self.odt_path)
+        self.assertEquals(styles.getvalue(), zf.read('styles.xml'))
+        self.assertEquals(content.getvalue(), zf.read('content.xml'))
+        self.assertTrue('manifest.rdf' in zf.namelist())
+        self.assertTrue('bindata/BIN0002.jpg' in zf.namelist())
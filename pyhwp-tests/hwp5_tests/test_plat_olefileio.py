@@ -2,9 +2,13 @@
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
+from multiprocessing.pool import ThreadPool
 from unittest import TestCase
+import sys
 
 from hwp5.plat import olefileio
+from hwp5.storage import iter_storage_leafs
+from hwp5.storage import open_storage_item
 
 from .mixin_olestg import OleStorageTestMixin
 
@@ -14,3 +18,35 @@ class TestOleStorageOleFileIO(TestCase, OleStorageTestMixin):
     def setUp(self):
         if olefileio.is_enabled():
             self.OleStorage = olefileio.OleStorage
+
+    def test_concurrent_open(self):
+        if self.OleStorage is None:
+            return
+        olestg = self.olestg
+        self.addCleanup(olestg.close)
+        paths = sorted(iter_storage_leafs(olestg))
+
+        def read(path):
+            f = open_storage_item(olestg, path).open()
+            try:
+                return f.read()
+            finally:
+                f.close()
+        expected = dict((path, read(path)) for path in paths)
+
+        def task(i):
+            path = paths[i % len(paths)]
+            return path, read(path)
+
+        # switch threads as often as possible
+        checkinterval = sys.getcheckinterval()
+        sys.setcheckinterval(1)
+        pool = ThreadPool(8)
+        try:
+            results = pool.map(task, range(2000))
+        finally:
+            pool.terminate()
+            pool.join()
+            sys.setcheckinterval(checkinterval)
+        for path, data in results:
+            self.assertEquals(expected[path], data, path)
@@ -2,6 +2,7 @@
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
+from binascii import a2b_hex
 from io import BytesIO
 import json
 
@@ -10,11 +11,13 @@ from hwp5.recordstream import RecordStream
 from hwp5.recordstream import dump_record
 from hwp5.recordstream import read_record
 from hwp5.recordstream import record_to_json
+from hwp5.recordstream import record_to_ndjson
 from hwp5.storage import ExtraItemStorage
 from hwp5.tagids import HWPTAG_DOCUMENT_PROPERTIES
 from hwp5.tagids import HWPTAG_ID_MAPPINGS
 from hwp5.tagids import HWPTAG_PARA_HEADER
 from hwp5.utils import cached_property
+from hwp5.utils import write_ndjson
 
 from . import test_filestructure
 
@@ -145,6 +148,28 @@ class TestJson(TestBase):
         self.assertEquals(0, jsonobject['seqno'])
         self.assertEquals('HWPTAG_DOCUMENT_PROPERTIES', jsonobject['tagname'])
 
+    def test_record_to_ndjson(self):
+        record = self.hwp5file.docinfo.records().next()
+        json_string = record_to_ndjson(record)
+        self.assertFalse('\n' in json_string)
+        self.assertFalse(' ' in json_string)
+        jsonobject = json.loads(json_string)
+        self.assertEquals('01000100010001000100010001000000'
+                          '00000700000005000000',
+                          jsonobject['payload'])
+        self.assertEquals(record['payload'], a2b_hex(jsonobject['payload']))
+
+    def test_write_ndjson(self):
+        records = list(self.hwp5file.docinfo.records())
+        f = BytesIO()
+        write_ndjson((record_to_ndjson(record) for record in records), f,
+                     buffer_size=256)
+        lines = f.getvalue().split(b'\n')
+        self.assertEquals(b'', lines.pop())
+        self.assertEquals(67, len(lines))
+        self.assertEquals([record['seqno'] for record in records],
+                          [json.loads(line)['seqno'] for line in lines])
+
     def test_generate_json(self):
         records_json = self.hwp5file.docinfo.records_json()
         json_string = ''.join(records_json.generate())
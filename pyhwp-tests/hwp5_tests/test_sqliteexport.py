@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from contextlib import closing
+from unittest import TestCase
+import os.path
+import shutil
+import sqlite3
+import tempfile
+
+from hwp5.binmodel import Hwp5File
+from hwp5.sqliteexport import export_files
+from hwp5.sqliteexport import flatten_content
+
+from .fixtures import get_fixture_path
+
+
+class TestSQLiteExport(TestCase):
+
+    def make_tempdir(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, True)
+        return path
+
+    def connect(self, path=':memory:'):
+        conn = sqlite3.connect(path)
+        self.addCleanup(conn.close)
+        return conn
+
+    def counts(self, conn):
+        return [conn.execute('SELECT count(*) FROM ' + table).fetchone()[0]
+                for table in ('files', 'streams', 'records', 'fields',
+                              'paragraphs')]
+
+    def test_flatten_content(self):
+        content = dict(a=1, b=[dict(c='x'), 2])
+        self.assertEquals([('a', 1), ('b.0.c', 'x'), ('b.1', 2)],
+                          list(flatten_content(content)))
+
+    def test_export_files(self):
+        conn = self.connect()
+        paths = [get_fixture_path('sample-5017.hwp'),
+                 get_fixture_path('table.hwp')]
+        self.assertEquals(2, export_files(conn, paths))
+
+        path, version = conn.execute(
+            'SELECT path, version FROM files ORDER BY id'
+        ).fetchone()
+        self.assertEquals(os.path.abspath(paths[0]), path)
+        self.assertEquals('5.0.1.7', version)
+        self.assertEquals([('DocInfo',), ('BodyText/Section0',)],
+                          conn.execute('SELECT name FROM streams'
+                                       ' WHERE file_id = 1').fetchall())
+
+        with closing(Hwp5File(paths[0])) as hwp5file:
+            records = list(hwp5file.docinfo.records())
+        rows = conn.execute('SELECT seqno, tagid, level, size, offset, model'
+                            ' FROM records WHERE stream_id = 1'
+                            ' ORDER BY seqno').fetchall()
+        self.assertEquals(len(records), len(rows))
+        self.assertEquals((0, 16, 0, 26, 0, 'DocumentProperties'), rows[0])
+        self.assertEquals((1, 17, 0, 64, 30, 'IdMappings'), rows[1])
+        self.assertEquals(98, rows[2][4])
+
+        self.assertEquals(
+            [(5,)],
+            conn.execute("SELECT value FROM fields WHERE stream_id = 2"
+                         " AND seqno = 0 AND name = 'charshapes'").fetchall()
+        )
+        text = conn.execute('SELECT text FROM paragraphs WHERE stream_id = 2'
+                            ' AND seqno = 0').fetchone()[0]
+        self.assertEquals('\ud55c\uae00 2005 \uc608\uc81c '
+                          '\ud30c\uc77c\uc785\ub2c8\ub2e4.', text)
+
+    def test_export_again(self):
+        conn = self.connect()
+        path = get_fixture_path('table.hwp')
+        export_files(conn, [path])
+        counts = self.counts(conn)
+        export_files(conn, [path])
+        self.assertEquals(counts, self.counts(conn))
+
+    def test_export_workers(self):
+        tempdir = self.make_tempdir()
+        paths = [get_fixture_path('sample-5017.hwp'),
+                 get_fixture_path('table.hwp'),
+                 get_fixture_path('headerfooter.hwp')]
+        conn = self.connect(os.path.join(tempdir, 'workers.db'))
+        self.assertEquals(3, export_files(conn, paths, workers=2))
+
+        expected = self.connect()
+        export_files(expected, paths)
+        self.assertEquals(self.counts(expected), self.counts(conn))
+
+    def test_export_invalid_file(self):
+        conn = self.connect()
+        paths = [__file__, get_fixture_path('table.hwp')]
+        self.assertEquals(1, export_files(conn, paths))
+        self.assertEquals([(os.path.abspath(paths[1]),)],
+                          conn.execute('SELECT path FROM files').fetchall())
+
+    def test_export_missing_file(self):
+        conn = self.connect()
+        missing = os.path.join(self.make_tempdir(), 'missing.hwp')
+        paths = [missing, get_fixture_path('table.hwp')]
+        self.assertEquals(1, export_files(conn, paths))
+        self.assertEquals([(os.path.abspath(paths[1]),)],
+                          conn.execute('SELECT path FROM files').fetchall())
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from contextlib import closing
+from unittest import TestCase
+import os
+import os.path
+import shutil
+import sqlite3
+import tempfile
+
+from hwp5.binmodel import Hwp5File
+from hwp5.textindex import build_index
+from hwp5.textindex import query_index
+from hwp5.textindex import section_texts
+
+from .fixtures import get_fixture_path
+
+
+QUERY = '\ud30c\uc77c*'
+
+
+class TestTextIndex(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir, True)
+        self.paths = []
+        for name in ['sample-5017.hwp', 'table.hwp']:
+            path = os.path.join(self.tempdir, name)
+            shutil.copyfile(get_fixture_path(name), path)
+            self.paths.append(path)
+        self.conn = sqlite3.connect(os.path.join(self.tempdir, 'index.db'))
+        self.addCleanup(self.conn.close)
+        try:
+            self.conn.execute('CREATE VIRTUAL TABLE fts5_test USING fts5 (a)')
+        except sqlite3.OperationalError, e:
+            self.skipTest('SQLite without FTS5: %s' % e)
+        self.conn.execute('DROP TABLE fts5_test')
+
+    def count_texts(self):
+        return self.conn.execute('SELECT count(*) FROM texts').fetchone()[0]
+
+    def test_section_texts(self):
+        path = get_fixture_path('sample-5017.hwp')
+        with closing(Hwp5File(path)) as hwp5file:
+            models = hwp5file.bodytext.section(0).models()
+            texts = dict(section_texts(models))
+        self.assertEquals('\ud55c\uae00 2005 \uc608\uc81c '
+                          '\ud30c\uc77c\uc785\ub2c8\ub2e4.', texts[0])
+        # empty paragraphs are left out
+        self.assertFalse(1 in texts)
+        # paragraphs in the table cells are in the paragraph of the table
+        self.assertEquals(['\ud45c\ud45c\ub05d', 'A0', 'B0'],
+                          texts[5].split('\n')[:3])
+
+    def test_build_and_query(self):
+        stats = build_index(self.conn, self.paths)
+        self.assertEquals(dict(indexed=2, unchanged=0, removed=0), stats)
+
+        hits = list(query_index(self.conn, QUERY))
+        self.assertEquals(3, len(hits))
+        self.assertEquals(set([self.paths[0]]), set(hit[0] for hit in hits))
+        path, section, paragraph, snippet = hits[0]
+        self.assertEquals((0, 0), (section, paragraph))
+        self.assertTrue('[\ud30c\uc77c\uc785\ub2c8\ub2e4]' in snippet)
+
+        self.assertEquals(1, len(list(query_index(self.conn, QUERY, 1))))
+
+    def test_build_incrementally(self):
+        build_index(self.conn, self.paths)
+        count = self.count_texts()
+        stats = build_index(self.conn, self.paths)
+        self.assertEquals(dict(indexed=0, unchanged=2, removed=0), stats)
+
+        # touched, but the same
+        os.utime(self.paths[0], (0, 0))
+        stats = build_index(self.conn, self.paths)
+        self.assertEquals(dict(indexed=0, unchanged=2, removed=0), stats)
+        self.assertEquals(0, self.conn.execute(
+            'SELECT mtime FROM files WHERE path = ?', (self.paths[0],)
+        ).fetchone()[0])
+        self.assertEquals(count, self.count_texts())
+
+        # changed
+        shutil.copyfile(get_fixture_path('headerfooter.hwp'), self.paths[0])
+        os.utime(self.paths[0], (1, 1))
+        stats = build_index(self.conn, self.paths)
+        self.assertEquals(dict(indexed=1, unchanged=1, removed=0), stats)
+        self.assertEquals([], list(query_index(self.conn, QUERY)))
+
+        os.remove(self.paths[0])
+        stats = build_index(self.conn, self.paths[1:])
+        self.assertEquals(dict(indexed=0, unchanged=1, removed=1), stats)
+        self.assertEquals([(self.paths[1],)],
+                          self.conn.execute('SELECT path FROM files')
+                          .fetchall())
+        with closing(sqlite3.connect(':memory:')) as conn:
+            build_index(conn, self.paths[1:])
+            expected = conn.execute('SELECT count(*) FROM texts').fetchone()
+        self.assertEquals(expected[0], self.count_texts())
+
+    def test_build_with_workers(self):
+        stats = build_index(self.conn, self.paths, workers=2)
+        self.assertEquals(dict(indexed=2, unchanged=0, removed=0), stats)
+        count = self.count_texts()
+
+        with closing(sqlite3.connect(':memory:')) as conn:
+            build_index(conn, self.paths)
+            self.assertEquals(count, conn.execute(
+                'SELECT count(*) FROM texts'
+            ).fetchone()[0])
+
+    def test_build_missing_file(self):
+        paths = [os.path.join(self.tempdir, 'missing.hwp')] + self.paths
+        stats = build_index(self.conn, paths)
+        self.assertEquals(dict(indexed=2, unchanged=0, removed=0), stats)
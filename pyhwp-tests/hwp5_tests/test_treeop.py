@@ -5,10 +5,14 @@ from __future__ import unicode_literals
 from unittest import TestCase
 
 from hwp5.treeop import STARTEVENT, ENDEVENT
+from hwp5.treeop import ArrayTree
+from hwp5.treeop import InvalidLevelError
 from hwp5.treeop import build_subtree
 from hwp5.treeop import iter_subevents
 from hwp5.treeop import prefix_ancestors_from_level
+from hwp5.treeop import prefix_event
 from hwp5.treeop import tree_events
+from hwp5.treeop import tree_events_multi
 
 
 class Test_ancestors_from_level(TestCase):
@@ -61,11 +65,11 @@ class Test_ancestors_from_level(TestCase):
         ]
         try:
             list(prefix_ancestors_from_level(level_prefixed))
-            # TODO: 현재로서는 스택에 기본으로 root_item을 넣어놓는 구현 방식 때문에
-            # base level 바로 아래 level은 에러가 나지 않음
-            # self.fail('exception expected')
-        except:
-            pass
+            self.fail('exception expected')
+        except InvalidLevelError, e:
+            self.assertEquals(-1, e.level)
+            self.assertEquals(3, e.depth)
+            self.assertEquals('b7', e.item)
 
         level_prefixed = [
             (7, 'a7'),  # baselevel 7
@@ -129,6 +133,72 @@ class TestTreeEvents(TestCase):
         back = list(tree_events(*result))
         self.assertEquals(event_prefixed_items, back)
 
+        self.assertEquals(
+            event_prefixed_items + event_prefixed_items,
+            list(tree_events_multi([result, result]))
+        )
+
+    def test_deep_tree(self):
+        n = 10000
+        levels = [(level, level) for level in range(n)]
+        events = list(prefix_event(levels))
+        self.assertEquals(2 * n, len(events))
+
+        rootitem, childs = build_subtree(iter(events[1:]))
+        self.assertEquals(0, rootitem)
+        self.assertEquals(events, list(tree_events(rootitem, childs)))
+
+    def test_prefix_event_invalid_level(self):
+        level_prefixed = [(0, 'a0'), (2, 'a0-a1-a2')]
+        try:
+            list(prefix_event(level_prefixed))
+            self.fail('exception expected')
+        except InvalidLevelError, e:
+            self.assertEquals('invalid level: 2, 1, a0-a1-a2', str(e))
+
+
+class TestArrayTree(TestCase):
+
+    event_prefixed_items = [
+        (STARTEVENT, 'a'),
+        (STARTEVENT, 'b'),
+        (STARTEVENT, 'c'), (ENDEVENT, 'c'),
+        (STARTEVENT, 'd'), (ENDEVENT, 'd'),
+        (ENDEVENT, 'b'),
+        (STARTEVENT, 'e'), (ENDEVENT, 'e'),
+        (ENDEVENT, 'a'),
+    ]
+
+    def test_from_subtree(self):
+        events = iter(self.event_prefixed_items + [(STARTEVENT, 'f')])
+        event, rootitem = events.next()
+        tree = ArrayTree.from_subtree(rootitem, events)
+        self.assertEquals([(STARTEVENT, 'f')], list(events))
+
+        self.assertEquals(['a', 'b', 'c', 'd', 'e'], tree.items)
+        self.assertEquals(5, len(tree))
+        self.assertEquals([-1, 0, 1, 1, 0], list(tree.parents))
+        self.assertEquals([1, 4], list(tree.children()))
+        self.assertEquals([2, 3], list(tree.children(1)))
+        self.assertEquals([], list(tree.children(2)))
+
+        self.assertEquals(self.event_prefixed_items, list(tree.events()))
+        self.assertEquals(self.event_prefixed_items[1:7],
+                          list(tree.events(1)))
+        self.assertEquals([(STARTEVENT, 'e'), (ENDEVENT, 'e')],
+                          list(tree.events(4)))
+
+    def test_deep_tree(self):
+        n = 10000
+        events = prefix_event((level, level) for level in range(n))
+        event, rootitem = events.next()
+        tree = ArrayTree.from_subtree(rootitem, events)
+        self.assertEquals(n, len(tree))
+        self.assertEquals([n - 1], list(tree.children(n - 2)))
+        events = list(tree.events())
+        self.assertEquals((STARTEVENT, n - 1), events[n - 1])
+        self.assertEquals((ENDEVENT, 0), events[-1])
+
 
 class TestSubevents(TestCase):
 
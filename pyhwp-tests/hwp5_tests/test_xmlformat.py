@@ -3,14 +3,23 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 from unittest import TestCase
+from xml.sax.saxutils import escape
+from xml.sax.saxutils import quoteattr
 import logging
 
 from hwp5.dataio import Struct
+from hwp5.binmodel import Text
 from hwp5.dataio import INT32, BSTR
+from hwp5.dataio import UINT16
+from hwp5.dataio import Enum
+from hwp5.dataio import Flags
 from hwp5.treeop import STARTEVENT
 from hwp5.treeop import ENDEVENT
 from hwp5.xmlformat import element
 from hwp5.xmlformat import xmlattr_uniqnames
+from hwp5.xmlformat import xmlattrquote
+from hwp5.xmlformat import xmlevents_to_bytechunks
+from hwp5.xmlformat import xmltextescape
 
 
 class TestHello(TestCase):
@@ -58,6 +67,64 @@ class TestHello(TestCase):
                 ]
         self.assertEquals(expected, result)
 
+    def test_flags_and_enums(self):
+
+        class SomeStruct(Struct):
+            Kind = Enum(FOO=0, BAR_BAZ=1)
+            Flags = Flags(UINT16,
+                          0, 'has_foo',
+                          1, 2, Kind, 'some_kind')
+
+            @classmethod
+            def attributes(cls):
+                yield cls.Flags, 'some_flags'
+
+        result = list(element(dict(), (SomeStruct, dict(some_flags=3))))
+        expected = [
+            (STARTEVENT, ('SomeStruct', {'some-flags': '0003',
+                                         'has-foo': '1',
+                                         'some-kind': 'bar_baz'})),
+            (ENDEVENT, 'SomeStruct'),
+        ]
+        self.assertEquals(expected, result)
+
+    def test_flags_without_zero_enum(self):
+
+        class SomeStruct(Struct):
+            Kind = Enum(FOO=1, BAR=2)
+            Flags = Flags(UINT16,
+                          0, 1, Kind, 'some_kind')
+
+            @classmethod
+            def attributes(cls):
+                yield cls.Flags, 'some_flags'
+
+        warnings = []
+
+        class Handler(logging.Handler):
+            def emit(self, record):
+                warnings.append(record.getMessage())
+        handler = Handler(logging.WARNING)
+        dataio_logger = logging.getLogger('hwp5.dataio')
+        dataio_logger.addHandler(handler)
+        self.addCleanup(dataio_logger.removeHandler, handler)
+
+        result = list(element(dict(), (SomeStruct, dict(some_flags=2))))
+        self.assertEquals({'some-flags': '0002', 'some-kind': 'bar'},
+                          result[0][1][1])
+        # the enum is not made of any value but those in the flags
+        self.assertEquals([], warnings)
+
+    def test_attribute_name_clashes(self):
+
+        class SomeStruct(Struct):
+            @staticmethod
+            def attributes():
+                yield INT32, 'a_b'
+
+        result = element(dict(), (SomeStruct, {'a_b': 1, 'a-b': 2}))
+        self.assertRaises(AssertionError, list, result)
+
     def test_xmlattr_uniqnames(self):
         a = [('a', 1), ('b', 2)]
         self.assertEquals([('a', 1), ('b', 2)], list(xmlattr_uniqnames(a)))
@@ -65,3 +132,36 @@ class TestHello(TestCase):
         a = [('a', 1), ('a', 2)]
         result = xmlattr_uniqnames(a)
         self.assertRaises(Exception, list, result)
+
+
+class TestXmlSerialize(TestCase):
+
+    values = ['', '0', 'abc', u'가나다', 'a & b', '<tag>', 'say "hi"',
+              "it's", '"it\'s"', 'line\r\nbreak\ttab', 'nul\x00byte']
+
+    def test_xmltextescape(self):
+        for value in self.values:
+            expected = escape(value).replace('\x00', '')
+            self.assertEquals(expected, xmltextescape(value))
+
+    def test_xmlattrquote(self):
+        entities = {'\r': '&#13;', '\n': '&#10;', '\t': '&#9;'}
+        for value in self.values:
+            expected = quoteattr(value, entities).replace('\x00', '')
+            self.assertEquals(expected, xmlattrquote(value))
+
+    def test_xmlevents_to_bytechunks(self):
+        xmlevents = [
+            (STARTEVENT, ('a', {'x': '1'})),
+            (Text, u'가 < 나'),
+            (STARTEVENT, ('b', {})),
+            (ENDEVENT, 'b'),
+            (ENDEVENT, 'a'),
+        ]
+        expected = u'<a x="1">가 &lt; 나<b></b></a>'.encode('utf-8')
+        chunks = list(xmlevents_to_bytechunks(xmlevents))
+        self.assertEquals([expected], chunks)
+
+        chunks = list(xmlevents_to_bytechunks(xmlevents, chunk_size=10))
+        self.assertEquals(expected, b''.join(chunks))
+        self.assertTrue(1 < len(chunks) < len(xmlevents))
@@ -3,11 +3,15 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 from io import BytesIO
+from multiprocessing.pool import ThreadPool
 from unittest import TestCase
 from xml.etree import ElementTree
 import base64
 import io
+import os
+import os.path
 import pickle
+import sys
 
 from hwp5 import binmodel
 from hwp5 import xmlmodel
@@ -15,23 +19,39 @@ from hwp5 import treeop
 from hwp5.binmodel import BinData
 from hwp5.binmodel import ControlChar
 from hwp5.binmodel import PageDef
+from hwp5.binmodel import Paragraph
 from hwp5.binmodel import ParaCharShape
 from hwp5.binmodel import ParaLineSeg
 from hwp5.binmodel import ParaText
 from hwp5.binmodel import SectionDef
+from hwp5.binmodel import TableBody
+from hwp5.binmodel import TableCell
+from hwp5.binmodel import TableControl
+from hwp5.binmodel import Text
 from hwp5.tagids import HWPTAG_PARA_LINE_SEG
 from hwp5.treeop import STARTEVENT, ENDEVENT
 from hwp5.utils import cached_property
+from hwp5.xmlformat import ChunkedText
 from hwp5.xmlmodel import DocInfo
 from hwp5.xmlmodel import Hwp5File
 from hwp5.xmlmodel import ModelEventStream
 from hwp5.xmlmodel import Section
+from hwp5.xmlmodel import Selection
 from hwp5.xmlmodel import XmlEvents
+from hwp5.xmlmodel import base64_lines
 from hwp5.xmlmodel import embed_bindata
 from hwp5.xmlmodel import line_segmented
 from hwp5.xmlmodel import make_ranged_shapes
+from hwp5.xmlmodel import TableRow
 from hwp5.xmlmodel import merge_paragraph_text_charshape_lineseg
+from hwp5.xmlmodel import pagedef_body_height
+from hwp5.xmlmodel import range_shaped_textchunk_events
+from hwp5.xmlmodel import restructure_section
+from hwp5.xmlmodel import restructure_section_by_passes
+from hwp5.xmlmodel import restructure_tablebody
+from hwp5.xmlmodel import segment_paragraph
 from hwp5.xmlmodel import split_and_shape
+from hwp5.xmlmodel import tokenize_text_by_lang
 
 from . import test_binmodel
 from .fixtures import get_fixture_path
@@ -107,8 +127,8 @@ class TestDocInfo(TestBase):
         events = list(self.docinfo.events(embedbin=bindata))
         self.assertTrue('<text>' in events[4][1][1]['bindata'])
         self.assertEquals(bindata['BIN0002.jpg'].open().read(),
-                          base64.b64decode(events[4][1][1]
-                                           ['bindata']['<text>']))
+                          base64.b64decode(unicode(events[4][1][1]
+                                                   ['bindata']['<text>'])))
 
 
 class TestSection(TestBase):
@@ -163,6 +183,206 @@ class TestHwp5File(TestBase):
         self.assertEquals('HwpDoc', doc.getroot().tag)
 
 
+def toplevel_paragraphs(events, level=3):
+    ''' Top-level paragraphs of BodyText events, or of Section events with
+    `level` 2, as lists of their events.
+    '''
+    paragraphs = []
+    depth = 0
+    for ev, item in events:
+        if ev is STARTEVENT:
+            if depth == level and item[0] is Paragraph:
+                paragraphs.append([])
+            depth += 1
+        if depth > level:
+            paragraphs[-1].append((ev, item))
+        if ev is ENDEVENT:
+            depth -= 1
+    return paragraphs
+
+
+class TestSelection(TestCase):
+
+    def open_hwp5file(self, filename):
+        hwp5file = Hwp5File(get_fixture_path(filename))
+        self.addCleanup(hwp5file.close)
+        return hwp5file
+
+    def spy_sections(self, hwp5file):
+        ''' Record which sections are read, and the streams opened. '''
+        bodytext = hwp5file.text
+        section = bodytext.section
+        read = []
+
+        class Stream(object):
+            def __init__(self, f):
+                self.f = f
+                self.closed = False
+                self.eof = False
+
+            def read(self, size=-1):
+                data = self.f.read(size)
+                if not data:
+                    self.eof = True
+                return data
+
+            def tell(self):
+                return self.f.tell()
+
+            def close(self):
+                self.closed = True
+                self.f.close()
+
+        def read_section(idx):
+            item = section(idx)
+            open_stream = item.open
+
+            def spy_open():
+                stream = Stream(open_stream())
+                read.append((idx, stream))
+                return stream
+            item.open = spy_open
+            return item
+        bodytext.section = read_section
+        return read
+
+    def test_sections(self):
+        hwp5file = self.open_hwp5file('lists.hwp')
+        read = self.spy_sections(hwp5file)
+        events = list(hwp5file.text.events(selection=Selection(
+            sections=(1, None)
+        )))
+        self.assertEquals([1], [idx for idx, stream in read])
+        sectiondefs = [item for ev, item in events
+                       if ev is STARTEVENT and item[0] is SectionDef]
+        self.assertEquals(1, len(sectiondefs))
+        self.assertEquals(1, sectiondefs[0][1]['section_id'])
+
+        section = hwp5file.text.section(1)
+        expected = toplevel_paragraphs(section.events(section_idx=1), 2)
+        self.assertEquals(expected, toplevel_paragraphs(events))
+
+    def test_paragraphs(self):
+        hwp5file = self.open_hwp5file('aligns.hwp')
+        expected = toplevel_paragraphs(hwp5file.text.events())
+        self.assertEquals(17, len(expected))
+
+        events = list(hwp5file.text.events(selection=Selection(
+            paragraphs=(1, 3)
+        )))
+        self.assertEquals(expected[1:3], toplevel_paragraphs(events))
+        self.assertEquals((STARTEVENT, SectionDef),
+                          (events[1][0], events[1][1][0]))
+        self.assertEquals((ENDEVENT, SectionDef),
+                          (events[-2][0], events[-2][1][0]))
+
+        events = hwp5file.text.events(selection=Selection(
+            paragraphs=(15, None)
+        ))
+        self.assertEquals(expected[15:], toplevel_paragraphs(events))
+
+    def test_paragraphs_through_sections(self):
+        hwp5file = self.open_hwp5file('lists.hwp')
+        expected = toplevel_paragraphs(hwp5file.text.events())
+        section = hwp5file.text.section(0)
+        n = len(toplevel_paragraphs(section.events(section_idx=0), 2))
+        events = hwp5file.text.events(selection=Selection(
+            paragraphs=(n - 1, n + 1)
+        ))
+        self.assertEquals(expected[n - 1:n + 1], toplevel_paragraphs(events))
+
+    def test_stop_reading(self):
+        hwp5file = self.open_hwp5file('lists.hwp')
+        read = self.spy_sections(hwp5file)
+        events = list(hwp5file.xmlevents(selection=Selection(
+            paragraphs=(0, 1)
+        )))
+        self.assertEquals([0], [idx for idx, stream in read])
+        idx, stream = read[0]
+        self.assertTrue(stream.closed)
+        self.assertFalse(stream.eof)
+        # still well-formed
+        self.assertEquals((ENDEVENT, 'HwpDoc'), events[-1])
+
+    def test_pages(self):
+        hwp5file = self.open_hwp5file('paragraph-split-page.hwp')
+        expected = toplevel_paragraphs(hwp5file.text.events())
+        self.assertEquals(3, len(expected))
+        events = hwp5file.text.events(selection=Selection(pages=1))
+        self.assertEquals(expected[:2], toplevel_paragraphs(events))
+        events = hwp5file.text.events(selection=Selection(pages=2))
+        self.assertEquals(expected, toplevel_paragraphs(events))
+
+        hwp5file = self.open_hwp5file('aligns.hwp')
+        expected = toplevel_paragraphs(hwp5file.text.events())
+        events = hwp5file.text.events(selection=Selection(pages=3))
+        self.assertEquals(expected[:4], toplevel_paragraphs(events))
+
+    def test_pagedef_body_height(self):
+        attributes = dict(width=59528, height=84188,
+                          left_offset=8504, right_offset=8504,
+                          top_offset=5668, bottom_offset=4252,
+                          header_offset=4252, footer_offset=4252,
+                          attr=0)
+        self.assertEquals(65764, pagedef_body_height(attributes))
+        attributes['attr'] = 1
+        self.assertEquals(42520, pagedef_body_height(attributes))
+
+
+class TestConcurrentReaders(TestCase):
+
+    def test_parallel_section_parses(self):
+        path = get_fixture_path('sample-5017.hwp')
+        # every open() reads the OLE2 file, not the stream cache
+        hwp5file = Hwp5File(path, stream_cache_size=0)
+        self.addCleanup(hwp5file.close)
+
+        def parse_section(idx):
+            section = hwp5file.bodytext.section(idx)
+            return list(section.events(section_idx=idx))
+
+        def read_bindata(name):
+            f = hwp5file['BinData'][name].open()
+            try:
+                return f.read()
+            finally:
+                f.close()
+
+        bindata_names = list(hwp5file['BinData'])
+        expected_section = parse_section(0)
+        expected_bindata = dict((name, read_bindata(name))
+                                for name in bindata_names)
+        expected_docinfo = list(hwp5file.docinfo.events())
+
+        def task(i):
+            if i % 3 == 0:
+                return 'section', parse_section(0)
+            elif i % 3 == 1:
+                name = bindata_names[i % len(bindata_names)]
+                return name, read_bindata(name)
+            else:
+                return 'docinfo', list(hwp5file.docinfo.events())
+
+        # switch threads as often as possible
+        checkinterval = sys.getcheckinterval()
+        sys.setcheckinterval(1)
+        pool = ThreadPool(8)
+        try:
+            results = pool.map(task, range(24))
+        finally:
+            pool.terminate()
+            pool.join()
+            sys.setcheckinterval(checkinterval)
+
+        for name, result in results:
+            if name == 'section':
+                self.assertEquals(expected_section, result)
+            elif name == 'docinfo':
+                self.assertEquals(expected_docinfo, result)
+            else:
+                self.assertEquals(expected_bindata[name], result)
+
+
 class TestShapedText(TestCase):
     def test_make_shape_range(self):
         charshapes = [(0, 'A'), (4, 'B'), (6, 'C'), (10, 'D')]
@@ -204,6 +424,25 @@ class TestShapedText(TestCase):
             ((51, 103), ('B', ('c', None)), 'x' * (103 - 51)),
             ((103, 112), ('C', ('c', None)), 'x' * (112 - 103))], lines)
 
+    def test_segment_paragraph(self):
+        tab = dict(code=0x9)
+        chunks = [((0, 112), 'x' * 112), ((112, 113), tab),
+                  ((113, 116), 'yyy')]
+        charshapes = [(0, 'a'), (3, 'b'), (3, 'c'), (5, 'd')]
+        linesegs = [dict(chpos=0), dict(chpos=51), dict(chpos=103),
+                    dict(chpos=115)]
+        A, B, C, D = linesegs
+        self.assertEquals([
+            (0, 3, 'a', A, 'xxx'),
+            (3, 5, 'c', A, 'xx'),
+            (5, 51, 'd', A, 'x' * (51 - 5)),
+            (51, 103, 'd', B, 'x' * (103 - 51)),
+            (103, 112, 'd', C, 'x' * (112 - 103)),
+            (112, 113, 'd', C, tab),
+            (113, 115, 'd', C, 'yy'),
+            (115, 116, 'd', D, 'y'),
+        ], list(segment_paragraph(chunks, charshapes, linesegs)))
+
 
 class TestLineSeg(TestCase):
     def test_line_segmented(self):
@@ -220,6 +459,72 @@ class TestLineSeg(TestCase):
                            ('D', [((10, 12), None, 'dd')])], lines)
 
 
+class TestSharedEvents(TestCase):
+
+    def test_controlchar_events_shared(self):
+        context = dict()
+        tab = dict(code=0x9)
+        chunks = [((0, 1), ('A', None), tab),
+                  ((1, 2), ('A', None), 'x'),
+                  ((2, 3), ('A', None), dict(tab)),
+                  ((3, 4), ('B', None), dict(tab))]
+        events = list(range_shaped_textchunk_events(context, chunks))
+        self.assertEquals(8, len(events))
+        self.assertTrue(events[0] is events[4])
+        self.assertTrue(events[1] is events[5])
+        self.assertFalse(events[0] is events[6])
+
+        event, (model, attributes, _) = events[6]
+        self.assertEquals(STARTEVENT, event)
+        self.assertEquals(ControlChar, model)
+        self.assertEquals(dict(name='TAB', code=0x9,
+                               kind=ControlChar.INLINE,
+                               charshape_id='B', char='\t'),
+                          attributes)
+
+    def test_tokenize_text_by_lang(self):
+        context = dict()
+        single = (Text, dict(text='abc', charshape_id=1), context)
+        mixed = (Text, dict(text=u'abc가나', charshape_id=2), context)
+        events = [(STARTEVENT, single), (ENDEVENT, single),
+                  (STARTEVENT, mixed), (ENDEVENT, mixed)]
+        events = list(tokenize_text_by_lang(iter(events)))
+
+        self.assertTrue(events[0][1] is single)
+        self.assertEquals(dict(text='abc', charshape_id=1, lang='en'),
+                          single[1])
+        self.assertEquals([
+            (STARTEVENT, (Text, dict(text='abc', charshape_id=2,
+                                     lang='en'), context)),
+            (ENDEVENT, (Text, dict(text='abc', charshape_id=2,
+                                   lang='en'), context)),
+            (STARTEVENT, (Text, dict(text=u'가나', charshape_id=2,
+                                     lang='ko'), context)),
+            (ENDEVENT, (Text, dict(text=u'가나', charshape_id=2,
+                                   lang='ko'), context)),
+        ], events[2:])
+
+    def test_restructure_tablebody(self):
+        context = dict()
+        tablebody = (TableBody, dict(rowcols=[1, 2]), context)
+        cell = (TableCell, dict(), context)
+        events = [(STARTEVENT, tablebody)]
+        events.extend([(STARTEVENT, cell), (ENDEVENT, cell)] * 3)
+        events.append((ENDEVENT, tablebody))
+        events = list(restructure_tablebody(iter(events)))
+
+        rows = list(ev for ev in events if ev[1][0] is TableRow)
+        self.assertEquals(4, len(rows))
+        self.assertEquals([STARTEVENT, ENDEVENT, STARTEVENT, ENDEVENT],
+                          list(ev for ev, item in rows))
+        self.assertTrue(rows[0] is rows[2])
+        self.assertTrue(rows[1] is rows[3])
+        self.assertEquals([TableBody, TableRow, TableCell, TableCell,
+                           TableRow, TableRow, TableCell, TableCell,
+                           TableCell, TableCell, TableRow, TableBody],
+                          list(item[0] for ev, item in events))
+
+
 class TestDistributionBodyText(TestBase):
 
     hwp5file_name = 'viewtext.hwp'
@@ -247,6 +552,110 @@ class TestDistributionBodyText(TestBase):
         list(evs)
 
 
+class TestRestructureSection(TestCase):
+    ''' The state machine should generate what the passes do. '''
+
+    def assertSameEvents(self, modelevents, name):
+        expected = list(restructure_section_by_passes(modelevents(), 0))
+        events = list(restructure_section(modelevents(), 0))
+        self.assertEquals(len(expected), len(events), name)
+        for i, (x, y) in enumerate(zip(expected, events)):
+            self.assertEquals(x, y, '%s: event %d' % (name, i))
+
+    def test_samples(self):
+        dirname = os.path.dirname(get_fixture_path('sample-5017.hwp'))
+        names = sorted(name for name in os.listdir(dirname)
+                       if name.endswith('.hwp'))
+        self.assertTrue(len(names) > 30)
+        for name in names:
+            hwp5file = Hwp5File(os.path.join(dirname, name))
+            if hwp5file.header.flags.password:
+                continue
+            bodytext = hwp5file.bodytext
+            for idx in bodytext.section_indexes():
+                section = bodytext.section(idx)
+                self.assertSameEvents(section.modelevents,
+                                      '%s: section %d' % (name, idx))
+
+    def test_controls_streamed(self):
+        ''' A control is restructured as it is read. '''
+        hwp5file = Hwp5File(get_fixture_path('table.hwp'))
+        modelevents = list(hwp5file.bodytext.section(0).modelevents())
+        table_end = modelevents.index((ENDEVENT, next(
+            item for event, item in modelevents if item[0] is TableControl
+        )))
+        read = []
+
+        def spy():
+            for x in modelevents:
+                read.append(x)
+                yield x
+        for event, item in restructure_section(spy()):
+            if item[0] is TableCell:
+                break
+        self.assertTrue(len(read) < table_end)
+
+    def test_deeply_nested_tables(self):
+        def paragraph(controls, text=None):
+            context = dict()
+            chunks = [((i * 8, i * 8 + 8), dict(code=code))
+                      for i, (code, events) in enumerate(controls)]
+            if text is not None:
+                chunks.append(((0, len(text)), text))
+            events = [(STARTEVENT, (Paragraph, dict(split=0), context)),
+                      (STARTEVENT, (ParaText, dict(chunks=chunks), context)),
+                      (ENDEVENT, (ParaText, dict(chunks=chunks), context)),
+                      (STARTEVENT, (ParaCharShape, dict(charshapes=[(0, 0)]),
+                                    context)),
+                      (ENDEVENT, (ParaCharShape, dict(charshapes=[(0, 0)]),
+                                  context))]
+            for code, control_events in controls:
+                events.extend(control_events)
+            events.append((ENDEVENT, (Paragraph, dict(split=0), context)))
+            return events
+
+        def table(cell_paragraph):
+            context = dict()
+            tablecontrol = (TableControl, dict(), context)
+            tablebody = (TableBody, dict(rowcols=[1]), context)
+            cell = (TableCell, dict(), context)
+            return ([(STARTEVENT, tablecontrol),
+                     (STARTEVENT, tablebody), (ENDEVENT, tablebody),
+                     (STARTEVENT, cell), (ENDEVENT, cell)] +
+                    cell_paragraph +
+                    [(ENDEVENT, tablecontrol)])
+
+        nesting = sys.getrecursionlimit()
+        events = paragraph([], 'innermost')
+        for i in range(nesting):
+            events = paragraph([(0xb, table(events))])
+        sectiondef = (SectionDef, dict(), dict())
+        events = paragraph([(0x2, [(STARTEVENT, sectiondef),
+                                   (ENDEVENT, sectiondef)]),
+                            (0xb, table(events))])
+
+        depth = max_depth = 0
+        cells = 0
+        texts = []
+        for event, item in restructure_section(iter(events)):
+            if event is STARTEVENT:
+                depth += 1
+                max_depth = max(depth, max_depth)
+                if item[0] is TableCell:
+                    cells += 1
+                elif item[0] is Text:
+                    texts.append(item[1]['text'])
+            else:
+                depth -= 1
+        self.assertEquals(0, depth)
+        self.assertEquals(nesting + 1, cells)
+        self.assertEquals(['innermost'], texts)
+        # SectionDef, then Paragraph, LineSeg, TableControl, TableBody,
+        # TableRow and TableCell for each table, then Paragraph, LineSeg and
+        # Text innermost
+        self.assertEquals(1 + (nesting + 1) * 6 + 3, max_depth)
+
+
 class TestMatchFieldStartEnd(TestCase):
 
     def test_match_field_start_end(self):
@@ -301,3 +710,39 @@ class TestEmbedBinData(TestBase):
                   (ENDEVENT, (BinData, bindata, dict()))]
         events = list(embed_bindata(events, self.hwp5file_bin['BinData']))
         self.assertTrue('<text>' in bindata['bindata'])
+
+        text = bindata['bindata']['<text>']
+        self.assertTrue(isinstance(text, ChunkedText))
+        data = self.hwp5file_bin['BinData']['BIN0002.jpg'].open().read()
+        self.assertEquals(data, base64.b64decode(unicode(text)))
+        lines = unicode(text).split('\n')
+        self.assertEquals(['', ''], [lines[0], lines[-1]])
+        self.assertTrue(all(len(line) == 64 for line in lines[1:-2]))
+
+    def test_base64_lines(self):
+
+        class Item(object):
+            def __init__(self, data):
+                self.data = data
+
+            def open(self):
+                # short reads
+                f = BytesIO(self.data)
+                return ShortReads(f)
+
+        class ShortReads(object):
+            def __init__(self, f):
+                self.f = f
+
+            def read(self, size):
+                return self.f.read(min(size, 1000))
+
+            def close(self):
+                self.f.close()
+
+        self.assertEquals('\n\n', ''.join(base64_lines(Item(b''))))
+        data = os.urandom(10000)
+        b64 = base64.b64encode(data)
+        expected = '\n' + '\n'.join(b64[i:i + 64]
+                                    for i in range(0, len(b64), 64)) + '\n'
+        self.assertEquals(expected, ''.join(base64_lines(Item(data))))
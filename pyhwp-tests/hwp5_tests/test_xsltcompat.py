@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from io import BytesIO
+from unittest import TestCase
+
+from hwp5.xsltcompat import XmlWriter
+from hwp5.xsltcompat import number
+from hwp5.xsltcompat import string
+from hwp5.xsltcompat import xround
+
+
+class TestXPathNumbers(TestCase):
+
+    def test_number(self):
+        self.assertEquals(12.5, number(' 12.5 '))
+        self.assertEquals(-3, number('-3'))
+        self.assertEquals(1500, number('1.5e3'))
+        self.assertNotEquals(number(''), number(''))
+        self.assertNotEquals(number('+1'), number('+1'))
+        self.assertNotEquals(number(None), number(None))
+
+    def test_string(self):
+        self.assertEquals('0', string(-0.0))
+        self.assertEquals('NaN', string(number('')))
+        self.assertEquals('100', string(100.0))
+        self.assertEquals('0.1', string(0.1))
+        self.assertEquals('35.28', string(3528 / 100.0))
+        self.assertEquals('1e-06', string(0.000001))
+        self.assertEquals('1.5e+20', string(1.5e20))
+
+    def test_xround(self):
+        self.assertEquals(3, xround(2.5))
+        self.assertEquals(-2, xround(-2.5))
+        self.assertEquals('0', string(xround(-0.4)))
+
+
+class TestXmlWriter(TestCase):
+
+    def test_write(self):
+        f = BytesIO()
+        w = XmlWriter(f)
+        w.start('a', [('x', '"<&>\n')])
+        w.empty('b')
+        w.text('1 < 2\r\n')
+        w.end('a')
+        w.flush()
+        self.assertEquals(b'<a x="&quot;&lt;&amp;&gt;&#10;"><b/>'
+                          b'1 &lt; 2&#13;\n</a>', f.getvalue())
+
+    def test_indent(self):
+        f = BytesIO()
+        w = XmlWriter(f, indent=True)
+        w.start('a')
+        w.start('b')
+        w.empty('c')
+        w.end('b')
+        w.end('a')
+        w.flush()
+        self.assertEquals(b'<a>\n  <b>\n    <c/>\n  </b>\n</a>\n',
+                          f.getvalue())
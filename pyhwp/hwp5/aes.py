@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+#
+#   pyhwp : hwp file format parser in python
+#   Copyright (C) 2010-2019 mete0r <mete0r@sarangbang.or.kr>
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+''' Table-driven AES-128-ECB decryption in pure python.
+
+This is the fallback used to decrypt distribution documents when neither
+`cryptography` nor `javax.crypto` is available. It follows the usual
+"equivalent inverse cipher" of FIPS-197 with precomputed T-tables, so each
+round of a block is sixteen table lookups and xors.
+'''
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+import struct
+
+
+BLOCK_SIZE = 16
+ROUNDS = 10
+
+
+def _xtime(a):
+    a <<= 1
+    if a & 0x100:
+        a ^= 0x11b
+    return a
+
+
+def _gmul(a, b):
+    p = 0
+    while b:
+        if b & 1:
+            p ^= a
+        a = _xtime(a)
+        b >>= 1
+    return p
+
+
+def _make_sboxes():
+    # multiplicative inverses in GF(2^8) via generator 3
+    exp = [0] * 255
+    log = [0] * 256
+    x = 1
+    for i in range(255):
+        exp[i] = x
+        log[x] = i
+        x ^= _xtime(x)
+
+    sbox = [0] * 256
+    for a in range(256):
+        inv = exp[(255 - log[a]) % 255] if a else 0
+        s = inv
+        for shift in range(1, 5):
+            s ^= ((inv << shift) | (inv >> (8 - shift))) & 0xff
+        sbox[a] = s ^ 0x63
+
+    inv_sbox = [0] * 256
+    for a, s in enumerate(sbox):
+        inv_sbox[s] = a
+    return sbox, inv_sbox
+
+
+def _make_decryption_tables(inv_sbox):
+    td0 = []
+    for a in range(256):
+        s = inv_sbox[a]
+        td0.append(_gmul(s, 0x0e) << 24 | _gmul(s, 0x09) << 16 |
+                   _gmul(s, 0x0d) << 8 | _gmul(s, 0x0b))
+
+    def ror8(w):
+        return ((w >> 8) | (w << 24)) & 0xffffffff
+
+    td1 = [ror8(w) for w in td0]
+    td2 = [ror8(w) for w in td1]
+    td3 = [ror8(w) for w in td2]
+    return td0, td1, td2, td3
+
+
+SBOX, INV_SBOX = _make_sboxes()
+TD0, TD1, TD2, TD3 = _make_decryption_tables(INV_SBOX)
+
+
+def expand_key(key):
+    ''' AES-128 key schedule: 44 big-endian 32-bit words. '''
+    if len(key) != 16:
+        raise ValueError('AES-128 key must be 16 bytes')
+    words = list(struct.unpack('>4I', key))
+    rcon = 1
+    for i in range(4, 4 * (ROUNDS + 1)):
+        t = words[i - 1]
+        if i % 4 == 0:
+            t = ((SBOX[(t >> 16) & 0xff] << 24) |
+                 (SBOX[(t >> 8) & 0xff] << 16) |
+                 (SBOX[t & 0xff] << 8) |
+                 SBOX[t >> 24]) ^ (rcon << 24)
+            rcon = _xtime(rcon)
+        words.append(words[i - 4] ^ t)
+    return words
+
+
+def expand_decryption_key(key):
+    ''' Round keys for the equivalent inverse cipher, in decryption order.
+    '''
+    words = expand_key(key)
+    rounds = [words[4 * r:4 * r + 4] for r in range(ROUNDS + 1)]
+    rounds.reverse()
+    for r in range(1, ROUNDS):
+        rounds[r] = [TD0[SBOX[w >> 24]] ^
+                     TD1[SBOX[(w >> 16) & 0xff]] ^
+                     TD2[SBOX[(w >> 8) & 0xff]] ^
+                     TD3[SBOX[w & 0xff]]
+                     for w in rounds[r]]
+    return [w for rk in rounds for w in rk]
+
+
+def decrypt_blocks(rk, data):
+    ''' Decrypt `data`, whose length should be a multiple of BLOCK_SIZE. '''
+    nwords = len(data) // 4
+    words = struct.unpack('>%dI' % nwords, data)
+    out = []
+    append = out.extend
+
+    td0 = TD0
+    td1 = TD1
+    td2 = TD2
+    td3 = TD3
+    si = INV_SBOX
+    k0, k1, k2, k3 = rk[0:4]
+    kf0, kf1, kf2, kf3 = rk[40:44]
+    inner = [tuple(rk[4 * r:4 * r + 4]) for r in range(1, ROUNDS)]
+
+    for i in range(0, nwords, 4):
+        s0 = words[i] ^ k0
+        s1 = words[i + 1] ^ k1
+        s2 = words[i + 2] ^ k2
+        s3 = words[i + 3] ^ k3
+        for r0, r1, r2, r3 in inner:
+            s0, s1, s2, s3 = (
+                td0[s0 >> 24] ^ td1[(s3 >> 16) & 0xff] ^
+                td2[(s2 >> 8) & 0xff] ^ td3[s1 & 0xff] ^ r0,
+                td0[s1 >> 24] ^ td1[(s0 >> 16) & 0xff] ^
+                td2[(s3 >> 8) & 0xff] ^ td3[s2 & 0xff] ^ r1,
+                td0[s2 >> 24] ^ td1[(s1 >> 16) & 0xff] ^
+                td2[(s0 >> 8) & 0xff] ^ td3[s3 & 0xff] ^ r2,
+                td0[s3 >> 24] ^ td1[(s2 >> 16) & 0xff] ^
+                td2[(s1 >> 8) & 0xff] ^ td3[s0 & 0xff] ^ r3,
+            )
+        append((
+            (si[s0 >> 24] << 24 | si[(s3 >> 16) & 0xff] << 16 |
+             si[(s2 >> 8) & 0xff] << 8 | si[s1 & 0xff]) ^ kf0,
+            (si[s1 >> 24] << 24 | si[(s0 >> 16) & 0xff] << 16 |
+             si[(s3 >> 8) & 0xff] << 8 | si[s2 & 0xff]) ^ kf1,
+            (si[s2 >> 24] << 24 | si[(s1 >> 16) & 0xff] << 16 |
+             si[(s0 >> 8) & 0xff] << 8 | si[s3 & 0xff]) ^ kf2,
+            (si[s3 >> 24] << 24 | si[(s2 >> 16) & 0xff] << 16 |
+             si[(s1 >> 8) & 0xff] << 8 | si[s0 & 0xff]) ^ kf3,
+        ))
+    return struct.pack('>%dI' % nwords, *out)
+
+
+class AES128ECBDecryptor(object):
+    ''' Incremental AES-128-ECB decryptor.
+
+    Mimics the `update()`/`finalize()` protocol of `cryptography`'s
+    decryptor contexts: bytes which do not fill a whole block are kept
+    until the next `update()`.
+    '''
+
+    def __init__(self, key):
+        self.rk = expand_decryption_key(key)
+        self.pending = b''
+
+    def update(self, data):
+        data = self.pending + data
+        size = len(data) - len(data) % BLOCK_SIZE
+        self.pending = data[size:]
+        if size == 0:
+            return b''
+        return decrypt_blocks(self.rk, data[:size])
+
+    def finalize(self):
+        if self.pending:
+            raise ValueError('The length of the provided data is not a '
+                             'multiple of the block length.')
+        return b''
+
+
+def aes128ecb_decrypt(key, ciphertext):
+    decryptor = AES128ECBDecryptor(key)
+    return decryptor.update(ciphertext) + decryptor.finalize()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+#
+#   pyhwp : hwp file format parser in python
+#   Copyright (C) 2010-2019 mete0r <mete0r@sarangbang.or.kr>
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+''' Content-addressed store of BinData streams.
+
+Documents made from the same templates embed the same pictures over and
+over. A `BinDataStore` keeps each decompressed BinData stream once, named
+by the SHA-1 of its contents, and outputs get hard links to it instead of
+copies of their own; where hard links can not be made, they get copies.
+
+The objects are written into a temporary file and renamed into place, so
+that workers sharing a store never see an incomplete one, and are made
+read-only, since every output linked to an object shares it.
+'''
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from contextlib import closing
+import errno
+import hashlib
+import logging
+import os
+import os.path
+import shutil
+import stat
+import tempfile
+import threading
+
+from .cache import makedirs
+from .utils import unlink_existing
+
+
+logger = logging.getLogger(__name__)
+
+
+CHUNK_SIZE = 64 * 1024
+
+# streams up to this size are hashed in memory: one already stored is
+# never written at all
+SPOOL_SIZE = 1024 * 1024
+
+OBJECTS_DIRNAME = 'objects'
+TEMP_DIRNAME = 'tmp'
+
+READONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+class BinDataStore(object):
+    ''' Content-addressed store at `path`, which several processes or
+    threads may share.
+
+    >>> store = BinDataStore('/var/lib/pyhwp/bindata')
+    >>> store.unpack(hwp5file['BinData'], 'output/bindata')
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.added = 0
+        self.reused = 0
+
+    def object_path(self, digest):
+        return os.path.join(self.path, OBJECTS_DIRNAME, digest[:2], digest)
+
+    def add(self, f):
+        ''' Store the contents of a file object, unless they are stored
+        already.
+
+        :returns: hex digest of the contents
+        '''
+        digest = hashlib.sha1()
+        chunks = []
+        size = 0
+        tmp = None
+        try:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                digest.update(data)
+                if tmp is not None:
+                    tmp.write(data)
+                    continue
+                chunks.append(data)
+                size += len(data)
+                if size > SPOOL_SIZE:
+                    tmp = self.open_temp()
+                    tmp.writelines(chunks)
+                    chunks = None
+            digest = digest.hexdigest()
+            path = self.object_path(digest)
+            if os.path.exists(path):
+                with self.lock:
+                    self.reused += 1
+                return digest
+            if tmp is None:
+                tmp = self.open_temp()
+                tmp.writelines(chunks)
+            tmp.close()
+            os.chmod(tmp.name, READONLY)
+            makedirs(os.path.dirname(path))
+            try:
+                os.rename(tmp.name, path)
+            except OSError, e:
+                if e.errno != errno.EEXIST:
+                    raise
+                # stored by another worker in the meantime
+            with self.lock:
+                self.added += 1
+            return digest
+        finally:
+            if tmp is not None:
+                tmp.close()
+                if os.path.exists(tmp.name):
+                    os.unlink(tmp.name)
+
+    def open_temp(self):
+        tmp_root = os.path.join(self.path, TEMP_DIRNAME)
+        makedirs(tmp_root)
+        return tempfile.NamedTemporaryFile(dir=tmp_root, delete=False)
+
+    def link(self, digest, path):
+        ''' Make a file at `path` of an object: a hard link to it, or a
+        copy of it.
+        '''
+        source = self.object_path(digest)
+        unlink_existing(path)
+        try:
+            os.link(source, path)
+            return
+        except AttributeError:
+            # no hard links on this platform
+            pass
+        except OSError, e:
+            logger.debug('%s: %s', path, e)
+        shutil.copyfile(source, path)
+
+    def export(self, f, path):
+        ''' Store the contents of a file object and make a file at `path`
+        of them.
+        '''
+        digest = self.add(f)
+        self.link(digest, path)
+        return digest
+
+    def unpack(self, stg, outdir):
+        ''' Export the streams of a storage, e.g. BinData of an `Hwp5File`,
+        into a directory.
+        '''
+        makedirs(outdir)
+        for name in stg:
+            with closing(stg[name].open()) as f:
+                self.export(f, os.path.join(outdir, name))
@@ -19,6 +19,7 @@
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
+from binascii import b2a_hex
 from io import BytesIO
 from itertools import takewhile
 import json
@@ -416,6 +417,53 @@ def model_to_json(model, *args, **kwargs):
     return json.dumps(model, *args, **kwargs)
 
 
+def model_to_ndjson(model):
+    ''' convert a model to compact json in a line, the bytes in hex '''
+    model = dict(model)
+    model['type'] = model['type'].__name__
+    model['payload'] = b2a_hex(model['payload'])
+    if 'unparsed' in model:
+        model['unparsed'] = b2a_hex(model['unparsed'])
+    if 'binevents' in model:
+        del model['binevents']
+    return json.dumps(model, separators=(',', ':'))
+
+
+# text of the control chars which stand for characters
+CONTROLCHAR_TEXTS = {
+    0x09: '\t',
+    0x0a: '\n',
+    0x18: '-',
+    0x1e: '\u00a0',
+    0x1f: ' ',
+}
+
+
+def paragraph_texts(models):
+    ''' `(model, text)` of each `Paragraph` in `models`: the text of its
+    `ParaText`, with the control chars which stand for characters, or an
+    empty text.
+    '''
+    paragraph = None
+    for model in models:
+        if model['type'] is Paragraph:
+            if paragraph is not None:
+                yield paragraph, ''
+            paragraph = model
+        elif (model['type'] is ParaText and paragraph is not None and
+              model['level'] == paragraph['level'] + 1):
+            texts = []
+            for (start, end), chunk in model['content']['chunks']:
+                if isinstance(chunk, basestring):
+                    texts.append(chunk)
+                else:
+                    texts.append(CONTROLCHAR_TEXTS.get(chunk['code'], ''))
+            yield paragraph, ''.join(texts)
+            paragraph = None
+    if paragraph is not None:
+        yield paragraph, ''
+
+
 def chain_iterables(iterables):
     for iterable in iterables:
         for item in iterable:
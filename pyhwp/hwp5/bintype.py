@@ -135,9 +135,7 @@ versioned_typedefs = dict()
 
 
 def get_compiled_typedef_with_version(type, version):
-    if version not in versioned_typedefs:
-        versioned_typedefs[version] = typedefs = dict()
-    typedefs = versioned_typedefs[version]
+    typedefs = versioned_typedefs.setdefault(version, dict())
 
     if type not in typedefs:
         logger.info('filter compiled typedef of %s with version %s',
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+#
+#   pyhwp : hwp file format parser in python
+#   Copyright (C) 2010-2019 mete0r <mete0r@sarangbang.or.kr>
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+''' On-disk cache of conversions.
+
+A conversion is cached under a key made of the contents of the OLE streams
+of a document, the pyhwp version, and the kind and the parameters of the
+conversion: the same document converted again, under whatever name it has
+arrived, is copied from the cache instead.
+
+Each entry is a directory holding the output, a file or a directory. It is
+written into a temporary directory in the cache and renamed into place, so
+that workers sharing a cache never see an incomplete one. Entries are used
+in LRU order: a hit touches its entry, and the least recently used entries
+are removed once the cache is larger than its `max_size`.
+'''
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from contextlib import closing
+from contextlib import contextmanager
+from weakref import WeakKeyDictionary
+import errno
+import hashlib
+import io
+import logging
+import os
+import os.path
+import shutil
+import tempfile
+import threading
+import time
+
+from . import __version__
+from .storage import StorageWrapper
+from .storage import iter_storage_leafs
+from .storage import open_storage_item
+
+
+logger = logging.getLogger(__name__)
+
+
+CHUNK_SIZE = 64 * 1024
+
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+# temporary directories left by crashed workers are removed after this
+STALE_TEMP_AGE = 60 * 60
+
+OUTPUT_NAME = 'output'
+TEMP_DIRNAME = 'tmp'
+
+
+def parse_size(value):
+    ''' Parse a size such as ``1048576``, ``512K``, ``100M`` or ``2G``.
+
+    >>> parse_size('100M')
+    104857600
+    '''
+    value = value.strip().upper()
+    units = dict(K=1024, M=1024 ** 2, G=1024 ** 3)
+    if value[-1:] in units:
+        return int(value[:-1]) * units[value[-1]]
+    return int(value)
+
+
+def raw_storage(stg):
+    ''' The OLE2 storage under the layers of an `Hwp5File`. '''
+    while isinstance(stg, StorageWrapper):
+        stg = stg.wrapped
+    return stg
+
+
+def storage_digest(stg):
+    ''' Hex digest of the names and the contents of the streams in the OLE2
+    storage of `stg`, as they are stored: compressed or encrypted ones are
+    not decoded.
+    '''
+    stg = raw_storage(stg)
+    digest = hashlib.sha1()
+    for path in sorted(iter_storage_leafs(stg)):
+        digest.update(path.encode('utf-8'))
+        digest.update(b'\0')
+        with closing(open_storage_item(stg, path).open()) as f:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                digest.update(data)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ConversionCache(object):
+    ''' On-disk conversion cache at `path`, which several processes or
+    threads may share.
+
+    >>> cache = ConversionCache('/var/cache/pyhwp', max_size=100 * 1024 ** 2)
+    >>> transform = cache.cached(html_transform.transform_hwp5_to_dir,
+    ...                          'html/dir', embedbin=False)
+    >>> transform(hwp5file, 'output')
+    '''
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        self.path = path
+        self.max_size = max_size
+        # size of the entries as of the last walk, with those stored since;
+        # the entries stored by other workers are known at the next walk
+        self.size = None
+        self.size_lock = threading.Lock()
+        self.digests = WeakKeyDictionary()
+        self.digests_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def document_digest(self, hwp5file):
+        ''' `storage_digest()` of a document, computed once per instance. '''
+        with self.digests_lock:
+            digest = self.digests.get(hwp5file)
+        if digest is None:
+            digest = storage_digest(hwp5file)
+            with self.digests_lock:
+                self.digests[hwp5file] = digest
+        return digest
+
+    def key(self, hwp5file, kind, **params):
+        ''' Key of a conversion of `hwp5file`. `kind` names what is converted
+        into; `params` are anything which changes the output, of which the
+        reprs are stable.
+        '''
+        digest = hashlib.sha1()
+        digest.update(self.document_digest(hwp5file).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(__version__.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(kind.encode('utf-8'))
+        for name, value in sorted(params.items()):
+            digest.update(b'\0')
+            digest.update(('%s=%r' % (name, value)).encode('utf-8'))
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.path, key[:2], key)
+
+    def lookup(self, key):
+        ''' Path of the output of an entry, or None. A hit is touched as
+        recently used.
+        '''
+        entry = self.entry_path(key)
+        try:
+            os.utime(entry, None)
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+        return os.path.join(entry, OUTPUT_NAME)
+
+    def store(self, key, write):
+        ''' Store an entry: `write(path)` writes the output at `path`, a file
+        or a directory which it makes.
+
+        :returns: path of the output of the entry
+        '''
+        tmp_root = os.path.join(self.path, TEMP_DIRNAME)
+        makedirs(tmp_root)
+        tmp = tempfile.mkdtemp(dir=tmp_root)
+        try:
+            write(os.path.join(tmp, OUTPUT_NAME))
+            size = tree_size(tmp)
+            entry = self.entry_path(key)
+            makedirs(os.path.dirname(entry))
+            try:
+                os.rename(tmp, entry)
+            except OSError, e:
+                if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                    raise
+                # stored by another worker in the meantime
+                os.utime(entry, None)
+                size = 0
+        finally:
+            if os.path.exists(tmp):
+                shutil.rmtree(tmp, ignore_errors=True)
+        self.stored(size, keep=entry)
+        return os.path.join(entry, OUTPUT_NAME)
+
+    def stored(self, size, keep=None):
+        ''' Count an entry of `size` bytes just stored, and evict once the
+        cache may be larger than `max_size`: the entries are walked at the
+        first time and then only if so.
+        '''
+        with self.size_lock:
+            if self.size is not None:
+                self.size += size
+                if self.size <= self.max_size:
+                    return
+        self.evict(keep=keep)
+
+    @contextmanager
+    def open_output(self, key, write):
+        ''' Open the output of an entry, a file, storing it with `write(f)`
+        on a miss. It can be read even if the entry is evicted meanwhile.
+        '''
+        output = self.lookup(key)
+        if output is not None:
+            try:
+                f = io.open(output, 'rb')
+            except IOError, e:
+                if e.errno != errno.ENOENT:
+                    raise
+                output = None
+        if output is None:
+            self.misses += 1
+            f = io.open(self.store(key, write_file(write)), 'rb')
+        else:
+            self.hits += 1
+        with f:
+            yield f
+
+    def copy_output(self, key, write, path):
+        ''' Copy the output of an entry into `path`, storing it with
+        `write(path)` on a miss.
+        '''
+        output = self.lookup(key)
+        if output is not None:
+            try:
+                copy_into(output, path)
+                self.hits += 1
+                return
+            except (IOError, OSError), e:
+                # evicted while being copied
+                logger.warning('cache entry %s: %s', key, e)
+        self.misses += 1
+        copy_into(self.store(key, write), path)
+
+    def cached(self, transform, kind, **params):
+        ''' Wrap `transform(hwp5file, dest)` to be cached. `dest` is a path,
+        to a file or a directory, or a file object.
+        '''
+        def cached_transform(hwp5file, dest):
+            key = self.key(hwp5file, kind, **params)
+
+            def write(output):
+                transform(hwp5file, output)
+
+            if isinstance(dest, basestring):
+                self.copy_output(key, write, dest)
+                return
+            with self.open_output(key, write) as f:
+                shutil.copyfileobj(f, dest, CHUNK_SIZE)
+        return cached_transform
+
+    def entries(self):
+        ''' ``(mtime, size, path)`` of each entry. '''
+        try:
+            prefixes = os.listdir(self.path)
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                raise
+            return
+        for prefix in prefixes:
+            if prefix == TEMP_DIRNAME:
+                continue
+            prefix_path = os.path.join(self.path, prefix)
+            try:
+                names = os.listdir(prefix_path)
+            except OSError:
+                continue
+            for name in names:
+                entry = os.path.join(prefix_path, name)
+                try:
+                    mtime = os.stat(entry).st_mtime
+                    size = tree_size(entry)
+                except OSError:
+                    # evicted by another worker
+                    continue
+                yield mtime, size, entry
+
+    def evict(self, keep=None):
+        ''' Remove the least recently used entries but `keep` while the cache
+        is larger than `max_size`, and stale temporary directories.
+        '''
+        entries = sorted(self.entries())
+        total = sum(size for mtime, size, entry in entries)
+        for mtime, size, entry in entries:
+            if total <= self.max_size:
+                break
+            if entry == keep:
+                continue
+            self.remove_entry(entry)
+            total -= size
+        with self.size_lock:
+            self.size = total
+        self.remove_stale_temps()
+
+    def remove_entry(self, entry):
+        ''' Remove an entry atomically: it is moved away first, so that it
+        is either there as a whole or not at all.
+        '''
+        tmp_root = os.path.join(self.path, TEMP_DIRNAME)
+        makedirs(tmp_root)
+        removed = tempfile.mkdtemp(dir=tmp_root)
+        try:
+            os.rename(entry, os.path.join(removed, OUTPUT_NAME))
+        except OSError:
+            # removed by another worker
+            pass
+        shutil.rmtree(removed, ignore_errors=True)
+
+    def remove_stale_temps(self):
+        tmp_root = os.path.join(self.path, TEMP_DIRNAME)
+        try:
+            names = os.listdir(tmp_root)
+        except OSError:
+            return
+        now = time.time()
+        for name in names:
+            tmp = os.path.join(tmp_root, name)
+            try:
+                if now - os.stat(tmp).st_mtime > STALE_TEMP_AGE:
+                    shutil.rmtree(tmp, ignore_errors=True)
+            except OSError:
+                continue
+
+
+def write_file(write):
+    ''' Adapt `write(f)` to write into a file at a path. '''
+    def write_path(path):
+        with io.open(path, 'wb') as f:
+            write(f)
+    return write_path
+
+
+def makedirs(path):
+    try:
+        os.makedirs(path)
+    except OSError, e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def tree_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    size = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for filename in filenames:
+            size += os.path.getsize(os.path.join(dirpath, filename))
+    return size
+
+
+def copy_into(src, dst):
+    ''' Copy a file or the contents of a directory; `dst` may be an existing
+    directory.
+    '''
+    if not os.path.isdir(src):
+        shutil.copyfile(src, dst)
+        return
+    makedirs(dst)
+    for name in os.listdir(src):
+        copy_into(os.path.join(src, name), os.path.join(dst, name))
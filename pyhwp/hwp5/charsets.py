@@ -19,91 +19,125 @@
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
+from bisect import bisect_right
+import re
 
 
-def get_unichr_lang(uch):
-    # Hangul Syllables
-    # U+AC00..U+D7AF
-    # Hangul Jamo Extended-B
-    # U+D7B0..D7FF
-    if u'\uAC00' <= uch <= u'\uD7FF':
-        return 'ko'
-
-    # Control Characters and Numbers in Basic Latin
-    if u'\u0000' <= uch <= u'\u0040':
-        return None
-
-    # Hangul Jamo
-    if u'\u1100' <= uch <= u'\u11FF':
-        return 'ko'
-
-    # Hangul Compatibility Jamo
-    if u'\u3130' <= uch <= u'\u318F':
-        return 'ko'
-
-    # Hangul Jamo Extended-A
-    if u'\uA960' <= uch <= u'\uA97F':
-        return 'ko'
+# (first, last, lang) of the character ranges, sorted. A None lang is
+# neutral: it goes with the language around. Characters out of these ranges
+# are 'other'.
+LANG_RANGES = (
+    # Control Characters, Numbers and '@' in Basic Latin
+    (u'\u0000', u'\u0040', None),
 
     # -- en --
 
     # Basic Latin, Latin Extended-A/B
-    if u'\u0040' <= uch <= u'\u024F':
-        return 'en'
+    (u'\u0041', u'\u024F', 'en'),
 
-    # -- cn --
+    # -- ko --
 
-    # CJK Unified Ideographs
-    # U+4E00..U+9FFF
-    if u'\u4E00' <= uch <= u'\u9FFF':
-        return 'cn'
+    # Hangul Jamo
+    (u'\u1100', u'\u11FF', 'ko'),
+
+    # -- cn --
 
     # CJK Radicals Supplement
     # U+2E80..U+2EFF
     # Kangxi Radicals
     # U+2F00..U+2FDF
-    if u'\u2E80' <= uch <= u'\u2FDF':
-        return 'cn'
+    (u'\u2E80', u'\u2FDF', 'cn'),
+
+    # CJK Symbols and Punctuation
+    # U+3000..U+303F
+    (u'\u3000', u'\u303F', 'symbol'),
+
+    # -- jp --
+
+    # Hiragana + Katakana
+    (u'\u3040', u'\u30FF', 'jp'),
+
+    # Hangul Compatibility Jamo
+    (u'\u3130', u'\u318F', 'ko'),
 
     # CJK Unified Ideographs Extension A
     # U+3400..U+4DBF
-    if u'\u3400' <= uch <= u'\u4DBF':
-        return 'cn'
+    (u'\u3400', u'\u4DBF', 'cn'),
+
+    # CJK Unified Ideographs
+    # U+4E00..U+9FFF
+    (u'\u4E00', u'\u9FFF', 'cn'),
+
+    # Hangul Jamo Extended-A
+    (u'\uA960', u'\uA97F', 'ko'),
+
+    # Hangul Syllables
+    # U+AC00..U+D7AF
+    # Hangul Jamo Extended-B
+    # U+D7B0..D7FF
+    (u'\uAC00', u'\uD7FF', 'ko'),
 
     # CJK Compatibility Ideographs
     # U+F900..U+FAFF
-    if u'\uF900' <= uch <= u'\uFAFF':
-        return 'cn'
+    (u'\uF900', u'\uFAFF', 'cn'),
+)
 
-    # CJK Symbols and Punctuation
-    # U+3000..U+303F
-    if u'\u3000' <= uch <= u'\u303F':
-        return 'symbol'
+LANG_RANGE_FIRSTS = [first for first, last, lang in LANG_RANGES]
 
-    # -- jp --
+OTHER = 'other'
 
-    # Hiragana + Katakana
-    if u'\u3040' <= uch <= u'\u30FF':
-        return 'jp'
 
-    return 'other'
+def get_unichr_lang(uch):
+    i = bisect_right(LANG_RANGE_FIRSTS, uch) - 1
+    if i >= 0:
+        first, last, lang = LANG_RANGES[i]
+        if uch <= last:
+            return lang
+    return OTHER
+
+
+def char_class(ranges, negate=False):
+    ''' Regular expression character class of ``(first, last, lang)``. '''
+    return '[%s%s]' % ('^' if negate else '',
+                       ''.join('%s-%s' % (re.escape(first), re.escape(last))
+                               for first, last, lang in ranges))
+
+
+def compile_lang_runs():
+    ''' Regular expression of which each match is a run of a language, the
+    name of its group, with the neutral characters after it, and the ones
+    before it at the start of a text.
+    '''
+    neutral = [r for r in LANG_RANGES if r[2] is None]
+    langs = []
+    for first, last, lang in LANG_RANGES:
+        if lang is not None and lang not in langs:
+            langs.append(lang)
+    runs = []
+    for lang in langs:
+        ranges = [r for r in LANG_RANGES if r[2] == lang]
+        runs.append('(?P<%s>%s%s*)' % (lang, char_class(ranges),
+                                       char_class(ranges + neutral)))
+    # the others are out of the ranges
+    other = char_class(LANG_RANGES, negate=True)
+    other_or_neutral = char_class([r for r in LANG_RANGES
+                                   if r[2] is not None], negate=True)
+    runs.append('(?P<%s>%s%s*)' % (OTHER, other, other_or_neutral))
+    return re.compile('%s*(?:%s)' % (char_class(neutral), '|'.join(runs)),
+                      re.UNICODE)
+
+
+LANG_RUNS = compile_lang_runs()
 
 
 def tokenize_unicode_by_lang(text):
-    buf = []
-    buf_lang = None
-    for uch in text:
-        lang = get_unichr_lang(uch)
-        if lang is None:
-            buf.append(uch)
-            continue
-        if buf_lang == lang or buf_lang is None:
-            buf_lang = lang
-            buf.append(uch)
-            continue
-        else:
-            yield buf_lang or 'ko', ''.join(buf)
-            buf = [uch]
-            buf_lang = lang
-    if buf:
-        yield buf_lang or 'ko', ''.join(buf)
+    ''' Split a text into ``(lang, text)`` runs of languages. The neutral
+    characters go with the run before them, or with the first one; a text
+    of neutral characters only is 'ko'.
+    '''
+    matched = False
+    for m in LANG_RUNS.finditer(text):
+        matched = True
+        yield m.lastgroup, m.group()
+    if not matched and text:
+        yield 'ko', text
@@ -68,4 +68,13 @@ def decompress(stream):
         stream: a file-like readable
         returns a file-like readable
     '''
-    return BytesIO(zlib.decompress(stream.read(), -15))  # without gzip header
+    return BytesIO(decompress_data(stream))
+
+
+def decompress_data(stream):
+    ''' decompress inputstream
+
+        stream: a file-like readable
+        returns the decompressed bytes
+    '''
+    return zlib.decompress(stream.read(), -15)  # without gzip header
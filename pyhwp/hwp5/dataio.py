@@ -530,6 +530,69 @@ def typed_struct_attributes(struct, attributes, context):
         yield dict(name=name, type=type(value), value=value)
 
 
+def typed_struct_attribute_items(struct, attributes, context):
+    ''' Same as `typed_struct_attributes()`, but generates (name, type,
+    value) tuples using the member plan of the struct.
+    '''
+    attributes = dict(attributes)
+    popvalue = attributes.pop
+    for members in struct_member_plan(struct, context.get('version')):
+        values = dict()
+        for name, member_type, condition, resolve in members:
+            if resolve:
+                member_type = member_type(context, values)
+            if condition is None or condition(context, values):
+                if name in attributes:
+                    value = popvalue(name)
+                else:
+                    value = member_type()
+                values[name] = value
+                yield name, member_type, value
+
+    # remnants
+    for name, value in attributes.iteritems():
+        yield name, type(value), value
+
+
+def struct_member_plan(struct, version):
+    ''' Members of a struct and its bases for the given version.
+
+    Returns a list of member groups, one for each class in the MRO which
+    defines `attributes()`, base first. Each member is a tuple of (name,
+    type, condition, resolve), where `resolve` tells whether the type
+    should be resolved from the preceding values. Plans are cached per
+    (struct, version).
+    '''
+    key = struct, version
+    plan = _struct_member_plans.get(key)
+    if plan is None:
+        plan = list(_make_struct_member_plan(struct, version))
+        _struct_member_plans[key] = plan
+    return plan
+
+
+_struct_member_plans = dict()
+
+
+def _make_struct_member_plan(struct, version):
+    mro = inspect.getmro(struct)
+    mro = list(cls for cls in mro if 'attributes' in cls.__dict__)
+    for cls in reversed(mro):
+        members = []
+        for member in cls.members:
+            member_version = member.get('version')
+            if member_version is not None:
+                if version is None:
+                    raise KeyError('version')
+                if version < member_version:
+                    continue
+            member_type = member['type']
+            resolve = isinstance(member_type, (X_ARRAY, SelectiveType))
+            members.append((member['name'], member_type,
+                            member.get('condition'), resolve))
+        yield members
+
+
 class StructType(CompoundType):
     def __init__(cls, name, bases, attrs):
         super(StructType, cls).__init__(name, bases, attrs)
@@ -584,26 +647,24 @@ class Struct(object):
     __metaclass__ = StructType
 
 
+HEXBYTES = ['%02x' % i for i in range(256)]
+
+
 def dumpbytes(data, crust=False):
-    offsbase = 0
     if crust:
         yield '\t 0  1  2  3  4  5  6  7  8  9  A  B  C  D  E  F'
-    while len(data) > 16:
+    # lines are sliced at their offsets: slicing off the dumped ones from
+    # the data would copy the rest over and over
+    last = max(len(data) - 1, 0) // 16
+    for offsbase in range(last + 1):
         if crust:
             line = '%05x0: ' % offsbase
         else:
             line = ''
-        line += ' '.join(['%02x' % ord(ch) for ch in data[0:16]])
+        offset = offsbase * 16
+        line += ' '.join([HEXBYTES[ord(ch)]
+                          for ch in data[offset:offset + 16]])
         yield line
-        data = data[16:]
-        offsbase += 1
-
-    if crust:
-        line = '%05x0: ' % offsbase
-    else:
-        line = ''
-    line += ' '.join(['%02x' % ord(ch) for ch in data])
-    yield line
 
 
 def hexdump(data, crust=False):
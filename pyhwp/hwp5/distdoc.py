@@ -24,25 +24,50 @@ See https://groups.google.com/forum/#!topic/hwp-foss/d2KL2ypR89Q
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
-from io import BytesIO
 import logging
+import struct
 
 from .plat import get_aes128ecb_decrypt
+from .plat import get_aes128ecb_decryptor
 from .recordstream import read_record
 from .tagids import HWPTAG_DISTRIBUTE_DOC_DATA
+from .utils import GeneratorReader
 
 logger = logging.getLogger(__name__)
 
 
-def decode(stream):
+def decode(stream, keycache=None):
     distdoc_data_record = read_record(stream, 0)
     if distdoc_data_record['tagid'] != HWPTAG_DISTRIBUTE_DOC_DATA:
         raise IOError('the first record is not an HWPTAG_DISTRIBUTE_DOC_DATA')
     distdoc_data = distdoc_data_record['payload']
-    key = decode_head_to_key(distdoc_data)
-    tail = stream.read()
-    decrypted = decrypt_tail(key, tail)
-    return BytesIO(decrypted)
+    if keycache is None:
+        key = decode_head_to_key(distdoc_data)
+    else:
+        key = keycache.key(distdoc_data)
+    return GeneratorReader(decrypt_tail_gen(key, stream))
+
+
+class KeyCache(object):
+    ''' Cache of decoded HWPTAG_DISTRIBUTE_DOC_DATA payloads.
+
+    Every stream of a distribution document begins with such a record,
+    and they are all derived from the same password. Sharing one cache
+    per document decodes each distinct payload only once.
+    '''
+
+    def __init__(self):
+        self.sha1s = dict()
+
+    def sha1(self, record_payload):
+        sha1 = self.sha1s.get(record_payload)
+        if sha1 is None:
+            sha1 = decode_head_to_sha1(record_payload)
+            self.sha1s[record_payload] = sha1
+        return sha1
+
+    def key(self, record_payload):
+        return self.sha1(record_payload)[:16]
 
 
 class Random:
@@ -58,6 +83,18 @@ class Random:
         return value
 
 
+def xor_table(key):
+    ''' A translation table which xors every byte with `key`. '''
+    table = _xor_tables.get(key)
+    if table is None:
+        table = bytes(bytearray(x ^ key for x in range(256)))
+        _xor_tables[key] = table
+    return table
+
+
+_xor_tables = dict()
+
+
 def decode_head_to_sha1(record_payload):
     ''' Decode HWPTAG_DISTRIBUTE_DOC_DATA.
 
@@ -69,23 +106,26 @@ def decode_head_to_sha1(record_payload):
     if len(record_payload) != 256:
         raise ValueError('payload size must be 256 bytes')
 
-    data = list(ord(x) for x in record_payload)
-    seed = data[3] << 24 | data[2] << 16 | data[1] << 8 | data[0]
+    seed = struct.unpack('<I', record_payload[:4])[0]
     random = Random(seed)
 
-    n = 0
-    for i in range(256):
-        if n == 0:
-            key = random.rand() & 0xff
-            n = (random.rand() & 0xf) + 1
-        if i >= 4:
-            data[i] = data[i] ^ key
-        n -= 1
+    # The payload is xored with runs of same key byte; each run is
+    # translated at once.
+    decoded = bytearray(record_payload)
+    i = 0
+    while i < 256:
+        key = random.rand() & 0xff
+        n = (random.rand() & 0xf) + 1
+        begin = max(i, 4)
+        end = min(i + n, 256)
+        if begin < end:
+            run = record_payload[begin:end]
+            decoded[begin:end] = run.translate(xor_table(key))
+        i += n
 
-    decoded = b''.join(chr(x) for x in data)
     sha1offset = 4 + (seed & 0xf)
 
-    ucs16le = decoded[sha1offset:sha1offset + 80]
+    ucs16le = bytes(decoded[sha1offset:sha1offset + 80])
     return ucs16le
 
 
@@ -97,3 +137,22 @@ def decode_head_to_key(record_payload):
 def decrypt_tail(key, encrypted_tail):
     decrypt = get_aes128ecb_decrypt()
     return decrypt(key, encrypted_tail)
+
+
+def decrypt_tail_gen(key, stream, bufsize=64 * 1024):
+    ''' Decrypt the rest of `stream` chunk by chunk.
+
+    Only `bufsize` bytes of ciphertext are read at a time; the decrypted
+    chunks are generated as the consumer asks for them.
+    '''
+    decryptor = get_aes128ecb_decryptor()(key)
+    while True:
+        data = stream.read(bufsize)
+        if not data:
+            break
+        decrypted = decryptor.update(data)
+        if decrypted:
+            yield decrypted
+    decrypted = decryptor.finalize()
+    if decrypted:
+        yield decrypted
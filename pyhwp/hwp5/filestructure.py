@@ -19,11 +19,15 @@
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
+from collections import OrderedDict
+from functools import partial
 from io import BytesIO
 import logging
+import threading
 
 from .bintype import read_type
-from .compressed import decompress
+from .compressed import decompress_data
+from .compressed import decompress_gen
 from .dataio import UINT32, Flags, Struct
 from .errors import InvalidOleStorageError
 from .errors import InvalidHwp5FileError
@@ -38,6 +42,12 @@ from .utils import GeneratorReader
 from .utils import cached_property
 from .utils import transcoder
 
+try:
+    # a view of a str, not a copy of it
+    from cStringIO import StringIO as BytesView
+except ImportError:
+    BytesView = BytesIO
+
 
 logger = logging.getLogger(__name__)
 
@@ -107,18 +117,130 @@ def storage_is_hwp5file(stg):
         return False
 
 
+DEFAULT_STREAM_CACHE_SIZE = 32 * 1024 * 1024
+
+
+class StreamCache(object):
+    ''' Decompressed streams of a document, up to `max_size` bytes in total.
+
+    The least recently used ones are evicted first, and a stream larger than
+    `max_size` is not kept at all. It may be used by several threads at once;
+    a stream opened by two of them at once may be decompressed twice.
+    '''
+
+    def __init__(self, max_size=DEFAULT_STREAM_CACHE_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        self.buffers = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, load):
+        ''' Bytes of a stream, which `load()` returns on a miss. '''
+        data = self.lookup(key)
+        if data is None:
+            data = load()
+            self.put(key, data)
+        return data
+
+    def lookup(self, key):
+        ''' Bytes of a stream, or None on a miss. '''
+        with self.lock:
+            data = self.buffers.pop(key, None)
+            if data is not None:
+                # most recently used
+                self.buffers[key] = data
+                self.hits += 1
+                return data
+            self.misses += 1
+
+    def put(self, key, data):
+        ''' Keep the bytes of a stream, unless they are too large. '''
+        if len(data) > self.max_size:
+            return
+        with self.lock:
+            if key not in self.buffers:
+                self.buffers[key] = data
+                self.size += len(data)
+            while self.size > self.max_size:
+                evicted_key, evicted = self.buffers.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.buffers.clear()
+            self.size = 0
+
+
 class CompressedStream(ItemWrapper):
+    ''' decompress a stream
+
+    The stream is decompressed chunk by chunk, as far as it is read. With a
+    `StreamCache`, the decompressed bytes of a stream read to its end are
+    kept there under `key`, and the stream is opened as a view of them
+    afterwards; unless `incremental` is False, with which it is decompressed
+    as a whole into the cache, and may be seeked even at the first time.
+    '''
+
+    def __init__(self, wrapped, cache=None, key=None, incremental=True):
+        ItemWrapper.__init__(self, wrapped)
+        self.cache = cache
+        self.key = key
+        self.incremental = incremental
 
     def open(self):
-        return decompress(self.wrapped.open())
+        if self.cache is not None:
+            if not self.incremental:
+                return BytesView(self.cache.get(self.key,
+                                                self.decompress_data))
+            data = self.cache.lookup(self.key)
+            if data is not None:
+                return BytesView(data)
+        return GeneratorReader(self.decompressed_chunks())
+
+    def decompressed_chunks(self):
+        f = self.wrapped.open()
+        try:
+            if self.cache is None:
+                for chunk in decompress_gen(f):
+                    yield chunk
+                return
+            chunks = []
+            size = 0
+            for chunk in decompress_gen(f):
+                if chunks is not None:
+                    size += len(chunk)
+                    if size > self.cache.max_size:
+                        chunks = None
+                    else:
+                        chunks.append(chunk)
+                yield chunk
+            if chunks is not None:
+                self.cache.put(self.key, b''.join(chunks))
+        finally:
+            f.close()
+
+    def decompress_data(self):
+        f = self.wrapped.open()
+        try:
+            return decompress_data(f)
+        finally:
+            f.close()
 
 
 class CompressedStorage(StorageWrapper):
     ''' decompress streams in the underlying storage '''
+
+    def __init__(self, wrapped, cache=None, basepath=''):
+        StorageWrapper.__init__(self, wrapped)
+        self.cache = cache
+        self.basepath = basepath
+
     def __getitem__(self, name):
         item = self.wrapped[name]
         if is_stream(item):
-            return CompressedStream(item)
+            return CompressedStream(item, self.cache, self.basepath + name)
         else:
             return item
 
@@ -201,15 +323,31 @@ class Hwp5FileBase(ItemConversionStorage):
 
 class Hwp5DistDocStream(VersionSensitiveItem):
 
+    def __init__(self, item, version, keycache=None):
+        VersionSensitiveItem.__init__(self, item, version)
+        if keycache is None:
+            from hwp5.distdoc import KeyCache
+            keycache = KeyCache()
+        self.keycache = keycache
+
     def open(self):
         from hwp5.distdoc import decode
         encodedstream = self.wrapped.open()
-        return decode(encodedstream)
+        return decode(encodedstream, self.keycache)
 
-    def head_record(self):
-        item = self.wrapped.open()
+    def read_head_record(self):
         from .recordstream import read_record
-        return read_record(item, 0)
+        item = self.wrapped.open()
+        try:
+            return read_record(item, 0)
+        finally:
+            item.close()
+
+    # the HWPTAG_DISTRIBUTE_DOC_DATA record, read once
+    distdoc_data_record = cached_property(read_head_record)
+
+    def head_record(self):
+        return self.distdoc_data_record
 
     def head_record_stream(self):
         from .recordstream import record_to_json
@@ -225,57 +363,97 @@ class Hwp5DistDocStream(VersionSensitiveItem):
         return BytesIO(self.head())
 
     def head_sha1(self):
-        from hwp5.distdoc import decode_head_to_sha1
         payload = self.head()
-        return decode_head_to_sha1(payload)
+        return self.keycache.sha1(payload)
 
     def head_key(self):
-        from hwp5.distdoc import decode_head_to_key
         payload = self.head()
-        return decode_head_to_key(payload)
+        return self.keycache.key(payload)
 
-    def tail(self):
+    def open_tail(self):
+        ''' Open the stream past the head record. '''
+        from .recordstream import encode_record_header
+        record = self.head_record()
         item = self.wrapped.open()
-        from .recordstream import read_record
-        read_record(item, 0)
-        assert 4 + 256 == item.tell()
-        return item.read()
+        headsize = len(encode_record_header(record)) + record['size']
+        if len(item.read(headsize)) != headsize:
+            item.close()
+            raise IOError('the stream is shorter than its head record')
+        return item
+
+    def tail(self):
+        item = self.open_tail()
+        try:
+            return item.read()
+        finally:
+            item.close()
 
     def tail_decrypted(self):
         from hwp5.distdoc import decrypt_tail
-        key = self.head_key()
-        tail = self.tail()
-        return decrypt_tail(key, tail)
+        return decrypt_tail(self.head_key(), self.tail())
 
     def tail_stream(self):
         return BytesIO(self.tail())
 
 
 class Hwp5DistDocStorage(ItemConversionStorage):
+    ''' Streams of a distribution document which share `keycache`. '''
+
+    def __init__(self, stg, keycache=None):
+        ItemConversionStorage.__init__(self, stg)
+        if keycache is None:
+            from hwp5.distdoc import KeyCache
+            keycache = KeyCache()
+        self.keycache = keycache
 
     def resolve_conversion_for(self, name):
         def conversion(item):
-            return Hwp5DistDocStream(self.wrapped[name], None)  # TODO: version
+            return Hwp5DistDocStream(self.wrapped[name], None,  # TODO: version
+                                     self.keycache)
         return conversion
 
 
 class Hwp5DistDoc(ItemConversionStorage):
+    ''' handle distribution documents
+
+    Streams in `Scripts` and `ViewText` share a key cache, so the key is
+    decoded once per document.
+    '''
+
+    def __init__(self, stg):
+        from hwp5.distdoc import KeyCache
+        ItemConversionStorage.__init__(self, stg)
+        self.keycache = KeyCache()
 
     def resolve_conversion_for(self, name):
         if name in ('Scripts', 'ViewText'):
-            return Hwp5DistDocStorage
+            return partial(Hwp5DistDocStorage, keycache=self.keycache)
 
 
 class Hwp5Compression(ItemConversionStorage):
-    ''' handle compressed streams in HWPv5 files '''
+    ''' handle compressed streams in HWPv5 files
+
+    Decompressed streams are kept in `stream_cache`, a `StreamCache`, if
+    given. The streams in the storages, e.g. the sections, are decompressed
+    as far as they are read; DocInfo, which is read as a whole anyway, at
+    once.
+    '''
+
+    def __init__(self, stg, stream_cache=None):
+        ItemConversionStorage.__init__(self, stg)
+        self.stream_cache = stream_cache
 
     def resolve_conversion_for(self, name):
-        if name in ('BinData', 'BodyText', 'ViewText'):
-            return CompressedStorage
+        cache = self.stream_cache
+        if name in ('BinData', 'BodyText', 'ViewText', 'Scripts'):
+            def conversion(item):
+                return CompressedStorage(item, cache, name + '/')
+            return conversion
         elif name == 'DocInfo':
-            return CompressedStream
-        elif name == 'Scripts':
-            return CompressedStorage
+            def conversion(item):
+                return CompressedStream(item, cache, name,
+                                        incremental=False)
+            return conversion
 
 
 class PreviewText(object):
@@ -501,13 +679,27 @@ class HwpSummaryInfo(VersionSensitiveItem):
 class Hwp5File(ItemConversionStorage):
     ''' represents HWPv5 File
 
-        Hwp5File(stg)
+        Hwp5File(stg, stream_cache_size=DEFAULT_STREAM_CACHE_SIZE)
 
         stg: an instance of Storage
+        stream_cache_size: byte budget of the decompressed streams kept for
+        opening them again; 0 not to keep any.
+
+    An Hwp5File, its storages and its streams may be shared by threads
+    which read the document at the same time, e.g. one parsing a section
+    while another extracts BinData, with the OleFileIO based storage (the
+    default): each `open()` returns a stream of its own, which should not
+    be shared in turn. Parsed models and events are generated per call.
+    Other OLE2 storage implementations are not safe for that; open the
+    document once per thread instead.
     '''
 
-    def __init__(self, stg):
+    def __init__(self, stg, stream_cache_size=DEFAULT_STREAM_CACHE_SIZE):
         stg = Hwp5FileBase(stg)
+        if stream_cache_size > 0:
+            self.stream_cache = StreamCache(stream_cache_size)
+        else:
+            self.stream_cache = None
 
         if stg.header.flags.password:
             stg = Hwp5PasswordProtectedDoc(stg)
@@ -522,7 +714,7 @@ class Hwp5File(ItemConversionStorage):
             stg = Hwp5DistDoc(stg)
 
         if stg.header.flags.compressed:
-            stg = Hwp5Compression(stg)
+            stg = Hwp5Compression(stg, self.stream_cache)
 
         ItemConversionStorage.__init__(self, stg)
 
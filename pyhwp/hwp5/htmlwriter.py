@@ -0,0 +1,973 @@
+# -*- coding: utf-8 -*-
+#
+#   pyhwp : hwp file format parser in python
+#   Copyright (C) 2010-2019 mete0r <mete0r@sarangbang.or.kr>
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+''' Native HTML writer
+
+Writes index.xhtml and styles.css straight from the xml events of the
+sections, the way ``xsl/hwp5html.xsl`` and ``xsl/hwp5css.xsl`` do, without
+serializing XHWP5. Each method below is named after the template it stands
+for.
+
+index.xhtml is written while the sections are being read: the head goes out
+before the body text is parsed, and every top-level paragraph is written
+and dropped as soon as it has been read. This is where it differs from the
+stylesheets:
+
+- The header and footer areas of a section are written after its page
+  instead of around it, and only those of the section. They are positioned
+  absolutely, so they are laid out the same.
+- The rules of the header and footer areas go into styles.css, which is
+  made once index.xhtml is done and has only the rules of the classes it
+  uses.
+'''
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from contextlib import closing
+from itertools import chain
+import logging
+import math
+
+from .odtwriter import read_docinfo
+from .odtwriter import read_sectiondefs
+from .xmlformat import ChunkedText
+from .xmlmodel import Selection
+from .xmlmodel import modelevents_to_xmlevents
+from .xsltcompat import XhtmlWriter
+from .xsltcompat import NAN
+from .xsltcompat import detach
+from .xsltcompat import iter_elements
+from .xsltcompat import keyed
+from .xsltcompat import nth
+from .xsltcompat import number
+from .xsltcompat import string
+
+
+logger = logging.getLogger(__name__)
+
+
+XHTML_NAMESPACE = 'http://www.w3.org/1999/xhtml'
+XHTML_DOCTYPE = (
+    'html',
+    '-//W3C//DTD XHTML 1.0 Transitional//EN',
+    'http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd',
+)
+
+
+def write_xhtml(hwp5file, f, embedbin=False, selection=None):
+    ''' Write index.xhtml; what ``xsl/hwp5html.xsl`` does.
+
+    With a `hwp5.xmlmodel.Selection`, only that part of the body text is
+    read.
+
+    :returns: `UsedStyles` of what has been written, for `write_css()`
+    '''
+    writer = XHTMLWriter(read_docinfo(hwp5file, embedbin))
+    writer.write(hwp5file, f, selection)
+    return writer.used
+
+
+def write_css(hwp5file, f, used=None, selection=None):
+    ''' Write styles.css; what ``xsl/hwp5css.xsl`` does, but only with the
+    rules of the classes in `used`. Without `used`, index.xhtml is made and
+    thrown away to find them out.
+    '''
+    if used is None:
+        used = write_xhtml(hwp5file, NullOutput(), selection=selection)
+    styles = HTMLStyles(read_docinfo(hwp5file))
+    styles.write_css(f, used)
+
+
+class NullOutput(object):
+
+    def write(self, data):
+        pass
+
+
+class UsedStyles(object):
+    ''' Classes used in an index.xhtml, and its header and footer areas. '''
+
+    def __init__(self):
+        self.classes = set()
+        self.headers = []
+        self.footers = []
+
+
+#
+# CSS
+#
+
+def css_rule(selector, declarations):
+    return selector + ' {\n' + declarations + '}\n'
+
+
+def css_declaration(property, value):
+    return '  ' + property + ': ' + value + ';\n'
+
+
+def hwpunit_to_mm(hwpunit):
+    ''' ``floor($hwpunit div 100 * 0.352777778 * 100 + 0.5) div 100`` '''
+    value = math.floor(hwpunit / 100 * 0.352777778 * 100 + 0.5) / 100
+    return string(value) + 'mm'
+
+
+def hwpunit_to_pt(hwpunit):
+    ''' ``$hwpunit div 100`` '''
+    return string(hwpunit / 100) + 'pt'
+
+
+def attr_number(element, name):
+    if element is None:
+        return NAN
+    return number(element.get(name))
+
+
+def attr_equals(a, b, name):
+    ''' ``$a/@name = $b/@name`` '''
+    if a is None or b is None:
+        return False
+    value = a.get(name)
+    return value is not None and value == b.get(name)
+
+
+def ncname(name):
+    ''' ``translate($name, ' ', '-')`` '''
+    return (name or '').replace(' ', '-')
+
+
+LANGS = ('ko', 'en', 'cn', 'jp', 'other', 'symbol', 'user')
+LANG_FONTS = ('ko-fonts', 'en-fonts', 'cn-fonts', 'jp-fonts', 'other-fonts',
+              'symbol-fonts')
+
+TEXT_ALIGNS = {
+    'center': 'center',
+    'left': 'left',
+    'right': 'right',
+    'both': 'justify',
+}
+
+FONT_FAMILY_GENERICS = (
+    ('바탕', ', serif'),
+    ('돋움', ', sans-serif'),
+    ('명조', ', serif'),
+    ('고딕', ', sans-serif'),
+)
+
+BORDER_WIDTHS = {
+    '0.1mm': '1px',
+    '0.12mm': '1px',
+    '0.15mm': '1px',
+    '0.2mm': '1px',
+    '0.25mm': '1px',
+    '0.4mm': '2px',
+    '0.5mm': '2px',
+}
+
+BORDER_STYLES = {
+    'none': 'none',
+    'solid': 'solid',
+    'dashed': 'dashed',
+    'dotted': 'dotted',
+    'dash-dot': 'dashed',
+    'dash-dot-dot': 'dashed',
+    'long-dash': 'dahsed',
+    'large-dot': 'dotted',
+    'double': 'double',
+    'double-2': 'double',
+    'double-3': 'double',
+    'triple': 'double',
+    'wave': 'solid',
+    'double-wave': 'double',
+    'inset': 'inset',
+    'outset': 'outset',
+    'groove': 'groove',
+    'ridge': 'ridge',
+}
+
+TEXT_DECORATIONS = {
+    'underline': 'underline',
+    'overline': 'overline',
+    'line_through': 'line-through',
+}
+
+TEXT_DECORATION_STYLES = {
+    'solid': 'solid',
+    'dashed': 'dashed',
+    'dotted': 'dotted',
+    'dash_dot': 'dashed',
+    'dash_dot_dot': 'dashed',
+    'long_dashed': 'dashed',
+    'large_dotted': 'dotted',
+    'double': 'double',
+    'lower_weighted': 'double',
+    'upper_weighted': 'double',
+    'middle_weighted': 'double',
+}
+
+# the images of the patterns; the vertical one goes without the comment
+PATTERN_IMAGES = {
+    'horizontal': 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAgAAAAICAQAAABuBnYAAAAAAmJLR0QA/4ePzL8AAAAJcEhZcwAAAEgAAABIAEbJaz4AAAATSURBVAjXY2AgGTAy/CddEyEAAFOKAQGTpJ5ZAAAAJXRFWHRkYXRlOmNyZWF0ZQAyMDE0LTExLTA1VDE1OjM3OjA3KzA5OjAwrbX03gAAACV0RVh0ZGF0ZTptb2RpZnkAMjAxNC0xMS0wNVQxNTozNzowNyswOTowMNzoTGIAAAAASUVORK5CYII=',  # noqa
+    'vertical': 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAgAAAAICAQAAABuBnYAAAAAAmJLR0QA/4ePzL8AAAAJcEhZcwAAAEgAAABIAEbJaz4AAAAVSURBVAjXY2CAgP9QmoGJAQ3QRwAAg8ABDm14IFwAAAAldEVYdGRhdGU6Y3JlYXRlADIwMTQtMTEtMDVUMTU6Mzc6MzcrMDk6MDAjOvM9AAAAJXRFWHRkYXRlOm1vZGlmeQAyMDE0LTExLTA1VDE1OjM3OjM3KzA5OjAwUmdLgQAAAABJRU5ErkJggg==',  # noqa
+    'backslash': 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAgAAAAICAQAAABuBnYAAAAAAmJLR0QA/4ePzL8AAAAJcEhZcwAAAEgAAABIAEbJaz4AAAAQSURBVAjXY2D4z4ABBkAIABqKB/lrzYhNAAAAJXRFWHRkYXRlOmNyZWF0ZQAyMDE0LTExLTA1VDE1OjM4OjE0KzA5OjAwofy1UAAAACV0RVh0ZGF0ZTptb2RpZnkAMjAxNC0xMS0wNVQxNTozODoxNCswOTowMNChDewAAAAASUVORK5CYII=',  # noqa
+    'slash': 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAgAAAAICAQAAABuBnYAAAAAAmJLR0QA/4ePzL8AAAAJcEhZcwAAAEgAAABIAEbJaz4AAAAPSURBVAjXY2BABf8HiAsAGooH+VFK23UAAAAldEVYdGRhdGU6Y3JlYXRlADIwMTQtMTEtMDVUMTU6Mzg6MzUrMDk6MDBFrrmZAAAAJXRFWHRkYXRlOm1vZGlmeQAyMDE0LTExLTA1VDE1OjM4OjM1KzA5OjAwNPMBJQAAAABJRU5ErkJggg==',  # noqa
+    'grid': 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAgAAAAICAQAAABuBnYAAAAAAmJLR0QA/4ePzL8AAAAJcEhZcwAAAEgAAABIAEbJaz4AAAAVSURBVAjXY2T4z4AG0ASY0OVpIgAA/d8CDKGA4lwAAAAldEVYdGRhdGU6Y3JlYXRlADIwMTQtMTEtMDVUMTU6MzQ6MzUrMDk6MDBfklkXAAAAJXRFWHRkYXRlOm1vZGlmeQAyMDE0LTExLTA1VDE1OjM0OjM1KzA5OjAwLs/hqwAAAABJRU5ErkJggg==',  # noqa
+    'cross': 'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAgAAAAICAQAAABuBnYAAAAAAmJLR0QA/4ePzL8AAAAJcEhZcwAAAEgAAABIAEbJaz4AAAAeSURBVAjXY2CAgP9QmoGJAQ1gCDAiFKMCEszAEAAAEWMDCQJfExIAAAAldEVYdGRhdGU6Y3JlYXRlADIwMTQtMTEtMDVUMTU6Mzk6NDErMDk6MDBU5v+tAAAAJXRFWHRkYXRlOm1vZGlmeQAyMDE0LTExLTA1VDE1OjM5OjQxKzA5OjAwJbtHEQAAAABJRU5ErkJggg==',  # noqa
+}
+
+FIXED_RULES = (
+    ('body', (
+        ('background-color', '#eee'),
+        ('padding', '4px'),
+        ('margin', '0'),
+    )),
+    ('.Paper', (
+        ('background-color', '#fff'),
+        ('border', '1px solid black'),
+        ('margin', '1em auto'),
+    )),
+    ('.Paper:first-child', (
+        ('margin-top', '0'),
+    )),
+    ('.Paper:last-child', (
+        ('margin-bottom', '0'),
+    )),
+)
+
+
+class HTMLStyles(object):
+    ''' CSS rules derived from the DocInfo tables. '''
+
+    def __init__(self, docinfo):
+        self.load_docinfo(docinfo)
+
+    def load_docinfo(self, docinfo):
+        idmappings = docinfo.find('IdMappings')
+        if idmappings is None:
+            idmappings = docinfo
+        self.styles = idmappings.findall('Style')
+        self.parashapes = idmappings.findall('ParaShape')
+        self.charshapes = idmappings.findall('CharShape')
+        self.facenames = idmappings.findall('FaceName')
+        self.borderfills = idmappings.findall('BorderFill')
+        self.bullets = idmappings.findall('Bullet')
+        self.bindata = idmappings.findall('BinData')
+
+        # 1-based indexes of the first FaceName of each language
+        base = 1
+        self.facename_bases = [base]
+        for name in LANG_FONTS:
+            base = base + attr_number(idmappings, name)
+            self.facename_bases.append(base)
+
+    def write_css(self, f, used):
+        ''' The template of ``/`` in ``xsl/hwp5css.xsl`` '''
+        classes = used.classes
+        for selector, declarations in FIXED_RULES:
+            f.write(css_rule(selector, ''.join(
+                css_declaration(property, value)
+                for property, value in declarations
+            )).encode('utf-8'))
+
+        # IdMappings
+        f.write('/* Styles */\n'.encode('utf-8'))
+        for style in self.styles:
+            if ncname(style.get('name')) in classes:
+                f.write(self.style_css_rule(style).encode('utf-8'))
+        f.write('/* Paragraph attributes */\n'.encode('utf-8'))
+        for i, parashape in enumerate(self.parashapes):
+            if 'parashape-%d' % i in classes:
+                f.write(self.parashape_css_rule(parashape, i).encode('utf-8'))
+        f.write('/* Text attributes */\n'.encode('utf-8'))
+        for i, charshape in enumerate(self.charshapes):
+            if 'charshape-%d' % i in classes:
+                f.write(self.charshape_css_rule(charshape, i).encode('utf-8'))
+        for i, borderfill in enumerate(self.borderfills, 1):
+            if 'borderfill-%d' % i in classes:
+                f.write(self.borderfill_css_rule(borderfill,
+                                                 i).encode('utf-8'))
+        for i, bullet in enumerate(self.bullets, 1):
+            if 'Bullet-%d' % i in classes:
+                f.write(self.bullet_css_rule(bullet, i).encode('utf-8'))
+
+        # these are in index.xhtml with the stylesheets
+        for header in used.headers:
+            f.write(self.area_css_rule(header, '.HeaderArea', 'top',
+                                       'HeaderParagraphList').encode('utf-8'))
+        for footer in used.footers:
+            f.write(self.area_css_rule(footer, '.FooterArea', 'bottom',
+                                       'FooterParagraphList').encode('utf-8'))
+
+    def style_css_rule(self, style):
+        paragraph_selector = '.' + ncname(style.get('name'))
+        spans_selector = paragraph_selector + ' > span'
+        rules = ''
+        if style.get('kind') == 'paragraph':
+            parashape = keyed(self.parashapes,
+                              number(style.get('parashape-id')))
+            declarations = ('/* @parashape-id = ' +
+                            style.get('parashape-id', '') + '*/\n')
+            span_declarations = ''
+            if parashape is not None:
+                declarations += self.parashape_declarations(parashape)
+                span_declarations = self.parashape_span_declarations(
+                    parashape)
+            rules += css_rule(paragraph_selector, declarations)
+            rules += css_rule(spans_selector, span_declarations)
+
+        rules += '/* @charshape-id = ' + style.get('charshape-id', '') + '*/\n'
+        charshape = keyed(self.charshapes, number(style.get('charshape-id')))
+        if charshape is not None:
+            rules += self.charshape_css_rules(charshape, spans_selector)
+        return rules
+
+    def parashape_css_rule(self, parashape, position):
+        paragraph_selector = 'p.parashape-%d' % position
+        spans_selector = paragraph_selector + ' > span'
+        return (css_rule(paragraph_selector,
+                         self.parashape_declarations(parashape)) +
+                css_rule(spans_selector,
+                         self.parashape_span_declarations(parashape)))
+
+    def parashape_declarations(self, parashape):
+        margins = ' '.join(
+            hwpunit_to_pt(attr_number(parashape, name) / 2)
+            for name in ('doubled-margin-top', 'doubled-margin-right',
+                         'doubled-margin-bottom', 'doubled-margin-left')
+        )
+        declarations = css_declaration('margin', margins)
+        declarations += css_declaration(
+            'text-align', TEXT_ALIGNS.get(parashape.get('align'), 'justify')
+        )
+        # @indent seems to be doubled
+        indent = attr_number(parashape, 'indent')
+        declarations += css_declaration('text-indent',
+                                        hwpunit_to_pt(indent / 2))
+        if indent < 0:
+            declarations += css_declaration('padding-left',
+                                            hwpunit_to_pt(indent / 2 * -1))
+        if parashape.get('linespacing-type') == 'ratio':
+            linespacing = attr_number(parashape, 'linespacing')
+            declarations += css_declaration('min-height',
+                                            string(linespacing / 100) + 'em')
+        return declarations
+
+    def parashape_span_declarations(self, parashape):
+        if parashape.get('linespacing-type') == 'ratio':
+            linespacing = attr_number(parashape, 'linespacing')
+            return css_declaration('line-height', string(linespacing / 100))
+        return ''
+
+    def bullet_css_rule(self, bullet, position):
+        declarations = css_declaration('content',
+                                       '"' + bullet.get('char', '') + '"')
+        declarations += css_declaration('display', 'inline-block')
+        declarations += css_declaration('text-align', bullet.get('align', ''))
+        width = attr_number(bullet, 'width')
+        space = attr_number(bullet, 'space')
+        if width == 0:
+            declarations += css_declaration('width', '1em')
+            declarations += css_declaration('margin-right',
+                                            string(space / 100) + 'em')
+        else:
+            declarations += css_declaration('width', hwpunit_to_pt(width))
+            declarations += css_declaration(
+                'margin-right', hwpunit_to_pt(width * space / 100)
+            )
+        return css_rule('.Bullet-%d::before' % position, declarations)
+
+    def charshape_css_rule(self, charshape, position):
+        return self.charshape_css_rules(charshape,
+                                        'span.charshape-%d' % position)
+
+    def charshape_css_rules(self, charshape, selector):
+        rules = css_rule(selector, self.charshape_declarations(charshape))
+        basesize = attr_number(charshape, 'basesize')
+        for lang, base in zip(LANGS, self.facename_bases):
+            facename_idx = base + number(charshape.findattr('FontFace', lang))
+            font_size = number(charshape.findattr('RelativeSize', lang))
+            facename = keyed(self.facenames, facename_idx - 1)
+            if facename is not None:
+                font_family = ('"' + facename.get('name', '') + '"' +
+                               font_family_generic(facename))
+            else:
+                font_family = ''
+            declarations = css_declaration('font-family', font_family)
+            declarations += css_declaration(
+                'font-size', hwpunit_to_pt(basesize * font_size / 100)
+            )
+            rules += css_rule(selector + '.lang-' + lang, declarations)
+        return rules
+
+    def charshape_declarations(self, charshape):
+        declarations = css_declaration('color', charshape.get('text-color',
+                                                              ''))
+        if attr_number(charshape, 'italic') == 1:
+            declarations += css_declaration('font-style', 'italic')
+        if attr_number(charshape, 'bold') == 1:
+            declarations += css_declaration('font-weight', 'bold')
+        decoration = TEXT_DECORATIONS.get(charshape.get('underline'))
+        if decoration is not None:
+            declarations += css_declaration('text-decoration', decoration)
+            color = charshape.get('underline-color', '')
+            for prefix in ('', '-moz-', '-webkit-'):
+                declarations += css_declaration(
+                    prefix + 'text-decoration-color', color
+                )
+            style = TEXT_DECORATION_STYLES.get(
+                charshape.get('underline-style'), ''
+            )
+            for prefix in ('', '-moz-', '-webkit-'):
+                declarations += css_declaration(
+                    prefix + 'text-decoration-style', style
+                )
+        return declarations
+
+    def borderfill_css_rule(self, borderfill, position):
+        declarations = ''
+        for side in ('top', 'right', 'bottom', 'left'):
+            value = ''.join(border_value(border)
+                            for border in borderfill.findall('Border')
+                            if border.get('attribute-name') == side)
+            declarations += css_declaration('border-' + side, value)
+        for fill in borderfill.findall('FillColorPattern'):
+            declarations += css_declaration('background-color',
+                                            fill.get('background-color', ''))
+            declarations += pattern_background_image(fill)
+        for fill in borderfill.findall('FillGradation'):
+            colors = ''.join(',' + colors.get('hex', '')
+                             for colors in fill.findall('colors'))
+            for function in ('linear-gradient', '-webkit-linear-gradient',
+                             '-moz-linear-gradient'):
+                declarations += css_declaration(
+                    'background-image',
+                    function + '(' + fill.get('shear', '') + 'deg' + colors +
+                    ')'
+                )
+        for fill in borderfill.findall('FillImage'):
+            declarations += self.fillimage_declarations(fill)
+        return css_rule('.borderfill-%d' % position, declarations)
+
+    def fillimage_declarations(self, fillimage):
+        fillimage_type = fillimage.get('fillimage-type', '')
+        if fillimage_type != 'resize':
+            return ('/*  unsupported @fillimage-type: ' + fillimage_type +
+                    ' */\n')
+        bindata = nth(self.bindata, attr_number(fillimage, 'bindata-id'))
+        url = bindata_url(bindata) if bindata is not None else ''
+        return (css_declaration('background-image', 'url(' + url + ') ') +
+                css_declaration('background-size', '100% 100%'))
+
+    def sectiondef_css_rules(self, sectiondef):
+        section_selector = '.Section-' + sectiondef.get('section-id', '')
+        pagedefs = sectiondef.findall('PageDef')
+
+        declarations = ''
+        for pagedef in pagedefs:
+            orientation = pagedef.get('orientation')
+            if orientation == 'portrait':
+                width = attr_number(pagedef, 'width')
+            elif orientation == 'landscape':
+                width = attr_number(pagedef, 'height')
+            else:
+                continue
+            declarations += css_declaration('width', hwpunit_to_mm(width))
+        rules = css_rule(section_selector, declarations)
+
+        declarations = ''
+        for pagedef in pagedefs:
+            declarations += css_declaration('position', 'relative')
+            for side in ('top', 'right', 'bottom', 'left'):
+                offset = attr_number(pagedef, side + '-offset')
+                declarations += css_declaration('margin-' + side,
+                                                hwpunit_to_mm(offset))
+        rules += css_rule(section_selector + ' .HeaderPageFooter',
+                          declarations)
+
+        declarations = ''
+        for pagedef in pagedefs:
+            for side in ('header', 'footer'):
+                offset = attr_number(pagedef, side + '-offset')
+                declarations += css_declaration(
+                    'padding-' + ('top' if side == 'header' else 'bottom'),
+                    hwpunit_to_mm(offset)
+                )
+        rules += css_rule(section_selector + ' .Page', declarations)
+        return rules
+
+    def area_css_rule(self, area, selector, side, paragraphlist):
+        width = number(area.findattr(paragraphlist, 'width'))
+        height = number(area.findattr(paragraphlist, 'height'))
+        declarations = css_declaration('position', 'absolute')
+        declarations += css_declaration('left', '0')
+        declarations += css_declaration(side, '0')
+        declarations += css_declaration('width', hwpunit_to_mm(width))
+        declarations += css_declaration('height', hwpunit_to_mm(height))
+        return css_rule(selector, declarations)
+
+
+def font_family_generic(facename):
+    name = facename.get('name', '')
+    for word, generic in FONT_FAMILY_GENERICS:
+        if word in name:
+            return generic
+    return ''.join(panose1_generic(panose1)
+                   for panose1 in facename.findall('Panose1'))
+
+
+def panose1_generic(panose1):
+    family_type = attr_number(panose1, 'family-type')
+    if family_type == 2:
+        # Latin Text/Display
+        if attr_number(panose1, 'proportion') == 9:
+            return ', monospace'
+        serif_style = attr_number(panose1, 'serif-style')
+        if serif_style > 10:
+            return ', sans-serif'
+        if serif_style < 11:
+            return ', serif'
+    elif family_type == 3:
+        # Latin Hand Written
+        return ', cursive'
+    elif family_type == 4:
+        # Latin Decorative
+        return ', fantasy'
+    return ''
+
+
+def border_value(border):
+    width = border.get('width', '')
+    stroke_type = border.get('stroke-type')
+    return (BORDER_WIDTHS.get(width, width) + ' ' +
+            BORDER_STYLES.get(stroke_type, 'solid') + ' ' +
+            border.get('color', ''))
+
+
+def pattern_background_image(fill):
+    pattern_type = fill.get('pattern-type', '')
+    if pattern_type == 'none':
+        return ''
+    image = PATTERN_IMAGES.get(pattern_type)
+    if image is None:
+        return '/* unrecognized @pattern-type: ' + pattern_type + ' */'
+    value = 'url(' + image + ')'
+    if pattern_type != 'vertical':
+        value += '/* ' + pattern_type + ' */'
+    return css_declaration('background-image', value)
+
+
+def bindata_url(bindata):
+    return ''.join('bindata/' + embedding.get('storage-id', '') + '.' +
+                   embedding.get('ext', '')
+                   for embedding in bindata.findall('BinDataEmbedding'))
+
+
+#
+# XHTML
+#
+
+class XHTMLWriter(HTMLStyles):
+    ''' Write index.xhtml while reading the sections. '''
+
+    def __init__(self, docinfo):
+        HTMLStyles.__init__(self, docinfo)
+        self.used = UsedStyles()
+        self.w = None
+        self.section_started = False
+        self.headers = []
+        self.footers = []
+
+    def write(self, hwp5file, f, selection=None):
+        if selection is None:
+            selection = Selection()
+        w = self.w = XhtmlWriter(f)
+        w.declaration()
+        w.doctype(*XHTML_DOCTYPE)
+        w.start('html', [('xmlns', XHTML_NAMESPACE)])
+        w.start('head')
+        w.empty('meta', [('http-equiv', 'content-type'),
+                         ('content', 'text/html; charset=utf-8')])
+        w.empty('title')
+        w.empty('link', [('rel', 'stylesheet'),
+                         ('href', 'styles.css'),
+                         ('type', 'text/css')])
+        w.start('style', [('type', 'text/css')])
+        w.text('\n')
+        for sectiondef in read_sectiondefs(hwp5file, selection):
+            w.text(self.sectiondef_css_rules(sectiondef))
+        w.end('style')
+        w.end('head')
+        w.flush()
+
+        w.start('body')
+        bodytext = hwp5file.text
+        for idx, modelevents in selection.section_events(bodytext):
+            with closing(modelevents):
+                xmlevents = modelevents_to_xmlevents(modelevents)
+                for _ in iter_elements(xmlevents, self.on_end):
+                    pass
+        w.end('body')
+        w.end('html')
+        w.flush()
+
+    def on_end(self, element):
+        tag = element.tag
+        parent = element.parent
+        if parent is None:
+            self.section_end(element)
+        elif tag == 'Header':
+            self.headers.append(element)
+        elif tag == 'Footer':
+            self.footers.append(element)
+        elif parent.tag == 'SectionDef':
+            # PageDef and such are kept for the positions of the extended
+            # controls
+            if tag == 'ColumnSet':
+                detach(element)
+        elif (parent.tag == 'ColumnSet' and parent.parent is not None and
+              parent.parent.tag == 'SectionDef'):
+            self.section_start(parent.parent)
+            self.apply_templates(element)
+            detach(element)
+
+    def section_start(self, sectiondef):
+        ''' The start of the template of ``SectionDef`` in mode ``div`` '''
+        if self.section_started:
+            return
+        self.section_started = True
+        w = self.w
+        w.start('div', [self.class_attr(
+            'Section Section-' + sectiondef.get('section-id', '') + ' Paper'
+        )])
+        w.start('div', [self.class_attr('HeaderPageFooter')])
+        w.start('div', [self.class_attr('Page')])
+
+    def section_end(self, sectiondef):
+        self.section_start(sectiondef)
+        w = self.w
+        w.end('div')
+        for header in self.headers:
+            self.area(header, 'HeaderArea', 'HeaderParagraphList')
+        for footer in self.footers:
+            self.area(footer, 'FooterArea', 'FooterParagraphList')
+        w.end('div')
+        w.end('div')
+        w.flush()
+
+        self.used.headers.extend(self.headers)
+        self.used.footers.extend(self.footers)
+        self.headers = []
+        self.footers = []
+        self.section_started = False
+
+    def class_attr(self, value):
+        self.used.classes.update(value.split())
+        return 'class', value
+
+    def apply_templates(self, element):
+        template = BODY_TEMPLATES.get(element.tag)
+        if template is None or template(self, element) is NotImplemented:
+            # the built-in template
+            self.w.text(element.text)
+            for child in element.children:
+                self.apply_templates(child)
+
+    def area(self, area, class_name, paragraphlist):
+        ''' Header and Footer in mode ``div`` '''
+        w = self.w
+        w.start('div', [self.class_attr(class_name)])
+        for paragraphlist in area.findall(paragraphlist):
+            for paragraph in paragraphlist.findall('Paragraph'):
+                self.paragraph(paragraph)
+        w.end('div')
+
+    def paragraph(self, paragraph):
+        w = self.w
+        style = keyed(self.styles, attr_number(paragraph, 'style-id'))
+        class_name = ncname(style.get('name')) if style is not None else ''
+        if attr_equals(style, paragraph, 'parashape-id'):
+            class_name += self.class_bullet(style)
+        else:
+            class_name += ' parashape-' + paragraph.get('parashape-id', '')
+            class_name += self.class_bullet(paragraph)
+
+        linesegs = paragraph.findall('LineSeg')
+        w.start('p', [self.class_attr(class_name)])
+        for lineseg in linesegs:
+            for child in lineseg.children:
+                tag = child.tag
+                if tag == 'Text':
+                    self.text(child, style)
+                elif tag in ('ControlChar', 'AutoNumbering'):
+                    self.apply_templates(child)
+                elif (tag in ('TableControl', 'GShapeObjectControl') and
+                      child.get('inline') == '1'):
+                    self.apply_templates(child)
+        w.end('p')
+        for tag in ('TableControl', 'GShapeObjectControl'):
+            for lineseg in linesegs:
+                for child in lineseg.children:
+                    if child.tag == tag and child.get('inline') == '0':
+                        self.apply_templates(child)
+
+    def class_bullet(self, element):
+        ''' Paragraph and Style in mode ``add-class-bullet`` '''
+        parashape = keyed(self.parashapes,
+                          attr_number(element, 'parashape-id'))
+        if attr_number(parashape, 'numbering-bullet-id') > 0:
+            return ' Bullet-' + parashape.get('numbering-bullet-id')
+        return ''
+
+    def text(self, text, style):
+        ''' ``Paragraph/LineSeg/Text`` '''
+        class_name = 'lang-' + text.get('lang', '')
+        if not attr_equals(style, text, 'charshape-id'):
+            class_name += ' charshape-' + text.get('charshape-id', '')
+        w = self.w
+        w.start('span', [self.class_attr(class_name)])
+        w.text(text.text)
+        w.end('span')
+
+    def control_char(self, controlchar):
+        self.w.text(controlchar.get('char', ''))
+
+    def autonumbering(self, autonumbering):
+        w = self.w
+        w.start('span', [self.class_attr(
+            'autonumbering autonumbering-' + autonumbering.get('kind', '')
+        )])
+        w.text(autonumbering.get('prefix', '') +
+               autonumbering.get('number', '') +
+               autonumbering.get('suffix', ''))
+        w.end('span')
+
+    def tablecontrol(self, tablecontrol):
+        w = self.w
+        inline = tablecontrol.get('inline')
+        borderfill_id = tablecontrol.findattr('TableBody', 'borderfill-id')
+        cellspacing = tablecontrol.findattr('TableBody', 'cellspacing')
+        if inline == '1':
+            w.start('span', [
+                self.class_attr('TableControl'),
+                ('style', css_declaration('display', 'inline-block')),
+            ])
+            w.start('table', [
+                self.class_attr('borderfill-' + (borderfill_id or '')),
+                ('cellspacing', cellspacing or ''),
+                ('style', self.css_width(tablecontrol) +
+                 css_declaration('border-collapse', 'collapse')),
+            ])
+            for child in tablecontrol.children:
+                self.apply_templates(child)
+            w.end('table')
+            w.end('span')
+        elif inline == '0':
+            w.start('table', [
+                self.class_attr('TableControl borderfill-' +
+                                (borderfill_id or '')),
+                ('cellspacing', cellspacing or ''),
+                ('style', self.css_width(tablecontrol) +
+                 self.extendedcontrol_hpos(tablecontrol) +
+                 css_declaration('border-collapse', 'collapse')),
+            ])
+            for child in tablecontrol.children:
+                self.apply_templates(child)
+            w.end('table')
+        else:
+            return NotImplemented
+
+    def tablecaption(self, tablecaption):
+        w = self.w
+        position = tablecaption.get('position', '')
+        separation = hwpunit_to_mm(attr_number(tablecaption, 'separation'))
+        width = hwpunit_to_mm(attr_number(tablecaption, 'width'))
+        if position == 'top':
+            style = (css_declaration('caption-side', position) +
+                     css_declaration('margin-bottom', separation) +
+                     css_declaration('width', width))
+        elif position == 'bottom':
+            style = (css_declaration('caption-side', position) +
+                     css_declaration('margin-top', separation) +
+                     css_declaration('width', width))
+        else:
+            style = '/* not supported @position: ' + position + ' */\n'
+        w.start('caption', [self.class_attr('TableCaption'),
+                            ('style', style)])
+        w.text(tablecaption.text)
+        for child in tablecaption.children:
+            self.apply_templates(child)
+        w.end('caption')
+
+    def tablerow(self, tablerow):
+        w = self.w
+        w.start('tr')
+        w.text(tablerow.text)
+        for child in tablerow.children:
+            self.apply_templates(child)
+        w.end('tr')
+
+    def tablecell(self, tablecell):
+        w = self.w
+        padding = ' '.join(
+            hwpunit_to_mm(attr_number(tablecell, name))
+            for name in ('padding-top', 'padding-right', 'padding-bottom',
+                         'padding-left')
+        )
+        style = (css_declaration('width', hwpunit_to_mm(
+                     attr_number(tablecell, 'width'))) +
+                 css_declaration('height', hwpunit_to_mm(
+                     attr_number(tablecell, 'height'))) +
+                 css_declaration('padding', padding))
+        w.start('td', [
+            self.class_attr('borderfill-' +
+                            tablecell.get('borderfill-id', '')),
+            ('style', style),
+            ('rowspan', tablecell.get('rowspan', '')),
+            ('colspan', tablecell.get('colspan', '')),
+        ])
+        w.text(tablecell.text)
+        for child in tablecell.children:
+            self.apply_templates(child)
+        w.end('td')
+
+    def gshapeobjectcontrol(self, gso):
+        w = self.w
+        inline = gso.get('inline')
+        if inline == '1':
+            w.start('span', [
+                self.class_attr('GShapeObjectControl'),
+                ('style', self.css_width(gso) +
+                 css_declaration('display', 'inline-block')),
+            ])
+            name = 'span'
+        elif inline == '0':
+            w.start('div', [
+                self.class_attr('GShapeObjectControl'),
+                ('style', self.css_width(gso) +
+                 self.extendedcontrol_hpos(gso)),
+            ])
+            name = 'div'
+        else:
+            return NotImplemented
+        w.text(gso.text)
+        for child in gso.children:
+            self.apply_templates(child)
+        w.end(name)
+
+    def shape_picture(self, shapepicture):
+        attrs = []
+        bindata = nth(self.bindata, number(
+            shapepicture.findattr('PictureInfo', 'bindata-id')
+        ))
+        if bindata is not None:
+            for embedding in bindata.findall('BinDataEmbedding'):
+                if embedding.get('inline') == 'true':
+                    src = ChunkedText(chain, ['data:;base64,'],
+                                      embedding.text or ())
+                else:
+                    src = ('bindata/' + embedding.get('storage-id', '') +
+                           '.' + embedding.get('ext', ''))
+                attrs.append(('src', src))
+        shapecomponent = shapepicture.parent
+        attrs.append(('style', self.css_width(shapecomponent) + ' ' +
+                      css_declaration('height', hwpunit_to_mm(
+                          attr_number(shapecomponent, 'height')))))
+        self.w.empty('img', attrs)
+
+    def css_width(self, element):
+        return css_declaration('width', hwpunit_to_mm(
+            attr_number(element, 'width')
+        ))
+
+    def extendedcontrol_hpos(self, control):
+        ''' TableControl and GShapeObjectControl in mode
+        ``extendedcontrol-hpos``
+        '''
+        paragraph = columnset = section = pagedef = None
+        if control.parent is not None:
+            paragraph = control.parent.parent
+        if paragraph is not None:
+            columnset = paragraph.parent
+        if columnset is not None:
+            section = columnset.parent
+        if section is not None:
+            pagedef = section.find('PageDef')
+        parashape = keyed(self.parashapes,
+                          attr_number(paragraph, 'parashape-id'))
+
+        hrelto = control.get('hrelto', '')
+        halign = control.get('halign', '')
+        comment = '/* hrelto: ' + hrelto + ' halign: ' + halign + '*/'
+
+        x = attr_number(control, 'x')
+        width = attr_number(control, 'width')
+        margin_left = attr_number(control, 'margin-left')
+        margin_right = attr_number(control, 'margin-right')
+        page_width = attr_number(pagedef, 'width')
+        left_offset = attr_number(pagedef, 'left-offset')
+        right_offset = attr_number(pagedef, 'right-offset')
+        para_margin_left = attr_number(parashape, 'doubled-margin-left') / 2
+        para_margin_right = attr_number(parashape,
+                                        'doubled-margin-right') / 2
+
+        if hrelto == 'paragraph':
+            if halign == 'left':
+                value = para_margin_left + margin_left + x
+            elif halign == 'right':
+                value = (page_width - right_offset - para_margin_right -
+                         x - margin_right - width - left_offset)
+            elif halign == 'center':
+                value = ((page_width - left_offset - right_offset) / 2 -
+                         width / 2 + x + para_margin_left)
+            else:
+                return comment
+        elif hrelto in ('column', 'page'):
+            if halign == 'left':
+                value = margin_left + x
+            elif halign == 'right':
+                value = (page_width - right_offset - x - margin_right -
+                         width - left_offset)
+            elif halign == 'center':
+                value = ((page_width - left_offset - right_offset) / 2 -
+                         width / 2 + x)
+            else:
+                return comment
+        elif hrelto == 'paper':
+            if halign == 'left':
+                value = margin_left + x - left_offset
+            elif halign == 'right':
+                value = page_width - x - margin_right - width - left_offset
+            elif halign == 'center':
+                value = page_width / 2 - width / 2 + x - left_offset
+            else:
+                return comment
+        else:
+            return comment
+        return comment + css_declaration('margin-left', hwpunit_to_mm(value))
+
+
+BODY_TEMPLATES = {
+    'Paragraph': XHTMLWriter.paragraph,
+    'ControlChar': XHTMLWriter.control_char,
+    'AutoNumbering': XHTMLWriter.autonumbering,
+    'TableControl': XHTMLWriter.tablecontrol,
+    'TableCaption': XHTMLWriter.tablecaption,
+    'TableRow': XHTMLWriter.tablerow,
+    'TableCell': XHTMLWriter.tablecell,
+    'GShapeObjectControl': XHTMLWriter.gshapeobjectcontrol,
+    'ShapePicture': XHTMLWriter.shape_picture,
+}
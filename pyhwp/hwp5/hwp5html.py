@@ -34,6 +34,18 @@ Options::
     --logfile=<file>    Set log file.
 
     --output=<output>   Output file / directory
+
+    --sections=<range>  Convert only these sections: N, N-M or N-
+    --paragraphs=<range>
+                        Convert only these paragraphs: N, N-M or N-
+    --pages=<n>         Convert only about the first <n> pages
+
+    --cache-dir=<dir>   Cache conversions in <dir>
+    --cache-size=<size> Size limit of the cache, e.g. 512M
+
+    --bindata-store=<dir>
+                        Store BinData streams once in <dir>, shared by the
+                        outputs, and link them into bindata/
 '''
 from __future__ import absolute_import
 from __future__ import print_function
@@ -41,15 +53,28 @@ from __future__ import unicode_literals
 from contextlib import contextmanager
 from contextlib import closing
 from functools import partial
+from io import BytesIO
+from multiprocessing.pool import ThreadPool
+from zipfile import ZIP_DEFLATED
+from zipfile import ZipFile
 import gettext
 import io
 import logging
 import os.path
 import shutil
 import sys
+import tempfile
+import threading
 
+from .htmlwriter import write_css
+from .htmlwriter import write_xhtml
 from .transforms import BaseTransform
 from .utils import cached_property
+from .utils import unlink_existing
+from .zipstream import DeflatedStream
+from .zipstream import ZipEntryWriter
+from .zipstream import compress_type_for
+from .zipstream import write_stream
 
 
 PY3 = sys.version_info.major == 3
@@ -69,11 +94,35 @@ RESOURCE_PATH_XSL_XHTML = 'xsl/hwp5html.xsl'
 
 class HTMLTransform(BaseTransform):
 
+    def __init__(self, xslt_compile=None, embedbin=False, native=True,
+                 bindata_workers=1, selection=None, bindata_store=None):
+        '''
+        >>> from hwp5.hwp5html import HTMLTransform
+        >>> T = HTMLTransform()
+
+        With `native`, HWPv5 files are converted by `hwp5.htmlwriter`
+        instead of the XSL transforms, which remain for XHWP5 inputs.
+        `bindata_workers` threads write BinData streams into outputs.
+        With a `hwp5.bindatastore.BinDataStore`, the BinData streams are
+        stored in it once and linked into the output directories.
+        With a `hwp5.xmlmodel.Selection`, only that part of the body text
+        is converted.
+        '''
+        BaseTransform.__init__(self, xslt_compile=xslt_compile,
+                               embedbin=embedbin, selection=selection)
+        self.native = native
+        self.bindata_workers = bindata_workers
+        self.bindata_store = bindata_store
+
     @property
     def transform_hwp5_to_css(self):
         '''
         >>> T.transform_hwp5_to_css(hwp5file, 'styles.css')
         '''
+        if self.native:
+            def transform(hwp5file, f):
+                write_css(hwp5file, f, selection=self.selection)
+            return transform
         transform_xhwp5 = self.transform_xhwp5_to_css
         return self.make_transform_hwp5(transform_xhwp5)
 
@@ -82,6 +131,11 @@ class HTMLTransform(BaseTransform):
         '''
         >>> T.transform_hwp5_to_xhtml(hwp5file, 'index.xhtml')
         '''
+        if self.native:
+            def transform(hwp5file, f):
+                write_xhtml(hwp5file, f, embedbin=self.embedbin,
+                            selection=self.selection)
+            return transform
         transform_xhwp5 = self.transform_xhwp5_to_xhtml
         return self.make_transform_hwp5(transform_xhwp5)
 
@@ -89,11 +143,50 @@ class HTMLTransform(BaseTransform):
         '''
         >>> T.transform_hwp5_to_dir(hwp5file, 'output')
         '''
-        with self.transformed_xhwp5_at_temp(hwp5file) as xhwp5path:
-            self.transform_xhwp5_to_dir(xhwp5path, outdir)
-
-        bindata_dir = os.path.join(outdir, b'bindata')
-        self.extract_bindata_dir(hwp5file, bindata_dir)
+        self.transform_hwp5_into(hwp5file, DirectoryTarget(
+            outdir, self.bindata_store
+        ))
+
+    def transform_hwp5_into(self, hwp5file, target):
+        ''' Write index.xhtml, styles.css and bindata/ into a target.
+
+        >>> T.transform_hwp5_into(hwp5file, 'output')
+        >>> files = dict()
+        >>> T.transform_hwp5_into(hwp5file, files)
+        >>> with closing(ZipFile('output.zip', 'w')) as zf:
+        ...     T.transform_hwp5_into(hwp5file, zf)
+
+        See `make_target()` for the targets. With `native`, styles.css has
+        only the rules which index.xhtml uses; otherwise both of them are
+        transformed from one XHWP5 source.
+        '''
+        target = make_target(target, self.bindata_store)
+        if self.native:
+            with target.open('index.xhtml') as f:
+                used = write_xhtml(hwp5file, f, embedbin=self.embedbin,
+                                   selection=self.selection)
+            with target.open('styles.css') as f:
+                write_css(hwp5file, f, used)
+            self.write_bindata(hwp5file, target)
+            return
+        with self.transformed_xhwp5_source(hwp5file) as source:
+            with self.open_output(target, 'index.xhtml') as f:
+                self.transform_xhwp5_to_xhtml(source, f)
+            with self.open_output(target, 'styles.css') as f:
+                self.transform_xhwp5_to_css(source, f)
+        self.write_bindata(hwp5file, target)
+
+    @contextmanager
+    def open_output(self, target, path):
+        with target.open(path) as f:
+            if self.xml_parse is not None or has_fileno(f):
+                yield f
+                return
+            # transforms run by other processes write into file descriptors
+            with closing(tempfile.TemporaryFile()) as tmp:
+                yield tmp
+                tmp.seek(0)
+                shutil.copyfileobj(tmp, f)
 
     @cached_property
     def transform_xhwp5_to_css(self):
@@ -127,21 +220,167 @@ class HTMLTransform(BaseTransform):
         if 'BinData' not in hwp5file:
             return
         bindata_stg = hwp5file['BinData']
+        if self.bindata_store is not None:
+            self.bindata_store.unpack(bindata_stg, bindata_dir)
+            return
         if not os.path.exists(bindata_dir):
             os.mkdir(bindata_dir)
 
         from hwp5.storage import unpack
         unpack(bindata_stg, bindata_dir)
 
+    def write_bindata(self, hwp5file, target):
+        ''' Write BinData streams into bindata/ of a target, with
+        `bindata_workers` threads.
+        '''
+        if 'BinData' not in hwp5file:
+            return
+        bindata = hwp5file['BinData']
+        items = [(bindata[name], 'bindata/' + name) for name in bindata]
+        workers = self.bindata_workers
+        if workers <= 1:
+            for item, path in items:
+                with closing(item.open()) as f:
+                    target.write_stream(path, f)
+            return
+
+        lock = threading.Lock()
+
+        def write(args):
+            item, path = args
+            with lock:
+                f = item.open()
+            with closing(f):
+                target.write_stream(path, f)
+
+        pool = ThreadPool(workers)
+        try:
+            pool.map(write, items)
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+def has_fileno(f):
+    try:
+        f.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        return False
+    return True
+
+
+def make_target(target, bindata_store=None):
+    ''' Output target of `HTMLTransform.transform_hwp5_into()`:
+
+    - a path: a directory, as `DirectoryTarget`, with `bindata_store`
+    - a dict: files are put into it as `path: bytes`, as `DictTarget`
+    - a ZipFile: files are archived into it, as `ZipTarget`
+    - or an object which is such a target already
+    '''
+    if isinstance(target, basestring):
+        return DirectoryTarget(target, bindata_store)
+    if isinstance(target, dict):
+        return DictTarget(target)
+    if isinstance(target, ZipFile):
+        return ZipTarget(target)
+    return target
+
+
+class DirectoryTarget(object):
+    ''' Write files into a directory, making subdirectories as needed.
+
+    With a `hwp5.bindatastore.BinDataStore`, the streams are stored in it
+    and linked into the directory.
+    '''
+
+    def __init__(self, path, bindata_store=None):
+        self.path = path
+        self.bindata_store = bindata_store
+        self.lock = threading.Lock()
+
+    def makedirs_for(self, path):
+        outpath = os.path.join(self.path, *path.split('/'))
+        dirname = os.path.dirname(outpath)
+        with self.lock:
+            if not os.path.exists(dirname):
+                os.makedirs(dirname)
+        return outpath
+
+    @contextmanager
+    def open(self, path):
+        outpath = self.makedirs_for(path)
+        # may be linked into a BinDataStore by a former conversion
+        unlink_existing(outpath)
+        with io.open(outpath, 'wb') as f:
+            yield f
+
+    def write_stream(self, path, f):
+        if self.bindata_store is not None:
+            self.bindata_store.export(f, self.makedirs_for(path))
+            return
+        with self.open(path) as outfile:
+            shutil.copyfileobj(f, outfile)
+
+
+class DictTarget(object):
+    ''' Put files into a dict as ``path: bytes``, in memory. '''
+
+    def __init__(self, files=None):
+        if files is None:
+            files = dict()
+        self.files = files
+
+    @contextmanager
+    def open(self, path):
+        f = BytesIO()
+        yield f
+        self.files[path] = f.getvalue()
+
+    def write_stream(self, path, f):
+        self.files[path] = f.read()
+
+
+class ZipTarget(object):
+    ''' Archive files into a ZipFile, which has to be seekable.
+
+    Already compressed media are stored; the others are deflated. Streams
+    written by several threads are deflated concurrently, and are archived
+    in the order they are done.
+    '''
+
+    def __init__(self, zf):
+        self.zf = zf
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def open(self, path):
+        compress_type = compress_type_for(path, None)
+        with self.lock:
+            with closing(ZipEntryWriter(self.zf, path, compress_type)) as f:
+                yield f
+
+    def write_stream(self, path, f):
+        compress_type = compress_type_for(path, None)
+        if compress_type != ZIP_DEFLATED:
+            with self.lock:
+                write_stream(self.zf, f, path, compress_type)
+            return
+        with closing(DeflatedStream(f)) as deflated:
+            with self.lock:
+                deflated.write_into(self.zf, path)
+
 
 def main():
     from docopt import docopt
 
     from . import __version__ as version
+    from .bindatastore import BinDataStore
     from .dataio import ParseError
     from .errors import InvalidHwp5FileError
     from .proc import rest_to_docopt
+    from .proc import cache_from_args
     from .proc import init_logger
+    from .proc import selection_from_args
     from .utils import make_open_dest_file
     from .xmlmodel import Hwp5File
 
@@ -151,22 +390,37 @@ def main():
 
     hwp5path = args['<hwp5file>']
 
-    html_transform = HTMLTransform()
+    selection = selection_from_args(args)
+    bindata_store = None
+    if args['--bindata-store']:
+        bindata_store = BinDataStore(args['--bindata-store'])
+    html_transform = HTMLTransform(selection=selection,
+                                   bindata_store=bindata_store)
 
     open_dest = make_open_dest_file(args['--output'])
     if args['--css']:
         transform = html_transform.transform_hwp5_to_css
+        kind = 'html/css'
         open_dest = wrap_for_css(open_dest)
     elif args['--html']:
         transform = html_transform.transform_hwp5_to_xhtml
+        kind = 'html/xhtml'
         open_dest = wrap_for_xml(open_dest)
     else:
         transform = html_transform.transform_hwp5_to_dir
+        kind = 'html/dir'
         dest_path = args['--output']
         if not dest_path:
             dest_path = os.path.splitext(os.path.basename(hwp5path))[0]
         open_dest = partial(open_dir, dest_path)
 
+    cache = cache_from_args(args)
+    if cache is not None:
+        transform = cache.cached(transform, kind,
+                                 embedbin=html_transform.embedbin,
+                                 native=html_transform.native,
+                                 selection=selection)
+
     try:
         with closing(Hwp5File(hwp5path)) as hwp5file:
             with open_dest() as dest:
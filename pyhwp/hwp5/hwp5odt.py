@@ -39,26 +39,54 @@ Options::
     --content           Produce *.content.xml
 
     --output=<file>     Output file.
+
+    --validation=<policy>
+                        Validate outputs against the OpenDocument schema:
+                        always, never, sampled or async [default: always]
+
+    --sections=<range>  Convert only these sections: N, N-M or N-
+    --paragraphs=<range>
+                        Convert only these paragraphs: N, N-M or N-
+    --pages=<n>         Convert only about the first <n> pages
+
+    --cache-dir=<dir>   Cache conversions in <dir>
+    --cache-size=<size> Size limit of the cache, e.g. 512M
 '''
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
+from collections import deque
 from contextlib import contextmanager
 from contextlib import closing
 from functools import partial
 from io import BytesIO
+from multiprocessing.pool import ThreadPool
+from zipfile import ZIP_DEFLATED
+from zipfile import ZIP_STORED
 import gettext
 import io
 import logging
+import os
 import os.path
+import random
+import shutil
 import sys
+import tempfile
+import threading
 
 from .errors import ImplementationNotAvailable
+from .odtwriter import write_content
+from .odtwriter import write_single_document
+from .odtwriter import write_styles
 from .utils import mkstemp_open
 from .utils import hwp5_resources_path
 from .transforms import BaseTransform
 from .plat import get_relaxng_compile
 from .utils import cached_property
+from .zipstream import DeflatedStream
+from .zipstream import ZipEntryWriter
+from .zipstream import compress_type_for
+from .zipstream import write_stream
 
 
 PY3 = sys.version_info.major == 3
@@ -77,19 +105,50 @@ RESOURCE_PATH_XSL_SINGLE_DOCUMENT = 'xsl/odt/document.xsl'
 RESOURCE_PATH_XSL_STYLE = 'xsl/odt/styles.xsl'
 RESOURCE_PATH_XSL_CONTENT = 'xsl/odt/content.xsl'
 
+VALIDATE_ALWAYS = 'always'
+VALIDATE_NEVER = 'never'
+VALIDATE_SAMPLED = 'sampled'
+VALIDATE_ASYNC = 'async'
+VALIDATION_POLICIES = (VALIDATE_ALWAYS, VALIDATE_NEVER, VALIDATE_SAMPLED,
+                       VALIDATE_ASYNC)
+
+# compiled OpenDocument schemas, by the relaxng_compile which compiled them
+_odf_validators = dict()
+_odf_validators_lock = threading.Lock()
+
 
 class ODFValidate:
 
-    def __init__(self, relaxng_compile=None):
+    def __init__(self, relaxng_compile=None, validation=VALIDATE_ALWAYS,
+                 validation_sample=10, on_validation_failed=None):
         '''
         >>> V = ODFValidate()
+
+        `validation` is one of:
+
+        - ``'always'``: validate every output before it is written out; an
+          invalid output raises ValidationFailed.
+        - ``'never'``
+        - ``'sampled'``: validate one in `validation_sample` outputs on
+          average, as ``'always'`` does.
+        - ``'async'``: write outputs out as they are made and validate them
+          in a background thread; failures are passed to
+          `on_validation_failed(exception)`, or logged. See
+          `wait_validations()`.
         '''
+        if validation not in VALIDATION_POLICIES:
+            raise ValueError('validation: %r' % (validation,))
         if relaxng_compile is None:
             try:
                 relaxng_compile = self.get_default_relaxng_compile()
             except ImplementationNotAvailable:
                 relaxng_compile = None
         self.relaxng_compile = relaxng_compile
+        self.validation = validation
+        self.validation_sample = validation_sample
+        self.on_validation_failed = on_validation_failed
+        self.validation_random = random.Random()
+        self.validation_pool = None
 
     @classmethod
     def get_default_relaxng_compile(cls):
@@ -107,22 +166,111 @@ class ODFValidate:
         return self.make_odf_validator()
 
     def make_odf_validator(self):
-        if self.relaxng_compile:
-            with hwp5_resources_path(RESOURCE_PATH_RNG) as rng_path:
-                return self.relaxng_compile(rng_path)
+        ''' The schema is compiled once, and shared by ODFValidate
+        instances with the same `relaxng_compile`.
+        '''
+        if not self.relaxng_compile:
+            return
+        with _odf_validators_lock:
+            validator = _odf_validators.get(self.relaxng_compile)
+            if validator is None:
+                with hwp5_resources_path(RESOURCE_PATH_RNG) as rng_path:
+                    validator = self.relaxng_compile(rng_path)
+                _odf_validators[self.relaxng_compile] = validator
+            return validator
+
+    @contextmanager
+    def validating_output(self, output):
+        ''' Validate what is written into `output` as `validation` says.
+
+        >>> with V.validating_output(sys.stdout) as output:
+        ...     output.write(xml)
+        '''
+        validation = self.validation
+        if validation == VALIDATE_NEVER:
+            yield output
+            return
+        if validation == VALIDATE_SAMPLED:
+            sample = self.validation_random.random() * self.validation_sample
+            if sample >= 1:
+                yield output
+                return
+        validator = self.odf_validator
+        if not validator:
+            yield output
+        elif validation == VALIDATE_ASYNC:
+            spool = tempfile.TemporaryFile()
+            try:
+                yield TeeOutput(output, spool)
+            except Exception:
+                spool.close()
+                raise
+            if self.validation_pool is None:
+                self.validation_pool = ThreadPool(1)
+            self.validation_pool.apply_async(self.validate_spooled, (spool,))
+        else:
+            with validator.validating_output(output) as output:
+                yield output
+
+    def validate_spooled(self, spool):
+        try:
+            spool.seek(0)
+            with io.open(os.devnull, 'wb') as devnull:
+                with self.odf_validator.validating_output(devnull) as output:
+                    shutil.copyfileobj(spool, output)
+        except Exception, e:
+            if self.on_validation_failed:
+                self.on_validation_failed(e)
+            else:
+                logger.error('ODF validation failed: %s', e)
+        finally:
+            spool.close()
+
+    def wait_validations(self):
+        ''' Wait for the background validations to finish. '''
+        pool = self.validation_pool
+        if pool is not None:
+            self.validation_pool = None
+            pool.close()
+            pool.join()
+
+
+class TeeOutput(object):
+    ''' Write into several outputs at once. '''
+
+    def __init__(self, *outputs):
+        self.outputs = outputs
+
+    def write(self, data):
+        for output in self.outputs:
+            output.write(data)
 
 
 class ODTTransform(BaseTransform, ODFValidate):
 
     def __init__(self, xslt_compile=None, relaxng_compile=None,
-                 embedbin=False):
+                 embedbin=False, native=True, bindata_workers=1,
+                 validation=VALIDATE_ALWAYS, validation_sample=10,
+                 on_validation_failed=None, selection=None):
         '''
         >>> from hwp5.hwp5odt import ODTTransform
         >>> T = ODTTransform()
+
+        With `native`, HWPv5 files are converted by `hwp5.odtwriter`
+        instead of the XSL transforms, which remain for XHWP5 inputs.
+        `bindata_workers` threads deflate BinData streams into packages.
+        See `ODFValidate` for the `validation` policies. With a
+        `hwp5.xmlmodel.Selection`, only that part of the body text is
+        converted.
         '''
         BaseTransform.__init__(self, xslt_compile=xslt_compile,
-                               embedbin=embedbin)
-        ODFValidate.__init__(self, relaxng_compile)
+                               embedbin=embedbin, selection=selection)
+        ODFValidate.__init__(self, relaxng_compile,
+                             validation=validation,
+                             validation_sample=validation_sample,
+                             on_validation_failed=on_validation_failed)
+        self.native = native
+        self.bindata_workers = bindata_workers
 
     @property
     def transform_hwp5_to_styles(self):
@@ -130,6 +278,10 @@ class ODTTransform(BaseTransform, ODFValidate):
         >>> with io.open('styles.xml', 'wb') as f:
         ...     T.transform_hwp5_to_styles(hwp5file, f)
         '''
+        if self.native:
+            def write(hwp5file, f):
+                write_styles(hwp5file, f, selection=self.selection)
+            return self.make_odf_writer(write)
         transform_xhwp5 = self.transform_xhwp5_to_styles
         return self.make_transform_hwp5(transform_xhwp5)
 
@@ -139,6 +291,11 @@ class ODTTransform(BaseTransform, ODFValidate):
         >>> with io.open('content.xml', 'wb') as f:
         ...     T.transform_hwp5_to_content(hwp5file, f)
         '''
+        if self.native:
+            def write(hwp5file, f):
+                write_content(hwp5file, f, embedbin=self.embedbin,
+                              selection=self.selection)
+            return self.make_odf_writer(write)
         transform_xhwp5 = self.transform_xhwp5_to_content
         return self.make_transform_hwp5(transform_xhwp5)
 
@@ -148,6 +305,11 @@ class ODTTransform(BaseTransform, ODFValidate):
         >>> with io.open('transformed.fodt', 'wb') as f:
         ...     T.transform_hwp5_to_single_document(hwp5file, f)
         '''
+        if self.native:
+            def write(hwp5file, f):
+                write_single_document(hwp5file, f, embedbin=self.embedbin,
+                                      selection=self.selection)
+            return self.make_odf_writer(write)
         transform_xhwp5 = self.transform_xhwp5_to_single_document
         return self.make_transform_hwp5(transform_xhwp5)
 
@@ -156,16 +318,22 @@ class ODTTransform(BaseTransform, ODFValidate):
         >>> with open_odtpkg('transformed.odt') as odtpkg:
         ...    T.transform_hwp5_to_package(hwp5file, odtpkg)
         '''
-        with self.transformed_xhwp5_at_temp(hwp5file) as xml_path:
-            self.transform_xhwp5_into_package(xml_path, odtpkg)
+        if self.native:
+            with odtpkg.open_stream('styles.xml', 'text/xml') as f:
+                self.transform_hwp5_to_styles(hwp5file, f)
+            with odtpkg.open_stream('content.xml', 'text/xml') as f:
+                self.transform_hwp5_to_content(hwp5file, f)
+            insert_manifest_rdf(odtpkg)
+        else:
+            with self.transformed_xhwp5_at_temp(hwp5file) as xml_path:
+                self.transform_xhwp5_into_package(xml_path, odtpkg)
 
         if 'BinData' in hwp5file:
             bindata = hwp5file['BinData']
-            for name in bindata:
-                f = bindata[name].open()
-                path = 'bindata/' + name
-                mimetype = 'application/octet-stream'
-                odtpkg.insert_stream(f, path, mimetype)
+            mimetype = 'application/octet-stream'
+            streams = [(bindata[name], 'bindata/' + name, mimetype)
+                       for name in bindata]
+            odtpkg.insert_streams(streams, workers=self.bindata_workers)
 
     @cached_property
     def transform_xhwp5_to_styles(self):
@@ -205,12 +373,7 @@ class ODTTransform(BaseTransform, ODFValidate):
                 odtpkg.insert_path(path, 'styles.xml', 'text/xml')
             with self.transformed_content_at_temp(xhwp5path) as path:
                 odtpkg.insert_path(path, 'content.xml', 'text/xml')
-
-            rdf = BytesIO()
-            manifest_rdf(rdf)
-            rdf.seek(0)
-            odtpkg.insert_stream(rdf, 'manifest.rdf',
-                                 'application/rdf+xml')
+            insert_manifest_rdf(odtpkg)
         return transform
 
     def transformed_styles_at_temp(self, xhwp5path):
@@ -239,15 +402,20 @@ class ODTTransform(BaseTransform, ODFValidate):
 
     def make_odf_transform(self, resource_path):
         transform = self.make_xsl_transform(resource_path)
-        validator = self.odf_validator
-        if validator:
-            def validating_transform(input, output):
-                with validator.validating_output(output) as output:
-                    transform(input, output)
-            return validating_transform
-        else:
+        if self.validation == VALIDATE_NEVER:
             return transform
 
+        def validating_transform(input, output):
+            with self.validating_output(output) as output:
+                transform(input, output)
+        return validating_transform
+
+    def make_odf_writer(self, write):
+        def transform_hwp5(hwp5file, output):
+            with self.validating_output(output) as output:
+                write(hwp5file, output)
+        return transform_hwp5
+
 
 @contextmanager
 def transformed_at_temp_path(inp_path, transform):
@@ -258,7 +426,14 @@ def transformed_at_temp_path(inp_path, transform):
 
 
 class ODTPackage(object):
-    def __init__(self, path_or_zipfile):
+    ''' An ODT package being written.
+
+    Entries are written chunk by chunk. Already compressed media, e.g.
+    JPEG or PNG images, are stored; everything else is compressed with
+    `compression`.
+    '''
+
+    def __init__(self, path_or_zipfile, compression=ZIP_DEFLATED):
         self.files = []
 
         if isinstance(path_or_zipfile, basestring):
@@ -267,19 +442,84 @@ class ODTPackage(object):
         else:
             zipfile = path_or_zipfile
         self.zf = zipfile
+        self.compression = compression
+
+    def compress_type_for(self, path, media_type):
+        return compress_type_for(path, media_type, self.compression)
 
     def insert_path(self, src_path, path, media_type):
         with io.open(src_path, 'rb') as f:
             self.insert_stream(f, path, media_type)
 
     def insert_stream(self, f, path, media_type):
-        if isinstance(path, unicode):
-            path_bytes = path.encode('utf-8')
-            path_unicode = path
-        else:
-            path_bytes = path
-            path_unicode = unicode(path)
-        self.zf.writestr(path_bytes, f.read())
+        path_bytes, path_unicode = _package_path(path)
+        compress_type = self.compress_type_for(path_unicode, media_type)
+        write_stream(self.zf, f, path_bytes, compress_type)
+        self.files.append(dict(full_path=path_unicode, media_type=media_type))
+
+    def insert_streams(self, streams, workers=1):
+        ''' Insert streams given as ``(item, path, media_type)``, where
+        ``item.open()`` opens the stream to be inserted.
+
+        With `workers` more than one, the streams to be compressed are read
+        and deflated by that many threads beforehand, at most two for each
+        of them ahead of the one being written; the items are opened one at
+        a time, and the entries are written in the given order.
+        '''
+        if workers <= 1:
+            for item, path, media_type in streams:
+                with closing(item.open()) as f:
+                    self.insert_stream(f, path, media_type)
+            return
+
+        lock = threading.Lock()
+
+        def deflate(stream):
+            item, path, media_type = stream
+            if self.compress_type_for(path, media_type) != ZIP_DEFLATED:
+                return
+            with lock:
+                f = item.open()
+            with closing(f):
+                return DeflatedStream(f)
+
+        def insert(stream, result):
+            item, path, media_type = stream
+            deflated = result.get()
+            if deflated is None:
+                with lock:
+                    f = item.open()
+                with closing(f):
+                    self.insert_stream(f, path, media_type)
+            else:
+                path_bytes, path_unicode = _package_path(path)
+                with closing(deflated):
+                    deflated.write_into(self.zf, path_bytes)
+                self.files.append(dict(full_path=path_unicode,
+                                       media_type=media_type))
+
+        pool = ThreadPool(workers)
+        # streams being deflated, in the order to be written
+        pending = deque()
+        try:
+            for stream in streams:
+                pending.append((stream, pool.apply_async(deflate, (stream,))))
+                if len(pending) >= 2 * workers:
+                    insert(*pending.popleft())
+            while pending:
+                insert(*pending.popleft())
+        finally:
+            pool.terminate()
+            pool.join()
+
+    @contextmanager
+    def open_stream(self, path, media_type):
+        ''' Open an entry to be written into. '''
+        path_bytes, path_unicode = _package_path(path)
+        compress_type = self.compress_type_for(path_unicode, media_type)
+        with closing(ZipEntryWriter(self.zf, path_bytes,
+                                    compress_type)) as f:
+            yield f
         self.files.append(dict(full_path=path_unicode, media_type=media_type))
 
     def close(self):
@@ -287,12 +527,21 @@ class ODTPackage(object):
         manifest = BytesIO()
         manifest_xml(manifest, self.files)
         manifest.seek(0)
-        self.zf.writestr('META-INF/manifest.xml', manifest.getvalue())
-        self.zf.writestr('mimetype', 'application/vnd.oasis.opendocument.text')
+        self.zf.writestr('META-INF/manifest.xml', manifest.getvalue(),
+                         self.compression)
+        self.zf.writestr('mimetype', 'application/vnd.oasis.opendocument.text',
+                         ZIP_STORED)
 
         self.zf.close()
 
 
+def _package_path(path):
+    if isinstance(path, unicode):
+        return path.encode('utf-8'), path
+    else:
+        return path, unicode(path)
+
+
 def manifest_xml(f, files):
     from xml.sax.saxutils import XMLGenerator
     xml = XMLGenerator(f, 'utf-8')
@@ -329,6 +578,13 @@ def manifest_xml(f, files):
     xml.endDocument()
 
 
+def insert_manifest_rdf(odtpkg):
+    rdf = BytesIO()
+    manifest_rdf(rdf)
+    rdf.seek(0)
+    odtpkg.insert_stream(rdf, 'manifest.rdf', 'application/rdf+xml')
+
+
 def manifest_rdf(f):
     f.write(b'''<?xml version="1.0" encoding="utf-8"?>
 <rdf:RDF
@@ -349,11 +605,14 @@ def main():
 
     from . import __version__ as version
     from .proc import rest_to_docopt
+    from .proc import cache_from_args
     from .proc import init_logger
     from .dataio import ParseError
     from .errors import InvalidHwp5FileError
     from .proc import init_with_environ
+    from .proc import selection_from_args
     from .utils import make_open_dest_file
+    from .utils import null_contextmanager_filter
     from .xmlmodel import Hwp5File
 
     doc = rest_to_docopt(__doc__)
@@ -363,27 +622,44 @@ def main():
 
     hwp5path = args['<hwp5file>']
 
-    odt_transform = ODTTransform()
+    validation = args['--validation']
+    if validation not in VALIDATION_POLICIES:
+        logger.error('--validation: %s', validation)
+        sys.exit(1)
+    selection = selection_from_args(args)
+    odt_transform = ODTTransform(validation=validation, selection=selection)
 
     open_dest = make_open_dest_file(args['--output'])
     if args['--document']:
         odt_transform.embedbin = not args['--no-embed-image']
         transform = odt_transform.transform_hwp5_to_single_document
+        kind = 'odt/document'
         open_dest = wrap_for_xml(open_dest)
     elif args['--styles']:
         odt_transform.embedbin = args['--embed-image']
         transform = odt_transform.transform_hwp5_to_styles
+        kind = 'odt/styles'
         open_dest = wrap_for_xml(open_dest)
     elif args['--content']:
         odt_transform.embedbin = args['--embed-image']
         transform = odt_transform.transform_hwp5_to_content
+        kind = 'odt/content'
         open_dest = wrap_for_xml(open_dest)
     else:
         odt_transform.embedbin = args['--embed-image']
         transform = odt_transform.transform_hwp5_to_package
+        transform = transform_into_odtpkg(transform)
+        kind = 'odt/package'
         dest_path = args['--output']
         dest_path = dest_path or replace_ext(hwp5path, '.odt')
-        open_dest = partial(open_odtpkg, dest_path)
+        open_dest = partial(null_contextmanager_filter, dest_path)
+
+    cache = cache_from_args(args)
+    if cache is not None:
+        transform = cache.cached(transform, kind,
+                                 embedbin=odt_transform.embedbin,
+                                 native=odt_transform.native,
+                                 selection=selection)
 
     try:
         with closing(Hwp5File(hwp5path)) as hwp5file:
@@ -394,6 +670,8 @@ def main():
     except InvalidHwp5FileError, e:
         logger.error('%s', e)
         sys.exit(1)
+    finally:
+        odt_transform.wait_validations()
 
 
 def replace_ext(path, ext):
@@ -409,6 +687,16 @@ def open_odtpkg(path):
         yield odtpkg
 
 
+def transform_into_odtpkg(transform):
+    ''' Make `transform(hwp5file, odtpkg)` transform into a package at a
+    path.
+    '''
+    def transform_into_path(hwp5file, path):
+        with open_odtpkg(path) as odtpkg:
+            transform(hwp5file, odtpkg)
+    return transform_into_path
+
+
 def wrap_for_xml(open_dest):
     from .utils import wrap_open_dest_for_tty
     from .utils import pager
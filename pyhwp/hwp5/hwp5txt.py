@@ -32,6 +32,14 @@ Options::
     --logfile=<file>    Set log file.
 
     --output=<file>     Output file
+
+    --sections=<range>  Convert only these sections: N, N-M or N-
+    --paragraphs=<range>
+                        Convert only these paragraphs: N, N-M or N-
+    --pages=<n>         Convert only about the first <n> pages
+
+    --cache-dir=<dir>   Cache conversions in <dir>
+    --cache-size=<size> Size limit of the cache, e.g. 512M
 '''
 from __future__ import absolute_import
 from __future__ import print_function
@@ -47,8 +55,10 @@ from docopt import docopt
 from . import __version__ as version
 from .dataio import ParseError
 from .errors import InvalidHwp5FileError
+from .proc import cache_from_args
 from .proc import init_logger
 from .proc import rest_to_docopt
+from .proc import selection_from_args
 from .utils import make_open_dest_file
 from .utils import cached_property
 from .transforms import BaseTransform
@@ -93,11 +103,16 @@ def main():
 
     hwp5path = args['<hwp5file>']
 
-    text_transform = TextTransform()
+    selection = selection_from_args(args)
+    text_transform = TextTransform(selection=selection)
 
     open_dest = make_open_dest_file(args['--output'])
     transform = text_transform.transform_hwp5_to_text
 
+    cache = cache_from_args(args)
+    if cache is not None:
+        transform = cache.cached(transform, 'text', selection=selection)
+
     try:
         with closing(Hwp5File(hwp5path)) as hwp5file:
             with open_dest() as dest:
@@ -0,0 +1,1396 @@
+# -*- coding: utf-8 -*-
+#
+#   pyhwp : hwp file format parser in python
+#   Copyright (C) 2010-2019 mete0r <mete0r@sarangbang.or.kr>
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+''' Native ODT writer
+
+Writes styles.xml, content.xml and single OpenDocument documents straight
+from the xml events of `hwp5.xmlmodel`, without serializing XHWP5 and
+running the XSL transforms of ``xsl/odt/``. The output is the same as the
+stylesheets', which remain the reference; each function below is named
+after the template it stands for.
+
+The body is written while the events are being read: every top-level
+paragraph is dropped as soon as its text and its automatic styles have been
+written out, so the memory usage does not grow with the document.
+'''
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from contextlib import closing
+from tempfile import SpooledTemporaryFile
+import logging
+
+from .treeop import STARTEVENT
+from .treeop import ENDEVENT
+from .xmlmodel import Selection
+from .xmlmodel import modelevents_to_xmlevents
+from .xsltcompat import XmlWriter
+from .xsltcompat import NAN
+from .xsltcompat import detach
+from .xsltcompat import iter_elements
+from .xsltcompat import keyed
+from .xsltcompat import nth
+from .xsltcompat import number
+from .xsltcompat import string
+from .xsltcompat import xround
+
+
+logger = logging.getLogger(__name__)
+
+
+ODF_NAMESPACES = (
+    ('office', 'urn:oasis:names:tc:opendocument:xmlns:office:1.0'),
+    ('style', 'urn:oasis:names:tc:opendocument:xmlns:style:1.0'),
+    ('text', 'urn:oasis:names:tc:opendocument:xmlns:text:1.0'),
+    ('table', 'urn:oasis:names:tc:opendocument:xmlns:table:1.0'),
+    ('draw', 'urn:oasis:names:tc:opendocument:xmlns:drawing:1.0'),
+    ('fo', 'urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0'),
+    ('xlink', 'http://www.w3.org/1999/xlink'),
+    ('dc', 'http://purl.org/dc/elements/1.1/'),
+    ('meta', 'urn:oasis:names:tc:opendocument:xmlns:meta:1.0'),
+    ('number', 'urn:oasis:names:tc:opendocument:xmlns:datastyle:1.0'),
+    ('svg', 'urn:oasis:names:tc:opendocument:xmlns:svg-compatible:1.0'),
+    ('chart', 'urn:oasis:names:tc:opendocument:xmlns:chart:1.0'),
+    ('dr3d', 'urn:oasis:names:tc:opendocument:xmlns:dr3d:1.0'),
+    ('math', 'http://www.w3.org/1998/Math/MathML'),
+    ('form', 'urn:oasis:names:tc:opendocument:xmlns:form:1.0'),
+    ('script', 'urn:oasis:names:tc:opendocument:xmlns:script:1.0'),
+    ('config', 'urn:oasis:names:tc:opendocument:xmlns:config:1.0'),
+    ('ooo', 'http://openoffice.org/2004/office'),
+    ('ooow', 'http://openoffice.org/2004/writer'),
+    ('oooc', 'http://openoffice.org/2004/calc'),
+    ('dom', 'http://www.w3.org/2001/xml-events'),
+    ('xforms', 'http://www.w3.org/2002/xforms'),
+    ('xsd', 'http://www.w3.org/2001/XMLSchema'),
+    ('xsi', 'http://www.w3.org/2001/XMLSchema-instance'),
+    ('rpt', 'http://openoffice.org/2005/report'),
+    ('of', 'urn:oasis:names:tc:opendocument:xmlns:of:1.2'),
+    ('xhtml', 'http://www.w3.org/1999/xhtml'),
+    ('grddl', 'http://www.w3.org/2003/g/data-view#'),
+    ('tableooo', 'http://openoffice.org/2009/table'),
+    ('field',
+     'urn:openoffice:names:experimental:ooo-ms-interop:xmlns:field:1.0'),
+    ('formx',
+     'urn:openoffice:names:experimental:ooxml-odf-interop:xmlns:form:1.0'),
+    ('css3t', 'http://www.w3.org/TR/css3-text/'),
+)
+
+ODF_ROOT_ATTRIBUTES = tuple(('xmlns:' + prefix, uri)
+                            for prefix, uri in ODF_NAMESPACES)
+GRDDL_TRANSFORMATION = 'http://docs.oasis-open.org/office/1.2/xslt/odf2rdf.xsl'
+
+# automatic styles are spooled in memory up to this size
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def write_styles(hwp5file, f, selection=None):
+    ''' Write styles.xml; what ``xsl/odt/styles.xsl`` does.
+
+    With a `hwp5.xmlmodel.Selection`, only the selected sections are read.
+    '''
+    docinfo = read_docinfo(hwp5file)
+    sectiondefs = list(read_sectiondefs(hwp5file, selection))
+    styles = ODTStyles(docinfo)
+
+    w = XmlWriter(f, indent=True)
+    w.declaration()
+    w.start('office:document-styles', ODF_ROOT_ATTRIBUTES + (
+        ('office:version', '1.2'),
+        ('grddl:transformation', GRDDL_TRANSFORMATION),
+    ))
+    styles.font_face_decls(w)
+    styles.office_styles(w)
+    w.start('office:automatic-styles')
+    for sectiondef in sectiondefs:
+        styles.page_layout(w, sectiondef)
+    w.end('office:automatic-styles')
+    styles.master_styles(w, sectiondefs)
+    w.end('office:document-styles')
+    w.flush()
+
+
+def write_content(hwp5file, f, embedbin=False, selection=None):
+    ''' Write content.xml; what ``xsl/odt/content.xsl`` does.
+
+    With a `hwp5.xmlmodel.Selection`, only that part of the body text is
+    read.
+    '''
+    with closing(ODTBodyWriter()) as body:
+        body.feed(hwp5file, embedbin, selection)
+
+        w = XmlWriter(f)
+        w.declaration()
+        w.start('office:document-content', ODF_ROOT_ATTRIBUTES + (
+            ('office:version', '1.2'),
+            ('grddl:transformation', GRDDL_TRANSFORMATION),
+        ))
+        w.empty('office:scripts')
+        w.empty('office:font-face-decls')
+        w.start('office:automatic-styles')
+        body.copy_automatic_styles(w)
+        w.end('office:automatic-styles')
+        body.copy_body(w)
+        w.end('office:document-content')
+        w.flush()
+
+
+def write_single_document(hwp5file, f, embedbin=False, selection=None):
+    ''' Write a single OpenDocument XML file (.fodt); what
+    ``xsl/odt/document.xsl`` does.
+    '''
+    with closing(ODTBodyWriter()) as body:
+        body.feed(hwp5file, embedbin, selection)
+
+        w = XmlWriter(f)
+        w.declaration()
+        w.start('office:document', ODF_ROOT_ATTRIBUTES + (
+            ('office:version', '1.2'),
+            ('office:mimetype', 'application/vnd.oasis.opendocument.text'),
+            ('grddl:transformation', GRDDL_TRANSFORMATION),
+        ))
+        w.empty('office:scripts')
+        body.font_face_decls(w)
+        body.office_styles(w)
+        w.start('office:automatic-styles')
+        for sectiondef in body.sectiondefs:
+            body.page_layout(w, sectiondef)
+        body.copy_automatic_styles(w)
+        w.end('office:automatic-styles')
+        body.master_styles(w, body.sectiondefs)
+        body.copy_body(w)
+        w.end('office:document')
+        w.flush()
+
+
+def read_docinfo(hwp5file, embedbin=False):
+    ''' Build the DocInfo element. '''
+    kwargs = dict()
+    if embedbin and 'BinData' in hwp5file:
+        kwargs['embedbin'] = hwp5file['BinData']
+    xmlevents = modelevents_to_xmlevents(hwp5file.docinfo.events(**kwargs))
+    for docinfo in iter_elements(xmlevents, _return_if_root):
+        return docinfo
+
+
+def read_sectiondefs(hwp5file, selection=None):
+    ''' Build the SectionDef elements with their PageDefs and such,
+    reading each section only up to its body.
+    '''
+    bodytext = hwp5file.text
+    if selection is None:
+        selection = Selection()
+    for idx in selection.section_indexes(bodytext):
+        modelevents = bodytext.section(idx).events(section_idx=idx)
+        with closing(modelevents):
+            xmlevents = modelevents_to_xmlevents(modelevents)
+            xmlevents = sectiondef_header(xmlevents)
+            for sectiondef in iter_elements(xmlevents, _return_if_root):
+                yield sectiondef
+
+
+def sectiondef_header(xmlevents):
+    ''' Stop the xml events of a section where its SectionDef gets the
+    first ColumnSet or Paragraph.
+    '''
+    depth = 0
+    for event, item in xmlevents:
+        if event is STARTEVENT:
+            if depth == 1 and item[0] in ('ColumnSet', 'Paragraph'):
+                yield ENDEVENT, 'SectionDef'
+                return
+            depth += 1
+        elif event is ENDEVENT:
+            depth -= 1
+        yield event, item
+
+
+def _return_if_root(element):
+    if element.parent is None:
+        return element
+
+
+def make_style_name(style):
+    ''' make-style-name: ``translate(@local-name, $prohibited, '_'...)`` '''
+    return style.get('local-name', '').translate(PROHIBITED_IN_NCNAME)
+
+
+PROHIBITED_IN_NCNAME = dict((ord(ch), '_')
+                            for ch in ' !"#$%&\'()*+,/:;<=>?@[\\]^`{|}~')
+
+
+def mm(value):
+    ''' ``round($value div 7200 * 25.4 * 100) div 100`` '''
+    return string(xround(value / 7200 * 25.4 * 100) / 100)
+
+
+def mm_(value):
+    ''' ``round($value div 7200 * 2.54 * 10 * 100) div 100`` '''
+    return string(xround(value / 7200 * 2.54 * 10 * 100) / 100)
+
+
+def cm(value):
+    ''' ``round($value div 7200 * 2.54 * 100) div 100`` '''
+    return string(xround(value / 7200 * 2.54 * 100) / 100)
+
+
+def set_attribute(attrs, name, value):
+    ''' xsl:attribute: replace the attribute if it has been set already. '''
+    for i, (n, v) in enumerate(attrs):
+        if n == name:
+            attrs[i] = name, value
+            return
+    attrs.append((name, value))
+
+
+class ODTStyles(object):
+    ''' Styles derived from the DocInfo tables. '''
+
+    def __init__(self, docinfo):
+        self.load_docinfo(docinfo)
+
+    def load_docinfo(self, docinfo):
+        idmappings = docinfo.find('IdMappings')
+        if idmappings is None:
+            idmappings = docinfo
+        self.styles = idmappings.findall('Style')
+        self.parashapes = idmappings.findall('ParaShape')
+        self.charshapes = idmappings.findall('CharShape')
+        self.facenames = idmappings.findall('FaceName')
+        self.borderfills = idmappings.findall('BorderFill')
+        self.bindata = idmappings.findall('BinData')
+
+    def font_face_decls(self, w):
+        w.start('office:font-face-decls')
+        w.tree(FONT_FACE_DECLS)
+        for facename in self.facenames:
+            self.font_face(w, facename)
+        w.end('office:font-face-decls')
+
+    def font_face(self, w, facename):
+        name = facename.get('name', '')
+        serif_styles = [number(panose1.get('serif-style'))
+                        for panose1 in facename.findall('Panose1')
+                        if 'serif-style' in panose1.attrib]
+        if any(v < 11 for v in serif_styles):
+            generic = 'roman'
+        elif any(v >= 11 for v in serif_styles):
+            generic = 'swiss'
+        else:
+            generic = ''
+        w.empty('style:font-face', [
+            ('style:name', name),
+            ('svg:font-family', "'" + name + "'"),
+            ('style:font-family-generic', generic),
+            ('style:font-pitch', 'variable'),
+        ])
+
+    def office_styles(self, w):
+        w.start('office:styles')
+        w.tree(OFFICE_STYLES)
+        for style in self.styles:
+            self.style_style(w, style)
+        w.end('office:styles')
+
+    def style_style(self, w, style):
+        next_style = nth(self.styles, number(style.get('next-style-id')) + 1)
+        w.start('style:style', [
+            ('style:name', make_style_name(style)),
+            ('style:next-style-name', make_style_name(next_style)
+             if next_style is not None else ''),
+            ('style:family', 'paragraph'),
+            ('style:class', 'text'),
+        ])
+        parashape = nth(self.parashapes, number(style.get('parashape-id')) + 1)
+        w.empty('style:paragraph-properties',
+                self.paragraph_properties_common(parashape)
+                if parashape is not None else [])
+        charshape = nth(self.charshapes, number(style.get('charshape-id')) + 1)
+        if charshape is not None:
+            w.empty('style:text-properties', self.text_properties(charshape))
+        w.end('style:style')
+
+    def page_layout(self, w, sectiondef):
+        section_id = number(sectiondef.get('section-id')) + 1
+        w.start('style:page-layout', [
+            ('style:name', 'PageLayout-' + string(section_id)),
+        ])
+        for pagedef in sectiondef.findall('PageDef'):
+            self.page_layout_properties(w, pagedef)
+        w.empty('style:header-style')
+        w.empty('style:footer-style')
+        w.end('style:page-layout')
+
+    def page_layout_properties(self, w, pagedef):
+        orientation = pagedef.get('orientation')
+        width = number(pagedef.get('width'))
+        height = number(pagedef.get('height'))
+        attrs = [('style:print-orientation', orientation or '')]
+        if orientation == 'portrait':
+            attrs.append(('fo:page-width', cm(width) + 'cm'))
+            attrs.append(('fo:page-height', cm(height) + 'cm'))
+        elif orientation == 'landscape':
+            attrs.append(('fo:page-width', cm(height) + 'cm'))
+            attrs.append(('fo:page-height', cm(width) + 'cm'))
+        for name, offset in (('fo:margin-top', 'top-offset'),
+                             ('fo:margin-left', 'left-offset'),
+                             ('fo:margin-right', 'right-offset'),
+                             ('fo:margin-bottom', 'bottom-offset')):
+            attrs.append((name, cm(number(pagedef.get(offset))) + 'cm'))
+        w.start('style:page-layout-properties', attrs)
+        w.tree(FOOTNOTE_SEP)
+        w.end('style:page-layout-properties')
+
+    def master_styles(self, w, sectiondefs):
+        w.start('office:master-styles')
+        for sectiondef in sectiondefs:
+            section_id = string(number(sectiondef.get('section-id')) + 1)
+            w.empty('style:master-page', [
+                ('style:name', 'MasterPage-' + section_id),
+                ('style:page-layout-name', 'PageLayout-' + section_id),
+            ])
+        w.end('office:master-styles')
+
+    def paragraph_properties_common(self, parashape):
+        ''' style-paragraph-properties-common '''
+        attrs = [('fo:text-align', TEXT_ALIGN.get(parashape.get('align'),
+                                                  'justify'))]
+        margin_left = number(parashape.get('doubled-margin-left'))
+        indent = number(parashape.get('indent'))
+        attrs.append(('fo:text-indent', string(indent / 200) + 'pt'))
+        if indent < 0:
+            attrs.append(('fo:margin-left',
+                          string((margin_left - indent) / 200) + 'pt'))
+        else:
+            attrs.append(('fo:margin-left', string(margin_left / 200) + 'pt'))
+        for name, attr in (('fo:margin-right', 'doubled-margin-right'),
+                           ('fo:margin-top', 'doubled-margin-top'),
+                           ('fo:margin-bottom', 'doubled-margin-bottom')):
+            value = number(parashape.get(attr))
+            attrs.append((name, string(value / 200) + 'pt'))
+
+        linespacing_type = parashape.get('linespacing-type')
+        linespacing = number(parashape.get('linespacing'))
+        if linespacing_type == 'ratio':
+            attrs.append(('fo:line-height', string(linespacing) + '%'))
+        elif linespacing_type == 'fixed':
+            attrs.append(('fo:line-height',
+                          string(linespacing / 200) + 'pt'))
+            attrs.append(('style:vertical-align', 'top'))
+        elif linespacing_type == 'spaceonly':
+            attrs.append(('style:line-spacing',
+                          string(linespacing / 200 / 2) + 'pt'))
+        return attrs
+
+    def text_properties(self, charshape):
+        attrs = []
+        fontfaces = charshape.findall('FontFace')
+        for attr, lang in (('style:font-name', 'en'),
+                           ('style:font-name-asian', 'ko')):
+            for fontface in fontfaces:
+                facename = keyed(self.facenames, number(fontface.get(lang)))
+                if facename is not None:
+                    set_attribute(attrs, attr, facename.get('name', ''))
+
+        basesize = number(charshape.get('basesize'))
+        for attr, lang in (('fo:font-size', 'en'),
+                           ('style:font-size-asian', 'ko'),
+                           ('style:font-size-complex', 'other')):
+            relsize = number(charshape.findattr('RelativeSize', lang))
+            attrs.append((attr, string(basesize * relsize / 100 / 100) + 'pt'))
+
+        if number(charshape.get('italic')) == 1:
+            attrs.append(('fo:font-style', 'italic'))
+            attrs.append(('style:font-style-asian', 'italic'))
+            attrs.append(('style:font-style-complex', 'italic'))
+
+        underline = charshape.get('underline')
+        underline_style = charshape.get('underline-style')
+        for line in ('underline', 'overline', 'line-through'):
+            prefix = 'style:text-' + line
+            if underline == line.replace('-', '_'):
+                attrs.append((prefix + '-type',
+                              XXXLINE_TYPE.get(underline_style, '')))
+                attrs.append((prefix + '-style',
+                              XXXLINE_STYLE.get(underline_style, '')))
+                attrs.append((prefix + '-width', 'auto'))
+                attrs.append((prefix + '-color',
+                              charshape.get('underline-color', '')))
+            else:
+                attrs.append((prefix + '-type', 'none'))
+
+        if number(charshape.get('bold')) == 1:
+            attrs.append(('fo:font-weight', 'bold'))
+            attrs.append(('style:font-weight-asian', 'bold'))
+            attrs.append(('style:font-weight-complex', 'bold'))
+        return attrs
+
+
+class ODTBodyWriter(ODTStyles):
+    ''' Write the body and its automatic styles while reading the events.
+
+    The automatic styles go into four groups, paragraph and text styles,
+    table styles, table-cell styles and graphic styles, each listed in
+    document order; they are spooled until the document has been read.
+    '''
+
+    def __init__(self):
+        self.spools = []
+        self.paragraph_styles = self.spooled_writer()
+        self.table_styles = self.spooled_writer()
+        self.table_cell_styles = self.spooled_writer()
+        self.shape_styles = self.spooled_writer()
+        self.body = self.spooled_writer()
+        self.sectiondefs = []
+
+    def spooled_writer(self):
+        spool = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self.spools.append(spool)
+        return XmlWriter(spool)
+
+    def close(self):
+        for spool in self.spools:
+            spool.close()
+
+    def feed(self, hwp5file, embedbin=False, selection=None):
+        modelevents = hwp5file.events(embedbin=embedbin,
+                                      selection=selection)
+        xmlevents = modelevents_to_xmlevents(modelevents)
+
+        w = self.body
+        w.start('office:body')
+        w.start('office:text')
+        w.tree(SEQUENCE_DECLS)
+        for _ in iter_elements(xmlevents, self.on_end):
+            pass
+        w.end('office:text')
+        w.end('office:body')
+
+        for writer in (self.paragraph_styles, self.table_styles,
+                       self.table_cell_styles, self.shape_styles, self.body):
+            writer.flush()
+
+    def on_end(self, element):
+        parent = element.parent
+        if parent is None:
+            return
+        tag = element.tag
+        if tag == 'DocInfo':
+            self.load_docinfo(element)
+        elif tag == 'HwpSummaryInfo':
+            detach(element)
+        elif tag == 'SectionDef':
+            if parent.tag == 'BodyText':
+                self.sectiondefs.append(element)
+            detach(element)
+        elif parent.tag == 'SectionDef':
+            if tag == 'ColumnSet':
+                detach(element)
+            else:
+                # PageDef and such: written as nothing, but kept for the
+                # page layouts
+                self.unit(element)
+        elif (parent.tag == 'ColumnSet' and parent.parent is not None and
+              parent.parent.tag == 'SectionDef'):
+            self.unit(element)
+            detach(element)
+
+    def unit(self, element):
+        ''' Write a top-level element of a section, with its ancestors
+        still in place.
+        '''
+        for e in element.iter():
+            tag = e.tag
+            if tag == 'Paragraph':
+                self.style_style_for_paragraph_and_text(
+                    self.paragraph_styles, e)
+            elif tag == 'TableControl':
+                self.table_style(self.table_styles, e)
+                self.style_style_for_table_cells(self.table_cell_styles, e)
+            elif tag == 'ShapeComponent':
+                self.shape_style(self.shape_styles, e)
+        self.apply_templates(self.body, element)
+
+    def copy_automatic_styles(self, w):
+        for writer in (self.paragraph_styles, self.table_styles,
+                       self.table_cell_styles, self.shape_styles):
+            w.copy(writer.f)
+
+    def copy_body(self, w):
+        w.copy(self.body.f)
+
+    #
+    # automatic styles
+    #
+
+    def paragraph_style_of(self, paragraph):
+        return keyed(self.styles, number(paragraph.get('style-id')))
+
+    def style_style_for_paragraph_and_text(self, w, paragraph):
+        style = self.paragraph_style_of(paragraph)
+        self.paragraph_style(w, paragraph, style)
+
+        paragraph_id = string(number(paragraph.get('paragraph-id')) + 1)
+        style_charshape_id = (number(style.get('charshape-id')) + 1
+                              if style is not None else NAN)
+        linesegs = paragraph.findall('LineSeg')
+        for lineseg_pos, lineseg in enumerate(linesegs, 1):
+            texts = lineseg.findall('Text')
+            for text_pos, text in enumerate(texts, 1):
+                charshape_id = number(text.get('charshape-id')) + 1
+                if style_charshape_id != charshape_id:
+                    w.start('style:style', [
+                        ('style:family', 'text'),
+                        ('style:name', 'p%s-%d-%d' % (paragraph_id,
+                                                      lineseg_pos,
+                                                      text_pos)),
+                    ])
+                    charshape = keyed(self.charshapes, charshape_id - 1)
+                    if charshape is not None:
+                        w.empty('style:text-properties',
+                                self.text_properties(charshape))
+                    w.end('style:style')
+
+    def paragraph_style(self, w, paragraph, style):
+        style_parashape_id = (number(style.get('parashape-id')) + 1
+                              if style is not None else NAN)
+        parashape_id = number(paragraph.get('parashape-id')) + 1
+        new_page = paragraph.get('new-page') == '1'
+        if not (style_parashape_id != parashape_id or new_page):
+            return
+
+        paragraph_id = number(paragraph.get('paragraph-id')) + 1
+        attrs = [
+            ('style:family', 'paragraph'),
+            ('style:class', 'text'),
+            ('style:name', 'Paragraph-' + string(paragraph_id)),
+        ]
+        if style is not None:
+            attrs.append(('style:parent-style-name', make_style_name(style)))
+        if paragraph.get('new-section') == '1':
+            sectiondef = paragraph.parent and paragraph.parent.parent
+            if sectiondef is not None and sectiondef.tag == 'SectionDef':
+                section_id = number(sectiondef.get('section-id')) + 1
+                attrs.append(('style:master-page-name',
+                              'MasterPage-' + string(section_id)))
+        w.start('style:style', attrs)
+
+        parashape = keyed(self.parashapes, parashape_id - 1)
+        props = (self.paragraph_properties_common(parashape)
+                 if parashape is not None else [])
+        if new_page:
+            props.append(('fo:break-before', 'page'))
+        w.empty('style:paragraph-properties', props)
+        w.end('style:style')
+
+    def table_style(self, w, tablecontrol):
+        table_id = number(tablecontrol.get('table-id')) + 1
+        w.start('style:style', [
+            ('style:name', 'Table-' + string(table_id)),
+            ('style:family', 'table'),
+        ])
+        attrs = []
+        if tablecontrol.get('width-relto') == 'absolute':
+            attrs.append(('style:width',
+                          mm_(number(tablecontrol.get('width'))) + 'mm'))
+            attrs.append(('table:align', 'margins'))
+            attrs.append(('fo:margin-left',
+                          mm_(number(tablecontrol.get('margin-left'))) +
+                          'mm'))
+            attrs.append(('fo:margin-right',
+                          mm_(number(tablecontrol.get('margin-right'))) +
+                          'mm'))
+        attrs.append(('fo:margin-top',
+                      mm_(number(tablecontrol.get('margin-top'))) + 'mm'))
+        attrs.append(('fo:margin-bottom',
+                      mm_(number(tablecontrol.get('margin-bottom'))) + 'mm'))
+        if any(number(tablebody.get('cellspacing')) == 0
+               for tablebody in tablecontrol.findall('TableBody')):
+            attrs.append(('table:border-model', 'collapsing'))
+        else:
+            attrs.append(('table:border-model', 'separating'))
+        w.empty('style:table-properties', attrs)
+        w.end('style:style')
+
+    def style_style_for_table_cells(self, w, tablecontrol):
+        table_id = string(number(tablecontrol.get('table-id')) + 1)
+        for rowidx, tablerow in enumerate(table_rows(tablecontrol), 1):
+            tablecells = tablerow.findall('TableCell')
+            for colidx, tablecell in enumerate(tablecells, 1):
+                w.start('style:style', [
+                    ('style:name', 'Table-%s-%d-%d' % (table_id, rowidx,
+                                                       colidx)),
+                    ('style:family', 'table-cell'),
+                ])
+                w.empty('style:table-cell-properties',
+                        self.table_cell_properties(tablecell))
+                w.end('style:style')
+
+    def table_cell_properties(self, tablecell):
+        attrs = []
+        for side in ('left', 'right', 'top', 'bottom'):
+            padding = number(tablecell.get('padding-' + side))
+            attrs.append(('fo:padding-' + side, mm_(padding) + 'mm'))
+        borderfill = nth(self.borderfills,
+                         number(tablecell.get('borderfill-id')))
+        if borderfill is not None:
+            for side in ('left', 'right', 'top', 'bottom'):
+                for border in borderfill.findall('Border'):
+                    if border.get('attribute-name') == side:
+                        set_attribute(attrs, 'fo:border-' + side, ' '.join([
+                            border.get('width', ''),
+                            border.get('stroke-type', ''),
+                            border.get('color', ''),
+                        ]))
+            for fillcolorpattern in borderfill.findall('FillColorPattern'):
+                set_attribute(attrs, 'fo:background-color',
+                              fillcolorpattern.get('background-color', ''))
+        return attrs
+
+    def shape_style(self, w, shapecomponent):
+        shape_id = number(shapecomponent.get('shape-id')) + 1
+        w.start('style:style', [
+            ('style:name', 'Shape-' + string(shape_id)),
+            ('style:family', 'graphic'),
+        ])
+        attrs = []
+        parent = shapecomponent.parent
+        if parent.tag == 'GShapeObjectControl':
+            self.gso_graphic_properties(attrs, parent)
+
+        # draw-fill
+        if number(shapecomponent.get('fill-colorpattern')) == 1:
+            attrs.append(('draw:fill', 'solid'))
+            fill_color = shapecomponent.findattr('FillColorPattern',
+                                                 'background-color')
+            attrs.append(('draw:fill-color', fill_color or ''))
+        else:
+            attrs.append(('draw:fill', 'none'))
+
+        # draw-stroke
+        for borderline in shapecomponent.findall('BorderLine'):
+            set_attribute(attrs, 'draw:stroke',
+                          DRAW_STROKE.get(borderline.get('stroke'), 'solid'))
+            set_attribute(attrs, 'svg:stroke-color',
+                          borderline.get('color', ''))
+            set_attribute(attrs, 'svg:stroke-width',
+                          mm(number(borderline.get('width'))) + 'mm')
+
+        w.empty('style:graphic-properties', attrs)
+        w.end('style:style')
+
+    def gso_graphic_properties(self, attrs, gso):
+        for side in ('left', 'right', 'top', 'bottom'):
+            margin = number(gso.get('margin-' + side))
+            attrs.append(('fo:margin-' + side, mm(margin) + 'mm'))
+        if number(gso.get('inline')) == 0:
+            flow = gso.get('flow')
+            if flow == 'float':
+                wrap = WRAP_FLOAT.get(gso.get('text-side'))
+            else:
+                wrap = WRAP.get(flow)
+            if wrap is not None:
+                attrs.append(('style:wrap', wrap))
+            attrs.append(('style:vertical-rel',
+                          VERTICAL_REL.get(gso.get('vrelto'), 'paragraph')))
+            attrs.append(('style:horizontal-rel',
+                          HORIZONTAL_REL.get(gso.get('hrelto'),
+                                             'paragraph')))
+            halign = gso.get('halign')
+            if halign == 'center' and number(gso.get('x')) != 0:
+                horizontal_pos = 'from-left'
+            else:
+                horizontal_pos = HORIZONTAL_POS.get(halign, '')
+            attrs.append(('style:horizontal-pos', horizontal_pos))
+            attrs.append(('style:vertical-pos',
+                          VERTICAL_POS.get(gso.get('valign'), 'top')))
+        else:
+            attrs.append(('style:vertical-rel', 'baseline'))
+            attrs.append(('style:vertical-pos', 'top'))
+
+    #
+    # body
+    #
+
+    def apply_templates(self, w, element):
+        template = BODY_TEMPLATES.get(element.tag)
+        if template is not None:
+            template(self, w, element)
+        else:
+            # the built-in template
+            w.text(element.text)
+            for child in element.children:
+                self.apply_templates(w, child)
+
+    def paragraph(self, w, paragraph):
+        style = nth(self.styles, number(paragraph.get('style-id')) + 1)
+        if style is not None:
+            style_parashape_id = number(style.get('parashape-id')) + 1
+            style_charshape_id = number(style.get('charshape-id')) + 1
+        else:
+            style_parashape_id = style_charshape_id = NAN
+        parashape_id = number(paragraph.get('parashape-id')) + 1
+        paragraph_id = string(number(paragraph.get('paragraph-id')) + 1)
+        if (style_parashape_id != parashape_id or
+                paragraph.get('new-page') == '1'):
+            style_name = 'Paragraph-' + paragraph_id
+        else:
+            style_name = make_style_name(style)
+
+        linesegs = paragraph.findall('LineSeg')
+        w.start('text:p', [('text:style-name', style_name)])
+        for lineseg_pos, lineseg in enumerate(linesegs, 1):
+            pos = 0
+            for child in lineseg.children:
+                tag = child.tag
+                if tag == 'Text':
+                    pos += 1
+                    charshape_id = number(child.get('charshape-id')) + 1
+                    if style_charshape_id != charshape_id:
+                        w.start('text:span', [
+                            ('text:style-name', 'p%s-%d-%d' % (paragraph_id,
+                                                               lineseg_pos,
+                                                               pos)),
+                        ])
+                    else:
+                        w.start('text:span')
+                    w.text(child.text)
+                    w.end('text:span')
+                elif tag in ('GShapeObjectControl', 'FootNote', 'EndNote'):
+                    pos += 1
+                    self.apply_templates(w, child)
+                elif tag == 'ControlChar':
+                    pos += 1
+        w.end('text:p')
+
+        for lineseg in linesegs:
+            for tablecontrol in lineseg.findall('TableControl'):
+                self.table(w, tablecontrol)
+
+    def table(self, w, tablecontrol):
+        table_id = string(number(tablecontrol.get('table-id')) + 1)
+        w.start('table:table', [('table:style-name', 'Table-' + table_id)])
+        cols = tablecontrol.findattr('TableBody', 'cols')
+        w.empty('table:table-column', [
+            ('table:number-columns-repeated', cols or ''),
+        ])
+        for rownum, tablerow in enumerate(table_rows(tablecontrol), 1):
+            w.start('table:table-row')
+            tablecells = tablerow.findall('TableCell')
+            for colnum, tablecell in enumerate(tablecells, 1):
+                w.start('table:table-cell', [
+                    ('table:style-name', 'Table-%s-%d-%d' % (table_id,
+                                                             rownum,
+                                                             colnum)),
+                    ('table:number-columns-spanned',
+                     tablecell.get('colspan', '')),
+                    ('table:number-rows-spanned',
+                     tablecell.get('rowspan', '')),
+                ])
+                for child in tablecell.children:
+                    self.apply_templates(w, child)
+                w.end('table:table-cell')
+            w.end('table:table-row')
+        w.end('table:table')
+
+    def gshapeobjectcontrol(self, w, gso):
+        x = number(gso.get('x'))
+        y = number(gso.get('y'))
+        for shapecomponent in gso.findall('ShapeComponent'):
+            self.shapecomponent(w, shapecomponent, x, y)
+
+    def shapecomponent(self, w, shapecomponent, x=NAN, y=NAN):
+        chid = shapecomponent.get('chid')
+        if chid == '$con':
+            self.shape_container(w, shapecomponent, x, y)
+        elif chid == '$pic':
+            self.shape_picture(w, shapecomponent, x, y)
+        elif chid == '$rec':
+            self.shape_rectangle(w, shapecomponent, x, y)
+        elif chid == '$lin':
+            self.shape_line(w, shapecomponent, x, y)
+        else:
+            w.text(shapecomponent.text)
+            for child in shapecomponent.children:
+                self.apply_templates(w, child)
+
+    def text_anchor_type(self, attrs, parent):
+        if parent.tag == 'GShapeObjectControl':
+            if number(parent.get('inline')) == 1:
+                attrs.append(('text:anchor-type', 'as-char'))
+            else:
+                attrs.append(('text:anchor-type', 'paragraph'))
+
+    def shape_container(self, w, shapecomponent, x, y):
+        shape_id = number(shapecomponent.get('shape-id')) + 1
+        attrs = [('draw:style-name', 'Shape-' + string(shape_id))]
+        self.text_anchor_type(attrs, shapecomponent.parent)
+        w.start('draw:g', attrs)
+        for child in shapecomponent.findall('ShapeComponent'):
+            self.shapecomponent(w, child, x, y)
+        w.end('draw:g')
+
+    def shape_picture(self, w, shapecomponent, x, y):
+        shape_id = number(shapecomponent.get('shape-id')) + 1
+        attrs = [('draw:style-name', 'Shape-' + string(shape_id))]
+
+        # draw-image-frame-attributes
+        parent = shapecomponent.parent
+        if parent.tag == 'ShapeComponent' and parent.get('chid') == '$con':
+            width = number(shapecomponent.get('initial-width'))
+            height = number(shapecomponent.get('initial-height'))
+            attrs.append(('svg:width', mm_(width) + 'mm'))
+            attrs.append(('svg:height', mm_(height) + 'mm'))
+        elif parent.tag == 'GShapeObjectControl':
+            if number(parent.get('inline')) == 0:
+                attrs.append(('svg:x',
+                              string(number(parent.get('x')) / 100) + 'pt'))
+                attrs.append(('svg:y',
+                              string(number(parent.get('y')) / 100) + 'pt'))
+            attrs.append(('draw:z-index', parent.get('z-order', '')))
+            if parent.get('width-relto') == 'absolute':
+                width = number(parent.findattr('ShapeComponent',
+                                               'initial-width'))
+                attrs.append(('svg:width', mm_(width) + 'mm'))
+            if parent.get('height-relto') == 'absolute':
+                height = number(parent.findattr('ShapeComponent',
+                                                'initial-height'))
+                attrs.append(('svg:height', mm_(height) + 'mm'))
+            self.text_anchor_type(attrs, parent)
+
+        attrs.append(('draw:transform',
+                      self.draw_transform(shapecomponent, x, y)))
+        w.start('draw:frame', attrs)
+
+        for shapepicture in shapecomponent.findall('ShapePicture'):
+            bindata_id = shapepicture.findattr('PictureInfo', 'bindata-id')
+            bindata = nth(self.bindata, number(bindata_id))
+            image_attrs = []
+            binary_data = []
+            if bindata is not None and bindata.get('storage') == 'embedding':
+                for embedding in bindata.findall('BinDataEmbedding'):
+                    if embedding.get('inline') == 'true':
+                        binary_data.append(embedding.text)
+                    else:
+                        href = 'bindata/%s.%s' % (
+                            embedding.get('storage-id', ''),
+                            embedding.get('ext', ''),
+                        )
+                        for name, value in (('xlink:actuate', 'onLoad'),
+                                            ('xlink:show', 'embed'),
+                                            ('xlink:type', 'simple'),
+                                            ('xlink:href', href)):
+                            set_attribute(image_attrs, name, value)
+            w.start('draw:image', image_attrs)
+            for text in binary_data:
+                w.start('office:binary-data')
+                w.text(text)
+                w.end('office:binary-data')
+            w.end('draw:image')
+        w.end('draw:frame')
+
+    def draw_transform(self, shapecomponent, x, y):
+        transform = [
+            ' translate (',
+            string(-xround(x / 7200 * 25.4 * 100) / 100), 'mm ',
+            string(-xround(y / 7200 * 25.4 * 100) / 100), 'mm)',
+        ]
+        matrices = []
+        for array in shapecomponent.findall('Array'):
+            for srmatrix in array.findall('ScaleRotationMatrix'):
+                for name in ('scaler', 'rotator'):
+                    matrices.extend(matrix
+                                    for matrix in srmatrix.findall('Matrix')
+                                    if matrix.get('attribute-name') == name)
+        matrices.extend(matrix
+                        for matrix in shapecomponent.findall('Matrix')
+                        if matrix.get('attribute-name') == 'translation')
+        for matrix in matrices:
+            transform.extend([
+                ' matrix (',
+                matrix.get('a', ''), ' ',
+                matrix.get('b', ''), ' ',
+                matrix.get('c', ''), ' ',
+                matrix.get('d', ''), ' ',
+                mm(number(matrix.get('e'))), 'mm ',
+                mm(number(matrix.get('f'))), 'mm)',
+            ])
+        transform.extend([
+            ' translate (',
+            mm(x), 'mm ',
+            mm(y), 'mm)',
+        ])
+        return ''.join(transform)
+
+    def shape_rectangle(self, w, shapecomponent, x, y):
+        shape_id = number(shapecomponent.get('shape-id')) + 1
+        width = (coord_attr(shapecomponent, 2, 'x') -
+                 coord_attr(shapecomponent, 1, 'x'))
+        height = (coord_attr(shapecomponent, 3, 'y') -
+                  coord_attr(shapecomponent, 2, 'y'))
+        attrs = [
+            ('draw:style-name', 'Shape-' + string(shape_id)),
+            ('svg:x', mm(x) + 'mm'),
+            ('svg:y', mm(y) + 'mm'),
+            ('svg:width', mm(width) + 'mm'),
+            ('svg:height', mm(height) + 'mm'),
+        ]
+        self.text_anchor_type(attrs, shapecomponent.parent)
+        attrs.append(('draw:transform',
+                      self.draw_transform(shapecomponent, x, y)))
+        w.start('draw:rect', attrs)
+        for textbox in shapecomponent.findall('TextboxParagraphList'):
+            for child in textbox.children:
+                self.apply_templates(w, child)
+        w.end('draw:rect')
+
+    def shape_line(self, w, shapecomponent, x, y):
+        shape_id = number(shapecomponent.get('shape-id')) + 1
+        rotation_center = [coord for coord in shapecomponent.findall('Coord')
+                           if coord.get('attribute-name') == 'rotation_center']
+        cx = first_number(rotation_center, 'x')
+        cy = first_number(rotation_center, 'y')
+        attrs = [
+            ('svg:x1', mm(x) + 'mm'),
+            ('svg:y1', mm(y) + 'mm'),
+            ('svg:x2', mm(x + 2 * cx) + 'mm'),
+            ('svg:y2', mm(y + 2 * cy) + 'mm'),
+            ('draw:style-name', 'Shape-' + string(shape_id)),
+        ]
+        self.text_anchor_type(attrs, shapecomponent.parent)
+        w.empty('draw:line', attrs)
+
+    def note(self, w, note):
+        note_number = note.get('number', '')
+        w.start('text:note', [
+            ('text:id', note.tag + '-' + note_number),
+            ('text:note-class', NOTE_CLASS[note.tag]),
+        ])
+        w.start('text:note-citation')
+        w.text(note_number)
+        w.end('text:note-citation')
+        w.start('text:note-body')
+        for listheader in note.findall('ListHeader'):
+            for paragraph in listheader.findall('Paragraph'):
+                self.paragraph(w, paragraph)
+        w.end('text:note-body')
+        w.end('text:note')
+
+    def nothing(self, w, element):
+        pass
+
+
+BODY_TEMPLATES = {
+    'Paragraph': ODTBodyWriter.paragraph.im_func,
+    'TableControl': ODTBodyWriter.table.im_func,
+    'GShapeObjectControl': ODTBodyWriter.gshapeobjectcontrol.im_func,
+    'ShapeComponent': ODTBodyWriter.shapecomponent.im_func,
+    'FootNote': ODTBodyWriter.note.im_func,
+    'EndNote': ODTBodyWriter.note.im_func,
+    'ControlChar': ODTBodyWriter.nothing.im_func,
+}
+
+
+def table_rows(tablecontrol):
+    ''' TableBody/TableRow '''
+    for tablebody in tablecontrol.findall('TableBody'):
+        for tablerow in tablebody.findall('TableRow'):
+            yield tablerow
+
+
+def first_number(elements, name):
+    ''' ``number($elements/@name)`` '''
+    for element in elements:
+        if name in element.attrib:
+            return number(element.attrib[name])
+    return NAN
+
+
+def coord_attr(shapecomponent, position, name):
+    ''' ``ShapeRectangle/Coord[position]/@name`` '''
+    for rectangle in shapecomponent.findall('ShapeRectangle'):
+        coords = rectangle.findall('Coord')
+        if len(coords) >= position and name in coords[position - 1].attrib:
+            return number(coords[position - 1].get(name))
+    return NAN
+
+
+TEXT_ALIGN = {
+    'both': 'justify',
+    'left': 'left',
+    'right': 'right',
+    'center': 'center',
+    'distribute': 'justify',
+    'distribute_space': 'justify',
+}
+
+XXXLINE_STYLE = {
+    'solid': 'solid',
+    'dashed': 'dash',
+    'dotted': 'dotted',
+    'dash_dot': 'dot-dash',
+    'dash_dot_dot': 'dot-dot-dash',
+    'long_dashed': 'long-dash',
+    'large_dotted': 'dotted',
+    'double': 'solid',
+    'lower_weighted': 'solid',
+    'upper_weighted': 'solid',
+    'middle_weighted': 'solid',
+}
+
+XXXLINE_TYPE = {
+    'solid': 'single',
+    'dashed': 'single',
+    'dotted': 'single',
+    'dash_dot': 'single',
+    'dash_dot_dot': 'single',
+    'long_dashed': 'single',
+    'large_dotted': 'single',
+    'double': 'double',
+    'lower_weighted': 'double',
+    'upper_weighted': 'double',
+    'middle_weighted': 'double',
+}
+
+WRAP_FLOAT = {
+    'both': 'parallel',
+    'left': 'left',
+    'right': 'right',
+    'larger': 'biggest',
+}
+
+WRAP = {
+    'block': 'none',
+    'back': 'run-through',
+    'front': 'run-through',
+}
+
+VERTICAL_REL = {
+    'page': 'page-content',
+    'paper': 'page',
+}
+
+HORIZONTAL_REL = {
+    'page': 'page-content',
+    'paper': 'page',
+    'column': 'page-content',
+}
+
+HORIZONTAL_POS = {
+    'left': 'from-left',
+    'inside': 'from-inside',
+    'center': 'center',
+    'outside': 'outside',
+    'right': 'right',
+}
+
+VERTICAL_POS = {
+    'top': 'from-top',
+    'middle': 'middle',
+    'bottom': 'bottom',
+}
+
+DRAW_STROKE = {
+    'none': 'none',
+    'solid': 'solid',
+    'dashed': 'dash',
+    'dotted': 'dash',
+}
+
+NOTE_CLASS = {
+    'FootNote': 'footnote',
+    'EndNote': 'endnote',
+}
+
+
+#
+# literal result elements of the stylesheets
+#
+
+FONT_FACE_DECLS = tuple(
+    ('style:font-face', (
+        ('style:name', name),
+        ('svg:font-family', family),
+        ('style:font-family-generic', generic),
+        ('style:font-pitch', 'variable'),
+    ), ())
+    for name, family, generic in (
+        ('serif', "'Times New Roman'", 'roman'),
+        ('sans-serif', "'Arial'", 'swiss'),
+        ('명조', "'은 바탕'", 'roman'),
+        ('고딕', "'은 돋움'", 'swiss'),
+        ('Lohit Hindi', "'Lohit Hindi'", 'system'),
+    )
+)
+
+OUTLINE_LEVEL_STYLES = tuple(
+    ('text:outline-level-style', (
+        ('text:level', '%d' % level),
+        ('style:num-format', ''),
+    ), (
+        ('style:list-level-properties', (
+            ('text:list-level-position-and-space-mode', 'label-alignment'),
+        ), (
+            ('style:list-level-label-alignment', (
+                ('text:label-followed-by', 'listtab'),
+                ('text:list-tab-stop-position', position + 'cm'),
+                ('fo:text-indent', '-' + position + 'cm'),
+                ('fo:margin-left', position + 'cm'),
+            ), ()),
+        )),
+    ))
+    for level, position in enumerate(('0.762', '1.016', '1.27', '1.524',
+                                      '1.778', '2.032', '2.286', '2.54',
+                                      '2.794', '3.048'), 1)
+)
+
+OFFICE_STYLES = (
+    ('style:default-style', (
+        ('style:family', 'graphic'),
+    ), (
+        ('style:graphic-properties', (
+            ('draw:shadow-offset-x', '0.3cm'),
+            ('draw:shadow-offset-y', '0.3cm'),
+            ('draw:start-line-spacing-horizontal', '0.283cm'),
+            ('draw:start-line-spacing-vertical', '0.283cm'),
+            ('draw:end-line-spacing-horizontal', '0.283cm'),
+            ('draw:end-line-spacing-vertical', '0.283cm'),
+            ('style:flow-with-text', 'false'),
+        ), ()),
+        ('style:paragraph-properties', (
+            ('style:text-autospace', 'ideograph-alpha'),
+            ('style:line-break', 'strict'),
+            ('style:writing-mode', 'lr-tb'),
+            ('style:font-independent-line-spacing', 'false'),
+        ), (
+            ('style:tab-stops', (), ()),
+        )),
+        ('style:text-properties', (
+            ('style:use-window-font-color', 'true'),
+            ('fo:font-size', '10pt'),
+            ('fo:language', 'en'),
+            ('fo:country', 'US'),
+            ('style:letter-kerning', 'true'),
+            ('style:font-size-asian', '10pt'),
+            ('style:language-asian', 'ko'),
+            ('style:country-asian', 'KR'),
+            ('style:font-size-complex', '10pt'),
+            ('style:language-complex', 'hi'),
+            ('style:country-complex', 'IN'),
+        ), ()),
+    )),
+    ('style:default-style', (
+        ('style:family', 'paragraph'),
+    ), (
+        ('style:paragraph-properties', (
+            ('fo:hyphenation-ladder-count', 'no-limit'),
+            ('style:text-autospace', 'ideograph-alpha'),
+            ('style:punctuation-wrap', 'hanging'),
+            ('style:line-break', 'strict'),
+            ('style:tab-stop-distance', '1.251cm'),
+            ('style:writing-mode', 'page'),
+        ), ()),
+        ('style:text-properties', (
+            ('style:use-window-font-color', 'true'),
+            ('style:font-name', 'sans-serif'),
+            ('fo:font-size', '10pt'),
+            ('fo:language', 'en'),
+            ('fo:country', 'US'),
+            ('style:letter-kerning', 'true'),
+            ('style:font-name-asian', '고딕'),
+            ('style:font-size-asian', '10pt'),
+            ('style:language-asian', 'ko'),
+            ('style:country-asian', 'KR'),
+            ('style:font-name-complex', 'Lohit Hindi'),
+            ('style:font-size-complex', '10pt'),
+            ('style:language-complex', 'hi'),
+            ('style:country-complex', 'IN'),
+            ('fo:hyphenate', 'false'),
+            ('fo:hyphenation-remain-char-count', '2'),
+            ('fo:hyphenation-push-char-count', '2'),
+        ), ()),
+    )),
+    ('style:default-style', (
+        ('style:family', 'table'),
+    ), (
+        ('style:table-properties', (
+            ('table:border-model', 'collapsing'),
+        ), ()),
+    )),
+    ('style:default-style', (
+        ('style:family', 'table-row'),
+    ), (
+        ('style:table-row-properties', (
+            ('fo:keep-together', 'auto'),
+        ), ()),
+    )),
+    ('style:style', (
+        ('style:name', 'Standard'),
+        ('style:family', 'paragraph'),
+        ('style:class', 'text'),
+    ), (
+        ('style:paragraph-properties', (
+            ('style:text-autospace', 'none'),
+        ), ()),
+    )),
+    ('style:style', (
+        ('style:name', 'Heading'),
+        ('style:family', 'paragraph'),
+        ('style:parent-style-name', 'Standard'),
+        ('style:next-style-name', 'Text_20_body'),
+        ('style:class', 'text'),
+    ), (
+        ('style:paragraph-properties', (
+            ('fo:margin-top', '0.423cm'),
+            ('fo:margin-bottom', '0.212cm'),
+            ('fo:keep-with-next', 'always'),
+        ), ()),
+        ('style:text-properties', (
+            ('style:font-name', 'sans-serif'),
+            ('fo:font-size', '14pt'),
+            ('style:font-name-asian', '고딕'),
+            ('style:font-size-asian', '14pt'),
+            ('style:font-name-complex', 'Lohit Hindi'),
+            ('style:font-size-complex', '14pt'),
+        ), ()),
+    )),
+    ('style:style', (
+        ('style:name', 'Text_20_body'),
+        ('style:display-name', 'Text body'),
+        ('style:family', 'paragraph'),
+        ('style:parent-style-name', 'Standard'),
+        ('style:class', 'text'),
+    ), (
+        ('style:paragraph-properties', (
+            ('fo:margin-top', '0cm'),
+            ('fo:margin-bottom', '0.212cm'),
+        ), ()),
+    )),
+    ('style:style', (
+        ('style:name', 'List'),
+        ('style:family', 'paragraph'),
+        ('style:parent-style-name', 'Text_20_body'),
+        ('style:class', 'list'),
+    ), (
+        ('style:text-properties', (), ()),
+    )),
+    ('style:style', (
+        ('style:name', 'Caption'),
+        ('style:family', 'paragraph'),
+        ('style:parent-style-name', 'Standard'),
+        ('style:class', 'extra'),
+    ), (
+        ('style:paragraph-properties', (
+            ('fo:margin-top', '0.212cm'),
+            ('fo:margin-bottom', '0.212cm'),
+            ('text:number-lines', 'false'),
+            ('text:line-number', '0'),
+        ), ()),
+        ('style:text-properties', (
+            ('fo:font-size', '12pt'),
+            ('fo:font-style', 'italic'),
+            ('style:font-size-asian', '12pt'),
+            ('style:font-style-asian', 'italic'),
+            ('style:font-size-complex', '12pt'),
+            ('style:font-style-complex', 'italic'),
+        ), ()),
+    )),
+    ('style:style', (
+        ('style:name', 'Index'),
+        ('style:family', 'paragraph'),
+        ('style:parent-style-name', 'Standard'),
+        ('style:class', 'index'),
+    ), (
+        ('style:paragraph-properties', (
+            ('text:number-lines', 'false'),
+            ('text:line-number', '0'),
+        ), ()),
+        ('style:text-properties', (), ()),
+    )),
+    ('style:style', (
+        ('style:name', 'Table_20_Contents'),
+        ('style:display-name', 'Table Contents'),
+        ('style:family', 'paragraph'),
+        ('style:parent-style-name', 'Standard'),
+        ('style:class', 'extra'),
+    ), (
+        ('style:paragraph-properties', (
+            ('text:number-lines', 'false'),
+            ('text:line-number', '0'),
+        ), ()),
+    )),
+    ('style:style', (
+        ('style:name', 'Graphics'),
+        ('style:family', 'graphic'),
+    ), (
+        ('style:graphic-properties', (
+            ('text:anchor-type', 'paragraph'),
+            ('svg:x', '0cm'),
+            ('svg:y', '0cm'),
+            ('style:wrap', 'dynamic'),
+            ('style:number-wrapped-paragraphs', 'no-limit'),
+            ('style:wrap-contour', 'false'),
+            ('style:vertical-pos', 'top'),
+            ('style:vertical-rel', 'paragraph'),
+            ('style:horizontal-pos', 'center'),
+            ('style:horizontal-rel', 'paragraph'),
+        ), ()),
+    )),
+    ('text:outline-style', (
+        ('style:name', 'Outline'),
+    ), OUTLINE_LEVEL_STYLES),
+    ('text:notes-configuration', (
+        ('text:note-class', 'footnote'),
+        ('style:num-format', '1'),
+        ('text:start-value', '0'),
+        ('text:footnotes-position', 'page'),
+        ('text:start-numbering-at', 'document'),
+    ), ()),
+    ('text:notes-configuration', (
+        ('text:note-class', 'endnote'),
+        ('style:num-format', 'i'),
+        ('text:start-value', '0'),
+    ), ()),
+    ('text:linenumbering-configuration', (
+        ('text:number-lines', 'false'),
+        ('text:offset', '0.499cm'),
+        ('style:num-format', '1'),
+        ('text:number-position', 'left'),
+        ('text:increment', '5'),
+    ), ()),
+)
+
+FOOTNOTE_SEP = (
+    ('style:footnote-sep', (
+        ('style:width', '0.018cm'),
+        ('style:distance-before-sep', '0.101cm'),
+        ('style:distance-after-sep', '0.101cm'),
+        ('style:adjustment', 'left'),
+        ('style:rel-width', '25%'),
+        ('style:color', '#000000'),
+    ), ()),
+)
+
+SEQUENCE_DECLS = (
+    ('text:sequence-decls', (), tuple(
+        ('text:sequence-decl', (
+            ('text:display-outline-level', '0'),
+            ('text:name', name),
+        ), ())
+        for name in ('Illustration', 'Table', 'Text', 'Drawing')
+    )),
+)
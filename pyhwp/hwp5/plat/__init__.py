@@ -24,9 +24,7 @@ from functools import partial
 from subprocess import CalledProcessError
 from subprocess import Popen
 import logging
-import os
 import subprocess
-import tempfile
 
 from . import _lxml
 from . import _uno
@@ -70,6 +68,21 @@ def get_xslt_compile():
                     return partial(xslt, xsl_path)
 
 
+def get_xml_parse(xslt_compile):
+    ''' A function which parses an input once, for the transforms compiled
+    with `xslt_compile` to share; None if they can't.
+    '''
+    modules = [
+        javax_transform,
+        _lxml,
+        xsltproc,
+        _uno
+    ]
+    for module in modules:
+        if getattr(module, 'xslt_compile', None) is xslt_compile:
+            return getattr(module, 'xml_parse', None)
+
+
 def get_relaxng():
     if _lxml.is_enabled():
         return _lxml.relaxng
@@ -115,41 +128,93 @@ def get_aes128ecb_decrypt():
     except Exception:
         pass
 
+    return get_aes128ecb_decrypt_builtin()
+
+
+def get_aes128ecb_decryptor():
+    ''' Get a factory of incremental AES-128-ECB decryptors.
+
+    The factory takes a key and returns an object with `update(data)` and
+    `finalize()`, so that a stream can be decrypted chunk by chunk.
+    '''
+    try:
+        return get_aes128ecb_decryptor_cryptography()
+    except Exception:
+        pass
+
     try:
-        return get_aes128ecb_decrypt_openssl()
+        return get_aes128ecb_decryptor_javax()
     except Exception:
         pass
 
-    raise NotImplementedError('aes128ecb_decrypt')
+    return get_aes128ecb_decryptor_builtin()
 
 
 def get_aes128ecb_decrypt_cryptography():
+    make_decryptor = get_aes128ecb_decryptor_cryptography()
+
+    def decrypt(key, ciphertext):
+        decryptor = make_decryptor(key)
+        return decryptor.update(ciphertext) + decryptor.finalize()
+
+    return decrypt
+
+
+def get_aes128ecb_decryptor_cryptography():
     from cryptography.hazmat.primitives.ciphers import Cipher
     from cryptography.hazmat.primitives.ciphers import algorithms
     from cryptography.hazmat.primitives.ciphers import modes
     from cryptography.hazmat.backends import default_backend
 
-    def decrypt(key, ciphertext):
+    def make_decryptor(key):
         backend = default_backend()
         cipher = Cipher(algorithms.AES(key), modes.ECB(), backend=backend)
-        decryptor = cipher.decryptor()
+        return cipher.decryptor()
+
+    return make_decryptor
+
+
+def get_aes128ecb_decrypt_javax():
+    make_decryptor = get_aes128ecb_decryptor_javax()
+
+    def decrypt(key, ciphertext):
+        decryptor = make_decryptor(key)
         return decryptor.update(ciphertext) + decryptor.finalize()
 
     return decrypt
 
 
-def get_aes128ecb_decrypt_javax():
+def get_aes128ecb_decryptor_javax():
     from javax.crypto import Cipher
     from javax.crypto.spec import SecretKeySpec
 
-    def decrypt(key, ciphertext):
-        secretkey = SecretKeySpec(key, 'AES')
-        cipher = Cipher.getInstance('AES/ECB/NoPadding')
-        cipher.init(Cipher.DECRYPT_MODE, secretkey)
-        decrypted = cipher.doFinal(ciphertext)
-        return decrypted.tostring()
+    class Decryptor(object):
 
-    return decrypt
+        def __init__(self, key):
+            secretkey = SecretKeySpec(key, 'AES')
+            self.cipher = Cipher.getInstance('AES/ECB/NoPadding')
+            self.cipher.init(Cipher.DECRYPT_MODE, secretkey)
+
+        def update(self, data):
+            decrypted = self.cipher.update(data)
+            if decrypted is None:
+                return b''
+            return decrypted.tostring()
+
+        def finalize(self):
+            return self.cipher.doFinal().tostring()
+
+    return Decryptor
+
+
+def get_aes128ecb_decrypt_builtin():
+    from ..aes import aes128ecb_decrypt
+    return aes128ecb_decrypt
+
+
+def get_aes128ecb_decryptor_builtin():
+    from ..aes import AES128ECBDecryptor
+    return AES128ECBDecryptor
 
 
 def get_aes128ecb_decrypt_openssl():
@@ -157,33 +222,20 @@ def get_aes128ecb_decrypt_openssl():
         raise NotImplementedError()
 
     def decrypt(key, ciphertext):
-        fd, name = tempfile.mkstemp()
-        fp = os.fdopen(fd, 'wb')
-        try:
-            fp.write(ciphertext)
-        finally:
-            fp.close()
-
         args = [
             'openssl',
             'enc',
             '-d',
-            '-in',
-            name,
             '-aes-128-ecb',
             '-K',
             b2a_hex(key),
             '-nopad',
         ]
-        try:
-            p = Popen(args, stdout=subprocess.PIPE)
-            try:
-                return p.stdout.read()
-            finally:
-                p.wait()
-                p.stdout.close()
-        finally:
-            os.unlink(name)
+        p = Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        decrypted, _ = p.communicate(ciphertext)
+        if p.returncode != 0:
+            raise CalledProcessError(p.returncode, args)
+        return decrypted
 
     return decrypt
 
@@ -58,6 +58,16 @@ def xslt_compile(xsl_path, **params):
     return xslt.transform_into_stream
 
 
+def xml_parse(input):
+    ''' Parse an input once for several transforms of `xslt_compile()`.
+
+    :param input: path or file
+    :returns: a parsed document
+    '''
+    from lxml import etree
+    return etree.parse(input)
+
+
 class XSLT:
 
     def __init__(self, xsl_path, **params):
@@ -86,13 +96,20 @@ class XSLT:
     def transform_into_stream(self, input, output):
         '''
         >>> T.transform_into_stream('input.xml', sys.stdout)
+
+        `input` may also be a document parsed by `xml_parse()`.
         '''
+        if not isinstance(input, basestring):
+            return self._transform_source(input, output)
         with io.open(input, 'rb') as inp_file:
             return self._transform(inp_file, output)
 
     def _transform(self, input, output):
         from lxml import etree
         source = etree.parse(input)
+        return self._transform_source(source, output)
+
+    def _transform_source(self, source, output):
         logger.info('_lxml.xslt(%s) start',
                     os.path.basename(self.xsl_path))
         result = self.etree_xslt(source, **self.params)
@@ -19,6 +19,7 @@
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
+import threading
 
 from ..errors import InvalidOleStorageError
 from ..utils import cached_property
@@ -75,10 +76,20 @@ def import_OleFileIO():
 
 
 class OleStorageItem(object):
+    ''' An item in an OLE2 file.
+
+    Items of an OleFileIO share a lock of their root storage: the OleFileIO
+    seeks and reads its file handle to open a stream, which is read into
+    memory as a whole.
+    '''
 
     def __init__(self, olefile, path, parent=None):
         self.olefile = olefile
         self.path = path  # path DOES NOT end with '/'
+        if parent is None:
+            self.lock = threading.Lock()
+        else:
+            self.lock = parent.lock
 
     def get_name(self):
         if self.path == '':
@@ -92,7 +103,8 @@ class OleStorageItem(object):
 class OleStream(OleStorageItem):
 
     def open(self):
-        return self.olefile.openstream(self.path)
+        with self.lock:
+            return self.olefile.openstream(self.path)
 
 
 class OleStorage(OleStorageItem):
@@ -40,6 +40,9 @@ import sys
 from docopt import docopt
 
 from .. import __version__
+from ..cache import ConversionCache
+from ..cache import DEFAULT_MAX_SIZE
+from ..cache import parse_size
 from ..dataio import ParseError
 from ..errors import InvalidHwp5FileError
 from ..plat import xsltproc
@@ -48,6 +51,7 @@ from ..storage import ExtraItemStorage
 from ..storage import open_storage_item
 from ..storage.ole import OleStorage
 from ..xmlmodel import Hwp5File
+from ..xmlmodel import Selection
 
 
 PY3 = sys.version_info.major == 3
@@ -103,6 +107,79 @@ def init_logger(args):
         logger.addHandler(logging.StreamHandler())
 
 
+def parse_range(value):
+    ''' Parse a range of the ``--sections``, ``--paragraphs`` options:
+    ``N``, ``N-M`` (inclusive) or ``N-``, into ``(start, stop)``.
+
+    >>> parse_range('0-1')
+    (0, 2)
+    '''
+    start, sep, end = value.partition('-')
+    start = int(start)
+    if not sep:
+        stop = start + 1
+    elif end:
+        stop = int(end) + 1
+    else:
+        stop = None
+    if start < 0 or (stop is not None and stop <= start):
+        raise ValueError(value)
+    return start, stop
+
+
+def selection_from_args(args):
+    ''' `Selection` from the ``--sections``, ``--paragraphs`` and
+    ``--pages`` options, or None if none of them is given.
+    '''
+    kwargs = dict()
+    for option in ('--sections', '--paragraphs'):
+        value = args.get(option)
+        if value is None:
+            continue
+        try:
+            kwargs[option[2:]] = parse_range(value)
+        except ValueError:
+            logger.error('%s: %s', option, value)
+            sys.exit(1)
+    pages = args.get('--pages')
+    if pages is not None:
+        try:
+            pages = int(pages)
+            if pages < 1:
+                raise ValueError(pages)
+        except ValueError:
+            logger.error('--pages: %s', pages)
+            sys.exit(1)
+        kwargs['pages'] = pages
+    if not kwargs:
+        return None
+    return Selection(**kwargs)
+
+
+def cache_from_args(args):
+    ''' `ConversionCache` from the ``--cache-dir`` and ``--cache-size``
+    options, or from ``PYHWP_CACHE_DIR`` and ``PYHWP_CACHE_SIZE``; None
+    without a cache directory.
+    '''
+    cache_dir = args.get('--cache-dir')
+    if not cache_dir:
+        cache_dir = os.environ.get('PYHWP_CACHE_DIR')
+    if not cache_dir:
+        return None
+    cache_size = args.get('--cache-size')
+    if not cache_size:
+        cache_size = os.environ.get('PYHWP_CACHE_SIZE')
+    if cache_size:
+        try:
+            max_size = parse_size(cache_size)
+        except ValueError:
+            logger.error('--cache-size: %s', cache_size)
+            sys.exit(1)
+    else:
+        max_size = DEFAULT_MAX_SIZE
+    return ConversionCache(cache_dir, max_size=max_size)
+
+
 subcommands = [
     'version',
     'header',
@@ -116,6 +193,8 @@ subcommands = [
     'xml',
     'rawunz',
     'diststream',
+    'export-sqlite',
+    'index',
 ]
 
 
@@ -178,7 +257,8 @@ def main():
         return 1
 
     argv = [command] + args['<args>']
-    mod = __import__('hwp5.proc.' + command, fromlist=['main'])
+    modname = 'hwp5.proc.' + command.replace('-', '_')
+    mod = __import__(modname, fromlist=['main'])
     main = mod.main
     doc = rest_to_docopt(mod.__doc__)
     args = docopt(doc, version=__version__, argv=argv)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+#   pyhwp : hwp file format parser in python
+#   Copyright (C) 2010-2019 mete0r <mete0r@sarangbang.or.kr>
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+''' Export records, models and paragraph texts into a SQLite database.
+
+Usage::
+
+    hwp5proc export-sqlite [--workers=<n>]
+                           [--loglevel=<loglevel>] [--logfile=<logfile>]
+                           <database> (--from-stdin | <hwp5files>...)
+    hwp5proc export-sqlite --help
+
+Options::
+
+    -h --help               Show this screen
+       --loglevel=<level>   Set log level.
+       --logfile=<file>     Set log file.
+
+       --from-stdin         Read the filenames from stdin
+       --workers=<n>        Parse the files in <n> processes [default: 1]
+
+    <database>              SQLite database, created if it does not exist
+    <hwp5files>...          HWPv5 files (*.hwp)
+
+Tables::
+
+    files(id, path, size, mtime, version)
+    streams(id, file_id, name)
+    records(stream_id, seqno, tagid, tagname, level, size, offset, model)
+    fields(stream_id, seqno, name, value)
+    paragraphs(stream_id, seqno, level, text)
+
+A file exported again replaces what has been exported of it.
+
+Example::
+
+    $ hwp5proc export-sqlite --workers=4 corpus.db samples/*.hwp
+    $ sqlite3 corpus.db "SELECT model, count(*) FROM records GROUP BY model"
+
+'''
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from contextlib import closing
+import sqlite3
+
+from ..sqliteexport import export_files
+from . import logger
+from .find import filenames_from_args
+
+
+def main(args):
+    try:
+        workers = int(args['--workers'])
+    except ValueError:
+        logger.error('--workers: %s', args['--workers'])
+        raise SystemExit(1)
+    filenames = filenames_from_args(args)
+    with closing(sqlite3.connect(args['<database>'])) as conn:
+        exported = export_files(conn, filenames, workers=workers)
+    logger.info('%d files exported', exported)
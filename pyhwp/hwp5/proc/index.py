@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#
+#   pyhwp : hwp file format parser in python
+#   Copyright (C) 2010-2019 mete0r <mete0r@sarangbang.or.kr>
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+''' Build and query a full-text index of paragraphs.
+
+Usage::
+
+    hwp5proc index build [--workers=<n>]
+                         [--loglevel=<loglevel>] [--logfile=<logfile>]
+                         <index> (--from-stdin | <hwp5files>...)
+    hwp5proc index query [--limit=<n>]
+                         [--loglevel=<loglevel>] [--logfile=<logfile>]
+                         <index> <query>
+    hwp5proc index --help
+
+Options::
+
+    -h --help               Show this screen
+       --loglevel=<level>   Set log level.
+       --logfile=<file>     Set log file.
+
+       --from-stdin         Read the filenames from stdin
+       --workers=<n>        Read the files in <n> processes [default: 1]
+       --limit=<n>          Print at most <n> hits [default: 20]
+
+    <index>                 SQLite database with the FTS5 extension, created
+                            if it does not exist
+    <hwp5files>...          HWPv5 files (*.hwp)
+    <query>                 FTS5 full-text query
+
+``build`` reads only the files which are new or changed since they have been
+indexed, and removes the files which no longer exist from the index.
+``query`` prints a hit per line: the file, the section, the top-level
+paragraph and a snippet, in which the matches are in brackets.
+
+Example::
+
+    $ hwp5proc index build --workers=4 corpus.idx samples/*.hwp
+    $ hwp5proc index query corpus.idx '"file format" OR spec*'
+    $ hwp5txt --sections=0 --paragraphs=4 samples/sample-5017.hwp
+
+'''
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from contextlib import closing
+import locale
+import sqlite3
+import sys
+
+from ..textindex import build_index
+from ..textindex import query_index
+from . import logger
+from .find import filenames_from_args
+
+
+def main(args):
+    try:
+        with closing(sqlite3.connect(args['<index>'])) as conn:
+            if args['build']:
+                build(conn, args)
+            elif args['query']:
+                query(conn, args)
+    except sqlite3.OperationalError, e:
+        logger.error('%s: %s', args['<index>'], e)
+        raise SystemExit(1)
+
+
+def int_from_args(args, option):
+    try:
+        return int(args[option])
+    except ValueError:
+        logger.error('%s: %s', option, args[option])
+        raise SystemExit(1)
+
+
+def query_from_args(args):
+    ''' The query, decoded in the encoding of the locale or else in UTF-8,
+    in which a query may be given under the C locale.
+    '''
+    text = args['<query>']
+    if not isinstance(text, bytes):
+        return text
+    for encoding in (locale.getpreferredencoding(), 'utf-8'):
+        try:
+            return text.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            continue
+    logger.error('<query>: not in the encoding of the locale nor in UTF-8')
+    raise SystemExit(1)
+
+
+def build(conn, args):
+    workers = int_from_args(args, '--workers')
+    filenames = filenames_from_args(args)
+    stats = build_index(conn, filenames, workers=workers)
+    logger.info('%(indexed)d files indexed, %(unchanged)d unchanged, '
+                '%(removed)d removed', stats)
+
+
+def query(conn, args):
+    limit = int_from_args(args, '--limit')
+    text = query_from_args(args)
+    for path, section, paragraph, snippet in query_index(conn, text, limit):
+        snippet = snippet.replace('\n', ' ')
+        line = '%s:%d:%d: %s\n' % (path, section, paragraph, snippet)
+        sys.stdout.write(line.encode('utf-8'))
@@ -20,8 +20,10 @@
 
 Usage::
 
-    hwp5proc models [--simple | --json | --format=<format> | --events]
+    hwp5proc models [--simple | --json | --ndjson | --format=<format> |
+                     --events]
                     [--treegroup=<treegroup> | --seqno=<seqno>]
+                    [--cache-dir=<dir>] [--cache-size=<size>]
                     [--loglevel=<loglevel>] [--logfile=<logfile>]
                     (<hwp5file> <record-stream> | -V <version>)
     hwp5proc models --help
@@ -34,6 +36,8 @@ Options::
 
        --simple             Print records as simple tree
        --json               Print records as json
+       --ndjson             Print records as json, one per line, with the
+                            bytes in hex
        --format=<format>    Print records as formatted
 
        --treegroup=<treegroup>
@@ -42,6 +46,9 @@ Options::
                             record structure.
        --seqno=<seqno>      Print a model of <seqno>-th record
 
+       --cache-dir=<dir>    Cache the JSON or NDJSON output in <dir>
+       --cache-size=<size>  Size limit of the cache, e.g. 512M
+
     -V <version>, --file-format-version=<version>
                             Specifies HWPv5 file format version
 
@@ -81,6 +88,7 @@ Example::
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
+from contextlib import closing
 from itertools import islice
 import sys
 
@@ -88,10 +96,13 @@ from ..binmodel import Hwp5File
 from ..binmodel import ModelStream
 from ..binmodel import RecordModel
 from ..binmodel import model_to_json
+from ..binmodel import model_to_ndjson
 from ..dataio import hexdump
 from ..storage import Open2Stream
 from ..treeop import ENDEVENT
 from ..utils import generate_json_array
+from ..utils import write_ndjson
+from . import cache_from_args
 from . import parse_recordstream_name
 
 
@@ -126,9 +137,30 @@ def main(args):
         return
 
     models_from_stream = models_from_args(args)
-    models = models_from_stream(stream)
-
     print_models = print_models_from_args(args)
+
+    cache = cache_from_args(args)
+    writers = {
+        print_models_json: (write_models_json, 'models/json'),
+        print_models_ndjson: (write_models_ndjson, 'models/ndjson'),
+    }
+    if (cache is not None and args['<hwp5file>'] and
+            print_models in writers):
+        streamname = args['<record-stream>']
+        write_models, kind = writers[print_models]
+
+        def write(hwp5file, f):
+            stream = parse_recordstream_name(hwp5file, streamname)
+            write_models(models_from_stream(stream), f)
+        write = cache.cached(write, kind,
+                             stream=streamname,
+                             treegroup=args['--treegroup'],
+                             seqno=args['--seqno'])
+        with closing(Hwp5File(args['<hwp5file>'])) as hwp5file:
+            write(hwp5file, sys.stdout)
+        return
+
+    models = models_from_stream(stream)
     print_models(models)
 
 
@@ -171,14 +203,29 @@ def print_models_from_args(args):
         print_model = print_model_with_format(fmt)
         return print_models_with_print_model(print_model)
 
+    if args['--ndjson']:
+        return print_models_ndjson
+
     return print_models_json
 
 
 def print_models_json(models):
+    write_models_json(models, sys.stdout)
+
+
+def write_models_json(models, f):
     jsonobjects = (model_to_json(model, sort_keys=True, indent=2)
                    for model in models)
     for s in generate_json_array(jsonobjects):
-        sys.stdout.write(s)
+        f.write(s.encode('utf-8'))
+
+
+def print_models_ndjson(models):
+    write_models_ndjson(models, sys.stdout)
+
+
+def write_models_ndjson(models, f):
+    write_ndjson((model_to_ndjson(model) for model in models), f)
 
 
 def print_models_with_print_model(print_model):
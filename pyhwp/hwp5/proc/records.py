@@ -20,11 +20,13 @@
 
 Usage::
 
-    hwp5proc records [--simple | --json | --raw | --raw-header | --raw-payload]
+    hwp5proc records [--simple | --json | --ndjson | --raw | --raw-header |
+                      --raw-payload]
                      [--treegroup=<treegroup> | --range=<range>]
                      [--loglevel=<loglevel>] [--logfile=<logfile>]
                      <hwp5file> <record-stream>
-    hwp5proc records [--simple | --json | --raw | --raw-header | --raw-payload]
+    hwp5proc records [--simple | --json | --ndjson | --raw | --raw-header |
+                      --raw-payload]
                      [--treegroup=<treegroup> | --range=<range>]
                      [--loglevel=<loglevel>] [--logfile=<logfile>]
     hwp5proc records --help
@@ -37,6 +39,8 @@ Options::
 
        --simple             Print records as simple tree
        --json               Print records as json
+       --ndjson             Print records as json, one per line, with the
+                            payloads in hex
        --raw                Print records as is
        --raw-header         Print record headers as is
        --raw-payload        Print record payloads as is
@@ -81,7 +85,9 @@ from ..recordstream import Hwp5File
 from ..recordstream import RecordStream
 from ..recordstream import encode_record_header
 from ..recordstream import dump_record
+from ..recordstream import record_to_ndjson
 from ..storage import Open2Stream
+from ..utils import write_ndjson
 from . import parse_recordstream_name
 
 
@@ -113,6 +119,10 @@ def main(args):
                 '  ' * record['level'],
                 record['tagname'],
             ))
+    elif args['--ndjson']:
+        records = stream.records(**opts)
+        write_ndjson((record_to_ndjson(record) for record in records),
+                     sys.stdout)
     elif args['--raw']:
         for record in stream.records(**opts):
             dump_record(sys.stdout, record)
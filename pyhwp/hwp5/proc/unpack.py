@@ -21,7 +21,7 @@
 Usage::
 
     hwp5proc unpack [--loglevel=<loglevel>] [--logfile=<logfile>]
-                    [--vstreams | --ole]
+                    [--vstreams | --ole] [--bindata-store=<dir>]
                     <hwp5file> [<out-directory>]
     hwp5proc unpack --help
 
@@ -36,6 +36,10 @@ Options::
        --ole                Treat <hwpfile> as an OLE Compound File. As a
                             result, some streams will be presented as-is. (i.e.
                             not decompressed)
+       --bindata-store=<dir>
+                            Store the BinData streams once in <dir>, shared
+                            by the unpacked files, and link them into
+                            <out-directory>/BinData
 
 Example::
 
@@ -54,6 +58,7 @@ from __future__ import unicode_literals
 import os.path
 
 from .. import storage
+from ..bindatastore import BinDataStore
 from . import open_hwpfile
 
 
@@ -66,4 +71,7 @@ def main(args):
         outdir, ext = os.path.splitext(os.path.basename(filename))
     if not os.path.exists(outdir):
         os.mkdir(outdir)
-    storage.unpack(hwp5file, outdir)
+    bindata_store = None
+    if args['--bindata-store']:
+        bindata_store = BinDataStore(args['--bindata-store'])
+    storage.unpack(hwp5file, outdir, bindata_store=bindata_store)
@@ -30,6 +30,8 @@ Usage::
                  [--output=<file>]
                  [--format=<format>]
                  [--no-validate-wellformed]
+                 [--sections=<range>] [--paragraphs=<range>] [--pages=<n>]
+                 [--cache-dir=<dir>] [--cache-size=<size>]
                  [--loglevel=<loglevel>] [--logfile=<logfile>]
                  <hwp5file>
     hwp5proc xml --help
@@ -43,6 +45,11 @@ Options::
        --embedbin           Embed BinData/* streams in the output XML.
        --no-xml-decl        Don't output <?xml ... ?> XML declaration.
        --output=<file>      Output filename.
+       --sections=<range>   Only these sections: N, N-M or N-
+       --paragraphs=<range> Only these paragraphs: N, N-M or N-
+       --pages=<n>          Only about the first <n> pages
+       --cache-dir=<dir>    Cache the output in <dir>
+       --cache-size=<size>  Size limit of the cache, e.g. 512M
 
     <hwp5file>              HWPv5 files (*.hwp)
     <format>                "flat", "nested" (default: "nested")
@@ -60,6 +67,15 @@ Example::
     $ hwp5proc xml --embedbin samples/sample-5017.hwp > sample-5017.xml
     $ xmllint --format sample-5017.xml
 
+In the nested format, with ``--sections``, ``--paragraphs`` or ``--pages``
+options, only that part of the body text is read and transformed; paragraphs
+are numbered from 0 through the selected sections, and pages are estimated
+from the layout of the lines.
+
+Example::
+
+    $ hwp5proc xml --paragraphs=0-9 samples/sample-5017.hwp
+
 '''
 from __future__ import absolute_import
 from __future__ import print_function
@@ -67,6 +83,8 @@ from __future__ import unicode_literals
 from functools import partial
 import logging
 
+from . import cache_from_args
+from . import selection_from_args
 from ..utils import make_open_dest_file
 from ..utils import wrap_open_dest_for_tty
 from ..utils import wrap_open_dest
@@ -80,8 +98,9 @@ from ..xmlmodel import Hwp5File
 logger = logging.getLogger(__name__)
 
 
-def xmldump_nested(hwp5file, output, embedbin=False, xml_declaration=True):
-    dump = hwp5file.xmlevents(embedbin=embedbin).dump
+def xmldump_nested(hwp5file, output, embedbin=False, xml_declaration=True,
+                   selection=None):
+    dump = hwp5file.xmlevents(embedbin=embedbin, selection=selection).dump
     dump = partial(dump, xml_declaration=xml_declaration)
     dump(output)
 
@@ -91,6 +110,7 @@ def main(args):
     '''
 
     fmt = args['--format'] or 'nested'
+    selection = selection_from_args(args)
     if fmt == 'flat':
         xmldump = partial(
             xmldump_flat,
@@ -101,8 +121,16 @@ def main(args):
             xmldump_nested,
             xml_declaration=not args['--no-xml-decl'],
             embedbin=args['--embedbin'],
+            selection=selection,
         )
 
+    cache = cache_from_args(args)
+    if cache is not None:
+        xmldump = cache.cached(xmldump, 'xhwp5/' + fmt,
+                               xml_declaration=not args['--no-xml-decl'],
+                               embedbin=args['--embedbin'],
+                               selection=selection)
+
     open_dest = make_open_dest_file(args['--output'])
     open_dest = wrap_open_dest_for_tty(open_dest, [
         pager(),
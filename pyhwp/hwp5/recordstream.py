@@ -19,6 +19,7 @@
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
+from binascii import b2a_hex
 from itertools import islice
 import json
 import struct
@@ -99,6 +100,18 @@ def read_records(f):
         seqno += 1
 
 
+def read_records_closing(f):
+    ''' Like `read_records()`, and close `f` once the records are exhausted
+    or no longer read; a stream is not read any further than its records
+    are.
+    '''
+    try:
+        for record in read_records(f):
+            yield record
+    finally:
+        f.close()
+
+
 def link_records(records):
     prev = None
     for rec in records:
@@ -118,6 +131,12 @@ def record_to_json(record, *args, **kwargs):
     return json.dumps(record, *args, **kwargs)
 
 
+def record_to_ndjson(record):
+    ''' convert a record to compact json in a line, the payload in hex '''
+    record = dict(record, payload=b2a_hex(record['payload']))
+    return json.dumps(record, separators=(',', ':'))
+
+
 def nth(iterable, n, default=None):
     try:
         return islice(iterable, n, None).next()
@@ -154,7 +173,7 @@ def group_records_by_toplevel(records, group_as_list=True):
 class RecordStream(filestructure.VersionSensitiveItem):
 
     def records(self, **kwargs):
-        records = read_records(self.open())
+        records = read_records_closing(self.open())
         if 'range' in kwargs:
             range = kwargs['range']
             records = islice(records, range[0], range[1])
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+#
+#   pyhwp : hwp file format parser in python
+#   Copyright (C) 2010-2019 mete0r <mete0r@sarangbang.or.kr>
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+''' Export of the records, the models and the texts of documents into a
+SQLite database.
+
+The documents are parsed in worker processes, each document as a whole,
+and written by the calling process alone, in batches of rows within
+transactions. Tables::
+
+    files(id, path, size, mtime, version)
+    streams(id, file_id, name)
+    records(stream_id, seqno, tagid, tagname, level, size, offset, model)
+    fields(stream_id, seqno, name, value)
+    paragraphs(stream_id, seqno, level, text)
+
+`fields` holds the contents of the models flattened: a name is the path to
+a value in the content, of which the parts are joined with dots, e.g.
+``charshapes.0.1``. The streams are DocInfo and the sections of BodyText.
+'''
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from contextlib import closing
+from itertools import imap
+import logging
+import os
+
+from .binmodel import Hwp5File
+from .binmodel import paragraph_texts
+from .dataio import ParseError
+from .errors import InvalidHwp5FileError
+from .utils import absolute_path
+from .utils import imap_unordered
+
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    version TEXT
+);
+CREATE TABLE IF NOT EXISTS streams (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files (id),
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    stream_id INTEGER NOT NULL REFERENCES streams (id),
+    seqno INTEGER NOT NULL,
+    tagid INTEGER,
+    tagname TEXT,
+    level INTEGER,
+    size INTEGER,
+    offset INTEGER,
+    model TEXT,
+    PRIMARY KEY (stream_id, seqno)
+);
+CREATE TABLE IF NOT EXISTS fields (
+    stream_id INTEGER NOT NULL REFERENCES streams (id),
+    seqno INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value
+);
+CREATE TABLE IF NOT EXISTS paragraphs (
+    stream_id INTEGER NOT NULL REFERENCES streams (id),
+    seqno INTEGER NOT NULL,
+    level INTEGER,
+    text TEXT,
+    PRIMARY KEY (stream_id, seqno)
+);
+CREATE INDEX IF NOT EXISTS streams_file_id ON streams (file_id);
+CREATE INDEX IF NOT EXISTS records_tagid ON records (tagid);
+CREATE INDEX IF NOT EXISTS records_model ON records (model);
+CREATE INDEX IF NOT EXISTS fields_stream_id ON fields (stream_id, seqno);
+CREATE INDEX IF NOT EXISTS fields_name ON fields (name);
+'''
+
+# rows written in a transaction, at least
+COMMIT_ROWS = 100000
+
+
+def init_schema(conn):
+    conn.executescript(SCHEMA)
+
+
+def record_header_size(size):
+    ''' Size of the header of a record, of which the payload is `size`
+    bytes long.
+    '''
+    if size < 0xfff:
+        return 4
+    return 8
+
+
+def flatten_content(content, prefix=''):
+    ''' `(name, value)` of each value in the content of a model. '''
+    if isinstance(content, dict):
+        items = sorted(content.items())
+    elif isinstance(content, (list, tuple)):
+        items = enumerate(content)
+    else:
+        yield prefix, content
+        return
+    for key, value in items:
+        name = '%s.%s' % (prefix, key) if prefix else '%s' % key
+        for item in flatten_content(value, name):
+            yield item
+
+
+def field_value(value):
+    ''' A value of a field, which pickles as a plain one: integers of the
+    enum and flags types as integers, and anything but bytes as text.
+    '''
+    if value is None or isinstance(value, (unicode, bytes, float)):
+        return value
+    if isinstance(value, (int, long)):
+        return int(value)
+    return unicode(value)
+
+
+def blob_row(row):
+    ''' A row of which the bytes are stored as blobs. '''
+    return tuple(buffer(value) if isinstance(value, bytes) else value
+                 for value in row)
+
+
+def extract_stream(stream):
+    ''' Rows of the records, the fields and the paragraphs of a stream, of
+    which the `stream_id` columns are left out.
+    '''
+    records = []
+    fields = []
+
+    def models():
+        offset = 0
+        for model in stream.models():
+            seqno = model['seqno']
+            size = model['size']
+            records.append((seqno, model['tagid'], model['tagname'],
+                            model['level'], size, offset,
+                            model['type'].__name__))
+            offset += record_header_size(size) + size
+            for name, value in flatten_content(model['content']):
+                fields.append((seqno, name, field_value(value)))
+            yield model
+
+    paragraphs = [(model['seqno'], model['level'], text)
+                  for model, text in paragraph_texts(models())]
+    return dict(records=records, fields=fields, paragraphs=paragraphs)
+
+
+def hwp5file_streams(hwp5file):
+    ''' `(name, stream)` of the record streams of a document. '''
+    yield 'DocInfo', hwp5file.docinfo
+    bodytext = hwp5file.bodytext
+    for section in bodytext:
+        yield 'BodyText/' + section, bodytext[section]
+
+
+def extract_file(path):
+    ''' What is exported of a document at `path`, or None if it fails to be
+    parsed. Workers run this.
+    '''
+    try:
+        # as it is before being read
+        stat = os.stat(path)
+        with closing(Hwp5File(path)) as hwp5file:
+            version = '.'.join('%d' % x for x in hwp5file.header.version)
+            streams = [(name, extract_stream(stream))
+                       for name, stream in hwp5file_streams(hwp5file)]
+    except (IOError, OSError, InvalidHwp5FileError), e:
+        logger.error('%s: %s', path, e)
+        return None
+    except ParseError, e:
+        logger.error('---- On processing %s:', path)
+        e.print_to_logger(logger)
+        return None
+    return dict(path=path, size=stat.st_size, mtime=stat.st_mtime,
+                version=version, streams=streams)
+
+
+def delete_file(conn, path):
+    ''' Delete the rows of a document, exported before. '''
+    streams = ('SELECT streams.id FROM streams JOIN files'
+               ' ON streams.file_id = files.id WHERE files.path = ?')
+    for table in ('records', 'fields', 'paragraphs'):
+        conn.execute('DELETE FROM %s WHERE stream_id IN (%s)' % (table,
+                                                                 streams),
+                     (path,))
+    conn.execute('DELETE FROM streams WHERE file_id IN'
+                 ' (SELECT id FROM files WHERE path = ?)', (path,))
+    conn.execute('DELETE FROM files WHERE path = ?', (path,))
+
+
+def write_file(conn, extracted):
+    ''' Write the rows of a document, replacing those exported before.
+
+    :returns: the number of rows written
+    '''
+    path = extracted['path']
+    delete_file(conn, path)
+    cursor = conn.execute('INSERT INTO files (path, size, mtime, version)'
+                          ' VALUES (?, ?, ?, ?)',
+                          (path, extracted['size'], extracted['mtime'],
+                           extracted['version']))
+    file_id = cursor.lastrowid
+    written = 1
+    for name, rows in extracted['streams']:
+        cursor = conn.execute('INSERT INTO streams (file_id, name)'
+                              ' VALUES (?, ?)', (file_id, name))
+        stream_id = cursor.lastrowid
+        conn.executemany('INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                         ((stream_id,) + row for row in rows['records']))
+        conn.executemany('INSERT INTO fields VALUES (?, ?, ?, ?)',
+                         (blob_row((stream_id,) + row)
+                          for row in rows['fields']))
+        conn.executemany('INSERT INTO paragraphs VALUES (?, ?, ?, ?)',
+                         ((stream_id,) + row for row in rows['paragraphs']))
+        written += 1 + sum(len(rows[table]) for table in rows)
+    return written
+
+
+def export_files(conn, paths, workers=1):
+    ''' Export the documents at `paths` into a database, parsed with
+    `workers` processes.
+
+    :returns: the number of the documents exported
+    '''
+    init_schema(conn)
+    paths = imap(absolute_path, paths)
+    extracted_files = imap_unordered(extract_file, paths, workers)
+    exported = 0
+    pending = 0
+    try:
+        for extracted in extracted_files:
+            if extracted is None:
+                continue
+            pending += write_file(conn, extracted)
+            exported += 1
+            if pending >= COMMIT_ROWS:
+                conn.commit()
+                pending = 0
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        extracted_files.close()
+    return exported
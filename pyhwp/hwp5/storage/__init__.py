@@ -22,6 +22,8 @@ from __future__ import unicode_literals
 import io
 import os.path
 
+from ..utils import unlink_existing
+
 
 def is_storage(item):
     return hasattr(item, '__iter__') and hasattr(item, '__getitem__')
@@ -115,16 +117,21 @@ def iter_storage_leafs(stg, basepath=''):
             yield path
 
 
-def unpack(stg, outbase):
+def unpack(stg, outbase, bindata_store=None):
     ''' unpack a storage into outbase directory
 
         stg: an instance of Storage
         outbase: path to a directory in filesystem (should not end with '/')
+        bindata_store: a `hwp5.bindatastore.BinDataStore` to store the
+        streams in BinData once and link them into outbase
     '''
     for name in stg:
         outpath = os.path.join(outbase, name)
         item = stg[name]
-        if is_storage(item):
+        if bindata_store is not None and name == 'BinData' and \
+                is_storage(item):
+            bindata_store.unpack(item, outpath)
+        elif is_storage(item):
             if not os.path.exists(outpath):
                 os.mkdir(outpath)
             unpack(item, outpath)
@@ -132,6 +139,7 @@ def unpack(stg, outbase):
             f = item.open()
             try:
                 outpath = outpath.replace('\x05', '_05')
+                unlink_existing(outpath)
                 with io.open(outpath, 'wb') as outfile:
                     outfile.write(f.read())
             finally:
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+#
+#   pyhwp : hwp file format parser in python
+#   Copyright (C) 2010-2019 mete0r <mete0r@sarangbang.or.kr>
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+''' Full-text index of the paragraphs of documents, in a SQLite database
+with the FTS5 extension.
+
+A row of the index is the text of a top-level paragraph in a section, of
+which the paragraphs nested in it, e.g. in the cells of its tables, make
+the following lines. Paragraphs are numbered as `hwp5.xmlmodel.Selection`
+does: ``hwp5txt --sections=S --paragraphs=P`` prints a hit.
+
+The index is updated incrementally: a document is not read again as long as
+its size and its mtime are the same, and it is not indexed again as long as
+the `hwp5.cache.storage_digest()` of its streams is the same. Documents are
+read in worker processes and the index is written by the calling process
+alone.
+'''
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from contextlib import closing
+from itertools import imap
+import logging
+import os
+
+from .binmodel import Hwp5File
+from .binmodel import paragraph_texts
+from .cache import storage_digest
+from .dataio import ParseError
+from .errors import InvalidHwp5FileError
+from .utils import absolute_path
+from .utils import imap_unordered
+
+
+logger = logging.getLogger(__name__)
+
+
+# the rowids of the texts of a file are ``file_id << FILE_ID_SHIFT | n``,
+# so that they are deleted by a range of the rowids
+FILE_ID_SHIFT = 32
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    digest TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS texts USING fts5 (
+    text,
+    section UNINDEXED,
+    paragraph UNINDEXED
+);
+'''
+
+# rows written in a transaction, at least
+COMMIT_ROWS = 100000
+
+SNIPPET_TOKENS = 16
+
+
+def init_schema(conn):
+    conn.executescript(SCHEMA)
+
+
+def section_texts(models):
+    ''' `(paragraph, text)` of the top-level paragraphs with any text, with
+    the texts of the paragraphs nested in them on the following lines.
+    '''
+    paragraph = -1
+    lines = []
+    for model, text in paragraph_texts(models):
+        if model['level'] == 0:
+            if lines:
+                yield paragraph, '\n'.join(lines)
+            paragraph += 1
+            lines = []
+        if text:
+            lines.append(text)
+    if lines:
+        yield paragraph, '\n'.join(lines)
+
+
+def hwp5file_texts(hwp5file):
+    ''' `(section, paragraph, text)` of the paragraphs of a document. '''
+    bodytext = hwp5file.bodytext
+    for section in bodytext.section_indexes():
+        models = bodytext.section(section).models()
+        for paragraph, text in section_texts(models):
+            yield section, paragraph, text
+
+
+def read_file(args):
+    ''' Read a document at `path` unless its digest is `digest`. Workers
+    run this.
+
+    :returns: the size, the mtime, the digest and the texts of the document,
+        of which the texts are None if it is not changed, or None if it
+        fails to be read.
+    '''
+    path, digest = args
+    try:
+        # as it is before being read
+        stat = os.stat(path)
+        with closing(Hwp5File(path)) as hwp5file:
+            read_digest = storage_digest(hwp5file)
+            if read_digest == digest:
+                texts = None
+            else:
+                texts = list(hwp5file_texts(hwp5file))
+    except (IOError, OSError, InvalidHwp5FileError), e:
+        logger.error('%s: %s', path, e)
+        return None
+    except ParseError, e:
+        logger.error('---- On processing %s:', path)
+        e.print_to_logger(logger)
+        return None
+    return dict(path=path, size=stat.st_size, mtime=stat.st_mtime,
+                digest=read_digest, texts=texts)
+
+
+def delete_texts(conn, file_id):
+    conn.execute('DELETE FROM texts WHERE rowid >= ? AND rowid < ?',
+                 (file_id << FILE_ID_SHIFT, (file_id + 1) << FILE_ID_SHIFT))
+
+
+def write_file(conn, read):
+    ''' Write what is read of a document into the index.
+
+    :returns: the number of rows written
+    '''
+    row = conn.execute('SELECT id FROM files WHERE path = ?',
+                       (read['path'],)).fetchone()
+    if row is None:
+        cursor = conn.execute('INSERT INTO files (path) VALUES (?)',
+                              (read['path'],))
+        file_id = cursor.lastrowid
+    else:
+        file_id = row[0]
+    conn.execute('UPDATE files SET size = ?, mtime = ?, digest = ?'
+                 ' WHERE id = ?',
+                 (read['size'], read['mtime'], read['digest'], file_id))
+    texts = read['texts']
+    if texts is None:
+        return 1
+    delete_texts(conn, file_id)
+    base = file_id << FILE_ID_SHIFT
+    conn.executemany('INSERT INTO texts (rowid, text, section, paragraph)'
+                     ' VALUES (?, ?, ?, ?)',
+                     ((base + n, text, section, paragraph)
+                      for n, (section, paragraph, text) in enumerate(texts)))
+    return 1 + len(texts)
+
+
+def remove_missing_files(conn):
+    ''' Remove the documents which no longer exist from the index.
+
+    :returns: the number of the documents removed
+    '''
+    removed = 0
+    for file_id, path in conn.execute('SELECT id, path FROM files').fetchall():
+        if os.path.exists(path):
+            continue
+        delete_texts(conn, file_id)
+        conn.execute('DELETE FROM files WHERE id = ?', (file_id,))
+        removed += 1
+    return removed
+
+
+def build_index(conn, paths, workers=1):
+    ''' Update the index with the documents at `paths`, read with `workers`
+    processes, and remove the documents which no longer exist.
+
+    :returns: a dict of the numbers of the documents `indexed`, found
+        `unchanged` and `removed`
+    '''
+    init_schema(conn)
+    stats = dict(indexed=0, unchanged=0, removed=0)
+
+    def changed_files():
+        for path in imap(absolute_path, paths):
+            try:
+                stat = os.stat(path)
+            except OSError, e:
+                logger.error('%s: %s', path, e)
+                continue
+            row = conn.execute('SELECT size, mtime, digest FROM files'
+                               ' WHERE path = ?', (path,)).fetchone()
+            if row is None:
+                yield path, None
+                continue
+            size, mtime, digest = row
+            if size == stat.st_size and mtime == stat.st_mtime:
+                stats['unchanged'] += 1
+                continue
+            yield path, digest
+
+    # the pool takes the tasks in another thread, where the connection
+    # may not be used
+    changed = list(changed_files())
+    read_files = imap_unordered(read_file, changed, workers)
+    pending = 0
+    try:
+        for read in read_files:
+            if read is None:
+                continue
+            pending += write_file(conn, read)
+            if read['texts'] is None:
+                stats['unchanged'] += 1
+            else:
+                stats['indexed'] += 1
+            if pending >= COMMIT_ROWS:
+                conn.commit()
+                pending = 0
+        stats['removed'] = remove_missing_files(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        read_files.close()
+    return stats
+
+
+def query_index(conn, query, limit=None):
+    ''' Search the index with an FTS5 query, e.g. ``"file format" OR spec*``.
+
+    :returns: `(path, section, paragraph, snippet)` of the hits, the best
+        ones first; in the snippets, the matches are in brackets.
+    '''
+    sql = ('SELECT files.path, texts.section, texts.paragraph,'
+           ' snippet(texts, 0, \'[\', \']\', \'...\', ?)'
+           ' FROM texts JOIN files ON files.id = texts.rowid >> ?'
+           ' WHERE texts MATCH ? ORDER BY rank')
+    params = [SNIPPET_TOKENS, FILE_ID_SHIFT, query]
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return conn.execute(sql, params)
@@ -20,10 +20,14 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 from contextlib import contextmanager
+from contextlib import closing
+from tempfile import SpooledTemporaryFile
 import logging
 
 from ..errors import ImplementationNotAvailable
+from ..plat import get_xml_parse
 from ..plat import get_xslt_compile
+from ..utils import cached_property
 from ..utils import hwp5_resources_path
 from ..utils import mkstemp_open
 
@@ -31,11 +35,16 @@ from ..utils import mkstemp_open
 logger = logging.getLogger(__name__)
 
 
+# XHWP5 to be parsed in-process is kept in memory up to this
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+
 class BaseTransform:
 
-    def __init__(self, xslt_compile=None, embedbin=False):
+    def __init__(self, xslt_compile=None, embedbin=False, selection=None):
         self.xslt_compile = xslt_compile or self.get_default_xslt_compile()
         self.embedbin = embedbin
+        self.selection = selection
 
     @classmethod
     def get_default_xslt_compile(cls):
@@ -54,8 +63,31 @@ class BaseTransform:
         with hwp5_resources_path(resource_path) as xsl_path:
             return self.xslt_compile(xsl_path, **params)
 
+    @cached_property
+    def xml_parse(self):
+        return get_xml_parse(self.xslt_compile)
+
     @contextmanager
     def transformed_xhwp5_at_temp(self, hwp5file):
         with mkstemp_open() as (tmp_path, f):
-            hwp5file.xmlevents(embedbin=self.embedbin).dump(f)
+            hwp5file.xmlevents(embedbin=self.embedbin,
+                               selection=self.selection).dump(f)
             yield tmp_path
+
+    @contextmanager
+    def transformed_xhwp5_source(self, hwp5file):
+        ''' XHWP5 of `hwp5file` as an input for several XSL transforms.
+
+        It is parsed once for all of them if the XSLT implementation can;
+        otherwise it is a temporary file.
+        '''
+        if self.xml_parse is None:
+            with self.transformed_xhwp5_at_temp(hwp5file) as tmp_path:
+                yield tmp_path
+            return
+        with closing(SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)) as f:
+            hwp5file.xmlevents(embedbin=self.embedbin,
+                               selection=self.selection).dump(f)
+            f.seek(0)
+            source = self.xml_parse(f)
+        yield source
@@ -19,6 +19,7 @@
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
+from array import array
 
 
 class STARTEVENT:
@@ -29,6 +30,22 @@ class ENDEVENT:
     pass
 
 
+class InvalidLevelError(Exception):
+    ''' A level deeper than one below the previous one, or above the first
+    one. The item is formatted only when the error is.
+    '''
+
+    def __init__(self, level, depth, item):
+        Exception.__init__(self, level, depth)
+        self.level = level
+        self.depth = depth
+        self.item = item
+
+    def __str__(self):
+        return 'invalid level: %d, %d, %s' % (self.level, self.depth,
+                                              self.item)
+
+
 def prefix_event(level_prefixed_items, root_item=None):
     ''' convert iterable of (level, item) into iterable of (event, item)
     '''
@@ -41,12 +58,12 @@ def prefix_event(level_prefixed_items, root_item=None):
         else:
             level -= baselevel
 
-        while level + 1 < len(stack):
+        depth = len(stack) - 1
+        if not 0 <= level <= depth:
+            raise InvalidLevelError(level, depth, item)
+        while level < depth:
             yield ENDEVENT, stack.pop()
-        while len(stack) < level + 1:
-            raise Exception('invalid level: %d, %d, %s' %
-                            (level, len(stack) - 1, item))
-        assert(len(stack) == level + 1)
+            depth -= 1
 
         stack.append(item)
         yield STARTEVENT, item
@@ -82,12 +99,11 @@ def prefix_ancestors_from_level(level_prefixed_items, root_item=None):
         else:
             level -= baselevel
 
-        while level + 1 < len(stack):
-            stack.pop()
-        while len(stack) < level + 1:
-            raise Exception('invalid level: %d, %d, %s' %
-                            (level, len(stack) - 1, item))
-        assert(len(stack) == level + 1)
+        depth = len(stack) - 1
+        if not 0 <= level <= depth:
+            raise InvalidLevelError(level, depth, item)
+        if level < depth:
+            del stack[level + 1:]
 
         yield stack, item
         stack.append(item)
@@ -116,12 +132,16 @@ def build_subtree(event_prefixed_items):
                                    (child2, [])])
 
     '''
-    childs = []
+    # children of the items open
+    stack = [[]]
     for event, item in event_prefixed_items:
-        if event == STARTEVENT:
-            childs.append(build_subtree(event_prefixed_items))
-        elif event == ENDEVENT:
-            return item, childs
+        if event is STARTEVENT:
+            stack.append([])
+        elif event is ENDEVENT:
+            childs = stack.pop()
+            if not stack:
+                return item, childs
+            stack[-1].append((item, childs))
 
 
 def iter_subevents(event_prefixed_items):
@@ -140,15 +160,111 @@ def iter_subevents(event_prefixed_items):
 def tree_events(rootitem, childs):
     ''' generate tuples of (event, item) from a tree
     '''
-    yield STARTEVENT, rootitem
-    for k in tree_events_multi(childs):
-        yield k
-    yield ENDEVENT, rootitem
+    return tree_events_multi([(rootitem, childs)])
 
 
 def tree_events_multi(trees):
     ''' generate tuples of (event, item) from trees
     '''
-    for rootitem, childs in trees:
-        for k in tree_events(rootitem, childs):
-            yield k
+    # the items open, with the iterators of their parents' children
+    stack = []
+    children = iter(trees)
+    while True:
+        for item, childs in children:
+            yield STARTEVENT, item
+            stack.append((item, children))
+            children = iter(childs)
+            break
+        else:
+            if not stack:
+                return
+            item, children = stack.pop()
+            yield ENDEVENT, item
+
+
+NIL = -1
+
+
+class ArrayTree(object):
+    ''' A tree of which the items are kept in a list in document order, and
+    the structure in arrays of the indexes of the parent, of the first child
+    and of the next sibling of each item, or NIL. The root is at 0.
+
+    It takes no more than a few words per item, whatever its shape, and it
+    is walked without any recursion.
+    '''
+
+    def __init__(self, rootitem):
+        self.items = [rootitem]
+        self.parents = array(b'l', [NIL])
+        self.first_children = array(b'l', [NIL])
+        self.next_siblings = array(b'l', [NIL])
+
+    @classmethod
+    def from_subtree(cls, rootitem, event_prefixed_items):
+        ''' Build a tree from the events of a subtree, of which the start
+        event of the root is just taken: the events are consumed up to the
+        end event of the root.
+        '''
+        tree = cls(rootitem)
+        items = tree.items
+        parents = tree.parents
+        first_children = tree.first_children
+        next_siblings = tree.next_siblings
+        # the items open, and the last child of each of them
+        stack = [0]
+        last_children = [NIL]
+        for event, item in event_prefixed_items:
+            if event is STARTEVENT:
+                index = len(items)
+                items.append(item)
+                parents.append(stack[-1])
+                first_children.append(NIL)
+                next_siblings.append(NIL)
+                last_child = last_children[-1]
+                if last_child == NIL:
+                    first_children[stack[-1]] = index
+                else:
+                    next_siblings[last_child] = index
+                last_children[-1] = index
+                stack.append(index)
+                last_children.append(NIL)
+            elif event is ENDEVENT:
+                stack.pop()
+                last_children.pop()
+                if not stack:
+                    break
+        return tree
+
+    def __len__(self):
+        return len(self.items)
+
+    def children(self, index=0):
+        ''' Indexes of the children of an item. '''
+        child = self.first_children[index]
+        while child != NIL:
+            yield child
+            child = self.next_siblings[child]
+
+    def events(self, index=0):
+        ''' Events of the subtree of an item. '''
+        items = self.items
+        parents = self.parents
+        first_children = self.first_children
+        next_siblings = self.next_siblings
+        node = index
+        while True:
+            yield STARTEVENT, items[node]
+            child = first_children[node]
+            if child != NIL:
+                node = child
+                continue
+            while True:
+                yield ENDEVENT, items[node]
+                if node == index:
+                    return
+                sibling = next_siblings[node]
+                if sibling != NIL:
+                    node = sibling
+                    break
+                node = parents[node]
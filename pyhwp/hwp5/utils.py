@@ -21,6 +21,8 @@ from __future__ import print_function
 from __future__ import unicode_literals
 from contextlib import contextmanager
 from functools import partial
+from itertools import imap
+from multiprocessing import Pool
 import codecs
 import logging
 import os
@@ -36,11 +38,19 @@ from .importhelper import pkg_resources_filename
 logger = logging.getLogger(__name__)
 
 
+NDJSON_BUFFER_SIZE = 64 * 1024
+
+
 class NIL:
     pass
 
 
 class cached_property(object):
+    ''' A property computed once per instance.
+
+    Threads may compute it at the same time, but they all get the value
+    which has been stored first.
+    '''
 
     def __init__(self, func):
         self.func = func
@@ -53,7 +63,7 @@ class cached_property(object):
         value = obj.__dict__.get(self.__name__, NIL)
         if value is NIL:
             value = self.func(obj)
-            obj.__dict__[self.__name__] = value
+            value = obj.__dict__.setdefault(self.__name__, value)
         return value
 
     def __set__(self, obj, value):
@@ -95,6 +105,47 @@ class JsonObjects(object):
             outfile.write(s)
 
 
+def write_ndjson(tokens, outfile, buffer_size=NDJSON_BUFFER_SIZE):
+    ''' write json texts one per line, in writes of about `buffer_size` '''
+    lines = []
+    size = 0
+    for token in tokens:
+        lines.append(token)
+        lines.append('\n')
+        size += len(token) + 1
+        if size >= buffer_size:
+            outfile.write(''.join(lines).encode('utf-8'))
+            lines = []
+            size = 0
+    if lines:
+        outfile.write(''.join(lines).encode('utf-8'))
+
+
+def imap_unordered(function, iterable, workers=1):
+    ''' `function` mapped over `iterable` in a pool of `workers` processes,
+    the results in the order they are done; in this process with a worker.
+    Closing the generator terminates the pool.
+    '''
+    if workers <= 1:
+        for result in imap(function, iterable):
+            yield result
+        return
+    pool = Pool(workers)
+    try:
+        for result in pool.imap_unordered(function, iterable):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def absolute_path(path):
+    ''' Absolute path of a path, in unicode. '''
+    if isinstance(path, bytes):
+        path = path.decode(sys.getfilesystemencoding())
+    return os.path.abspath(path)
+
+
 def transcode(backend_stream, backend_encoding, frontend_encoding,
               errors='strict'):
     enc = codecs.getencoder(frontend_encoding)
@@ -126,24 +177,40 @@ class GeneratorReader(object):
     def __init__(self, gen):
         self.gen = gen
         self.buffer = b''
+        # where the unread bytes of the buffer begin
+        self.offset = 0
+        self.position = 0
 
     def read(self, size=None):
-        if size is None:
-            d, self.buffer = self.buffer, b''
-            return d + b''.join(self.gen)
-
-        for data in self.gen:
-            self.buffer += data
-            bufsize = len(self.buffer)
-            if bufsize >= size:
-                size = min(bufsize, size)
-                d, self.buffer = self.buffer[:size], self.buffer[size:]
-                return d
-
-        d, self.buffer = self.buffer, b''
+        if size is None or size < 0:
+            d = self.buffer[self.offset:] + b''.join(self.gen)
+            self.buffer = b''
+            self.offset = 0
+        else:
+            end = self.offset + size
+            if end > len(self.buffer):
+                chunks = [self.buffer[self.offset:]]
+                bufsize = len(chunks[0])
+                for data in self.gen:
+                    chunks.append(data)
+                    bufsize += len(data)
+                    if bufsize >= size:
+                        break
+                self.buffer = b''.join(chunks)
+                self.offset = 0
+                end = size
+            d = self.buffer[self.offset:end]
+            self.offset += len(d)
+        self.position += len(d)
         return d
 
+    def tell(self):
+        return self.position
+
     def close(self):
+        close = getattr(self.gen, 'close', None)
+        if close is not None:
+            close()
         self.gen = self.buffer = None
 
 
@@ -334,6 +401,15 @@ def mkstemp_open(*args, **kwargs):
         unlink_or_warning(path)
 
 
+def unlink_existing(path):
+    ''' Remove a file at `path` if any: a file written there anew is not
+    written through a hard link into the files linked to it, e.g. into the
+    objects of a `hwp5.bindatastore.BinDataStore`.
+    '''
+    if os.path.lexists(path):
+        os.unlink(path)
+
+
 def unlink_or_warning(path):
     try:
         os.unlink(path)
@@ -19,15 +19,13 @@
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
-from itertools import chain
-from xml.sax.saxutils import escape
-from xml.sax.saxutils import quoteattr
 import logging
+import re
 
 from hypua2jamo import codes2unicode
 
 from .filestructure import VERSION
-from .dataio import typed_struct_attributes
+from .dataio import typed_struct_attribute_items
 from .dataio import Struct
 from .dataio import StructType
 from .dataio import ArrayType
@@ -59,35 +57,43 @@ def xmlattrval(value):
         return str(value)
 
 
-def expanded_xmlattribute((name, (t, value))):
-    if isinstance(t, FlagsType):
-        fmt = '%0'
-        fmt += '%d' % (t.basetype.fixed_size * 2)
-        fmt += 'X'
-        yield name, fmt % int(value)
-        for k, v in t.dictvalue(t(value)).iteritems():
-            yield k, xmlattrval(v)
-    elif t is Margin:
-        for pos in ('left', 'right', 'top', 'bottom'):
-            yield '-'.join([name, pos]), xmlattrval(value.get(pos))
-    elif t is COLORREF:
-        yield name, xmlattrval(t(value))
+def xmlattr_formatter(t):
+    ''' Get a function which formats a value of type `t` into an xml
+    attribute value.
+    '''
+    if t is COLORREF:
+        return colorref_xmlattrval
     elif t is VERSION:
-        yield name, '.'.join(str(x) for x in value)
+        return version_xmlattrval
     elif t in (HWPUNIT, SHWPUNIT, HWPUNIT16):
-        yield name, str(value)
+        return str
     elif t is WCHAR:
-        if value == 0:
-            yield name, u''
-        else:
-            if value in PUA_SYMBOLS:
-                yield name, PUA_SYMBOLS[value]
-            else:
-                yield name, codes2unicode([value])
+        return wchar_xmlattrval
     elif t is BinStorageId:
-        yield name, 'BIN%04X' % value
+        return binstorageid_xmlattrval
+    else:
+        return xmlattrval
+
+
+def colorref_xmlattrval(value):
+    return xmlattrval(COLORREF(value))
+
+
+def version_xmlattrval(value):
+    return '.'.join(str(x) for x in value)
+
+
+def wchar_xmlattrval(value):
+    if value == 0:
+        return u''
+    elif value in PUA_SYMBOLS:
+        return PUA_SYMBOLS[value]
     else:
-        yield name, xmlattrval(value)
+        return codes2unicode([value])
+
+
+def binstorageid_xmlattrval(value):
+    return 'BIN%04X' % value
 
 
 # TODO: arbitrary assignment; not based on any standards
@@ -117,11 +123,6 @@ PUA_SYMBOLS = {
 }
 
 
-def xmlattr_dashednames(attrs):
-    for k, v in attrs:
-        yield k.replace('_', '-'), v
-
-
 def xmlattr_uniqnames(attrs):
     names = set([])
     for k, v in attrs:
@@ -130,54 +131,99 @@ def xmlattr_uniqnames(attrs):
         names.add(k)
 
 
-def xmlattributes_for_plainvalues(context, plainvalues):
-    ntvs = plainvalues.iteritems()
-    ntvs = chain(*(expanded_xmlattribute(ntv) for ntv in ntvs))
-    return dict(xmlattr_uniqnames(xmlattr_dashednames(ntvs)))
+PLAIN = 0
+COMPLEX = 1
+COMPLEX_IF_DICT = 2
 
 
-def is_complex_type(type, value):
-    if isinstance(value, dict):
-        return True
-    elif isinstance(type, ArrayType) and issubclass(type.itemtype, Struct):
-        return True
-    elif isinstance(type, ArrayType) and issubclass(type.itemtype, COLORREF):
-        return True
-    else:
-        return False
-
-
-def separate_plainvalues(typed_attributes):
-    d = []
-    p = dict()
-    for named_item in typed_attributes:
-        name, item = named_item
-        t, value = item
-        try:
-            if t is Margin:
-                p[name] = item
-            elif is_complex_type(t, value):
-                d.append(named_item)
-            else:
-                p[name] = item
-        except Exception, e:
-            logger.error('%s', (name, t, value))
-            logger.error('%s', t.__dict__)
-            logger.exception(e)
-            raise e
-    return d, p
+class XmlAttributePlan(object):
+    ''' How an attribute of given name and type goes into xml.
+
+    Everything which depends only on the name and the type - the dashed
+    xml names, the bitfield layout of flags and whether it is rendered as
+    child elements - is worked out once and reused for every element.
+    '''
+
+    def __init__(self, name, t):
+        if t is Margin:
+            self.kind = PLAIN
+        elif isinstance(t, ArrayType) and issubclass(t.itemtype,
+                                                     (Struct, COLORREF)):
+            self.kind = COMPLEX
+        else:
+            self.kind = COMPLEX_IF_DICT
+
+        xmlname = name.replace('_', '-')
+        if isinstance(t, FlagsType):
+            self.expand = self.flags_expander(xmlname, t)
+        elif t is Margin:
+            self.expand = self.margin_expander(xmlname)
+        else:
+            self.expand = self.single_expander(xmlname, xmlattr_formatter(t))
+
+    @staticmethod
+    def flags_expander(xmlname, t):
+        fmt = '%%0%dX' % (t.basetype.fixed_size * 2)
+        # in the iteration order of dictvalue(), without making a value of
+        # which an enum bitfield may not be defined
+        bitfields = list((k, k.replace('_', '-'))
+                         for k in t.bitfields)
+
+        def expand(value):
+            flags = t(value)
+            attrs = [(xmlname, fmt % int(value))]
+            for k, xmlk in bitfields:
+                attrs.append((xmlk, xmlattrval(getattr(flags, k))))
+            return attrs
+        return expand
+
+    @staticmethod
+    def margin_expander(xmlname):
+        positions = list((pos, '-'.join([xmlname, pos]))
+                         for pos in ('left', 'right', 'top', 'bottom'))
+
+        def expand(value):
+            return list((xmlpos, xmlattrval(value.get(pos)))
+                        for pos, xmlpos in positions)
+        return expand
+
+    @staticmethod
+    def single_expander(xmlname, formatter):
+        def expand(value):
+            return [(xmlname, formatter(value))]
+        return expand
+
+
+def xmlattribute_plan(name, t):
+    key = name, t
+    plan = _xmlattribute_plans.get(key)
+    if plan is None:
+        plan = XmlAttributePlan(name, t)
+        _xmlattribute_plans[key] = plan
+    return plan
+
+
+_xmlattribute_plans = dict()
 
 
 def startelement(context, (model, attributes)):
     if isinstance(model, StructType):
-        typed_attributes = ((v['name'], (v['type'], v['value']))
-                            for v in typed_struct_attributes(model, attributes,
-                                                             context))
+        typed_items = typed_struct_attribute_items(model, attributes,
+                                                   context)
     else:
-        typed_attributes = ((k, (type(v), v))
-                            for k, v in attributes.iteritems())
-
-    typed_attributes, plainvalues = separate_plainvalues(typed_attributes)
+        typed_items = ((k, type(v), v)
+                       for k, v in attributes.iteritems())
+
+    typed_attributes = []
+    plainvalues = dict()
+    for name, t, value in typed_items:
+        plan = xmlattribute_plan(name, t)
+        kind = plan.kind
+        if kind is COMPLEX or (kind is COMPLEX_IF_DICT and
+                               isinstance(value, dict)):
+            typed_attributes.append((name, (t, value)))
+        else:
+            plainvalues[name] = plan, value
 
     if model is Text:
         text = plainvalues.pop('text')[1]
@@ -186,8 +232,14 @@ def startelement(context, (model, attributes)):
     else:
         text = None
 
-    yield STARTEVENT, (model.__name__,
-                       xmlattributes_for_plainvalues(context, plainvalues))
+    xmlattrs = []
+    for plan, value in plainvalues.itervalues():
+        xmlattrs.extend(plan.expand(value))
+    xmlattrs_dict = dict(xmlattrs)
+    if len(xmlattrs_dict) != len(xmlattrs):
+        list(xmlattr_uniqnames(xmlattrs))
+
+    yield STARTEVENT, (model.__name__, xmlattrs_dict)
     if text:
         yield Text, text
 
@@ -227,32 +279,106 @@ def element(context, (model, attributes)):
     yield ENDEVENT, model.__name__
 
 
-def xmlevents_to_bytechunks(xmlevents, encoding='utf-8'):
+class ChunkedText(object):
+    ''' A text content which is generated chunk by chunk, every time it is
+    written: ``generate(*args)`` generates the chunks. Its chunks need no
+    escaping as a text content.
+    '''
+
+    def __init__(self, generate, *args):
+        self.generate = generate
+        self.args = args
+
+    def __iter__(self):
+        return iter(self.generate(*self.args))
+
+    def __unicode__(self):
+        return ''.join(self)
+
+
+XML_CHUNK_SIZE = 64 * 1024
+
+
+def xmlevents_to_bytechunks(xmlevents, encoding='utf-8',
+                            chunk_size=XML_CHUNK_SIZE):
+    ''' Serialize xml events into encoded chunks of about `chunk_size`.
+
+    Serialized elements are batched and encoded at once, so that the
+    consumer gets a few large writes instead of one per markup fragment.
+    '''
+    batch = []
+    batch_size = 0
     for textchunk in xmlevents_to_textchunks(xmlevents):
-        yield textchunk.encode(encoding)
+        batch.append(textchunk)
+        batch_size += len(textchunk)
+        if batch_size >= chunk_size:
+            yield ''.join(batch).encode(encoding)
+            batch = []
+            batch_size = 0
+    if batch:
+        yield ''.join(batch).encode(encoding)
 
 
 def xmlevents_to_textchunks(xmlevents):
-    entities = {'\r': '&#13;',
-                '\n': '&#10;',
-                '\t': '&#9;'}
+    ''' Serialize xml events into text; one chunk per event. '''
     for event, item in xmlevents:
         if event is STARTEVENT:
-            yield '<'
-            yield item[0]
-            for n, v in item[1].items():
-                yield ' '
-                yield n
-                yield '='
-                v = quoteattr(v, entities)
-                v = v.replace('\x00', '')
-                yield v
-            yield '>'
+            name, attributes = item
+            if attributes:
+                yield '<%s%s>' % (name, ''.join([
+                    ' %s=%s' % (n, xmlattrquote(v))
+                    for n, v in attributes.items()
+                ]))
+            else:
+                yield '<%s>' % name
         elif event is Text:
-            text = escape(item)
-            text = text.replace('\x00', '')
-            yield text
+            if isinstance(item, ChunkedText):
+                for chunk in item:
+                    yield chunk
+            else:
+                yield xmltextescape(item)
         elif event is ENDEVENT:
-            yield '</'
-            yield item
-            yield '>'
+            yield '</%s>' % item
+
+
+# Escape tables for unicode.translate(). NUL is not allowed in XML at all.
+XMLTEXT_ESCAPES = {
+    ord('&'): '&amp;',
+    ord('<'): '&lt;',
+    ord('>'): '&gt;',
+    0: None,
+}
+XMLATTR_ESCAPES = dict(XMLTEXT_ESCAPES, **{
+    ord('\r'): '&#13;',
+    ord('\n'): '&#10;',
+    ord('\t'): '&#9;',
+})
+XMLATTR_ESCAPES_QUOT = dict(XMLATTR_ESCAPES, **{
+    ord('"'): '&quot;',
+})
+
+_xmltext_needs_escape = re.compile('[&<>\x00]').search
+_xmlattr_needs_escape = re.compile('[&<>"\r\n\t\x00]').search
+
+
+def xmltextescape(text):
+    ''' Escape text content; same as `xml.sax.saxutils.escape()` but
+    strips NULs.
+    '''
+    if _xmltext_needs_escape(text) is None:
+        return text
+    return unicode(text).translate(XMLTEXT_ESCAPES)
+
+
+def xmlattrquote(value):
+    ''' Quote an attribute value; same as `xml.sax.saxutils.quoteattr()`
+    with whitespace entities, but strips NULs.
+    '''
+    if _xmlattr_needs_escape(value) is None:
+        return '"%s"' % value
+    value = unicode(value)
+    if '"' in value:
+        if "'" in value:
+            return '"%s"' % value.translate(XMLATTR_ESCAPES_QUOT)
+        return "'%s'" % value.translate(XMLATTR_ESCAPES)
+    return '"%s"' % value.translate(XMLATTR_ESCAPES)
@@ -19,6 +19,8 @@
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
+from array import array
+from bisect import bisect_right
 from collections import deque
 from itertools import chain
 from pprint import pformat
@@ -43,6 +45,7 @@ from .binmodel import ParaLineSeg
 from .binmodel import ParaCharShape
 from .binmodel import LineSeg
 from .binmodel import ParaRangeTag
+from .binmodel import PageDef
 from .binmodel import Field
 from .binmodel import ControlChar
 from .binmodel import Control
@@ -51,9 +54,9 @@ from .dataio import Struct
 from .filestructure import VERSION
 from .treeop import STARTEVENT, ENDEVENT
 from .treeop import prefix_event
-from .treeop import build_subtree
-from .treeop import tree_events
-from .treeop import tree_events_multi
+from .treeop import ArrayTree
+from .utils import cached_property
+from .xmlformat import ChunkedText
 from .xmlformat import startelement
 from .xmlformat import xmlevents_to_bytechunks
 
@@ -149,6 +152,53 @@ def line_segmented(chunks, ranged_linesegs):
         yield prev_lineseg, line
 
 
+def segment_paragraph(chunks, charshapes, linesegs):
+    ''' Split the text chunks of a paragraph at the charshape and lineseg
+    boundaries.
+
+    The starting positions of the charshapes and of the linesegs are put
+    in sorted arrays once, and are looked up with bisect as the chunks go:
+    a chunk is sliced only where it is split, once per segment.
+
+    :param chunks: ``((start, end), chunk)`` of a ParaText
+    :param charshapes: ``(pos, charshape_id)`` of a ParaCharShape
+    :param linesegs: LineSegs of a ParaLineSeg
+    :returns: ``(start, end, charshape_id, lineseg, chunk)`` of segments
+    '''
+    shape_starts = array(b'l', (pos for pos, shape in charshapes))
+    line_starts = array(b'l', (lineseg['chpos'] for lineseg in linesegs))
+    shapes_end = len(shape_starts) - 1
+    lines_end = len(line_starts) - 1
+    si = li = 0
+    for (start, end), chunk in chunks:
+        si = bisect_right(shape_starts, start, si) - 1
+        li = bisect_right(line_starts, start, li) - 1
+        if si < 0:
+            si = 0
+        if li < 0:
+            li = 0
+        pos = start
+        # control chars are never split
+        splittable = isinstance(chunk, basestring)
+        while True:
+            seg_end = end
+            if splittable:
+                if si < shapes_end and shape_starts[si + 1] < seg_end:
+                    seg_end = shape_starts[si + 1]
+                if li < lines_end and line_starts[li + 1] < seg_end:
+                    seg_end = line_starts[li + 1]
+            if seg_end == end:
+                if pos != start:
+                    chunk = chunk[pos - start:]
+                yield pos, end, charshapes[si][1], linesegs[li], chunk
+                break
+            yield (pos, seg_end, charshapes[si][1], linesegs[li],
+                   chunk[pos - start:seg_end - start])
+            pos = seg_end
+            si = bisect_right(shape_starts, pos, si) - 1
+            li = bisect_right(line_starts, pos, li) - 1
+
+
 def make_texts_linesegmented_and_charshaped(event_prefixed_mac):
     ''' lineseg/charshaped text chunks '''
 
@@ -184,14 +234,11 @@ def make_texts_linesegmented_and_charshaped(event_prefixed_mac):
 
 
 def merge_paragraph_text_charshape_lineseg(paratext, paracharshape,
-                                           paralineseg):
+                                           paralineseg, interned=None):
 
     paratext_model, paratext_attributes, paratext_context = paratext
 
-    chunks = ((range, None, chunk)
-              for range, chunk in paratext_attributes['chunks'])
     charshapes = paracharshape[1]['charshapes']
-    shaped_chunks = split_and_shape(chunks, make_ranged_shapes(charshapes))
 
     if paralineseg:
         paralineseg_content = paralineseg[1]
@@ -204,40 +251,71 @@ def merge_paragraph_text_charshape_lineseg(paratext, paracharshape,
                        space_below=0, x=0, width=0, a8=0, flags=0)
         paralineseg_content = dict(linesegs=[lineseg])
         paralineseg_context = dict()
-    linesegs = ((lineseg['chpos'], lineseg)
-                for lineseg in paralineseg_content['linesegs'])
-    lined_shaped_chunks = line_segmented(shaped_chunks,
-                                         make_ranged_shapes(linesegs))
-    for lineseg_content, shaped_chunks in lined_shaped_chunks:
-        lineseg = (LineSeg, lineseg_content, paralineseg_context)
-        chunk_events = range_shaped_textchunk_events(paratext_context,
-                                                     shaped_chunks)
-        for x in wrap_modelevents(lineseg, chunk_events):
+    if interned is None:
+        interned = dict()
+    segments = segment_paragraph(paratext_attributes['chunks'], charshapes,
+                                 paralineseg_content['linesegs'])
+    lineseg_content = None
+    lineseg = None
+    for startpos, endpos, shape, content, chunk in segments:
+        if content is not lineseg_content:
+            if lineseg is not None:
+                yield ENDEVENT, lineseg
+            lineseg_content = content
+            lineseg = (LineSeg, lineseg_content, paralineseg_context)
+            yield STARTEVENT, lineseg
+        for x in textchunk_events(paratext_context, shape, chunk, interned):
             yield x
+    if lineseg is not None:
+        yield ENDEVENT, lineseg
 
 
-def range_shaped_textchunk_events(paratext_context, range_shaped_textchunks):
+def range_shaped_textchunk_events(paratext_context, range_shaped_textchunks,
+                                  interned=None):
+    if interned is None:
+        interned = dict()
     for (startpos, endpos), (shape, none), chunk in range_shaped_textchunks:
-        if isinstance(chunk, basestring):
-            textitem = (Text,
-                        dict(text=chunk, charshape_id=shape),
-                        paratext_context)
-            yield STARTEVENT, textitem
-            yield ENDEVENT, textitem
-        elif isinstance(chunk, dict):
-            code = chunk['code']
-            uch = unichr(code)
-            name = ControlChar.get_name_by_code(code)
-            kind = ControlChar.kinds[uch]
-            chunk_attributes = dict(name=name,
-                                    code=code,
-                                    kind=kind,
-                                    charshape_id=shape)
-            if code in (0x9, 0xa, 0xd):  # http://www.w3.org/TR/xml/#NT-Char
-                chunk_attributes['char'] = uch
-            ctrlch = (ControlChar, chunk_attributes, paratext_context)
-            yield STARTEVENT, ctrlch
-            yield ENDEVENT, ctrlch
+        for x in textchunk_events(paratext_context, shape, chunk, interned):
+            yield x
+
+
+def textchunk_events(paratext_context, shape, chunk, interned):
+    ''' Start/end events of a text chunk or of a control char. '''
+    if isinstance(chunk, basestring):
+        textitem = (Text,
+                    dict(text=chunk, charshape_id=shape),
+                    paratext_context)
+        return (STARTEVENT, textitem), (ENDEVENT, textitem)
+    elif isinstance(chunk, dict):
+        code = chunk['code']
+        key = code, shape
+        events = interned.get(key)
+        if events is None:
+            events = controlchar_events(paratext_context, code, shape)
+            interned[key] = events
+        return events
+    return ()
+
+
+def controlchar_events(paratext_context, code, shape):
+    ''' Start/end events of a control char.
+
+    The events are immutable tuples and the attributes are never modified
+    by the following passes, so the occurrences of a control char in the
+    same charshape share them within a paragraph. They are not shared
+    across paragraphs: each paragraph starts with an empty `interned`.
+    '''
+    uch = unichr(code)
+    name = ControlChar.get_name_by_code(code)
+    kind = ControlChar.kinds[uch]
+    chunk_attributes = dict(name=name,
+                            code=code,
+                            kind=kind,
+                            charshape_id=shape)
+    if code in (0x9, 0xa, 0xd):  # http://www.w3.org/TR/xml/#NT-Char
+        chunk_attributes['char'] = uch
+    ctrlch = (ControlChar, chunk_attributes, paratext_context)
+    return (STARTEVENT, ctrlch), (ENDEVENT, ctrlch)
 
 
 def wrap_section(event_prefixed_mac, sect_id=None):
@@ -251,12 +329,14 @@ def wrap_section(event_prefixed_mac, sect_id=None):
         else:
             model, attributes, context = item
             if model is SectionDef and event is STARTEVENT:
-                sectiondef, sectdef_child = build_subtree(event_prefixed_mac)
+                sectiondef = item
+                tree = ArrayTree.from_subtree(sectiondef, event_prefixed_mac)
                 if sect_id is not None:
                     attributes['section_id'] = sect_id
                 yield STARTEVENT, sectiondef
-                for k in tree_events_multi(sectdef_child):
-                    yield k
+                for child in tree.children():
+                    for k in tree.events(child):
+                        yield k
                 for evented_item in starting_buffer:
                     yield evented_item
                 started = True
@@ -315,10 +395,10 @@ def make_extended_controls_inline(event_prefixed_mac, stack=None):
             for x in meci_controlchar(event, stack, item, attributes):
                 yield x
         elif issubclass(model, Control) and event == STARTEVENT:
-            control_subtree = build_subtree(event_prefixed_mac)
+            control_tree = ArrayTree.from_subtree(item, event_prefixed_mac)
             paragraph = stack[-1]
             paragraph_controls = paragraph.setdefault(Control, [])
-            paragraph_controls.append(control_subtree)
+            paragraph_controls.append(control_tree)
         else:
             yield event, item
 
@@ -337,8 +417,8 @@ def meci_controlchar(event, stack, item, attributes):
         if attributes['kind'] is ControlChar.EXTENDED:
             paragraph = stack[-1]
             paragraph_controls = paragraph.get(Control)
-            control_subtree = paragraph_controls.pop(0)
-            tev = tree_events(*control_subtree)
+            control_tree = paragraph_controls.pop(0)
+            tev = control_tree.events()
             # to evade the Control/STARTEVENT trigger
             # in parse_models_pass3()
             yield tev.next()
@@ -453,55 +533,421 @@ def restructure_tablebody(event_prefixed_mac):
 
 def rstbody_tablebody(event, stack, item, attributes, context):
     if event is STARTEVENT:
-        rowcols = deque()
-        for cols in attributes.pop('rowcols'):
-            if cols == 1:
-                rowcols.append(ROW_OPEN | ROW_CLOSE)
-            else:
-                rowcols.append(ROW_OPEN)
-                for i in range(0, cols - 2):
-                    rowcols.append(0)
-                rowcols.append(ROW_CLOSE)
-        stack.append((context, rowcols))
+        rowcols = tablebody_rowcols(attributes.pop('rowcols'))
+        # rows of a table share one (attribute-less) TableRow item
+        row = (TableRow, dict(), dict(context))
+        stack.append(((STARTEVENT, row), (ENDEVENT, row), rowcols))
         yield event, item
     else:
         yield event, item
         stack.pop()
 
 
+def tablebody_rowcols(rowcols):
+    ''' How each cell opens and/or closes a row: ROW_OPEN and ROW_CLOSE
+    flags of the cells in order, from the number of cells in each row.
+    '''
+    cells = deque()
+    for cols in rowcols:
+        if cols == 1:
+            cells.append(ROW_OPEN | ROW_CLOSE)
+        else:
+            cells.append(ROW_OPEN)
+            for i in range(0, cols - 2):
+                cells.append(0)
+            cells.append(ROW_CLOSE)
+    return cells
+
+
 def rstbody_tablecell(event, stack, item):
-    table_context, rowcols = stack[-1]
-    row_context = dict(table_context)
+    row_start, row_end, rowcols = stack[-1]
     if event is STARTEVENT:
         how = rowcols[0]
         if how & ROW_OPEN:
-            yield STARTEVENT, (TableRow, dict(), row_context)
+            yield row_start
     yield event, item
     if event is ENDEVENT:
         how = rowcols.popleft()
         if how & ROW_CLOSE:
-            yield ENDEVENT, (TableRow, dict(), row_context)
+            yield row_end
 
 
 def tokenize_text_by_lang(event_prefixed_mac):
-    ''' Group table columns in each rows and wrap them with TableRow. '''
+    ''' Split texts into runs of the same language. '''
     for event, item in event_prefixed_mac:
         (model, attributes, context) = item
         if model is Text:
             if event is STARTEVENT:
-                charshape_id = attributes['charshape_id']
-                for lang, text in tokenize_unicode_by_lang(attributes['text']):
-                    token = (Text, {
-                        'charshape_id': charshape_id,
-                        'lang': lang,
-                        'text': text,
-                    }, context)
-                    yield STARTEVENT, token
-                    yield ENDEVENT, token
+                for x in text_tokens_events(item):
+                    yield x
         else:
             yield event, item
 
 
+def text_tokens_events(item):
+    ''' Events of the runs of the same language in a Text. '''
+    model, attributes, context = item
+    text = attributes['text']
+    tokens = list(tokenize_unicode_by_lang(text))
+    if len(tokens) == 1 and tokens[0][1] == text:
+        # a text of single language: annotate it in place
+        attributes['lang'] = tokens[0][0]
+        return (STARTEVENT, item), (ENDEVENT, item)
+    events = []
+    charshape_id = attributes['charshape_id']
+    for lang, text in tokens:
+        token = (Text, {
+            'charshape_id': charshape_id,
+            'lang': lang,
+            'text': text,
+        }, context)
+        events.append((STARTEVENT, token))
+        events.append((ENDEVENT, token))
+    return events
+
+
+def restructure_section_by_passes(event_prefixed_mac, sect_id=None):
+    ''' Restructure the model events of a section into the XHWP5 structure,
+    pass by pass. This is the reference of `restructure_section()`.
+    '''
+    events = make_texts_linesegmented_and_charshaped(event_prefixed_mac)
+    events = make_extended_controls_inline(events)
+    events = match_field_start_end(events)
+    events = make_paragraphs_children_of_listheader(events)
+    events = make_paragraphs_children_of_listheader(events, TableBody,
+                                                    TableCell)
+    events = restructure_tablebody(events)
+    events = tokenize_text_by_lang(events)
+    events = wrap_section(events, sect_id)
+    events = wrap_columns(events)
+    return events
+
+
+def restructure_section(event_prefixed_mac, sect_id=None):
+    ''' Restructure the model events of a section into the XHWP5 structure,
+    in one pass. The events are the same as `restructure_section_by_passes()`
+    would generate.
+    '''
+    return SectionRestructuring(sect_id).events(event_prefixed_mac)
+
+
+class SectionRestructuring(object):
+    ''' A state machine doing what the passes of
+    `restructure_section_by_passes()` do, event by event.
+
+    The input events are read from a stack of sources: the section, and the
+    texts of a paragraph, made of its ParaText, ParaCharShape and ParaLineSeg
+    which precede its controls. As each control of a paragraph starts, the
+    texts are read up to the next extended control char, where the control
+    takes its place, and its subtree is read right from the section: nothing
+    is kept but the paragraphs still open, however large and deeply nested
+    the controls are.
+
+    Each event is put through the fields, the list headers, the table rows
+    and the texts at once, with a stack of the list headers and table bodies
+    which are adopting their following siblings. The events made of it are
+    then put through the section and the columns.
+    '''
+
+    def __init__(self, sect_id=None):
+        self.sect_id = sect_id
+        self.out = []
+
+        # paragraphs still open
+        self.paragraphs = []
+
+        # fields not closed yet
+        self.fields = []
+
+        # depth of the events, as if the list headers and the table bodies
+        # were closed where they are read, and the adopters with their depth:
+        # one of them may stop adopting only if it is deeper than the event
+        self.depth = 0
+        self.adopters = []
+
+        # events before the SectionDef
+        self.head = []
+        self.sectiondef = None
+        self.in_sectiondef = False
+
+    def events(self, event_prefixed_mac):
+        ''' Restructured events, through the section and the columns. '''
+        # depth of the events but paragraphs, ColumnSets included, and of
+        # each of the ColumnSets
+        column_depth = 0
+        columnsets = []
+        for batch in self.batches(event_prefixed_mac):
+            if self.head is not None:
+                batch = self.wrap_section(batch)
+            for event, item in batch:
+                model = item[0]
+                if model is Paragraph:
+                    if event is STARTEVENT:
+                        split = Paragraph.SplitFlags(item[1]['split'])
+                        if split.new_columnsdef:
+                            if (columnsets and
+                                    columnsets[-1][0] == column_depth):
+                                yield ENDEVENT, columnsets.pop()[1]
+                                column_depth -= 1
+                            columns = (ColumnSet, {}, {})
+                            column_depth += 1
+                            columnsets.append((column_depth, columns))
+                            yield STARTEVENT, columns
+                elif event is STARTEVENT:
+                    column_depth += 1
+                else:
+                    if columnsets and columnsets[-1][0] == column_depth:
+                        yield ENDEVENT, columnsets.pop()[1]
+                        column_depth -= 1
+                    column_depth -= 1
+                yield event, item
+
+    def batches(self, event_prefixed_mac):
+        ''' Lists of the events made of each input event, through the
+        fields, the list headers, the table rows and the texts.
+        '''
+        put = self.put
+        out = self.out
+        paragraphs = self.paragraphs
+        fields = self.fields
+        adopters = self.adopters
+        EXTENDED = ControlChar.EXTENDED
+        sources = [(iter(event_prefixed_mac), None)]
+        control = None  # a control waiting for its control char
+        while sources:
+            source, paragraph = sources[-1]
+            for event, item in source:
+                model = item[0]
+                # Texts and ControlChars come in pairs of start/end events
+                if model is Text:
+                    if event is STARTEVENT:
+                        if adopters and adopters[-1][0] > self.depth:
+                            put(event, item)
+                            put(ENDEVENT, item)
+                        else:
+                            out.extend(text_tokens_events(item))
+                elif model is ControlChar:
+                    attributes = item[1]
+                    if attributes['kind'] is EXTENDED:
+                        if event is STARTEVENT:
+                            if control is None:
+                                logger.warning('no control for %s',
+                                               attributes['name'])
+                                continue
+                            # the control takes the place of its char
+                            put(STARTEVENT, control)
+                            control = None
+                            sources.pop()
+                            break
+                    elif event is STARTEVENT:
+                        if (attributes['name'] == 'FIELD_END' or
+                                adopters and adopters[-1][0] > self.depth):
+                            put(event, item)
+                            put(ENDEVENT, item)
+                        else:
+                            out.append((event, item))
+                            out.append((ENDEVENT, item))
+                elif model is LineSeg:
+                    if fields or adopters and adopters[-1][0] > self.depth:
+                        put(event, item)
+                    else:
+                        if event is STARTEVENT:
+                            self.depth += 1
+                        else:
+                            self.depth -= 1
+                        out.append((event, item))
+                elif model is Paragraph:
+                    if event is STARTEVENT:
+                        paragraphs.append(ParagraphTexts(item))
+                        put(event, item)
+                    else:
+                        # the rest of its texts, then its end
+                        sources.append((paragraphs[-1].texts, item))
+                        break
+                elif model in PARAGRAPH_RECORDS:
+                    if event is STARTEVENT:
+                        paragraphs[-1].records[model] = item
+                elif (event is STARTEVENT and issubclass(model, Control) and
+                      paragraphs and paragraphs[-1].depth == 0):
+                    # the texts up to its control char
+                    paragraphs[-1].depth += 1
+                    control = item
+                    sources.append((paragraphs[-1].texts, None))
+                    break
+                else:
+                    if paragraphs:
+                        if event is STARTEVENT:
+                            paragraphs[-1].depth += 1
+                        else:
+                            paragraphs[-1].depth -= 1
+                    put(event, item)
+                if out:
+                    yield out
+                    del out[:]
+            else:
+                sources.pop()
+                if paragraph is not None:
+                    put(ENDEVENT, paragraph)
+                    paragraphs.pop()
+                elif control is not None:
+                    # more controls than control chars: drop the rest
+                    logger.warning('no control char for %s',
+                                   control[0].__name__)
+                    skip_subtree(sources[-1][0])
+                    paragraphs[-1].depth -= 1
+                    control = None
+        if out:
+            yield out
+        yield [(ENDEVENT, self.sectiondef)]
+
+    def put(self, event, item):
+        ''' Put an event through the fields. '''
+        model = item[0]
+        if model is LineSeg:
+            fields = self.fields
+            if event is STARTEVENT:
+                self.put_element(event, item)
+                # fields temporarily closed; open them again
+                for field_item in fields:
+                    self.put_element(STARTEVENT, field_item)
+            else:
+                # fields still not closed; temporarily close them
+                for field_item in reversed(fields):
+                    self.put_element(ENDEVENT, field_item)
+                self.put_element(event, item)
+        elif model is ControlChar and item[1]['name'] == 'FIELD_END':
+            if event is ENDEVENT:
+                if len(self.fields) > 0:
+                    self.put_element(event, self.fields.pop())
+                else:
+                    logger.warning('unmatched field end')
+        elif model is not Text and issubclass(model, Field):
+            if event is STARTEVENT:
+                self.fields.append(item)
+                self.put_element(event, item)
+        else:
+            self.put_element(event, item)
+
+    def put_element(self, event, item):
+        ''' Put an event through the list headers, the table rows and the
+        texts.
+        '''
+        model = item[0]
+        adopters = self.adopters
+        if event is STARTEVENT:
+            self.depth += 1
+            depth = self.depth
+            # a sibling which is not adopted
+            while (adopters and adopters[-1][0] == depth and
+                   model is not adopters[-1][1]):
+                self.close_adopter()
+            if model is Text:
+                self.out.extend(text_tokens_events(item))
+                return
+            if issubclass(model, ListHeader):
+                if model is TableCell:
+                    rowcols, row_start = adopters[-1][3:5]
+                    if rowcols[0] & ROW_OPEN:
+                        self.out.append(row_start)
+                adopters.append((depth, Paragraph, item, None, None, None))
+            elif model is TableBody:
+                rowcols = tablebody_rowcols(item[1].pop('rowcols'))
+                # rows of a table share one (attribute-less) TableRow item
+                row = (TableRow, dict(), dict(item[2]))
+                adopters.append((depth, TableCell, item, rowcols,
+                                 (STARTEVENT, row), (ENDEVENT, row)))
+            self.out.append((event, item))
+        else:
+            depth = self.depth
+            self.depth -= 1
+            # the parent ends
+            while adopters and adopters[-1][0] - 1 == depth:
+                self.close_adopter()
+            if model is Text:
+                return
+            if issubclass(model, ListHeader) or model is TableBody:
+                # closed when they stop adopting
+                return
+            self.out.append((event, item))
+
+    def close_adopter(self):
+        adopters = self.adopters
+        item = adopters.pop()[2]
+        self.out.append((ENDEVENT, item))
+        if item[0] is TableCell:
+            rowcols, row_start, row_end = adopters[-1][3:6]
+            if rowcols.popleft() & ROW_CLOSE:
+                self.out.append(row_end)
+
+    def wrap_section(self, events):
+        ''' Move the SectionDef and its subtree before the events preceding
+        it.
+        '''
+        wrapped = []
+        for event, item in events:
+            if self.head is None:
+                wrapped.append((event, item))
+            elif self.in_sectiondef:
+                if item[0] is SectionDef and event is ENDEVENT:
+                    wrapped.extend(self.head)
+                    self.head = None
+                else:
+                    wrapped.append((event, item))
+            elif item[0] is SectionDef and event is STARTEVENT:
+                if self.sect_id is not None:
+                    item[1]['section_id'] = self.sect_id
+                self.sectiondef = item
+                self.in_sectiondef = True
+                wrapped.append((event, item))
+            else:
+                self.head.append((event, item))
+        return wrapped
+
+
+PARAGRAPH_RECORDS = (ParaText, ParaCharShape, ParaLineSeg, ParaRangeTag)
+
+
+class ParagraphTexts(object):
+    ''' A paragraph being read, of which the texts are yet to be inlined
+    with its controls.
+    '''
+
+    def __init__(self, item):
+        self.item = item
+        self.records = dict()
+        # elements open in the paragraph, but the paragraphs
+        self.depth = 0
+
+    @cached_property
+    def texts(self):
+        ''' LineSegs with the texts and the control chars. '''
+        model, attributes, context = self.item
+        paratext = self.records.get(ParaText)
+        paracharshape = self.records.get(ParaCharShape)
+        paralineseg = self.records.get(ParaLineSeg)
+        if paratext is None:
+            paratext = (ParaText,
+                        dict(chunks=[((0, 0), '')]),
+                        dict(context))
+        return merge_paragraph_text_charshape_lineseg(paratext,
+                                                      paracharshape,
+                                                      paralineseg)
+
+
+def skip_subtree(event_prefixed_items):
+    ''' Skip the subtree of which the start event of the root is just
+    taken.
+    '''
+    depth = 1
+    for event, item in event_prefixed_items:
+        if event is STARTEVENT:
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return
+
+
 def embed_bindata(event_prefixed_mac, bindata):
     for event, item in event_prefixed_mac:
         (model, attributes, context) = item
@@ -510,27 +956,51 @@ def embed_bindata(event_prefixed_mac, bindata):
                 name = ('BIN%04X' % attributes['bindata']['storage_id']
                         + '.'
                         + attributes['bindata']['ext'])
-                bin_stream = bindata[name].open()
-                try:
-                    binary = bin_stream.read()
-                finally:
-                    bin_stream.close()
-                b64 = base64.b64encode(binary)
-                truncated = []
-                while b64:
-                    if len(b64) > 64:
-                        truncated.append(b64[:64])
-                        b64 = b64[64:]
-                    else:
-                        truncated.append(b64)
-                        b64 = ''
-                b64 = '\n'.join(truncated)
-                b64 = '\n' + b64 + '\n'
-                attributes['bindata']['<text>'] = b64
+                text = ChunkedText(base64_lines, bindata[name])
+                attributes['bindata']['<text>'] = text
                 attributes['bindata']['inline'] = 'true'
         yield event, item
 
 
+# bytes of a line of 64 base64 characters
+BASE64_LINE_SIZE = 48
+BASE64_READ_SIZE = BASE64_LINE_SIZE * 1024
+
+
+def base64_lines(stream_item):
+    ''' A binary stream in base64, in lines of 64 characters between line
+    breaks, read and encoded chunk by chunk.
+    '''
+    f = stream_item.open()
+    try:
+        yield '\n'
+        empty = True
+        pending = b''
+        while True:
+            data = f.read(BASE64_READ_SIZE)
+            if not data:
+                break
+            empty = False
+            if pending:
+                data = pending + data
+            # whole lines, even if less is read
+            size = len(data) - len(data) % BASE64_LINE_SIZE
+            pending = data[size:]
+            if size:
+                yield base64_wrap(data[:size])
+        if pending:
+            yield base64_wrap(pending)
+        elif empty:
+            yield '\n'
+    finally:
+        f.close()
+
+
+def base64_wrap(data):
+    b64 = base64.b64encode(data).decode('ascii')
+    return ''.join([b64[i:i + 64] + '\n' for i in range(0, len(b64), 64)])
+
+
 def prefix_binmodels_with_event(context, models):
     level_prefixed = ((model['level'],
                        (model['type'], model['content'], context))
@@ -553,7 +1023,7 @@ def modelevents_to_xmlevents(modelevents):
                     yield x
             elif event is ENDEVENT:
                 yield ENDEVENT, model.__name__
-        except:
+        except Exception:
             logger.error('model: %s', pformat({
                 'event': event,
                 'model': model,
@@ -729,21 +1199,184 @@ class Section(ModelEventStream):
 
     def events(self, **kwargs):
         events = self.modelevents(**kwargs)
+        section_idx = kwargs.get('section_idx')
+        return restructure_section(events, section_idx)
 
-        events = make_texts_linesegmented_and_charshaped(events)
-        events = make_extended_controls_inline(events)
-        events = match_field_start_end(events)
-        events = make_paragraphs_children_of_listheader(events)
-        events = make_paragraphs_children_of_listheader(events, TableBody,
-                                                        TableCell)
-        events = restructure_tablebody(events)
-        events = tokenize_text_by_lang(events)
 
-        section_idx = kwargs.get('section_idx')
-        events = wrap_section(events, section_idx)
-        events = wrap_columns(events)
+class Selection(object):
+    ''' A part of the body text: a range of the sections, a range of the
+    top-level paragraphs, and/or about as many pages as the lines are laid
+    out on.
 
-        return events
+    Ranges are ``(start, stop)`` as for slicing, and `stop` may be None.
+    Paragraphs are numbered from 0 through the selected sections. Pages are
+    estimated from the vertical positions of the lines in the LineSegs, the
+    page breaks and the height of the PageDef: a page ends where the lines
+    go up again, and a section starts another one.
+
+    Sections out of the range are not read at all, and the reading stops as
+    soon as the selection is exhausted: the cost is proportional to where the
+    selection ends rather than to the whole document.
+    '''
+
+    def __init__(self, sections=None, paragraphs=None, pages=None):
+        self.sections = sections
+        self.paragraphs = paragraphs
+        self.pages = pages
+
+    def __repr__(self):
+        return 'Selection(sections=%r, paragraphs=%r, pages=%r)' % (
+            self.sections, self.paragraphs, self.pages
+        )
+
+    def section_indexes(self, sections):
+        ''' Indexes of the selected sections of a `Sections`. '''
+        for idx in sections.section_indexes():
+            if self.sections is not None:
+                start, stop = self.sections
+                if stop is not None and idx >= stop:
+                    return
+                if idx < start:
+                    continue
+            yield idx
+
+    def section_events(self, sections, **kwargs):
+        ''' Events of the selected part of each selected section of a
+        `Sections`, as ``(idx, events)``. Each one should be consumed before
+        the next one is taken.
+        '''
+        if self.paragraphs is None and self.pages is None:
+            for idx in self.section_indexes(sections):
+                kwargs['section_idx'] = idx
+                yield idx, sections.section(idx).events(**kwargs)
+            return
+        cursor = SelectionCursor(self)
+        for idx in self.section_indexes(sections):
+            if cursor.exhausted:
+                return
+            kwargs['section_idx'] = idx
+            events = sections.section(idx).events(**kwargs)
+            yield idx, cursor.select(events)
+
+
+class SelectionCursor(object):
+    ''' Where a reading of a `Selection` is. '''
+
+    def __init__(self, selection):
+        self.selection = selection
+        self.exhausted = False
+        self.paragraph_idx = 0
+        self.page = 0
+        self.page_height = 0
+        self.y = None
+
+    def select(self, events):
+        ''' Filter the events of a section: top-level paragraphs out of the
+        selection are dropped, and the section is closed as soon as the
+        selection is exhausted. A section without any selected paragraph is
+        dropped as a whole.
+        '''
+        events = iter(events)
+        if self.y is not None:
+            self.new_page()
+        stack = []
+        pending = []
+        for event, item in events:
+            model, attributes, context = item
+            if event is STARTEVENT and model is Paragraph:
+                # a top-level one: the nested ones are in its subtree
+                tree = ArrayTree.from_subtree(item, events)
+                if self.select_paragraph(item, tree):
+                    if pending is not None:
+                        for x in pending:
+                            yield x
+                        pending = None
+                    for x in tree.events():
+                        yield x
+                if self.exhausted:
+                    break
+                continue
+            if event is STARTEVENT:
+                if model is PageDef:
+                    self.page_height = pagedef_body_height(attributes)
+                stack.append(item)
+            else:
+                stack.pop()
+            if pending is None:
+                yield event, item
+            else:
+                pending.append((event, item))
+        else:
+            return
+        # stop reading the section
+        close = getattr(events, 'close', None)
+        if close is not None:
+            close()
+        if pending is None:
+            while stack:
+                yield ENDEVENT, stack.pop()
+
+    def select_paragraph(self, paragraph, tree):
+        selection = self.selection
+        paragraph_idx = self.paragraph_idx
+        self.paragraph_idx += 1
+        if selection.pages is not None:
+            if self.paragraph_page(paragraph, tree) >= selection.pages:
+                self.exhausted = True
+                return False
+        if selection.paragraphs is None:
+            return True
+        start, stop = selection.paragraphs
+        if stop is None:
+            return start <= paragraph_idx
+        if paragraph_idx + 1 >= stop:
+            # no need to read any further
+            self.exhausted = True
+        return start <= paragraph_idx < stop
+
+    def paragraph_page(self, paragraph, tree):
+        ''' Page where a top-level paragraph starts, estimated from the
+        LineSegs in its `ArrayTree`.
+        '''
+        model, attributes, context = paragraph
+        split = Paragraph.SplitFlags(attributes['split'])
+        if split.new_page and self.y is not None:
+            self.new_page()
+        page = None
+        items = tree.items
+        for child in tree.children():
+            model, attributes, context = items[child]
+            if model is not LineSeg:
+                continue
+            y = attributes['y']
+            if self.y is not None and y < self.y:
+                self.new_page()
+            self.y = y
+            if page is None:
+                page = self.current_page()
+        if page is None:
+            page = self.current_page()
+        return page
+
+    def current_page(self):
+        if self.y is None or self.page_height <= 0:
+            return self.page
+        return self.page + self.y // self.page_height
+
+    def new_page(self):
+        self.page = self.current_page() + 1
+        self.y = None
+
+
+def pagedef_body_height(attributes):
+    ''' Height of the body area of a PageDef '''
+    flags = PageDef.Flags(attributes['attr'])
+    if flags.orientation == PageDef.Orientation.LANDSCAPE:
+        return (attributes['width'] - attributes['left_offset'] -
+                attributes['right_offset'])
+    return (attributes['height'] -
+            attributes['top_offset'] - attributes['header_offset'] -
+            attributes['bottom_offset'] - attributes['footer_offset'])
 
 
 class Sections(binmodel.Sections, XmlEventsMixin):
@@ -751,16 +1384,14 @@ class Sections(binmodel.Sections, XmlEventsMixin):
     section_class = Section
 
     def events(self, **kwargs):
-        bodytext_events = []
-        for idx in self.section_indexes():
-            kwargs['section_idx'] = idx
-            section = self.section(idx)
-            events = section.events(**kwargs)
-            bodytext_events.append(events)
+        selection = kwargs.pop('selection', None) or Selection()
+        bodytext_events = (
+            events for idx, events in selection.section_events(self, **kwargs)
+        )
 
         class BodyText(object):
             pass
-        bodytext_events = chain(*bodytext_events)
+        bodytext_events = chain.from_iterable(bodytext_events)
         bodytext = BodyText, dict(), dict()
         return wrap_modelevents(bodytext, bodytext_events)
 
@@ -789,9 +1420,10 @@ class Hwp5File(binmodel.Hwp5File, XmlEventsMixin):
         else:
             kwargs.pop('embedbin', None)
 
+        selection = kwargs.pop('selection', None)
         events = chain(self.summaryinfo.events(**kwargs),
                        self.docinfo.events(**kwargs),
-                       self.text.events(**kwargs))
+                       self.text.events(selection=selection, **kwargs))
 
         hwpdoc = HwpDoc, dict(version=self.header.version), dict()
         events = wrap_modelevents(hwpdoc, events)
@@ -2,13 +2,24 @@
 <xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
     <xsl:output method="text" media-type="text/css" encoding="utf-8" indent="no" />
 
+    <!--
+      DocInfo tables indexed by their ids, so that resolving a style of a
+      paragraph or a text run does not scan the whole document.
+    -->
+    <xsl:key name="Style" match="IdMappings/Style" use="count(preceding-sibling::Style)" />
+    <xsl:key name="ParaShape" match="IdMappings/ParaShape" use="count(preceding-sibling::ParaShape)" />
+    <xsl:key name="CharShape" match="IdMappings/CharShape" use="count(preceding-sibling::CharShape)" />
+    <xsl:key name="FaceName" match="IdMappings/FaceName" use="count(preceding-sibling::FaceName)" />
+
+    <xsl:variable name="idmappings" select="/HwpDoc/DocInfo/IdMappings" />
+
     <xsl:variable name="facenamebaseko" select="1" />
-    <xsl:variable name="facenamebaseen" select="$facenamebaseko + //IdMappings/@ko-fonts" />
-    <xsl:variable name="facenamebasecn" select="$facenamebaseen + //IdMappings/@en-fonts" />
-    <xsl:variable name="facenamebasejp" select="$facenamebasecn + //IdMappings/@cn-fonts" />
-    <xsl:variable name="facenamebaseot" select="$facenamebasejp + //IdMappings/@jp-fonts" />
-    <xsl:variable name="facenamebasesy" select="$facenamebaseot + //IdMappings/@other-fonts" />
-    <xsl:variable name="facenamebaseus" select="$facenamebasesy + //IdMappings/@symbol-fonts" />
+    <xsl:variable name="facenamebaseen" select="$facenamebaseko + $idmappings/@ko-fonts" />
+    <xsl:variable name="facenamebasecn" select="$facenamebaseen + $idmappings/@en-fonts" />
+    <xsl:variable name="facenamebasejp" select="$facenamebasecn + $idmappings/@cn-fonts" />
+    <xsl:variable name="facenamebaseot" select="$facenamebasejp + $idmappings/@jp-fonts" />
+    <xsl:variable name="facenamebasesy" select="$facenamebaseot + $idmappings/@other-fonts" />
+    <xsl:variable name="facenamebaseus" select="$facenamebasesy + $idmappings/@symbol-fonts" />
 
     <xsl:template match="IdMappings" mode="css-rule">
         <xsl:text>/* Styles */&#10;</xsl:text>
@@ -32,8 +43,7 @@
             <xsl:text>span</xsl:text>
         </xsl:variable>
         <xsl:if test="@kind = 'paragraph'">
-            <xsl:variable name="parashape_pos" select="@parashape-id + 1" />
-            <xsl:variable name="parashape" select="//ParaShape[$parashape_pos]" />
+            <xsl:variable name="parashape" select="key('ParaShape', number(@parashape-id))" />
             <xsl:call-template name="css-rule">
                 <xsl:with-param name="selector" select="$paragraph-selector" />
                 <xsl:with-param name="declarations">
@@ -56,8 +66,7 @@
         <xsl:text>@charshape-id = </xsl:text>
         <xsl:value-of select="@charshape-id" />
         <xsl:text>*/&#10;</xsl:text>
-        <xsl:variable name="charshape_pos" select="number(@charshape-id) + 1" />
-        <xsl:variable name="charshape" select="//CharShape[$charshape_pos]" />
+        <xsl:variable name="charshape" select="key('CharShape', number(@charshape-id))" />
         <xsl:for-each select="$charshape">
             <xsl:call-template name="charshape-css-rule">
                 <xsl:with-param name="charshape-selector" select="$spans-selector" />
@@ -202,8 +211,7 @@
     </xsl:template>
 
     <xsl:template match="Paragraph|Style" mode="add-class-bullet">
-        <xsl:variable name="parashape_pos" select="number(@parashape-id) + 1" />
-        <xsl:variable name="parashape" select="//ParaShape[$parashape_pos]" />
+        <xsl:variable name="parashape" select="key('ParaShape', number(@parashape-id))" />
         <xsl:variable name="bullet_id" select="$parashape/@numbering-bullet-id" />
         <xsl:if test="$bullet_id &gt; 0">
             <xsl:text> </xsl:text>
@@ -319,8 +327,9 @@
                 <xsl:call-template name="css-declaration">
                     <xsl:with-param name="property">font-family</xsl:with-param>
                     <xsl:with-param name="value">
-                        <xsl:apply-templates select="//FaceName[$facename-idx]" mode="font-family-value" />
-                        <xsl:apply-templates select="//FaceName[$facename-idx]" mode="font-family-generic-value" />
+                        <xsl:variable name="facename" select="key('FaceName', $facename-idx - 1)" />
+                        <xsl:apply-templates select="$facename" mode="font-family-value" />
+                        <xsl:apply-templates select="$facename" mode="font-family-generic-value" />
                     </xsl:with-param>
                 </xsl:call-template>
                 <xsl:call-template name="css-declaration">
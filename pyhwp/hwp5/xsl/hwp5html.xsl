@@ -9,6 +9,9 @@
 
   <xsl:param name="embed-styles-css" select="0" />
 
+  <!-- BinData ids are 1-based -->
+  <xsl:key name="BinData" match="IdMappings/BinData" use="count(preceding-sibling::BinData) + 1" />
+
   <xsl:template match="/">
     <xsl:apply-templates select="HwpDoc" mode="html" />
   </xsl:template>
@@ -106,12 +109,10 @@
 
   <xsl:template match="Paragraph">
     <xsl:element name="p">
-      <xsl:variable name="styleid" select="@style-id"/>
-      <xsl:variable name="style" select="//Style[number($styleid)+1]" />
+      <xsl:variable name="style" select="key('Style', number(@style-id))" />
       <xsl:variable name="stylename" select="$style/@name" />
       <xsl:variable name="stylencname" select="translate($stylename, ' ', '-')" />
-      <xsl:variable name="parashape_pos" select="number(@parashape-id) + 1" />
-      <xsl:variable name="parashape" select="//ParaShape[$parashape_pos]" />
+      <xsl:variable name="parashape" select="key('ParaShape', number(@parashape-id))" />
       <xsl:attribute name="class">
         <xsl:value-of select="$stylencname" />
         <xsl:choose>
@@ -138,8 +139,7 @@
 
   <xsl:template match="Paragraph/LineSeg/Text">
     <xsl:element name="span">
-      <xsl:variable name="styleid" select="../../@style-id"/>
-      <xsl:variable name="style" select="//Style[number($styleid)+1]" />
+      <xsl:variable name="style" select="key('Style', number(../../@style-id))" />
       <xsl:variable name="stylename" select="$style/@name" />
       <xsl:variable name="stylencname" select="translate($stylename, ' ', '-')" />
       <xsl:attribute name="class">
@@ -355,7 +355,7 @@
 
   <xsl:template match="ShapePicture">
     <xsl:variable name="bindataid" select="PictureInfo/@bindata-id"/>
-    <xsl:variable name="bindata" select="/HwpDoc/DocInfo/IdMappings/BinData[number($bindataid)]"/>
+    <xsl:variable name="bindata" select="key('BinData', number($bindataid))"/>
     <xsl:element name="img">
       <xsl:apply-templates select="$bindata" mode="img-src"/>
       <xsl:attribute name="style">
@@ -436,8 +436,7 @@
 
   <xsl:template match="TableControl|GShapeObjectControl" mode="extendedcontrol-hpos">
     <xsl:variable name="paragraph" select="../.." />
-    <xsl:variable name="parashape_pos" select="number($paragraph/@parashape-id) + 1" />
-    <xsl:variable name="parashape" select="//ParaShape[$parashape_pos]" />
+    <xsl:variable name="parashape" select="key('ParaShape', number($paragraph/@parashape-id))" />
     <xsl:variable name="columnset" select="$paragraph/.." />
     <xsl:variable name="section" select="$columnset/.." />
     <xsl:variable name="pagedef" select="$section/PageDef" />
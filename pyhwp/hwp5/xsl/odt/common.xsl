@@ -34,6 +34,15 @@
   xmlns:css3t="http://www.w3.org/TR/css3-text/">
   <xsl:output method="xml" encoding="utf-8" indent="yes" />
 
+  <!--
+    DocInfo tables indexed by their ids, so that resolving a style of a
+    paragraph or a text run does not scan the whole document.
+  -->
+  <xsl:key name="Style" match="IdMappings/Style" use="count(preceding-sibling::Style)" />
+  <xsl:key name="ParaShape" match="IdMappings/ParaShape" use="count(preceding-sibling::ParaShape)" />
+  <xsl:key name="CharShape" match="IdMappings/CharShape" use="count(preceding-sibling::CharShape)" />
+  <xsl:key name="FaceName" match="IdMappings/FaceName" use="count(preceding-sibling::FaceName)" />
+
   <xsl:template mode="office:document" match="HwpDoc">
     <office:document
       office:version="1.2"
@@ -541,8 +550,7 @@
   </xsl:template>
 
   <xsl:template mode="style:font-name" match="FontFace">
-    <xsl:variable name="facename-en-id" select="@en + 1"/>
-    <xsl:apply-templates mode="style:font-name" select="//FaceName[$facename-en-id]" />
+    <xsl:apply-templates mode="style:font-name" select="key('FaceName', number(@en))" />
   </xsl:template>
 
   <xsl:template mode="style:font-name" match="FaceName">
@@ -550,8 +558,7 @@
   </xsl:template>
 
   <xsl:template mode="style:font-name-asian" match="FontFace">
-    <xsl:variable name="facename-ko-id" select="@ko + 1"/>
-    <xsl:apply-templates mode="style:font-name-asian" select="//FaceName[$facename-ko-id]" />
+    <xsl:apply-templates mode="style:font-name-asian" select="key('FaceName', number(@ko))" />
   </xsl:template>
 
   <xsl:template mode="style:font-name-asian" match="FaceName">
@@ -714,7 +721,7 @@
 
   <xsl:template mode="style-style-for-paragraph-and-text" match="Paragraph">
     <xsl:variable name="style-id" select="@style-id + 1" />
-    <xsl:variable name="style" select="//Style[$style-id]"/>
+    <xsl:variable name="style" select="key('Style', $style-id - 1)"/>
 
     <xsl:apply-templates mode="style:style" select="." />
 
@@ -750,7 +757,7 @@
         <xsl:attribute name="style:name">
           <xsl:value-of select="$style-name" />
         </xsl:attribute>
-        <xsl:apply-templates select="//CharShape[$charshape-id]" mode="style:text-properties" />
+        <xsl:apply-templates select="key('CharShape', $charshape-id - 1)" mode="style:text-properties" />
       </xsl:element>
     </xsl:if>
   </xsl:template>
@@ -758,10 +765,10 @@
   <xsl:template mode="style:style" match="Paragraph">
     <xsl:variable name="paragraph-id" select="@paragraph-id + 1"/>
     <xsl:variable name="style-id" select="@style-id + 1" />
-    <xsl:variable name="style" select="//Style[$style-id]"/>
+    <xsl:variable name="style" select="key('Style', $style-id - 1)"/>
     <xsl:variable name="style-parashape-id" select="$style/@parashape-id + 1"/>
     <xsl:variable name="parashape-id" select="@parashape-id + 1"/>
-    <xsl:variable name="parashape" select="//ParaShape[$parashape-id]"/>
+    <xsl:variable name="parashape" select="key('ParaShape', $parashape-id - 1)"/>
     <xsl:if test="$style-parashape-id != $parashape-id or @new-page = '1'">
       <xsl:element name="style:style">
         <xsl:attribute name="style:family">paragraph</xsl:attribute>
@@ -844,7 +851,7 @@
       <style:tab-stops> 17.7
     -->
     <xsl:variable name="parashape-id" select="@parashape-id + 1"/>
-    <xsl:variable name="parashape" select="//ParaShape[$parashape-id]"/>
+    <xsl:variable name="parashape" select="key('ParaShape', $parashape-id - 1)"/>
     <xsl:element name="style:paragraph-properties">
       <xsl:apply-templates mode="style-paragraph-properties-common" select="$parashape" />
       <xsl:if test="@new-page = '1'">
@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+#
+#   pyhwp : hwp file format parser in python
+#   Copyright (C) 2010-2019 mete0r <mete0r@sarangbang.or.kr>
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+''' Helpers for writers which reproduce the output of the XSL stylesheets.
+
+The native writers walk XHWP5 elements built from the xml events of
+`hwp5.xmlmodel`, and have to come up with exactly what libxslt would have
+written: XPath number conversions and formatting, and the serialization of
+the result tree.
+'''
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+import logging
+import math
+import re
+import shutil
+
+from .treeop import STARTEVENT
+from .treeop import ENDEVENT
+from .xmlformat import ChunkedText
+
+
+logger = logging.getLogger(__name__)
+
+
+NAN = float('nan')
+INF = float('inf')
+
+
+class Element(object):
+    ''' A XHWP5 element, as the stylesheets see it.
+
+    `text` is the text content which precedes the child elements; XHWP5
+    has no mixed content otherwise.
+    '''
+
+    __slots__ = ('tag', 'attrib', 'text', 'children', 'parent')
+
+    def __init__(self, tag, attrib, parent=None):
+        self.tag = tag
+        self.attrib = attrib
+        self.text = None
+        self.children = []
+        self.parent = parent
+
+    def get(self, name, default=None):
+        return self.attrib.get(name, default)
+
+    def find(self, tag):
+        for child in self.children:
+            if child.tag == tag:
+                return child
+
+    def findall(self, tag):
+        return [child for child in self.children if child.tag == tag]
+
+    def findattr(self, tag, name):
+        ''' String value of `tag/@name`, i.e. of the first `tag` child
+        which has the attribute; None if there is no such one.
+        '''
+        for child in self.children:
+            if child.tag == tag and name in child.attrib:
+                return child.attrib[name]
+
+    def iter(self):
+        ''' Iterate this element and its descendants in document order. '''
+        stack = [self]
+        while stack:
+            element = stack.pop()
+            yield element
+            stack.extend(reversed(element.children))
+
+
+def normalize_text(text):
+    ''' Text content as it comes out of parsing the serialized XHWP5:
+    line breaks are normalized and NULs were never written.
+    '''
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if '\x00' in text:
+        text = text.replace('\x00', '')
+    return text
+
+
+def iter_elements(xmlevents, on_end):
+    ''' Build `Element`s from xml events of `hwp5.xmlmodel`.
+
+    `on_end(element)` is called for every element once it is complete, and
+    may detach it from its parent to keep the memory usage bounded; the
+    values it returns, if not None, are yielded.
+    '''
+    stack = []
+    for event, item in xmlevents:
+        if event is STARTEVENT:
+            name, attrib = item
+            parent = stack[-1] if stack else None
+            element = Element(name, attrib, parent)
+            if parent is not None:
+                parent.children.append(element)
+            stack.append(element)
+        elif event is ENDEVENT:
+            result = on_end(stack.pop())
+            if result is not None:
+                yield result
+        elif isinstance(item, ChunkedText):
+            # generated when it is written
+            stack[-1].text = item
+        else:
+            stack[-1].text = normalize_text(item)
+
+
+def detach(element):
+    ''' Remove a just completed element from its parent. '''
+    parent = element.parent
+    if parent is not None:
+        assert parent.children[-1] is element
+        parent.children.pop()
+        element.parent = None
+
+
+#
+# XPath 1.0 numbers, the way libxml2 does them
+#
+
+_number_pattern = re.compile(r'''
+    ^[ \t\r\n]*
+    (?P<neg>-)?
+    (?P<int>[0-9]*)
+    (?:\.(?P<frac>[0-9]*))?
+    (?:[eE](?P<expsign>[-+])?(?P<exp>[0-9]*))?
+    [ \t\r\n]*$
+''', re.VERBOSE)
+
+MAX_FRAC = 20
+
+
+def number(value):
+    ''' XPath `number()` of a string value; None stands for an empty
+    node-set.
+    '''
+    if value is None:
+        return NAN
+    m = _number_pattern.match(value)
+    if m is None:
+        return NAN
+    intpart = m.group('int')
+    frac = m.group('frac')
+    if frac is None:
+        if not intpart and not m.group('neg'):
+            return NAN
+    elif not intpart and not frac:
+        return NAN
+
+    # accumulate digits the way xmlXPathStringEvalNumber() does
+    ret = 0.0
+    for ch in intpart:
+        ret = ret * 10 + (ord(ch) - 48)
+    if frac:
+        zeros = len(frac) - len(frac.lstrip('0'))
+        digits = frac[zeros:zeros + MAX_FRAC]
+        fraction = 0.0
+        for ch in digits:
+            fraction = fraction * 10 + (ord(ch) - 48)
+        fraction /= math.pow(10.0, zeros + len(digits))
+        ret = ret + fraction
+
+    exponent = 0
+    for ch in m.group('exp') or '':
+        if exponent < 1000000:
+            exponent = exponent * 10 + (ord(ch) - 48)
+    if m.group('neg'):
+        ret = -ret
+    if m.group('expsign') == '-':
+        exponent = -exponent
+    try:
+        return ret * math.pow(10.0, exponent)
+    except OverflowError:
+        return ret * INF
+
+
+def string(value):
+    ''' XPath `string()` of a number, as formatted by libxml2. '''
+    if value != value:
+        return 'NaN'
+    if value == INF:
+        return 'Infinity'
+    if value == -INF:
+        return '-Infinity'
+    if value == 0:
+        return '0'
+    if -2147483648 < value < 2147483647 and value == int(value):
+        return '%d' % value
+
+    absolute = abs(value)
+    if absolute > 1e9 or absolute < 1e-5:
+        formatted = '%*.*e' % (21, 14, value)
+        mantissa, exponent = formatted.strip().split('e')
+        return _strip_fraction_zeros(mantissa) + 'e' + exponent
+    integer_place = int(math.log10(absolute))
+    if integer_place > 0:
+        fraction_place = 15 - integer_place - 1
+    else:
+        fraction_place = 15 - integer_place
+    return _strip_fraction_zeros('%0.*f' % (fraction_place, value))
+
+
+def _strip_fraction_zeros(s):
+    if '.' in s:
+        s = s.rstrip('0')
+        if s.endswith('.'):
+            s = s[:-1]
+    return s
+
+
+def xround(value):
+    ''' XPath `round()` '''
+    if value != value or value in (INF, -INF):
+        return value
+    if -0.5 <= value < 0.5:
+        return value * 0.0
+    rounded = math.floor(value)
+    if value - rounded >= 0.5:
+        rounded += 1.0
+    return rounded
+
+
+def nth(elements, position):
+    ''' `elements[position]` of XPath: 1-based; None if there is no such
+    position.
+    '''
+    if 1 <= position <= len(elements) and position == int(position):
+        return elements[int(position) - 1]
+
+
+def keyed(elements, value):
+    ''' `key(name, value)` where the key is `count(preceding-sibling::*)`
+    of `elements`
+    '''
+    if 0 <= value < len(elements) and value == int(value):
+        return elements[int(value)]
+
+
+#
+# Serialization, the way libxml2 saves a result document
+#
+
+_text_escapes = {
+    ord('&'): '&amp;',
+    ord('<'): '&lt;',
+    ord('>'): '&gt;',
+    ord('\r'): '&#13;',
+    0: None,
+}
+_attr_escapes = dict(_text_escapes, **{
+    ord('"'): '&quot;',
+    ord('\n'): '&#10;',
+    ord('\t'): '&#9;',
+})
+_text_needs_escape = re.compile('[&<>\r\x00]').search
+_attr_needs_escape = re.compile('[&<>"\r\n\t\x00]').search
+
+
+def escape_text(text):
+    if _text_needs_escape(text) is None:
+        return text
+    return unicode(text).translate(_text_escapes)
+
+
+def escape_attr(value):
+    if _attr_needs_escape(value) is None:
+        return value
+    return unicode(value).translate(_attr_escapes)
+
+
+XML_DECLARATION = '<?xml version="1.0" encoding="utf-8"?>\n'
+CHUNK_SIZE = 64 * 1024
+
+
+class XmlWriter(object):
+    ''' Write a result tree as libxml2 would serialize it.
+
+    Empty elements are closed with ``/>``. With `indent`, the elements are
+    put on their own lines, two spaces per level, as with ``<xsl:output
+    indent="yes"/>``; such outputs have no text content.
+    '''
+
+    def __init__(self, f, indent=False, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.indent = indent
+        self.chunk_size = chunk_size
+        self.chunks = []
+        self.size = 0
+        self.depth = 0
+        self.pending = False
+
+    def write(self, s):
+        self.chunks.append(s)
+        self.size += len(s)
+        if self.size >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.chunks:
+            self.f.write(''.join(self.chunks).encode('utf-8'))
+            self.chunks = []
+            self.size = 0
+
+    def declaration(self):
+        self.write(XML_DECLARATION)
+
+    def start(self, name, attrs=()):
+        if self.pending:
+            self.write('>')
+        if self.indent and self.depth:
+            self.write('\n' + '  ' * self.depth)
+        chunks = ['<', name]
+        for n, v in attrs:
+            if isinstance(v, ChunkedText):
+                self.write(''.join(chunks))
+                chunks = []
+                self.write(' %s="' % n)
+                for chunk in v:
+                    self.write(escape_attr(chunk))
+                self.write('"')
+            else:
+                chunks.append(' %s="%s"' % (n, escape_attr(v)))
+        self.write(''.join(chunks))
+        self.pending = True
+        self.depth += 1
+
+    def end(self, name):
+        self.depth -= 1
+        if self.pending:
+            self.write('/>')
+            self.pending = False
+        else:
+            if self.indent:
+                self.write('\n' + '  ' * self.depth)
+            self.write('</' + name + '>')
+        if self.indent and self.depth == 0:
+            self.write('\n')
+
+    def empty(self, name, attrs=()):
+        self.start(name, attrs)
+        self.end(name)
+
+    def text(self, text):
+        if not text:
+            return
+        if self.pending:
+            self.write('>')
+            self.pending = False
+        if isinstance(text, ChunkedText):
+            for chunk in text:
+                self.write(chunk)
+        else:
+            self.write(escape_text(text))
+
+    def copy(self, f):
+        ''' Copy the content serialized into another file. '''
+        if f.tell() == 0:
+            return
+        if self.pending:
+            self.write('>')
+            self.pending = False
+        self.flush()
+        f.seek(0)
+        shutil.copyfileobj(f, self.f)
+
+    def tree(self, nodes):
+        ''' Write literal result elements of the form
+        ``(name, attrs, children)``.
+        '''
+        for name, attrs, children in nodes:
+            self.start(name, attrs)
+            self.tree(children)
+            self.end(name)
+
+
+# elements which libxml2 closes with `` />`` in XHTML 1.0 documents
+XHTML_EMPTY_ELEMENTS = frozenset([
+    'area', 'base', 'basefont', 'br', 'col', 'frame', 'hr', 'img', 'input',
+    'isindex', 'link', 'meta', 'param',
+])
+
+
+class XhtmlWriter(XmlWriter):
+    ''' Write a result tree as libxml2 serializes XHTML 1.0 documents:
+    the empty elements of XHTML are closed with `` />``, and the others
+    always get an end tag.
+    '''
+
+    def doctype(self, name, public_id, system_id):
+        self.write('<!DOCTYPE %s PUBLIC "%s" "%s">' % (name, public_id,
+                                                       system_id))
+
+    def end(self, name):
+        if not self.pending:
+            return XmlWriter.end(self, name)
+        self.depth -= 1
+        self.pending = False
+        if name in XHTML_EMPTY_ELEMENTS:
+            self.write(' />')
+        else:
+            self.write('></' + name + '>')
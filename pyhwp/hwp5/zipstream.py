@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+#
+#   pyhwp : hwp file format parser in python
+#   Copyright (C) 2010-2019 mete0r <mete0r@sarangbang.or.kr>
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+''' Chunked writing of zip entries.
+
+`zipfile.ZipFile.writestr()` wants the whole content of an entry at once,
+and Python 2 has no ``ZipFile.open(name, 'w')``. These write an entry chunk
+by chunk the way `ZipFile.write()` does for files on disk: the local header
+is written first and patched with the CRC and the sizes at the end, so the
+zip file has to be seekable.
+'''
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from tempfile import SpooledTemporaryFile
+from zipfile import ZIP64_LIMIT
+from zipfile import ZIP_DEFLATED
+from zipfile import ZIP_STORED
+from zipfile import LargeZipFile
+from zipfile import ZipInfo
+import logging
+import os.path
+import shutil
+import time
+import zlib
+
+
+logger = logging.getLogger(__name__)
+
+
+CHUNK_SIZE = 64 * 1024
+
+# deflated entries prepared off the zip file are kept in memory up to this
+SPOOL_MAX_SIZE = 1024 * 1024
+
+# media which are compressed already; deflating them again gains nothing
+COMPRESSED_MEDIA_TYPES = frozenset([
+    'image/gif',
+    'image/jpeg',
+    'image/png',
+    'application/zip',
+])
+COMPRESSED_EXTENSIONS = frozenset([
+    '.gif',
+    '.jpg',
+    '.jpeg',
+    '.png',
+    '.zip',
+    '.gz',
+    '.bz2',
+])
+
+
+def compress_type_for(path, media_type, compression=ZIP_DEFLATED):
+    ''' Compression of an entry: stored if its content is compressed
+    already, `compression` otherwise.
+    '''
+    if media_type in COMPRESSED_MEDIA_TYPES:
+        return ZIP_STORED
+    ext = os.path.splitext(path)[1].lower()
+    if ext in COMPRESSED_EXTENSIONS:
+        return ZIP_STORED
+    return compression
+
+
+def make_zipinfo(arcname, compress_type):
+    ''' ZipInfo as `ZipFile.writestr()` makes for an arcname. '''
+    zinfo = ZipInfo(filename=arcname,
+                    date_time=time.localtime(time.time())[:6])
+    zinfo.compress_type = compress_type
+    zinfo.external_attr = 0o600 << 16
+    return zinfo
+
+
+class ZipEntryWriter(object):
+    ''' A writable file-like entry of a ZipFile.
+
+    Nothing else should be written to the ZipFile until this is closed.
+    '''
+
+    def __init__(self, zf, arcname, compress_type=ZIP_DEFLATED):
+        if not zf.fp:
+            raise RuntimeError('Attempt to write to ZIP archive that was '
+                               'already closed')
+        zinfo = make_zipinfo(arcname, compress_type)
+        zinfo.file_size = 0
+        zinfo.compress_size = 0
+        zinfo.CRC = 0
+        zinfo.header_offset = zf.fp.tell()
+        zf._writecheck(zinfo)
+        zf._didModify = True
+        zf.fp.write(zinfo.FileHeader(False))
+
+        if compress_type == ZIP_DEFLATED:
+            self.compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION,
+                                               zlib.DEFLATED, -15)
+        else:
+            self.compressor = None
+        self.zf = zf
+        self.zinfo = zinfo
+        self.closed = False
+
+    def write(self, data):
+        zinfo = self.zinfo
+        zinfo.file_size += len(data)
+        zinfo.CRC = zlib.crc32(data, zinfo.CRC) & 0xffffffff
+        if self.compressor:
+            data = self.compressor.compress(data)
+        zinfo.compress_size += len(data)
+        self.zf.fp.write(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        zf = self.zf
+        zinfo = self.zinfo
+        if self.compressor:
+            data = self.compressor.flush()
+            zinfo.compress_size += len(data)
+            zf.fp.write(data)
+        if zinfo.file_size > ZIP64_LIMIT or zinfo.compress_size > ZIP64_LIMIT:
+            raise LargeZipFile('Filesize would require ZIP64 extensions')
+
+        position = zf.fp.tell()
+        zf.fp.seek(zinfo.header_offset, 0)
+        zf.fp.write(zinfo.FileHeader(False))
+        zf.fp.seek(position, 0)
+        zf.filelist.append(zinfo)
+        zf.NameToInfo[zinfo.filename] = zinfo
+
+
+def write_stream(zf, f, arcname, compress_type=ZIP_DEFLATED):
+    ''' Write a readable stream into a ZipFile, chunk by chunk. '''
+    writer = ZipEntryWriter(zf, arcname, compress_type)
+    shutil.copyfileobj(f, writer, CHUNK_SIZE)
+    writer.close()
+
+
+class DeflatedStream(object):
+    ''' A stream deflated ahead of being written into a ZipFile, e.g. in
+    another thread.
+    '''
+
+    def __init__(self, f):
+        self.spool = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self.file_size = 0
+        self.CRC = 0
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION,
+                                      zlib.DEFLATED, -15)
+        while True:
+            data = f.read(CHUNK_SIZE)
+            if not data:
+                break
+            self.file_size += len(data)
+            self.CRC = zlib.crc32(data, self.CRC) & 0xffffffff
+            self.spool.write(compressor.compress(data))
+        self.spool.write(compressor.flush())
+        self.compress_size = self.spool.tell()
+
+    def close(self):
+        self.spool.close()
+
+    def write_into(self, zf, arcname):
+        if not zf.fp:
+            raise RuntimeError('Attempt to write to ZIP archive that was '
+                               'already closed')
+        zinfo = make_zipinfo(arcname, ZIP_DEFLATED)
+        zinfo.file_size = self.file_size
+        zinfo.compress_size = self.compress_size
+        zinfo.CRC = self.CRC
+        zinfo.header_offset = zf.fp.tell()
+        zf._writecheck(zinfo)
+        zf._didModify = True
+        if zinfo.file_size > ZIP64_LIMIT or zinfo.compress_size > ZIP64_LIMIT:
+            raise LargeZipFile('Filesize would require ZIP64 extensions')
+        zf.fp.write(zinfo.FileHeader(False))
+        self.spool.seek(0)
+        shutil.copyfileobj(self.spool, zf.fp, CHUNK_SIZE)
+        zf.filelist.append(zinfo)
+        zf.NameToInfo[zinfo.filename] = zinfo